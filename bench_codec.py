@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark of the shim message codecs: encode/decode cost and size per message.
+"""
+
+import sys
+import timeit
+
+from shim_codec import BinaryCodec, JsonCodec
+
+
+SESSION_ID = "4242-1a2b3c4d"
+
+METHODS = [
+    "getInventoryCount", "checkInventoryForItem", "walkToLocation", "getNearbyGroundItems",
+    "addUpcomingSteps", "getPlayerLocation",
+]
+
+GROUND_ITEM_NAMES = ["Bones", "Coins", "Logs", "Raw shrimps", "Feather"]
+
+MESSAGES = {
+    "request, no args": {"method": "getInventoryCount", "args": [], "id": f"{SESSION_ID}-17"},
+    "request, small args": {"method": "walkToLocation", "args": [3222, 3218, 0], "id": f"{SESSION_ID}-18"},
+    "request, step list": {
+        "method": "addUpcomingSteps",
+        "args": [[f"Chop the oak tree near the bank ({i})" for i in range(20)]],
+        "id": f"{SESSION_ID}-19"
+    },
+    "response, scalar": {"id": f"{SESSION_ID}-17", "result": 27, "error": None},
+    "response, location": {"id": f"{SESSION_ID}-20", "result": {"x": 3222, "y": 3218, "z": 0}, "error": None},
+    "response, 200 ground items": {
+        "id": f"{SESSION_ID}-21",
+        "result": [
+            {
+                "id": 500 + i % len(GROUND_ITEM_NAMES),
+                "name": GROUND_ITEM_NAMES[i % len(GROUND_ITEM_NAMES)],
+                "x": 3200 + i % 15,
+                "y": 3200 + i // 15,
+                "z": 0,
+                "amount": 1 + i % 3
+            }
+            for i in range(200)
+        ],
+        "error": None
+    },
+}
+
+
+def bench(codec, message, number: int) -> tuple:
+    """Return (encoded size, encode us/msg, decode us/msg)."""
+    payload = codec.encode(message)
+    assert codec.decode(payload) == message, f"{codec.name} did not round-trip"
+    encode_time = min(timeit.repeat(lambda: codec.encode(message), number=number, repeat=5)) / number
+    decode_time = min(timeit.repeat(lambda: codec.decode(payload), number=number, repeat=5)) / number
+    return len(payload), encode_time * 1e6, decode_time * 1e6
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    codecs = [JsonCodec(), BinaryCodec(METHODS, SESSION_ID)]
+    
+    print(f"{'message':<28} {'codec':<10} {'bytes':>7} {'encode us':>10} {'decode us':>10}")
+    for label, message in MESSAGES.items():
+        for codec in codecs:
+            size, encode_us, decode_us = bench(codec, message, number)
+            print(f"{label:<28} {codec.name:<10} {size:>7} {encode_us:>10.2f} {decode_us:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Benchmark every MCP tool through handle_call_tool against the stub shim.
+
+Measures throughput and p50/p99 latency per tool and saves the results as
+JSON; --compare checks them against an earlier run and exits non-zero when
+a tool got slower than the threshold allows.
+
+Usage: python bench_tools.py [--iterations N] [--concurrency N] [--latency S] [--jitter S]
+                             [--error-rate P] [--output-mode MODE] [--tools a,b] [--output FILE]
+                             [--compare FILE]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from bot_pool import BotPool
+from bridge_metrics import BridgeMetrics
+from ground_items import GroundItemIndex
+from handlers import handle_call_tool
+from output_format import DEFAULT_OUTPUT_MODE, OUTPUT_MODES
+from item_dictionary import ItemDictionary
+from java_caller import JavaMethodCaller
+from response_cache import ResponseCache
+from stub_shim import StubShim
+from tools import TOOL_SPECS_BY_NAME
+
+
+# Arguments used for each tool; every tool in tools.py needs an entry
+SAMPLE_ARGUMENTS: Dict[str, Dict[str, Any]] = {
+    "call_java_method": {"method_name": "getInventoryCount"},
+    "call_batch": {"calls": [{"method": "getInventoryCount"}, {"method": "bankIsOpen"}, {"method": "getPlayerLocation"}]},
+    "broadcast": {"tool": "get_inventory_count"},
+    "run_macro": {
+        "variables": {"item": "Logs"},
+        "steps": [{"repeat": 3, "steps": [
+            {"tool": "withdraw_item", "args": {"item_name": "$item", "quantity": 14}},
+            {"tool": "check_inventory_for_item", "args": {"item_name": "$item"}, "save": "count"},
+            {"if": {"var": "count", "op": "<", "value": 1}, "then": [{"stop": "Out of ${item}"}]},
+            {"tool": "deposit_all"}
+        ]}]
+    },
+    "wait_until": {"conditions": [{"type": "at_tile", "x": 3222, "y": 3218, "radius": 2}, {"type": "bank_open", "open": False}]},
+    "greet_user": {"name": "Zezima"},
+    "calculate": {"a": 6, "b": 7, "operation": "multiply"},
+    "walk_to_location": {"x": 3222, "y": 3218},
+    # The stub never moves, so a trip to its own tile measures the planner's position check
+    "travel_to_location": {"x": 3222, "y": 3218},
+    "click_object": {"object_name": "Bank booth"},
+    "get_inventory_count": {},
+    "check_inventory_for_item": {"item_name": "Logs"},
+    "inventory_contains_item": {"item_name": "Logs"},
+    "lookup_item": {"query": "Bone"},
+    "check_bank_open": {},
+    "close_bank": {},
+    "withdraw_item": {"item_name": "Logs", "quantity": 5},
+    "deposit_item": {"item_name": "Logs", "quantity": 5},
+    "deposit_all": {},
+    "run_dreambot_action": {"action": "Walking.walk", "params": ["3222", "3218"]},
+    "log_message": {"level": "INFO", "message": "benchmark"},
+    "clear_upcoming_steps": {},
+    "add_upcoming_step": {"step_description": "Walk to bank area"},
+    "get_upcoming_steps_count": {},
+    "peek_next_step": {},
+    "get_next_step": {},
+    "set_current_step": {"step_description": "Walk to bank area"},
+    "remove_upcoming_step": {"index": 0},
+    "insert_upcoming_step": {"index": 0, "step_description": "Open bank booth"},
+    "get_upcoming_steps": {},
+    "add_upcoming_steps": {"step_descriptions": ["Open bank booth", "Deposit all items"]},
+    "replace_upcoming_steps": {"step_descriptions": ["Open bank booth", "Deposit all items"]},
+    "apply_step_edits": {"edits": [{"op": "insert", "index": 0, "step_description": "Open bank booth"}, {"op": "remove", "index": 1}]},
+    "handle_npc_dialogue": {"npc_name": "Banker"},
+    "use_item_on_item": {"primary_item": "Tinderbox", "secondary_item": "Logs"},
+    "perform_item_action": {"action": "Eat", "item": "Lobster"},
+    "pickup_ground_item": {"item_name": "Bones"},
+    "pickup_ground_item_by_id": {"item_id": 526},
+    "get_nearby_ground_items": {},
+    "ground_item_exists": {"item_name": "Bones"},
+    "get_distance_to_ground_item": {"item_name": "Bones"},
+    "find_ground_items": {"radius": 10},
+    "get_current_tile": {},
+    "get_more_results": {"cursor": "r1:20"},
+    "get_bridge_metrics": {},
+    "get_cache_stats": {},
+}
+
+# Calls made before measuring each tool, to open connections and warm caches
+WARMUP_CALLS = 5
+
+
+def percentile(sorted_values: List[float], quantile: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(quantile * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+async def bench_tool(java_caller: JavaMethodCaller, bot_pool: BotPool, name: str,
+                     iterations: int, concurrency: int, output_mode: str = DEFAULT_OUTPUT_MODE) -> Dict[str, Any]:
+    """Call one tool iterations times with up to concurrency calls in flight."""
+    arguments = SAMPLE_ARGUMENTS[name]
+    for _ in range(WARMUP_CALLS):
+        await handle_call_tool(java_caller, name, dict(arguments), bot_pool, output_mode)
+    java_caller.metrics.clear()
+    
+    latencies: List[float] = []
+    remaining = iter(range(iterations))
+    
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            await handle_call_tool(java_caller, name, dict(arguments), bot_pool, output_mode)
+            latencies.append(time.perf_counter() - started)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, iterations))))
+    elapsed = time.perf_counter() - started
+    
+    latencies.sort()
+    counters = java_caller.metrics.snapshot().values()
+    output_bytes = sum(entry["bytes"] for entry in java_caller.metrics.outputs.get(name, {}).values())
+    return {
+        "calls": len(latencies),
+        "shim_calls": sum(entry["calls"] for entry in counters),
+        "shim_errors": sum(entry["errors"] + entry["timeouts"] for entry in counters),
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "mean_ms": sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+        "mean_output_bytes": output_bytes / len(latencies) if latencies else 0.0
+    }
+
+
+async def run_suite(tool_names: List[str], iterations: int, concurrency: int, latency: float, jitter: float,
+                    error_rate: float, cache: bool, seed: Optional[int],
+                    output_mode: str = DEFAULT_OUTPUT_MODE) -> Dict[str, Dict[str, Any]]:
+    """Start a stub shim on temporary FIFOs and benchmark each tool against it."""
+    directory = tempfile.mkdtemp(prefix="dreambot_bench_")
+    pipe_path = os.path.join(directory, "shim_pipe")
+    response_pipe_path = os.path.join(directory, "shim_response_pipe")
+    shim = StubShim(pipe_path, response_pipe_path, latency=latency, jitter=jitter, error_rate=error_rate, seed=seed)
+    # Built the way server.py builds the default caller
+    java_caller = JavaMethodCaller(pipe_path, response_pipe_path, cache=ResponseCache() if cache else None,
+                                   metrics=BridgeMetrics(), ground_items=GroundItemIndex() if cache else None,
+                                   items=ItemDictionary())
+    bot_pool = BotPool(java_caller)
+    results = {}
+    try:
+        shim.start()
+        for name in tool_names:
+            results[name] = await bench_tool(java_caller, bot_pool, name, iterations, concurrency, output_mode)
+            print(f"{name:<28} {results[name]['throughput']:>10.1f}/s  p50 {results[name]['p50_ms']:>8.3f} ms"
+                  f"  p99 {results[name]['p99_ms']:>8.3f} ms", file=sys.stderr)
+    finally:
+        bot_pool.close()
+        java_caller.close()
+        shim.stop()
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """Print per-tool changes against a baseline run; returns the tools that regressed."""
+    regressions = []
+    print(f"{'tool':<28} {'p50 ms':>17} {'p99 ms':>17} {'throughput/s':>21}")
+    for name, result in current["tools"].items():
+        before = baseline["tools"].get(name)
+        if before is None:
+            print(f"{name:<28} (new)")
+            continue
+        regressed = (
+            result["p50_ms"] > before["p50_ms"] * (1 + threshold)
+            or result["p99_ms"] > before["p99_ms"] * (1 + threshold)
+            or result["throughput"] < before["throughput"] * (1 - threshold)
+        )
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<28} {before['p50_ms']:>7.3f} -> {result['p50_ms']:>7.3f}"
+              f" {before['p99_ms']:>7.3f} -> {result['p99_ms']:>7.3f}"
+              f" {before['throughput']:>9.1f} -> {result['throughput']:>9.1f}"
+              f"{'  REGRESSED' if regressed else ''}")
+    return regressions
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every tool through handle_call_tool against the stub shim.")
+    parser.add_argument("--iterations", type=int, default=200, help="measured calls per tool")
+    parser.add_argument("--concurrency", type=int, default=8, help="calls in flight per tool")
+    parser.add_argument("--latency", type=float, default=0.001, help="stub shim reply latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="stub shim latency jitter in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of shim calls that fail")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for jitter and errors")
+    parser.add_argument("--no-cache", action="store_true", help="benchmark without the response cache and ground item index")
+    parser.add_argument("--output-mode", choices=OUTPUT_MODES, default=DEFAULT_OUTPUT_MODE,
+                        help="result format for tools that take an output argument")
+    parser.add_argument("--tools", help="comma-separated tool names (default: all)")
+    parser.add_argument("--output", help="results file (default: bench_tools_<revision>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown counted as a regression")
+    options = parser.parse_args()
+    
+    tool_names = options.tools.split(",") if options.tools else list(TOOL_SPECS_BY_NAME)
+    for name in tool_names:
+        if name not in TOOL_SPECS_BY_NAME:
+            parser.error(f"Unknown tool: {name}")
+        if name not in SAMPLE_ARGUMENTS:
+            parser.error(f"No sample arguments for tool {name}; add them to SAMPLE_ARGUMENTS")
+        error = TOOL_SPECS_BY_NAME[name].validate(SAMPLE_ARGUMENTS[name])
+        if error:
+            parser.error(f"Sample arguments for {name} are invalid: {error}")
+    
+    revision = git_revision()
+    results = asyncio.run(run_suite(tool_names, options.iterations, options.concurrency, options.latency,
+                                    options.jitter, options.error_rate, not options.no_cache, options.seed,
+                                    options.output_mode))
+    report = {
+        "revision": revision,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "iterations": options.iterations,
+            "concurrency": options.concurrency,
+            "latency": options.latency,
+            "jitter": options.jitter,
+            "error_rate": options.error_rate,
+            "cache": not options.no_cache,
+            "output_mode": options.output_mode
+        },
+        "tools": results
+    }
+    output_path = options.output or f"bench_tools_{revision or 'unknown'}.json"
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output_path}", file=sys.stderr)
+    
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("settings") != report["settings"]:
+            print("Warning: baseline was recorded with different settings", file=sys.stderr)
+        regressions = compare(baseline, report, options.threshold)
+        if regressions:
+            print(f"Regressed: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+from bridge_metrics import BridgeMetrics
+from ground_items import GroundItemIndex
+from java_caller import JavaMethodCaller
+from response_cache import ResponseCache
+from transports import DEFAULT_PIPE_PATH, FifoTransport, create_transport, response_pipe_path_for
+
+
+# bot_id that always refers to the server's own caller
+DEFAULT_BOT_ID = "default"
+
+
+class BotPool:
+    """Long-lived JavaMethodCallers keyed by bot id, one per DreamBot client.
+    
+    Bots come from a JSON registry file:
+    
+        {
+            "bots": {
+                "main": {"transport": "unix", "socket_path": "/tmp/main_shim.sock"},
+                "alt1": {"pipe_path": "/tmp/alt1_pipe", "response_pipe_path": "/tmp/alt1_response_pipe"},
+                "alt2": {"transport": "shm", "ring_path": "/dev/shm/alt2_ring", "codec": "binary"}
+            }
+        }
+    
+    Each entry is a create_transport() config plus an optional codec. A FIFO
+    bot without response_pipe_path reads the response FIFO paired with its
+    pipe_path; no two callers may read the same response FIFO, since each
+    one's reader would take the others' replies. A bot's caller (with its
+    own response cache, and its own metrics when the default caller collects
+    them) is created on first use and kept open, so routing a call to a bot
+    never reconnects. Tool calls without a bot_id go to the default caller.
+    """
+    
+    def __init__(self, default_caller: JavaMethodCaller, registry: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.default_caller = default_caller
+        self.registry: Dict[str, Dict[str, Any]] = dict(registry or {})
+        self._callers: Dict[str, JavaMethodCaller] = {}
+        # Callers for ad-hoc pipe paths given to call_java_method
+        self._pipe_callers: Dict[str, JavaMethodCaller] = {}
+    
+    def load_registry(self, registry_path: str) -> None:
+        """Load bot entries from a registry file; raises ValueError if it is malformed."""
+        with open(registry_path) as f:
+            try:
+                registry = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Bot registry {registry_path} is not valid JSON: {e}")
+        
+        bots = registry.get("bots") if isinstance(registry, dict) else None
+        if not isinstance(bots, dict) or not all(isinstance(entry, dict) for entry in bots.values()):
+            raise ValueError(f"Bot registry {registry_path} must map \"bots\" to an object of bot configs")
+        if DEFAULT_BOT_ID in bots:
+            raise ValueError(f"Bot registry {registry_path} must not redefine the \"{DEFAULT_BOT_ID}\" bot")
+        
+        # Entries being replaced do not conflict with their new configs
+        in_use = {path: owner for path, owner in self._response_pipes_in_use().items() if owner not in bots}
+        for bot_id, config in sorted(bots.items()):
+            response_pipe_path = _response_pipe_path(config)
+            if response_pipe_path is None:
+                continue
+            if response_pipe_path in in_use:
+                raise ValueError(
+                    f"Bot registry {registry_path}: bot \"{bot_id}\" reads response FIFO {response_pipe_path}, "
+                    f"already read by \"{in_use[response_pipe_path]}\""
+                )
+            in_use[response_pipe_path] = bot_id
+        self.registry.update(bots)
+    
+    def bot_ids(self) -> List[str]:
+        """Return every routable bot id, the default bot first."""
+        return [DEFAULT_BOT_ID] + sorted(self.registry)
+    
+    def get(self, bot_id: Optional[str]) -> Optional[JavaMethodCaller]:
+        """Return the pooled caller for bot_id, or None if the bot is not registered."""
+        if bot_id is None or bot_id == DEFAULT_BOT_ID:
+            return self.default_caller
+        
+        caller = self._callers.get(bot_id)
+        if caller is None:
+            config = self.registry.get(bot_id)
+            if config is None:
+                return None
+            caller = JavaMethodCaller(
+                config.get("pipe_path", DEFAULT_PIPE_PATH),
+                config.get("response_pipe_path"),
+                cache=ResponseCache(),
+                transport=create_transport(config),
+                codec=config.get("codec", "json"),
+                metrics=BridgeMetrics() if self.default_caller.metrics else None,
+                tracer=self.default_caller.tracer,
+                ground_items=GroundItemIndex(),
+                # Routes and item names depend on the game world, not the bot, so every bot shares them
+                routes=self.default_caller.routes,
+                items=self.default_caller.items
+            )
+            self._callers[bot_id] = caller
+        return caller
+    
+    def connected_callers(self) -> Dict[str, JavaMethodCaller]:
+        """Return the default caller and every bot caller created so far, keyed by bot id."""
+        return dict({DEFAULT_BOT_ID: self.default_caller}, **self._callers)
+    
+    def for_pipe(self, pipe_path: str, response_pipe_path: Optional[str] = None) -> JavaMethodCaller:
+        """Return a pooled caller for an arbitrary request FIFO.
+        
+        Replies are read from response_pipe_path, by default the FIFO paired
+        with pipe_path; raises ValueError if another caller already reads it.
+        """
+        response_pipe_path = response_pipe_path or response_pipe_path_for(pipe_path)
+        caller = self._pipe_callers.get(response_pipe_path)
+        if caller is not None and caller.pipe_path == pipe_path:
+            return caller
+        owner = self._response_pipes_in_use().get(response_pipe_path)
+        if owner is not None:
+            raise ValueError(f"Response FIFO {response_pipe_path} is already read by {owner}")
+        caller = JavaMethodCaller(pipe_path, response_pipe_path)
+        self._pipe_callers[response_pipe_path] = caller
+        return caller
+    
+    def _response_pipes_in_use(self) -> Dict[str, str]:
+        """Map each response FIFO read by the default caller, a registered bot or a pipe caller to its reader."""
+        in_use = {}
+        if isinstance(self.default_caller.transport, FifoTransport):
+            in_use[self.default_caller.transport.response_pipe_path] = DEFAULT_BOT_ID
+        for bot_id, config in self.registry.items():
+            response_pipe_path = _response_pipe_path(config)
+            if response_pipe_path is not None:
+                in_use[response_pipe_path] = bot_id
+        for response_pipe_path, caller in self._pipe_callers.items():
+            in_use[response_pipe_path] = f"the caller for {caller.pipe_path}"
+        return in_use
+    
+    def close(self) -> None:
+        """Close every pooled caller; the default caller is left to its owner."""
+        for caller in list(self._callers.values()) + list(self._pipe_callers.values()):
+            try:
+                caller.close()
+            except Exception as e:
+                print(f"Error closing bot connection: {e}", file=sys.stderr)
+        self._callers.clear()
+        self._pipe_callers.clear()
+
+
+def _response_pipe_path(config: Dict[str, Any]) -> Optional[str]:
+    """Return the response FIFO a bot config reads, or None for transports without one."""
+    if config.get("transport", "fifo") != "fifo":
+        return None
+    return config.get("response_pipe_path") or response_pipe_path_for(config.get("pipe_path", DEFAULT_PIPE_PATH))
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+from typing import Any, Dict
+
+
+# Phases of one shim round-trip, in order
+#   encode  building the request bytes
+#   write   handing them to the transport
+#   wait    from the write completing until the reply is read (includes shim execution)
+#   decode  parsing the reply
+#   shim    execution time reported by the shim itself (replies carrying "shim_time_ms" only)
+#   total   the whole call as seen by the caller
+PHASES = ("encode", "write", "wait", "decode", "shim", "total")
+
+# Sub-buckets per power of two; 32 keeps every reported value within ~3% of the recorded one
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class LatencyHistogram:
+    """HDR-style log-linear histogram of durations at microsecond resolution.
+    
+    Values below 2 * SUB_BUCKETS microseconds are counted exactly; above that
+    each power of two is split into SUB_BUCKETS linear buckets, so recording
+    is O(1) and memory grows only with the range of values seen.
+    """
+    
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def record(self, seconds: float) -> None:
+        micros = int(seconds * 1_000_000) if seconds > 0 else 0
+        index = _bucket_index(micros)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+    
+    def percentile(self, quantile: float) -> float:
+        """Return the value (in seconds) below which the given fraction of recorded values fall."""
+        if not self.count:
+            return 0.0
+        threshold = quantile * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= threshold:
+                return min(_bucket_high(index) / 1_000_000, self.max)
+        return self.max
+    
+    def summary(self) -> Dict[str, float]:
+        """Return count, mean, p50/p90/p99 and max in seconds."""
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "max": self.max
+        }
+
+
+class BridgeMetrics:
+    """Per-method call counters and per-phase latency histograms for one JavaMethodCaller.
+    
+    The server's own caller also counts the bytes of text each tool returns,
+    per output mode.
+    """
+    
+    def __init__(self):
+        self.histograms: Dict[str, Dict[str, LatencyHistogram]] = {}
+        self.counters: Dict[str, Dict[str, int]] = {}
+        # {tool: {output mode: {"calls", "bytes"}}}
+        self.outputs: Dict[str, Dict[str, Dict[str, int]]] = {}
+    
+    def record_phase(self, method_name: str, phase: str, seconds: float) -> None:
+        phases = self.histograms.get(method_name)
+        if phases is None:
+            phases = self.histograms[method_name] = {}
+        histogram = phases.get(phase)
+        if histogram is None:
+            histogram = phases[phase] = LatencyHistogram()
+        histogram.record(seconds)
+    
+    def count(self, method_name: str, outcome: str) -> None:
+        """Count one call outcome: "calls", "errors", "timeouts" or "cancelled"."""
+        counters = self.counters.get(method_name)
+        if counters is None:
+            counters = self.counters[method_name] = {"calls": 0, "errors": 0, "timeouts": 0, "cancelled": 0}
+        counters[outcome] += 1
+    
+    def record_output(self, tool: str, mode: str, size: int) -> None:
+        """Count one tool result of size bytes returned in the given output mode."""
+        modes = self.outputs.get(tool)
+        if modes is None:
+            modes = self.outputs[tool] = {}
+        entry = modes.get(mode)
+        if entry is None:
+            entry = modes[mode] = {"calls": 0, "bytes": 0}
+        entry["calls"] += 1
+        entry["bytes"] += size
+    
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return {method: {"calls", "errors", "timeouts", "cancelled", "phases": {phase: summary}}}."""
+        result = {}
+        for method_name in sorted(set(self.counters) | set(self.histograms)):
+            entry = dict(self.counters.get(method_name, {"calls": 0, "errors": 0, "timeouts": 0, "cancelled": 0}))
+            phases = self.histograms.get(method_name, {})
+            entry["phases"] = {phase: phases[phase].summary() for phase in PHASES if phase in phases}
+            result[method_name] = entry
+        return result
+    
+    def clear(self) -> None:
+        self.histograms.clear()
+        self.counters.clear()
+        self.outputs.clear()
+
+
+def format_prometheus(metrics_by_bot: Dict[str, BridgeMetrics]) -> str:
+    """Render metrics in the Prometheus text exposition format, labelled by bot, method and phase."""
+    lines = [
+        "# HELP dreambot_bridge_calls_total Shim calls made.",
+        "# TYPE dreambot_bridge_calls_total counter",
+    ]
+    failures = [
+        "# HELP dreambot_bridge_failures_total Shim calls that failed, by outcome.",
+        "# TYPE dreambot_bridge_failures_total counter",
+    ]
+    for bot_id, metrics in sorted(metrics_by_bot.items()):
+        for method_name, counters in sorted(metrics.counters.items()):
+            lines.append(f'dreambot_bridge_calls_total{{{_labels(bot=bot_id, method=method_name)}}} {counters["calls"]}')
+            for outcome in ("errors", "timeouts", "cancelled"):
+                labels = _labels(bot=bot_id, method=method_name, outcome=outcome)
+                failures.append(f'dreambot_bridge_failures_total{{{labels}}} {counters[outcome]}')
+    lines += failures
+    
+    lines += [
+        "# HELP dreambot_bridge_phase_seconds Latency of each phase of a shim round-trip.",
+        "# TYPE dreambot_bridge_phase_seconds summary",
+    ]
+    maxima = [
+        "# HELP dreambot_bridge_phase_seconds_max Slowest observation of each phase.",
+        "# TYPE dreambot_bridge_phase_seconds_max gauge",
+    ]
+    for bot_id, metrics in sorted(metrics_by_bot.items()):
+        for method_name, phases in sorted(metrics.histograms.items()):
+            for phase in PHASES:
+                histogram = phases.get(phase)
+                if histogram is None:
+                    continue
+                labels = _labels(bot=bot_id, method=method_name, phase=phase)
+                for quantile in QUANTILES:
+                    lines.append(f'dreambot_bridge_phase_seconds{{{labels},quantile="{quantile}"}} {histogram.percentile(quantile):.6f}')
+                lines.append(f'dreambot_bridge_phase_seconds_sum{{{labels}}} {histogram.total:.6f}')
+                lines.append(f'dreambot_bridge_phase_seconds_count{{{labels}}} {histogram.count}')
+                maxima.append(f'dreambot_bridge_phase_seconds_max{{{labels}}} {histogram.max:.6f}')
+    
+    outputs = [
+        "# HELP dreambot_tool_output_bytes_total Bytes of text returned by each tool, by output mode.",
+        "# TYPE dreambot_tool_output_bytes_total counter",
+    ]
+    output_calls = [
+        "# HELP dreambot_tool_outputs_total Tool results returned, by output mode.",
+        "# TYPE dreambot_tool_outputs_total counter",
+    ]
+    for bot_id, metrics in sorted(metrics_by_bot.items()):
+        for tool, modes in sorted(metrics.outputs.items()):
+            for mode, entry in sorted(modes.items()):
+                labels = _labels(bot=bot_id, tool=tool, mode=mode)
+                outputs.append(f'dreambot_tool_output_bytes_total{{{labels}}} {entry["bytes"]}')
+                output_calls.append(f'dreambot_tool_outputs_total{{{labels}}} {entry["calls"]}')
+    return "\n".join(lines + maxima + outputs + output_calls) + "\n"
+
+
+def write_prometheus_textfile(path: str, metrics_by_bot: Dict[str, BridgeMetrics]) -> bool:
+    """Atomically replace a node_exporter textfile-collector file; returns False on failure."""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "w") as f:
+            f.write(format_prometheus(metrics_by_bot))
+        os.replace(temp_path, path)
+        return True
+    except OSError as e:
+        print(f"Error writing metrics to {path}: {e}", file=sys.stderr)
+        return False
+
+
+def _labels(**labels: str) -> str:
+    return ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels.items())
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _bucket_index(micros: int) -> int:
+    if micros < 2 * SUB_BUCKETS:
+        return micros
+    shift = micros.bit_length() - SUB_BUCKET_BITS - 1
+    return (shift + 1) * SUB_BUCKETS + (micros >> shift) - SUB_BUCKETS
+
+
+def _bucket_high(index: int) -> int:
+    """Highest microsecond value that falls in a bucket."""
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    mantissa = index % SUB_BUCKETS + SUB_BUCKETS
+    return ((mantissa + 1) << shift) - 1
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+
+import math
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from item_dictionary import fold
+from route_cache import Tile
+
+
+# Side of the square grid cells items are bucketed into
+CELL_SIZE = 8
+
+# Shim queries the index answers, from the getNearbyGroundItems result
+GROUND_ITEM_QUERIES = ("groundItemExists", "getDistanceToGroundItem")
+
+Match = Tuple[float, Dict[str, Any]]
+
+
+def _item_key(item: Any, use_item_id: bool) -> str:
+    if use_item_id:
+        return f"id:{item}"
+    return f"name:{fold(item)}" if isinstance(item, str) else f"name:{item}"
+
+
+class GroundItemIndex:
+    """Spatial index over a getNearbyGroundItems result.
+    
+    Items are bucketed by grid cell and indexed by name and id, so existence,
+    nearest-item, distance-sorted and within-radius queries need no shim
+    call. The index holds no freshness of its own: the caller refreshes it
+    from the state mirror or response cache before each query, and it is
+    only rebuilt when that returns a different result. Distances are
+    Euclidean, between tiles on the same plane. Names match the way
+    wait_until and the item dictionary compare them: case-folded, with runs
+    of whitespace collapsed.
+    """
+    
+    def __init__(self, cell_size: int = CELL_SIZE):
+        self.cell_size = cell_size
+        self.items: List[Dict[str, Any]] = []
+        # When the current items were indexed (time.monotonic()), 0 before the first update
+        self.built_at = 0.0
+        self.counters = {"answered": 0, "fallbacks": 0, "rebuilds": 0}
+        self._source: Optional[list] = None
+        self._cells: Dict[Tile, List[Dict[str, Any]]] = {}
+        self._by_key: Dict[str, List[Dict[str, Any]]] = {}
+    
+    def update(self, items: list) -> None:
+        """Index a getNearbyGroundItems result unless it is the one already indexed."""
+        if items is self._source:
+            return
+        self._source = items
+        self.items = [item for item in items if isinstance(item, dict)]
+        self._cells = {}
+        self._by_key = {}
+        for item in self.items:
+            self._by_key.setdefault(_item_key(item.get("name"), False), []).append(item)
+            self._by_key.setdefault(_item_key(item.get("id"), True), []).append(item)
+            if isinstance(item.get("x"), int) and isinstance(item.get("y"), int):
+                self._cells.setdefault(self._cell_of(_item_tile(item)), []).append(item)
+        self.built_at = time.monotonic()
+        self.counters["rebuilds"] += 1
+    
+    def exists(self, item: Any, use_item_id: bool = False) -> bool:
+        return bool(self._by_key.get(_item_key(item, use_item_id)))
+    
+    def nearest(self, origin: Tile, item: Any = None, use_item_id: bool = False) -> Optional[Match]:
+        """The (distance, item) closest to origin, optionally of one kind; None if there is none."""
+        if item is not None:
+            return min(self._matches(origin, self._by_key.get(_item_key(item, use_item_id), [])), default=None, key=_distance)
+        
+        # Search outward ring by ring; every tile in ring k + 1 is more than k cells' width away
+        center = self._cell_of(origin)
+        best: Optional[Match] = None
+        for ring in range(self._max_ring(origin) + 1):
+            for match in self._matches(origin, self._ring_items(center, ring)):
+                if best is None or match[0] < best[0]:
+                    best = match
+            if best is not None and best[0] <= ring * self.cell_size:
+                break
+        return best
+    
+    def by_distance(self, origin: Tile, item: Any = None, use_item_id: bool = False,
+                    radius: Optional[float] = None) -> List[Match]:
+        """(distance, item) pairs on origin's plane, nearest first, optionally of one kind and within radius tiles."""
+        if item is not None:
+            candidates = self._by_key.get(_item_key(item, use_item_id), [])
+        elif radius is not None:
+            reach = int(radius) // self.cell_size + 1
+            center = self._cell_of(origin)
+            candidates = [
+                candidate
+                for cx in range(center[0] - reach, center[0] + reach + 1)
+                for cy in range(center[1] - reach, center[1] + reach + 1)
+                for candidate in self._cells.get((cx, cy, origin[2]), ())
+            ]
+        else:
+            candidates = self.items
+        matches = self._matches(origin, candidates)
+        if radius is not None:
+            matches = [match for match in matches if match[0] <= radius]
+        return sorted(matches, key=_distance)
+    
+    def answer(self, method_name: str, args: tuple, origin: Optional[Tile]) -> Any:
+        """The result the shim would return for a GROUND_ITEM_QUERIES call."""
+        if method_name == "groundItemExists":
+            return self.exists(*args)
+        match = self.nearest(origin, *args) if origin is not None else None
+        # The shim answers -1 when there is no such item
+        return -1 if match is None else round(match[0], 2)
+    
+    def stats(self) -> Dict[str, Any]:
+        return dict(
+            self.counters,
+            items=len(self.items),
+            age=round(time.monotonic() - self.built_at, 3) if self.built_at else None
+        )
+    
+    def _cell_of(self, tile: Tile) -> Tile:
+        return (tile[0] // self.cell_size, tile[1] // self.cell_size, tile[2])
+    
+    def _max_ring(self, origin: Tile) -> int:
+        """The ring (in cells around origin's cell) holding the farthest occupied cell on origin's plane."""
+        center = self._cell_of(origin)
+        return max(
+            (max(abs(cell[0] - center[0]), abs(cell[1] - center[1])) for cell in self._cells if cell[2] == origin[2]),
+            default=-1
+        )
+    
+    def _ring_items(self, center: Tile, ring: int) -> List[Dict[str, Any]]:
+        if ring == 0:
+            return self._cells.get(center, [])
+        items = []
+        for offset in range(-ring, ring + 1):
+            for cell in ((center[0] + offset, center[1] - ring), (center[0] + offset, center[1] + ring)):
+                items.extend(self._cells.get((cell[0], cell[1], center[2]), ()))
+        for offset in range(-ring + 1, ring):
+            for cell in ((center[0] - ring, center[1] + offset), (center[0] + ring, center[1] + offset)):
+                items.extend(self._cells.get((cell[0], cell[1], center[2]), ()))
+        return items
+    
+    @staticmethod
+    def _matches(origin: Tile, candidates: List[Dict[str, Any]]) -> List[Match]:
+        matches = []
+        for candidate in candidates:
+            if not isinstance(candidate.get("x"), int) or not isinstance(candidate.get("y"), int):
+                continue
+            tile = _item_tile(candidate)
+            if tile[2] == origin[2]:
+                matches.append((math.hypot(tile[0] - origin[0], tile[1] - origin[1]), candidate))
+        return matches
+
+
+def _item_tile(item: Dict[str, Any]) -> Tile:
+    return (item["x"], item["y"], item.get("z") or 0)
+
+
+def _distance(match: Match) -> float:
+    return match[0]
@@ -1,616 +1,464 @@
 #!/usr/bin/env python3
 
+import asyncio
+import fnmatch
 import logging
-from typing import Any, Dict, Optional
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
 import mcp.types as types
+from bot_pool import DEFAULT_BOT_ID, BotPool
+from ground_items import GroundItemIndex
 from java_caller import JavaMethodCaller
+from macros import MacroRun
+from output_format import DEFAULT_OUTPUT_MODE, OUTPUT_MODES, ResultPager, page_text, render_error, render_page, render_result
+from route_cache import format_tile, parse_tile
+from tools import QUICK_TIMEOUT, TOOL_SPECS_BY_NAME, ToolSpec
+from tracing import traced
+from wait_conditions import ConditionWaiter
+from walk_planner import WalkPlanner
 
 
 logger = logging.getLogger(__name__)
 
+# Rest of long list and text results, for get_more_results
+_result_pager = ResultPager()
+
+
+# (content, success) of one tool call; success is False when the tool or the shim reported a failure
+ToolReply = Tuple[List[types.TextContent], bool]
+
 
 async def handle_call_tool(
     java_caller: JavaMethodCaller,
     name: str, 
-    arguments: Optional[Dict[str, Any]]
+    arguments: Optional[Dict[str, Any]],
+    bot_pool: Optional[BotPool] = None,
+    output_mode: str = DEFAULT_OUTPUT_MODE
 ) -> list[types.TextContent]:
-    """Handle tool calls."""
+    """Handle tool calls, routing them to the bot named by an optional bot_id argument.
+    
+    output_mode is the result format of tools that take an output argument
+    when the call does not choose one.
+    """
+    content, _ = await run_tool(java_caller, name, arguments, bot_pool, output_mode)
+    return content
+
+
+async def run_tool(
+    java_caller: JavaMethodCaller,
+    name: str,
+    arguments: Optional[Dict[str, Any]],
+    bot_pool: Optional[BotPool] = None,
+    output_mode: str = DEFAULT_OUTPUT_MODE
+) -> ToolReply:
+    """handle_call_tool that also reports whether the call succeeded, for tools running other tools."""
     args = arguments or {}
+    spec = TOOL_SPECS_BY_NAME.get(name)
+    if spec is not None and args.get("output") is None and "output" in spec.input_schema["properties"]:
+        args = dict(args, output=output_mode)
+    # Each invocation is one span when tracing is enabled; shim calls made for it become children
+    with traced(java_caller.tracer, "tool", tool=name, bot_id=args.get("bot_id")):
+        content, success = await _dispatch_tool(java_caller, name, args, bot_pool, output_mode)
+    if java_caller.metrics:
+        mode = args.get("output") if args.get("output") in OUTPUT_MODES else DEFAULT_OUTPUT_MODE
+        java_caller.metrics.record_output(name, mode, sum(len(item.text.encode()) for item in content))
+    return content, success
+
+
+def _reply(text: str, success: bool = True) -> ToolReply:
+    return [types.TextContent(type="text", text=text)], success
+
+
+async def _dispatch_tool(java_caller: JavaMethodCaller, name: str, args: Dict[str, Any],
+                         bot_pool: Optional[BotPool], output_mode: str) -> ToolReply:
+    """Validate, route and run one tool call."""
+    spec = TOOL_SPECS_BY_NAME.get(name)
+    if spec is None:
+        return _reply(f"Unknown tool: {name}", False)
+    
+    # Reject bad arguments before anything is written to the shim
+    with traced(java_caller.tracer, "validate"):
+        error = spec.validate(args)
+    if error:
+        return _reply(f"Error: {error}", False)
+    
+    bot_id = args.get("bot_id")
+    if bot_id is not None:
+        if bot_pool is None:
+            return _reply("Error: bot_id requires a bot registry", False)
+        java_caller = bot_pool.get(bot_id)
+        if java_caller is None:
+            known = ", ".join(bot_pool.bot_ids())
+            return _reply(f"Error: Unknown bot_id '{bot_id}' (known bots: {known})", False)
+    
+    args, error = _resolve_item_names(java_caller, spec, args)
+    if error:
+        return _reply(f"Error: {error}", False)
     
     try:
-        if name == "call_java_method":
-            return await _handle_call_java_method(args)
-        elif name == "greet_user":
-            return await _handle_greet_user(java_caller, args)
-        elif name == "calculate":
-            return await _handle_calculate(java_caller, args)
-        elif name == "walk_to_location":
-            return await _handle_walk_to_location(java_caller, args)
-        elif name == "click_object":
-            return await _handle_click_object(java_caller, args)
-        elif name == "get_inventory_count":
-            return await _handle_get_inventory_count(java_caller, args)
-        elif name == "check_inventory_for_item":
-            return await _handle_check_inventory_for_item(java_caller, args)
-        elif name == "inventory_contains_item":
-            return await _handle_inventory_contains_item(java_caller, args)
-        elif name == "check_bank_open":
-            return await _handle_check_bank_open(java_caller, args)
-        elif name == "close_bank":
-            return await _handle_close_bank(java_caller, args)
-        elif name == "withdraw_item":
-            return await _handle_withdraw_item(java_caller, args)
-        elif name == "deposit_item":
-            return await _handle_deposit_item(java_caller, args)
-        elif name == "deposit_all":
-            return await _handle_deposit_all(java_caller, args)
-        elif name == "run_dreambot_action":
-            return await _handle_run_dreambot_action(java_caller, args)
-        elif name == "log_message":
-            return await _handle_log_message(java_caller, args)
-        # Task Management Tools
-        elif name == "clear_upcoming_steps":
-            return await _handle_clear_upcoming_steps(java_caller, args)
-        elif name == "add_upcoming_step":
-            return await _handle_add_upcoming_step(java_caller, args)
-        elif name == "get_upcoming_steps_count":
-            return await _handle_get_upcoming_steps_count(java_caller, args)
-        elif name == "peek_next_step":
-            return await _handle_peek_next_step(java_caller, args)
-        elif name == "get_next_step":
-            return await _handle_get_next_step(java_caller, args)
-        elif name == "set_current_step":
-            return await _handle_set_current_step(java_caller, args)
-        elif name == "remove_upcoming_step":
-            return await _handle_remove_upcoming_step(java_caller, args)
-        elif name == "insert_upcoming_step":
-            return await _handle_insert_upcoming_step(java_caller, args)
-        elif name == "handle_npc_dialogue":
-            return await _handle_npc_dialogue(java_caller, args)
-        elif name == "use_item_on_item":
-            return await _handle_use_item_on_item(java_caller, args)
-        elif name == "perform_item_action":
-            return await _handle_perform_item_action(java_caller, args)
-        # Ground Item Tools
-        elif name == "pickup_ground_item":
-            return await _handle_pickup_ground_item(java_caller, args)
-        elif name == "pickup_ground_item_by_id":
-            return await _handle_pickup_ground_item_by_id(java_caller, args)
-        elif name == "get_nearby_ground_items":
-            return await _handle_get_nearby_ground_items(java_caller, args)
-        elif name == "ground_item_exists":
-            return await _handle_ground_item_exists(java_caller, args)
-        elif name == "get_distance_to_ground_item":
-            return await _handle_get_distance_to_ground_item(java_caller, args)
-        elif name == "get_current_tile":
-            return await _handle_get_current_tile(java_caller, args)
-        else:
-            return [types.TextContent(type="text", text=f"Unknown tool: {name}")]
+        if spec.method is None:
+            return await _LOCAL_HANDLERS[name](java_caller, args, bot_pool, output_mode)
+        return await _handle_shim_tool(java_caller, spec, args)
     
     except Exception as e:
         logger.error(f"Error executing tool {name}: {e}")
-        return [types.TextContent(type="text", text=f"Error: {str(e)}")]
-
-
-async def _handle_call_java_method(args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle call_java_method tool."""
-    method_name = args.get("method_name")
-    method_args = args.get("args", [])
-    pipe_path = args.get("pipe_path", "/tmp/dreambot_shim_pipe")
-    
-    if not method_name:
-        return [types.TextContent(type="text", text="Error: method_name is required")]
-    
-    caller = JavaMethodCaller(pipe_path)
-    response = caller.call_method_with_response(method_name, *method_args)
-    
-    if response["success"]:
-        result = response.get("result", "Method executed successfully")
-        return [types.TextContent(
-            type="text", 
-            text=f"Java method '{method_name}' result: {result}"
-        )]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(
-            type="text", 
-            text=f"Failed to call Java method '{method_name}': {error}"
-        )]
-
-
-async def _handle_greet_user(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle greet_user tool."""
-    name_arg = args.get("name")
-    if not name_arg:
-        return [types.TextContent(type="text", text="Error: name is required")]
-    
-    response = java_caller.greet(name_arg)
-    if response["success"]:
-        result = response.get("result", "Greeting completed")
-        return [types.TextContent(type="text", text=f"Greeting result: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to greet user: {error}")]
-
-
-async def _handle_calculate(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle calculate tool."""
-    a = args.get("a")
-    b = args.get("b")
-    operation = args.get("operation")
-    
-    if a is None or b is None or not operation:
-        return [types.TextContent(type="text", text="Error: a, b, and operation are required")]
-    
-    response = java_caller.calculate(a, b, operation)
-    if response["success"]:
-        result = response.get("result", f"{a} {operation} {b}")
-        return [types.TextContent(
-            type="text", 
-            text=f"Calculation result: {result}"
-        )]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to calculate: {error}")]
-
-
-async def _handle_walk_to_location(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle walk_to_location tool."""
-    x = args.get("x")
-    y = args.get("y")
-    z = args.get("z", 0)  # Default z to 0 if not provided
-    
-    if x is None or y is None:
-        return [types.TextContent(type="text", text="Error: x and y coordinates are required")]
-    
-    response = java_caller.walk_to_location(x, y, z)
-    if response["success"]:
-        result = response.get("result", f"Walking to ({x}, {y}, {z})")
-        return [types.TextContent(type="text", text=f"Walk result: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to walk: {error}")]
-
+        return _reply(f"Error: {str(e)}", False)
 
-async def _handle_click_object(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle click_object tool."""
-    object_name = args.get("object_name")
-    
-    if not object_name:
-        return [types.TextContent(type="text", text="Error: object_name is required")]
-    
-    response = java_caller.click_object(object_name)
-    if response["success"]:
-        result = response.get("result", f"Clicked {object_name}")
-        return [types.TextContent(type="text", text=f"Click result: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to click object: {error}")]
 
-
-async def _handle_get_inventory_count(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle get_inventory_count tool."""
-    response = java_caller.get_inventory_count()
-    if response["success"]:
-        result = response.get("result", "Unknown")
-        
-        # Handle different response types
-        if result == "count_unknown":
-            return [types.TextContent(type="text", text="Inventory count request sent successfully (actual count unknown - enable response waiting for real count)")]
-        else:
-            return [types.TextContent(type="text", text=f"Inventory count: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to get inventory count: {error}")]
+def _resolve_item_names(java_caller: JavaMethodCaller, spec: ToolSpec, args: Dict[str, Any]) -> tuple:
+    """Check item name arguments against the item dictionary; returns (arguments to send, error)."""
+    if java_caller.items is None:
+        return args, None
+    for arg in spec.item_name_args(args):
+        name, suggestions = java_caller.items.resolve(args[arg])
+        if name is None:
+            return args, (
+                f"Unknown item '{args[arg]}' in {arg}. Did you mean: {', '.join(suggestions)}? "
+                "(set exact_item_names to send it anyway)"
+            )
+        if name != args[arg]:
+            args = dict(args, **{arg: name})
+    return args, None
 
 
-async def _handle_check_inventory_for_item(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle check_inventory_for_item tool."""
-    item_name = args.get("item_name")
-    use_item_id = args.get("use_item_id", False)
-    
-    if not item_name:
-        return [types.TextContent(type="text", text="Error: item_name is required")]
-    
-    response = java_caller.check_inventory_for_item(item_name, use_item_id)
+async def _handle_shim_tool(java_caller: JavaMethodCaller, spec: ToolSpec, args: Dict[str, Any]) -> ToolReply:
+    """Handle a tool declared as a single shim method call."""
+    mode = args.get("output", DEFAULT_OUTPUT_MODE)
+    response = await java_caller.call_method_async(spec.method, *spec.shim_args(args), timeout=spec.deadline(args))
     if response["success"]:
-        count = response.get("result", -1)
-        
-        if count == -1:
-            item_type = "ID" if use_item_id else "name"
-            return [types.TextContent(type="text", text=f"Item {item_type} '{item_name}' not found in inventory")]
-        else:
-            item_type = "ID" if use_item_id else "name"
-            return [types.TextContent(type="text", text=f"Inventory contains {count} of item {item_type} '{item_name}'")]
+        with traced(java_caller.tracer, "format"):
+            if mode == "verbose":
+                text = page_text(spec.format_result(args, response.get("result")), _result_pager)
+            else:
+                text = render_result(mode, response.get("result"), response.get("error"), _result_pager)
+        # The reply is shown either way, but an error reported alongside it counts as a failure
+        return _reply(text, response.get("error") is None)
     else:
         error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to check inventory for item: {error}")]
+        text = f"{spec.failure}: {error}" if mode == "verbose" else render_error(mode, error)
+        return _reply(text, False)
 
 
-async def _handle_inventory_contains_item(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle inventory_contains_item tool."""
-    item_name = args.get("item_name")
-    use_item_id = args.get("use_item_id", False)
-    
-    if not item_name:
-        return [types.TextContent(type="text", text="Error: item_name is required")]
-    
-    response = java_caller.inventory_contains_item(item_name, use_item_id)
-    if response["success"]:
-        contains = response.get("result", False)
-        item_type = "ID" if use_item_id else "name"
-        status = "contains" if contains else "does not contain"
-        return [types.TextContent(type="text", text=f"Inventory {status} item {item_type} '{item_name}'")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to check if inventory contains item: {error}")]
-
-
-async def _handle_check_bank_open(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle check_bank_open tool."""
-    response = java_caller.check_bank_open()
-    if response["success"]:
-        result = response.get("result", False)
-        
-        # Handle different response types
-        if result == "status_unknown":
-            return [types.TextContent(type="text", text="Bank status check sent successfully (actual status unknown - enable response waiting for real status)")]
-        elif isinstance(result, bool):
-            status = "open" if result else "closed"
-            return [types.TextContent(type="text", text=f"Bank is {status}")]
-        elif isinstance(result, str) and result.lower() in ["true", "open", "yes"]:
-            return [types.TextContent(type="text", text="Bank is open")]
-        elif isinstance(result, str) and result.lower() in ["false", "closed", "no"]:
-            return [types.TextContent(type="text", text="Bank is closed")]
-        else:
-            return [types.TextContent(type="text", text=f"Bank status: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to check bank status: {error}")]
-
-
-async def _handle_close_bank(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle close_bank tool."""
-    response = java_caller.close_bank()
-    if response["success"]:
-        result = response.get("result", "Bank close attempted")
-        return [types.TextContent(type="text", text=f"Close bank result: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to close bank: {error}")]
-
-
-async def _handle_withdraw_item(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle withdraw_item tool."""
-    item_name = args.get("item_name")
-    quantity = args.get("quantity")
-    
-    if not item_name or quantity is None:
-        return [types.TextContent(type="text", text="Error: item_name and quantity are required")]
-    
-    response = java_caller.withdraw_item(item_name, quantity)
-    if response["success"]:
-        result = response.get("result", f"Withdraw {quantity} {item_name} attempted")
-        return [types.TextContent(type="text", text=f"Withdraw item result: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to withdraw item: {error}")]
-
-
-async def _handle_deposit_item(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle deposit_item tool."""
-    item_name = args.get("item_name")
-    quantity = args.get("quantity")
-    
-    if not item_name or quantity is None:
-        return [types.TextContent(type="text", text="Error: item_name and quantity are required")]
-    
-    response = java_caller.deposit_item(item_name, quantity)
-    if response["success"]:
-        result = response.get("result", f"Deposit {quantity} {item_name} attempted")
-        return [types.TextContent(type="text", text=f"Deposit item result: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to deposit item: {error}")]
-
-
-async def _handle_deposit_all(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle deposit_all tool."""
-    response = java_caller.deposit_all()
-    if response["success"]:
-        result = response.get("result", "Deposit all attempted")
-        return [types.TextContent(type="text", text=f"Deposit all result: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to deposit all: {error}")]
-
-
-async def _handle_run_dreambot_action(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle run_dreambot_action tool."""
-    action = args.get("action")
-    params = args.get("params", [])
-    
-    if not action:
-        return [types.TextContent(type="text", text="Error: action is required")]
-    
-    response = java_caller.run_dreambot_action(action, *params)
-    if response["success"]:
-        result = response.get("result", f"Action '{action}' executed")
-        return [types.TextContent(
-            type="text", 
-            text=f"DreamBot action result: {result}"
-        )]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to execute DreamBot action: {error}")]
-
-
-async def _handle_log_message(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle log_message tool."""
-    level = args.get("level")
-    message = args.get("message")
-    
-    if not level or not message:
-        return [types.TextContent(type="text", text="Error: level and message are required")]
-    
-    response = java_caller.log_message(level, message)
-    if response["success"]:
-        result = response.get("result", f"[{level}] {message}")
-        return [types.TextContent(type="text", text=f"Log message result: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to log message: {error}")]
-
-
-# Task Management Handlers
-async def _handle_clear_upcoming_steps(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle clear_upcoming_steps tool."""
-    response = java_caller.clear_upcoming_steps()
-    if response["success"]:
-        result = response.get("result", "Steps cleared")
-        return [types.TextContent(type="text", text=f"Cleared upcoming steps: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to clear upcoming steps: {error}")]
-
-
-async def _handle_add_upcoming_step(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle add_upcoming_step tool."""
-    step_description = args.get("step_description")
-    
-    if not step_description:
-        return [types.TextContent(type="text", text="Error: step_description is required")]
-    
-    response = java_caller.add_upcoming_step(step_description)
-    if response["success"]:
-        result = response.get("result", f"Added: {step_description}")
-        return [types.TextContent(type="text", text=f"Step added: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to add step: {error}")]
-
-
-async def _handle_get_upcoming_steps_count(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle get_upcoming_steps_count tool."""
-    response = java_caller.get_upcoming_steps_count()
-    if response["success"]:
-        count = response.get("result", 0)
-        return [types.TextContent(type="text", text=f"Upcoming steps count: {count}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to get steps count: {error}")]
-
-
-async def _handle_peek_next_step(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle peek_next_step tool."""
-    response = java_caller.peek_next_step()
-    if response["success"]:
-        result = response.get("result", "No upcoming steps")
-        return [types.TextContent(type="text", text=f"Next step: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to peek next step: {error}")]
-
-
-async def _handle_get_next_step(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle get_next_step tool."""
-    response = java_caller.get_next_step()
-    if response["success"]:
-        result = response.get("result", "No steps available")
-        return [types.TextContent(type="text", text=f"Retrieved next step: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to get next step: {error}")]
-
-
-async def _handle_set_current_step(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle set_current_step tool."""
-    step_description = args.get("step_description")
-    
-    if not step_description:
-        return [types.TextContent(type="text", text="Error: step_description is required")]
-    
-    response = java_caller.set_current_step(step_description)
-    if response["success"]:
-        result = response.get("result", f"Current step: {step_description}")
-        return [types.TextContent(type="text", text=f"Set current step: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to set current step: {error}")]
-
-
-async def _handle_remove_upcoming_step(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle remove_upcoming_step tool."""
-    index = args.get("index")
-    
-    if index is None:
-        return [types.TextContent(type="text", text="Error: index is required")]
-    
-    response = java_caller.remove_upcoming_step(index)
-    if response["success"]:
-        result = response.get("result", f"Removed step at index {index}")
-        return [types.TextContent(type="text", text=f"Remove step result: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to remove step: {error}")]
-
-
-async def _handle_insert_upcoming_step(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle insert_upcoming_step tool."""
-    index = args.get("index")
-    step_description = args.get("step_description")
-    
-    if index is None or not step_description:
-        return [types.TextContent(type="text", text="Error: index and step_description are required")]
-    
-    response = java_caller.insert_upcoming_step(index, step_description)
-    if response["success"]:
-        result = response.get("result", f"Inserted '{step_description}' at index {index}")
-        return [types.TextContent(type="text", text=f"Insert step result: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to insert step: {error}")]
-
-
-async def _handle_npc_dialogue(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle NPC dialogue interactions, waiting for all dialogue to complete."""
-    npc_name = args.get("npc_name", "")
-    max_wait_time = args.get("max_wait_time", 120)  # Default 120 seconds max wait for long dialogues
-    
-    response = java_caller.handle_npc_dialogue(npc_name, max_wait_time)
-    if response["success"]:
-        result = response.get("result", f"Successfully handled dialogue with {npc_name if npc_name else 'NPC'}")
-        return [types.TextContent(type="text", text=f"NPC dialogue result: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to handle NPC dialogue: {error}")]
-
-
-async def _handle_use_item_on_item(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle use_item_on_item tool."""
-    primary_item = args.get("primary_item")
-    secondary_item = args.get("secondary_item")
-    use_item_ids = args.get("use_item_ids", False)
-    
-    if not primary_item or not secondary_item:
-        return [types.TextContent(type="text", text="Error: primary_item and secondary_item are required")]
-    
-    response = java_caller.use_item_on_item(primary_item, secondary_item, use_item_ids)
-    if response["success"]:
-        result = response.get("result", f"Used {primary_item} on {secondary_item}")
-        return [types.TextContent(type="text", text=f"Use item on item result: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to use item on item: {error}")]
-
-
-async def _handle_perform_item_action(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle perform_item_action tool."""
-    action = args.get("action")
-    item = args.get("item")
-    target = args.get("target")
-    use_item_ids = args.get("use_item_ids", False)
-    target_type = args.get("target_type", "object")  # Default to object if target is provided
-    
-    if not action or not item:
-        return [types.TextContent(type="text", text="Error: action and item are required")]
-    
-    response = java_caller.perform_item_action(action, item, target, use_item_ids, target_type)
-    if response["success"]:
-        result = response.get("result", f"Performed {action} on {item}")
-        return [types.TextContent(type="text", text=f"Item action result: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to perform item action: {error}")]
-
-
-# Ground Item Handlers
-async def _handle_pickup_ground_item(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle pickup_ground_item tool."""
-    item_name = args.get("item_name")
-    
-    if not item_name:
-        return [types.TextContent(type="text", text="Error: item_name is required")]
-    
-    response = java_caller.pickup_ground_item(item_name)
-    if response["success"]:
-        result = response.get("result", f"Attempted to pick up ground item: {item_name}")
-        return [types.TextContent(type="text", text=f"Pickup ground item result: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to pick up ground item: {error}")]
-
-
-async def _handle_pickup_ground_item_by_id(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle pickup_ground_item_by_id tool."""
-    item_id = args.get("item_id")
-    
-    if item_id is None:
-        return [types.TextContent(type="text", text="Error: item_id is required")]
-    
-    response = java_caller.pickup_ground_item_by_id(item_id)
-    if response["success"]:
-        result = response.get("result", f"Attempted to pick up ground item ID: {item_id}")
-        return [types.TextContent(type="text", text=f"Pickup ground item by ID result: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to pick up ground item by ID: {error}")]
-
-
-async def _handle_get_nearby_ground_items(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle get_nearby_ground_items tool."""
-    response = java_caller.get_nearby_ground_items()
-    if response["success"]:
-        result = response.get("result", "No ground items information available")
-        return [types.TextContent(type="text", text=f"Nearby ground items: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to get nearby ground items: {error}")]
-
-
-async def _handle_ground_item_exists(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle ground_item_exists tool."""
-    item_name = args.get("item_name")
-    
-    if not item_name:
-        return [types.TextContent(type="text", text="Error: item_name is required")]
-    
-    response = java_caller.ground_item_exists(item_name)
-    if response["success"]:
-        result = response.get("result", False)
-        exists_text = "exists" if result else "does not exist"
-        return [types.TextContent(type="text", text=f"Ground item '{item_name}' {exists_text}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to check if ground item exists: {error}")]
-
-
-async def _handle_get_distance_to_ground_item(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle get_distance_to_ground_item tool."""
-    item_name = args.get("item_name")
-    
-    if not item_name:
-        return [types.TextContent(type="text", text="Error: item_name is required")]
+async def _handle_call_java_method(java_caller: JavaMethodCaller, args: Dict[str, Any],
+                                  bot_pool: Optional[BotPool], output_mode: str) -> ToolReply:
+    """Handle call_java_method tool."""
+    method_name = args["method_name"]
+    method_args = args.get("args", [])
+    pipe_path = args.get("pipe_path")
+    response_pipe_path = args.get("response_pipe_path")
+    timeout = TOOL_SPECS_BY_NAME["call_java_method"].deadline(args)
+    
+    if pipe_path is None or pipe_path == java_caller.pipe_path:
+        # Reuse the persistent connection (and its cache invalidation) for the selected bot
+        response = await java_caller.call_method_async(method_name, *method_args, timeout=timeout)
+    elif bot_pool:
+        caller = bot_pool.for_pipe(pipe_path, response_pipe_path)
+        response = await caller.call_method_async(method_name, *method_args, timeout=timeout)
+    else:
+        caller = JavaMethodCaller(pipe_path, response_pipe_path)
+        if caller.response_pipe_path == java_caller.response_pipe_path:
+            return _reply(f"Error: Response FIFO {caller.response_pipe_path} is already read by the server's connection", False)
+        try:
+            response = await caller.call_method_async(method_name, *method_args, timeout=timeout)
+        finally:
+            caller.close()
     
-    response = java_caller.get_distance_to_ground_item(item_name)
-    if response["success"]:
-        distance = response.get("result", -1)
-        if distance == -1:
-            return [types.TextContent(type="text", text=f"Ground item '{item_name}' not found")]
-        else:
-            return [types.TextContent(type="text", text=f"Distance to '{item_name}': {distance:.1f}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to get distance to ground item: {error}")]
-
-
-async def _handle_get_current_tile(java_caller: JavaMethodCaller, args: Dict[str, Any]) -> list[types.TextContent]:
-    """Handle get_current_tile tool."""
-    response = java_caller.get_current_tile()
     if response["success"]:
-        result = response.get("result", "Current tile unknown")
-        return [types.TextContent(type="text", text=f"Current tile: {result}")]
-    else:
-        error = response.get("error", "Unknown error")
-        return [types.TextContent(type="text", text=f"Failed to get current tile: {error}")]
+        result = response.get("result", "Method executed successfully")
+        return _reply(f"Java method '{method_name}' result: {result}", response.get("error") is None)
+    else:
+        error = response.get("error", "Unknown error")
+        return _reply(f"Failed to call Java method '{method_name}': {error}", False)
+
+
+async def _handle_call_batch(java_caller: JavaMethodCaller, args: Dict[str, Any],
+                            bot_pool: Optional[BotPool], output_mode: str) -> ToolReply:
+    """Handle call_batch tool."""
+    calls = args["calls"]
+    response = await java_caller.call_batch_async(calls, timeout=TOOL_SPECS_BY_NAME["call_batch"].deadline(args))
+    if response["success"]:
+        lines = []
+        for index, (call, entry) in enumerate(zip(calls, response["result"])):
+            if entry["success"]:
+                lines.append(f"[{index}] {call['method']}: {entry.get('result')}")
+            else:
+                lines.append(f"[{index}] {call['method']} failed: {entry.get('error', 'Unknown error')}")
+        return _reply("Batch results:\n" + "\n".join(lines), all(entry["success"] for entry in response["result"]))
+    else:
+        error = response.get("error", "Unknown error")
+        return _reply(f"Failed to run batch: {error}", False)
+
+
+async def _handle_get_cache_stats(java_caller: JavaMethodCaller, args: Dict[str, Any],
+                                 bot_pool: Optional[BotPool], output_mode: str) -> ToolReply:
+    """Handle get_cache_stats tool."""
+    if not java_caller.cache:
+        return _reply("Response cache is disabled")
+    
+    stats = java_caller.cache.stats()
+    if not stats:
+        return _reply("Response cache has not been used yet")
+    lines = [
+        f"{method}: hits={entry['hits']} misses={entry['misses']} invalidations={entry['invalidations']} "
+        f"hit_rate={entry['hit_rate']:.1%} ttl={entry['ttl']}s"
+        for method, entry in stats.items()
+    ]
+    if java_caller.ground_items:
+        index = java_caller.ground_items.stats()
+        lines.append(
+            f"ground item index: answered={index['answered']} fallbacks={index['fallbacks']} "
+            f"rebuilds={index['rebuilds']} items={index['items']} age={index['age']}s"
+        )
+    return _reply("Cache stats:\n" + "\n".join(lines))
+
+
+async def _handle_get_bridge_metrics(java_caller: JavaMethodCaller, args: Dict[str, Any],
+                                     bot_pool: Optional[BotPool], output_mode: str) -> ToolReply:
+    """Handle get_bridge_metrics tool."""
+    if args.get("all_bots") and bot_pool:
+        callers = bot_pool.connected_callers()
+    else:
+        callers = {args.get("bot_id") or DEFAULT_BOT_ID: java_caller}
+    
+    sections = []
+    for bot_id, caller in callers.items():
+        if not caller.metrics:
+            sections.append(f"Bot {bot_id}: metrics are disabled")
+            continue
+        snapshot = caller.metrics.snapshot()
+        if args.get("method"):
+            snapshot = {name: entry for name, entry in snapshot.items() if name == args["method"]}
+        outputs = [] if args.get("method") else [
+            f"  {tool} {mode}: calls={entry['calls']} bytes={entry['bytes']} avg={entry['bytes'] / entry['calls']:.0f}"
+            for tool, modes in sorted(caller.metrics.outputs.items()) for mode, entry in sorted(modes.items())
+        ]
+        if not snapshot and not outputs:
+            sections.append(f"Bot {bot_id}: no calls recorded yet")
+            continue
+        lines = [f"Bot {bot_id}:"]
+        for method_name, entry in snapshot.items():
+            lines.append(
+                f"{method_name}: calls={entry['calls']} errors={entry['errors']} "
+                f"timeouts={entry['timeouts']} cancelled={entry['cancelled']}"
+            )
+            for phase, summary in entry["phases"].items():
+                lines.append(
+                    f"  {phase:<6} p50={summary['p50'] * 1000:.3f}ms p90={summary['p90'] * 1000:.3f}ms "
+                    f"p99={summary['p99'] * 1000:.3f}ms max={summary['max'] * 1000:.3f}ms (n={summary['count']})"
+                )
+        if outputs:
+            lines += ["Tool output bytes:"] + outputs
+        sections.append("\n".join(lines))
+    return _reply("Bridge metrics:\n" + "\n\n".join(sections))
+
+
+async def _handle_broadcast(java_caller: JavaMethodCaller, args: Dict[str, Any],
+                            bot_pool: Optional[BotPool], output_mode: str) -> ToolReply:
+    """Handle broadcast tool: run one tool on every selected bot concurrently."""
+    if bot_pool is None:
+        return _reply("Error: broadcast requires a bot registry", False)
+    
+    spec = TOOL_SPECS_BY_NAME["broadcast"]
+    tool_name = args["tool"]
+    selector = args.get("bots", spec.defaults["bots"])
+    max_concurrency = args.get("max_concurrency", spec.defaults["max_concurrency"])
+    target_spec = TOOL_SPECS_BY_NAME[tool_name]
+    # Without an explicit deadline each bot gets the target tool's own
+    timeout = args.get("timeout") or target_spec.deadline(args.get("arguments") or {})
+    # Only tools that take a deadline are passed one; the rest are bounded by wait_for alone
+    pass_timeout = timeout is not None and "timeout" in target_spec.input_schema["properties"]
+    
+    bot_ids, unknown = _select_bots(bot_pool, selector)
+    if not bot_ids:
+        return _reply(f"Error: No bots match {selector}", False)
+    
+    limit = asyncio.Semaphore(max_concurrency)
+    
+    async def run_on_bot(bot_id: str) -> tuple:
+        async with limit:
+            # The deadline starts once the bot gets a slot, so queueing behind the cap does not eat into it
+            started = time.monotonic()
+            bot_args = dict(args.get("arguments") or {}, bot_id=bot_id)
+            if pass_timeout:
+                bot_args["timeout"] = timeout
+            try:
+                content, success = await asyncio.wait_for(
+                    run_tool(java_caller, tool_name, bot_args, bot_pool, output_mode), timeout
+                )
+            except asyncio.TimeoutError:
+                return bot_id, "timeout", time.monotonic() - started, f"No result within {timeout}s"
+            text = "\n".join(item.text for item in content)
+            return bot_id, "ok" if success else "failed", time.monotonic() - started, text
+    
+    started = time.monotonic()
+    rows = await asyncio.gather(*[run_on_bot(bot_id) for bot_id in bot_ids])
+    rows += [(bot_id, "unknown", 0.0, "Not in the bot registry") for bot_id in unknown]
+    elapsed = time.monotonic() - started
+    
+    counts = {status: sum(1 for row in rows if row[1] == status) for status in ("ok", "failed", "timeout", "unknown")}
+    summary = ", ".join(f"{count} {status}" for status, count in counts.items() if count)
+    width = max(len(row[0]) for row in rows)
+    lines = [f"Broadcast {tool_name} to {len(rows)} bots in {elapsed:.2f}s ({summary}):"]
+    for bot_id, status, bot_elapsed, text in rows:
+        # Continuation lines of multi-line results are indented under the result column
+        text = text.replace("\n", "\n" + " " * (width + 22))
+        lines.append(f"{bot_id:<{width}}  {status:<7}  {bot_elapsed:>8.2f}s  {text}")
+    return _reply("\n".join(lines), counts["ok"] == len(rows))
+
+
+async def _handle_run_macro(java_caller: JavaMethodCaller, args: Dict[str, Any],
+                            bot_pool: Optional[BotPool], output_mode: str) -> ToolReply:
+    """Handle run_macro tool: run a checked script of shim tool calls against the selected bot."""
+    spec = TOOL_SPECS_BY_NAME["run_macro"]
+    timeout = spec.deadline(args)
+    
+    async def run_step_tool(name: str, tool_args: Dict[str, Any], remaining: Optional[float]) -> tuple:
+        tool_spec = TOOL_SPECS_BY_NAME[name]
+        error = tool_spec.validate(tool_args)
+        if error:
+            return False, None, f"Error: {error}"
+        tool_args, error = _resolve_item_names(java_caller, tool_spec, tool_args)
+        if error:
+            return False, None, f"Error: {error}"
+        deadline = tool_spec.deadline(tool_args)
+        if remaining is not None:
+            deadline = min(deadline, remaining)
+        with traced(java_caller.tracer, "macro_step", tool=name):
+            response = await java_caller.call_method_async(tool_spec.method, *tool_spec.shim_args(tool_args), timeout=deadline)
+        result = response.get("result")
+        # Unlike a lone tool call, an error reported alongside a reply counts as a failure
+        if not response["success"] or response.get("error") is not None:
+            return False, result, f"{tool_spec.failure}: {response.get('error') or 'Unknown error'}"
+        return True, result, tool_spec.format_result(tool_args, result)
+    
+    run = MacroRun(
+        args["steps"], run_step_tool,
+        variables=args.get("variables"),
+        max_actions=args.get("max_actions", spec.defaults["max_actions"]),
+        deadline=time.monotonic() + timeout if timeout is not None else None
+    )
+    await run.run()
+    return _reply(run.summary(), run.status in ("completed", "stopped"))
+
+
+async def _handle_wait_until(java_caller: JavaMethodCaller, args: Dict[str, Any],
+                             bot_pool: Optional[BotPool], output_mode: str) -> ToolReply:
+    """Handle wait_until tool."""
+    spec = TOOL_SPECS_BY_NAME["wait_until"]
+    waiter = ConditionWaiter(
+        java_caller, args["conditions"],
+        match=args.get("match", spec.defaults["match"]),
+        timeout=spec.deadline(args),
+        read_timeout=QUICK_TIMEOUT
+    )
+    await waiter.wait()
+    return _reply(waiter.summary(), waiter.met)
+
+
+async def _handle_travel_to_location(java_caller: JavaMethodCaller, args: Dict[str, Any],
+                                    bot_pool: Optional[BotPool], output_mode: str) -> ToolReply:
+    """Handle travel_to_location tool."""
+    spec = TOOL_SPECS_BY_NAME["travel_to_location"]
+    planner = WalkPlanner(
+        java_caller, (args["x"], args["y"], args.get("z", spec.defaults["z"])),
+        timeout=spec.deadline(args),
+        routes=java_caller.routes
+    )
+    await planner.walk()
+    return _reply(planner.summary(), planner.outcome == "arrived")
+
+
+async def _handle_find_ground_items(java_caller: JavaMethodCaller, args: Dict[str, Any],
+                                   bot_pool: Optional[BotPool], output_mode: str) -> ToolReply:
+    """Handle find_ground_items tool."""
+    spec = TOOL_SPECS_BY_NAME["find_ground_items"]
+    items, location = await asyncio.gather(
+        java_caller.call_method_async("getNearbyGroundItems", timeout=spec.deadline(args)),
+        java_caller.call_method_async("getPlayerLocation", timeout=spec.deadline(args))
+    )
+    for response in (items, location):
+        if not response["success"] or response.get("error") is not None:
+            return _reply(f"{spec.failure}: {response.get('error', 'Unknown error')}", False)
+    origin = parse_tile(location.get("result"))
+    if origin is None or not isinstance(items.get("result"), list):
+        return _reply(f"{spec.failure}: unexpected reply from the shim", False)
+    
+    # Callers without an index of their own (e.g. pipe_path callers) use a throwaway one
+    index = java_caller.ground_items or GroundItemIndex()
+    index.update(items["result"])
+    matches = index.by_distance(
+        origin, args.get("item_name"), args.get("use_item_id", spec.defaults["use_item_id"]), args.get("radius")
+    )
+    subject = f"'{args['item_name']}' ground items" if args.get("item_name") is not None else "ground items"
+    scope = f" within {args['radius']:g} tiles of {format_tile(origin)}" if args.get("radius") is not None else f" near {format_tile(origin)}"
+    if not matches:
+        return _reply(f"No {subject}{scope}")
+    
+    limit = args.get("limit", spec.defaults["limit"])
+    lines = [f"{len(matches)} {subject}{scope}, nearest first:"]
+    for distance, item in matches[:limit]:
+        lines.append(
+            f"  {item.get('name')} (id {item.get('id')}) x{item.get('amount', 1)} "
+            f"at ({item['x']}, {item['y']}, {item.get('z') or 0}): {distance:.1f} tiles"
+        )
+    if len(matches) > limit:
+        lines.append(f"  ... and {len(matches) - limit} more")
+    return _reply("\n".join(lines))
+
+
+async def _handle_lookup_item(java_caller: JavaMethodCaller, args: Dict[str, Any],
+                             bot_pool: Optional[BotPool], output_mode: str) -> ToolReply:
+    """Handle lookup_item tool."""
+    if java_caller.items is None:
+        return _reply("Item dictionary is disabled")
+    
+    spec = TOOL_SPECS_BY_NAME["lookup_item"]
+    matches = java_caller.items.lookup(args["query"], args.get("limit", spec.defaults["limit"]))
+    if not matches:
+        return _reply(f"No known item matches '{args['query']}' ({java_caller.items.table.count} items known)")
+    labels = {"id": "By id", "name": "Name", "prefix": "Names starting with it", "similar": "Similar names"}
+    lines = [f"Items matching '{args['query']}':"]
+    for kind, entries in matches.items():
+        lines.append(f"{labels[kind]}: " + ", ".join(f"{name} (id {item_id})" for item_id, name in entries))
+    return _reply("\n".join(lines))
+
+
+async def _handle_get_more_results(java_caller: JavaMethodCaller, args: Dict[str, Any],
+                                  bot_pool: Optional[BotPool], output_mode: str) -> ToolReply:
+    """Handle get_more_results tool."""
+    mode = args.get("output", DEFAULT_OUTPUT_MODE)
+    page = _result_pager.page(args["cursor"])
+    if page is None:
+        error = f"Unknown or expired cursor '{args['cursor']}'"
+        return _reply(f"Error: {error}" if mode == "verbose" else render_error(mode, error), False)
+    return _reply(render_page(mode, *page))
+
+
+def _select_bots(bot_pool: BotPool, selector: Any) -> tuple:
+    """Resolve a bot list or glob to (known bot ids, unknown ids from an explicit list)."""
+    known = bot_pool.bot_ids()
+    if isinstance(selector, str):
+        return [bot_id for bot_id in known if fnmatch.fnmatchcase(bot_id, selector)], []
+    
+    selected: List[str] = []
+    unknown: List[str] = []
+    for bot_id in dict.fromkeys(selector):
+        (selected if bot_id in known else unknown).append(bot_id)
+    return selected, unknown
+
+
+# Tools declared with method=None in tools.py are implemented here
+_LOCAL_HANDLERS = {
+    "call_java_method": _handle_call_java_method,
+    "call_batch": _handle_call_batch,
+    "get_cache_stats": _handle_get_cache_stats,
+    "broadcast": _handle_broadcast,
+    "get_bridge_metrics": _handle_get_bridge_metrics,
+    "run_macro": _handle_run_macro,
+    "wait_until": _handle_wait_until,
+    "travel_to_location": _handle_travel_to_location,
+    "find_ground_items": _handle_find_ground_items,
+    "lookup_item": _handle_lookup_item,
+    "get_more_results": _handle_get_more_results,
+}
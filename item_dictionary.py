@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Local dictionary of the item names and ids the shim has reported, used to
+normalize or reject item name arguments before they are sent.
+
+A dictionary file is searched in place through mmap; it holds a header and
+two fixed-size tables followed by the names:
+
+    header    magic "DBID", version, entry count, name bytes
+    entries   (id, name offset, name length), sorted by folded name, then id
+    id index  (id, entry number), sorted by id
+    names     UTF-8 names
+
+Usage: python item_dictionary.py items.dict                 (lists the entries)
+       python item_dictionary.py items.dict QUERY           (looks a name or id up)
+       python item_dictionary.py items.dict --import FILE   (adds a JSON list of {"id", "name"} items)
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+
+DICT_MAGIC = b"DBID"
+DICT_VERSION = 1
+
+# magic, version, entry count, name blob size
+HEADER = struct.Struct(">4sBII")
+# item id, name offset in the blob, name length
+ENTRY = struct.Struct(">iII")
+# item id, entry number
+ID_ENTRY = struct.Struct(">iI")
+
+# Newly reported items are written to the file at most this often (and on close)
+FLUSH_INTERVAL = 30.0
+
+MAX_SUGGESTIONS = 5
+
+
+def fold(name: str) -> str:
+    """Comparison form of an item name: case-folded, with runs of whitespace collapsed."""
+    return " ".join(name.split()).casefold()
+
+
+def typo_distance(a: str, b: str, limit: int) -> int:
+    """Edit distance counting adjacent transpositions as one edit; any value above limit is returned as limit + 1."""
+    over = limit + 1
+    if abs(len(a) - len(b)) > limit:
+        return over
+    # Only cells within limit of the diagonal can stay within limit; the rest count as over
+    previous_row = None
+    row = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        previous_row, last_row = row, previous_row
+        row = [over] * (len(b) + 1)
+        if i <= limit:
+            row[0] = i
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            value = min(previous_row[j] + 1, row[j - 1] + 1, previous_row[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, last_row[j - 2] + 1)
+            row[j] = min(value, over)
+        # A transposition reaches back two rows, so both must be past the limit
+        if min(row) > limit and min(previous_row) > limit:
+            return over
+    return row[-1]
+
+
+def typo_limit(name: str) -> int:
+    """Edits a misspelling of name may have; short names allow one, so distinct short names are not confused."""
+    return 1 if len(name) < 10 else 2
+
+
+def char_signature(text: str) -> int:
+    """Bit set of the characters in text (folded into 64 bits); an edit flips at most two of its bits."""
+    bits = 0
+    for char in text:
+        bits |= 1 << (ord(char) & 63)
+    return bits
+
+
+def build_table(items: Dict[int, str]) -> bytes:
+    """Serialize an id -> name mapping in the dictionary file format."""
+    ordered = sorted(items.items(), key=lambda item: (fold(item[1]), item[0]))
+    names = bytearray()
+    entries = bytearray()
+    for item_id, name in ordered:
+        encoded = name.encode()
+        entries += ENTRY.pack(item_id, len(names), len(encoded))
+        names += encoded
+    id_index = b"".join(
+        ID_ENTRY.pack(item_id, number)
+        for number, item_id in sorted(((number, item[0]) for number, item in enumerate(ordered)), key=lambda pair: pair[1])
+    )
+    return HEADER.pack(DICT_MAGIC, DICT_VERSION, len(ordered), len(names)) + bytes(entries) + id_index + bytes(names)
+
+
+class ItemTable:
+    """Read-only view of a serialized dictionary (bytes or an mmap), searched by bisection."""
+    
+    def __init__(self, buffer: Union[bytes, mmap.mmap]):
+        if len(buffer) < HEADER.size:
+            raise ValueError("not an item dictionary")
+        magic, version, self.count, names_size = HEADER.unpack_from(buffer, 0)
+        if magic != DICT_MAGIC or version != DICT_VERSION:
+            raise ValueError(f"not a version {DICT_VERSION} item dictionary")
+        self.buffer = buffer
+        self._ids_offset = HEADER.size + self.count * ENTRY.size
+        self._names_offset = self._ids_offset + self.count * ID_ENTRY.size
+        if len(buffer) < self._names_offset + names_size:
+            raise ValueError("truncated item dictionary")
+        # Folded names and their character signatures, built on the first fuzzy lookup
+        self._folded: Optional[List[str]] = None
+        self._signatures: List[int] = []
+    
+    def id_at(self, number: int) -> int:
+        return ENTRY.unpack_from(self.buffer, HEADER.size + number * ENTRY.size)[0]
+    
+    def name_at(self, number: int) -> str:
+        _, offset, length = ENTRY.unpack_from(self.buffer, HEADER.size + number * ENTRY.size)
+        start = self._names_offset + offset
+        return bytes(self.buffer[start:start + length]).decode()
+    
+    def entries(self) -> Iterable[Tuple[int, str]]:
+        for number in range(self.count):
+            yield self.id_at(number), self.name_at(number)
+    
+    def lower_bound(self, folded: str) -> int:
+        """Number of the first entry whose folded name is not less than folded."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if fold(self.name_at(middle)) < folded:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+    
+    def find(self, name: str) -> List[Tuple[int, str]]:
+        """(id, name) of every entry whose name folds to the same as name."""
+        folded = fold(name)
+        matches = []
+        number = self.lower_bound(folded)
+        while number < self.count and fold(self.name_at(number)) == folded:
+            matches.append((self.id_at(number), self.name_at(number)))
+            number += 1
+        return matches
+    
+    def with_prefix(self, prefix: str, limit: int) -> List[Tuple[int, str]]:
+        """Up to limit (id, name) entries whose folded names start with the folded prefix, in name order."""
+        folded = fold(prefix)
+        matches = []
+        number = self.lower_bound(folded)
+        while number < self.count and len(matches) < limit:
+            name = self.name_at(number)
+            if not fold(name).startswith(folded):
+                break
+            matches.append((self.id_at(number), name))
+            number += 1
+        return matches
+    
+    def similar(self, name: str, limit: int) -> List[Tuple[int, str]]:
+        """Up to limit (id, name) entries within typo distance of name, closest first."""
+        if self._folded is None:
+            self._folded = [fold(self.name_at(number)) for number in range(self.count)]
+            self._signatures = [char_signature(candidate) for candidate in self._folded]
+        folded = fold(name)
+        allowed = typo_limit(folded)
+        signature = char_signature(folded)
+        scored = []
+        for number, candidate_signature in enumerate(self._signatures):
+            # Cheap filter first: names differing in more characters than the edits allow cannot match
+            if bin(candidate_signature ^ signature).count("1") > 2 * allowed:
+                continue
+            if abs(len(self._folded[number]) - len(folded)) > allowed:
+                continue
+            distance = typo_distance(folded, self._folded[number], allowed)
+            if distance <= allowed:
+                scored.append((distance, number))
+        scored.sort()
+        return [(self.id_at(number), self.name_at(number)) for _, number in scored[:limit]]
+    
+    def name_for_id(self, item_id: int) -> Optional[str]:
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            entry_id, number = ID_ENTRY.unpack_from(self.buffer, self._ids_offset + middle * ID_ENTRY.size)
+            if entry_id == item_id:
+                return self.name_at(number)
+            if entry_id < item_id:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+
+class ItemDictionary:
+    """Item names and ids the shim has reported, for resolving item arguments locally.
+    
+    With a path the dictionary is memory-mapped from that file and newly
+    reported items are written back to it (atomically, at most every
+    FLUSH_INTERVAL seconds and on close); without one it lives only as long
+    as the process. The dictionary only knows items it has seen, so a name
+    it does not know is only rejected when it looks like a misspelling of
+    one it does.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.table = ItemTable(build_table({}))
+        self.counters = {"exact": 0, "normalized": 0, "rejected": 0, "unknown": 0}
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        self._file = None
+        if path and os.path.exists(path):
+            self._load()
+    
+    def observe(self, items: Iterable[Any]) -> None:
+        """Learn the id and name of each reported item (dicts with "id" and "name")."""
+        added = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            item_id, name = item.get("id"), item.get("name")
+            if isinstance(item_id, int) and not isinstance(item_id, bool) and isinstance(name, str) and name.strip():
+                if item_id not in added and self.table.name_for_id(item_id) != name:
+                    added[item_id] = name
+        if not added:
+            return
+        merged = dict(self.table.entries())
+        merged.update(added)
+        self.table = ItemTable(build_table(merged))
+        self._dirty = True
+        if self.path and time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+            self.save()
+    
+    def resolve(self, name: str) -> Tuple[Optional[str], List[str]]:
+        """Return (name to send, []) or, for a likely misspelling, (None, suggestions).
+        
+        A known name is sent as is and one differing from a single known
+        name only in case or spacing is replaced by it. An unknown name is
+        sent as is unless it is within typo distance of known names, which
+        are then suggested along with names it is a prefix of.
+        """
+        matches = self.table.find(name)
+        if any(match_name == name for _, match_name in matches):
+            self.counters["exact"] += 1
+            return name, []
+        names = list(dict.fromkeys(match_name for _, match_name in matches))
+        if len(names) == 1:
+            self.counters["normalized"] += 1
+            return names[0], []
+        if names:
+            self.counters["rejected"] += 1
+            return None, names[:MAX_SUGGESTIONS]
+        
+        similar = [match_name for _, match_name in self.table.similar(name, MAX_SUGGESTIONS)]
+        if not similar:
+            self.counters["unknown"] += 1
+            return name, []
+        self.counters["rejected"] += 1
+        prefixed = [match_name for _, match_name in self.table.with_prefix(name, MAX_SUGGESTIONS)]
+        return None, list(dict.fromkeys(similar + prefixed))[:MAX_SUGGESTIONS]
+    
+    def lookup(self, query: str, limit: int = MAX_SUGGESTIONS) -> Dict[str, List[Tuple[int, str]]]:
+        """Entries matching query as an id, a name, a name prefix or a misspelled name."""
+        results: Dict[str, List[Tuple[int, str]]] = {}
+        if query.strip().lstrip("-").isdigit():
+            name = self.table.name_for_id(int(query))
+            if name is not None:
+                results["id"] = [(int(query), name)]
+        exact = self.table.find(query)
+        if exact:
+            results["name"] = exact[:limit]
+        prefixed = [entry for entry in self.table.with_prefix(query, limit + len(exact)) if entry not in exact]
+        if prefixed:
+            results["prefix"] = prefixed[:limit]
+        if not exact:
+            similar = [entry for entry in self.table.similar(query, limit) if entry not in prefixed]
+            if similar:
+                results["similar"] = similar
+        return results
+    
+    def save(self) -> None:
+        """Atomically rewrite the dictionary file; failures are reported and otherwise ignored."""
+        self._last_flush = time.monotonic()
+        if not self.path or not self._dirty:
+            return
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(self.table.buffer)
+            os.replace(temp_path, self.path)
+            self._dirty = False
+        except OSError as e:
+            print(f"Error saving item dictionary to {self.path}: {e}", file=sys.stderr)
+    
+    def close(self) -> None:
+        self.save()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def _load(self) -> None:
+        try:
+            self._file = open(self.path, "rb")
+            self.table = ItemTable(mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ))
+        except (OSError, ValueError) as e:
+            print(f"Error loading item dictionary from {self.path}: {e}", file=sys.stderr)
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def main():
+    if len(sys.argv) not in (2, 3, 4) or (len(sys.argv) == 4 and sys.argv[2] != "--import"):
+        print(__doc__.strip(), file=sys.stderr)
+        sys.exit(2)
+    dictionary = ItemDictionary(sys.argv[1])
+    if len(sys.argv) == 4:
+        with open(sys.argv[3]) as f:
+            dictionary.observe(json.load(f))
+        dictionary.close()
+        print(f"{dictionary.table.count} items in {sys.argv[1]}")
+    elif len(sys.argv) == 3:
+        for kind, entries in dictionary.lookup(sys.argv[2]).items():
+            for item_id, name in entries:
+                print(f"{kind:<8} {item_id:>6}  {name}")
+    else:
+        for item_id, name in dictionary.table.entries():
+            print(f"{item_id:>6}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,104 @@
 #!/usr/bin/env python3
 
+import asyncio
+import itertools
 import json
 import os
 import sys
 import time
-from typing import Any, Optional, Dict
+import uuid
+from typing import Any, Optional, Dict, List
+
+from bridge_metrics import BridgeMetrics
+from ground_items import GROUND_ITEM_QUERIES, GroundItemIndex
+from item_dictionary import ItemDictionary
+from response_cache import ResponseCache
+from route_cache import RouteCache, parse_tile
+from shim_codec import BINARY_CODEC_NAME, JSON_CODEC_NAME, BinaryCodec, JsonCodec
+from tracing import Tracer, traced
+from traffic_log import REQUEST, RESPONSE, TrafficRecorder
+from transports import DEFAULT_PIPE_PATH, FifoTransport, Transport, response_pipe_path_for
+
+
+# Process-wide so ids stay unique across every caller in this process
+_request_counter = itertools.count(1)
+
+# Longest wait for the shim's answer to the codec handshake before settling on JSON
+CODEC_HANDSHAKE_TIMEOUT = 5.0
+
+# Longest time spent writing a cancel message for an abandoned request
+CANCEL_SEND_TIMEOUT = 1.0
+
+# Shim methods whose results list items with ids and names, learned by the item dictionary
+ITEM_REPORTING_METHODS = ("getNearbyGroundItems",)
+
+
+def new_session_id() -> str:
+    """Return a prefix that distinguishes this process's requests from other servers sharing a shim."""
+    return f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+def _check_batch_calls(calls: List[Dict[str, Any]]) -> Optional[str]:
+    """Return why a list of batch calls cannot be sent, or None; checked before either path sends anything."""
+    for index, call in enumerate(calls):
+        if not isinstance(call, dict) or not isinstance(call.get("method"), str) or not call["method"]:
+            return f"Batch entry {index} is missing a method name"
+        if not isinstance(call.get("args", []), (list, tuple)):
+            return f"Batch entry {index} args must be a list"
+    return None
+
+
+def _metric_label(request: Dict[str, Any]) -> str:
+    """Metrics are kept per shim method; batch envelopes share one label."""
+    return request.get("method") or "batch"
 
 
 class JavaMethodCaller:
-    def __init__(self, pipe_path: str = "/tmp/dreambot_shim_pipe", response_pipe_path: str = "/tmp/dreambot_shim_response_pipe"):
+    def __init__(self, pipe_path: str = DEFAULT_PIPE_PATH, response_pipe_path: Optional[str] = None,
+                 session_id: Optional[str] = None, max_in_flight: int = 32, cache: Optional[ResponseCache] = None,
+                 transport: Optional[Transport] = None, codec: str = "json", metrics: Optional[BridgeMetrics] = None,
+                 tracer: Optional[Tracer] = None, recorder: Optional[TrafficRecorder] = None,
+                 routes: Optional[RouteCache] = None, ground_items: Optional[GroundItemIndex] = None,
+                 items: Optional[ItemDictionary] = None):
         self.pipe_path = pipe_path
-        self.response_pipe_path = response_pipe_path
+        # Without an explicit path, the response FIFO paired with pipe_path (see response_pipe_path_for)
+        self.response_pipe_path = response_pipe_path or response_pipe_path_for(pipe_path)
+        # Named pipes unless another transport (e.g. UnixSocketTransport) is given
+        self.transport = transport or FifoTransport(pipe_path, self.response_pipe_path)
+        # Optional TTL cache for read-only game-state queries
+        self.cache = cache
+        # Optional per-method call counters and phase latency histograms
+        self.metrics = metrics
+        # Optional span writer; shim calls become children of the current tool span
+        self.tracer = tracer
+        # Optional log of every message exchanged with the shim, for replay_shim.py
+        self.recorder = recorder
+        # Optional cache of walked routes for travel_to_location (see walk_planner.py)
+        self.routes = routes
+        # Optional spatial index answering ground item queries from getNearbyGroundItems results
+        self.ground_items = ground_items
+        # Optional dictionary of reported item names and ids, for checking item arguments (see item_dictionary.py)
+        self.items = items
+        # Set by GameStateMirror.start() when push-based state subscription is enabled
+        self.mirror = None
+        self.session_id = session_id or new_session_id()
+        # Number of async requests written back-to-back before waiting for replies
+        self.max_in_flight = max_in_flight
+        # Async request state, reset whenever the caller is used from a new event loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+        # Set once the shim is found not to understand the batch envelope
+        self._batch_unsupported = False
+        # "binary" offers the compact codec in a handshake on binary-safe transports; JSON is the fallback
+        self.codec_preference = codec
+        self.codec = JsonCodec()
+        self._codec_handshake: Optional[asyncio.Task] = None
+        # The blocking API has a connection (and handshake) of its own, so it keeps a separate codec
+        self.sync_codec = JsonCodec()
+        self._sync_codec_negotiated = False
+        # Cancel messages still being written; referenced so they are not garbage collected
+        self._cancel_tasks: set = set()
     
     def call_method(self, method_name: str, *args) -> bool:
         """Legacy method for backwards compatibility - just sends without waiting for response."""
@@ -21,13 +109,12 @@ class JavaMethodCaller:
             }
             json_request = json.dumps(request)
             
-            if not os.path.exists(self.pipe_path):
-                print(f"Error: Named pipe {self.pipe_path} not available", file=sys.stderr)
+            if not self.transport.is_available():
+                print(f"Error: {self.transport.unavailable_error()}", file=sys.stderr)
                 return False
             
-            with open(self.pipe_path, 'w') as pipe:
-                pipe.write(json_request + '\n')
-                pipe.flush()
+            self.transport.send_sync(json_request.encode())
+            self._record(REQUEST, request)
             
             return True
         except Exception as e:
@@ -36,70 +123,570 @@ class JavaMethodCaller:
     
     def call_method_with_response(self, method_name: str, *args, timeout: int = 300) -> Dict[str, Any]:
         """Call method and wait for response from Java shim."""
+        if self.mirror:
+            mirrored = self.mirror.answer(method_name, args)
+            if mirrored is not None:
+                return mirrored
+        if self.cache:
+            cached = self.cache.lookup(method_name, args)
+            if cached is not None:
+                return cached
+            self.cache.invalidate_for(method_name)
+        
+        request = {
+            "method": method_name,
+            "args": list(args),
+            "id": self._next_request_id()
+        }
+        
+        if not self.transport.is_available():
+            return {
+                "success": False,
+                "error": self.transport.unavailable_error(),
+                "result": None
+            }
+        
         try:
-            request = {
-                "method": method_name,
-                "args": list(args),
-                "id": f"{method_name}_{int(time.time() * 1000)}"
+            response = self._send_request(request, timeout)
+        except TimeoutError:
+            return {
+                "success": False,
+                "error": f"Timeout waiting for response (waited {timeout}s)",
+                "result": None
             }
-            
-            json_request = json.dumps(request)
-            
-            if not os.path.exists(self.pipe_path):
-                return {
-                    "success": False,
-                    "error": f"Named pipe {self.pipe_path} not available",
-                    "result": None
-                }
-            
-            # Send request
-            with open(self.pipe_path, 'w') as pipe:
-                pipe.write(json_request + '\n')
-                pipe.flush()
-            
-            # Always wait for response from Java
-            return self._wait_for_response(request.get("id"), timeout)
-            
         except Exception as e:
             return {
                 "success": False,
                 "error": f"Error calling method {method_name}: {e}",
                 "result": None
             }
+        
+        result = {
+            "success": True,
+            "result": response.get("result"),
+            "error": response.get("error")
+        }
+        if self.cache:
+            # Invalidate again in case a read was cached while this call was in flight
+            self.cache.invalidate_for(method_name)
+            self.cache.store(method_name, args, result)
+        return result
+    
+    def call_batch(self, calls: List[Dict[str, Any]], timeout: int = 300) -> Dict[str, Any]:
+        """Send several {method, args} calls in one request and wait for the combined reply.
+        
+        The result is a list with one {success, result, error} entry per call.
+        """
+        error = _check_batch_calls(calls)
+        if error:
+            return {
+                "success": False,
+                "error": f"Error calling batch: {error}",
+                "result": None
+            }
+        
+        if self._batch_unsupported:
+            results = [self.call_method_with_response(call["method"], *call.get("args", []), timeout=timeout) for call in calls]
+            return self._batch_response({"results": results}, calls)
+        
+        if not self.transport.is_available():
+            return {
+                "success": False,
+                "error": self.transport.unavailable_error(),
+                "result": None
+            }
+        
+        try:
+            request = self._build_batch_request(calls)
+            self._invalidate_cache_for_calls(calls)
+            response = self._send_request(request, timeout)
+            self._invalidate_cache_for_calls(calls)
+        except TimeoutError:
+            return {
+                "success": False,
+                "error": f"Timeout waiting for response (waited {timeout}s)",
+                "result": None
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Error calling batch: {e}",
+                "result": None
+            }
+        
+        if "results" not in response:
+            # Older shims reply to the envelope with an error; send the calls one by one
+            self._batch_unsupported = True
+            return self.call_batch(calls, timeout)
+        return self._batch_response(response, calls)
+    
+    def _send_request(self, request: Dict[str, Any], timeout: int) -> Dict[str, Any]:
+        """Write a request to the shim and return its raw response."""
+        self._negotiate_codec_sync(timeout)
+        label = _metric_label(request)
+        self._count(label, "calls")
+        started = time.perf_counter()
+        try:
+            with traced(self.tracer, "shim_call", method=label, request_id=request["id"]):
+                self._attach_trace_context(request)
+                with traced(self.tracer, "encode"):
+                    payload = self.sync_codec.encode(request)
+                encoded = time.perf_counter()
+                with traced(self.tracer, "transport_write", bytes=len(payload)):
+                    self.transport.send_sync(payload)
+                written = time.perf_counter()
+                self._record(REQUEST, request)
+                
+                # Always wait for response from Java
+                with traced(self.tracer, "wait"):
+                    received = self._wait_for_response(request["id"], timeout)
+        except Exception:
+            self._count(label, "errors")
+            # The blocking connection may have been replaced; negotiate again on the next call
+            self._reset_sync_codec()
+            raise
+        if received is None:
+            self._count(label, "timeouts")
+            # Tell the shim to stop work nobody is waiting for any more
+            try:
+                cancel = self._cancel_request(request["id"])
+                self.transport.send_sync(self.sync_codec.encode(cancel))
+                self._record(REQUEST, cancel)
+            except Exception as e:
+                print(f"Error cancelling request {request['id']}: {e}", file=sys.stderr)
+            raise TimeoutError()
+        
+        response, decode_time = received
+        self._record_round_trip(label, response, started, encoded, written, decode_time)
+        return response
     
-    def _wait_for_response(self, request_id: str, timeout: int) -> Dict[str, Any]:
-        """Wait for response from the Java shim."""
-        start_time = time.time()
+    def _wait_for_response(self, request_id: str, timeout: int) -> Optional[tuple]:
+        """Wait for response from the Java shim; returns (response, decode seconds) or None on timeout."""
+        deadline = time.monotonic() + timeout
         
-        while time.time() - start_time < timeout:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            payload = self.transport.receive_sync(remaining)
+            if payload is None:
+                return None
+            decode_started = time.perf_counter()
             try:
-                if os.path.exists(self.response_pipe_path):
-                    with open(self.response_pipe_path, 'r') as pipe:
-                        # Set non-blocking mode would be ideal, but let's try with a small timeout
-                        response_line = pipe.readline().strip()
-                        if response_line:
-                            response = json.loads(response_line)
-                            # For methods without requestId (backward compatibility)
-                            # just return the first response we get
-                            if not request_id or response.get("id") == request_id:
-                                return {
-                                    "success": True,
-                                    "result": response.get("result"),
-                                    "error": response.get("error")
-                                }
-                
-                time.sleep(0.1)  # Small delay before checking again
-                
-            except (FileNotFoundError, json.JSONDecodeError, Exception) as e:
+                response = self.sync_codec.decode(payload)
+            except Exception as e:
                 print(f"Error reading response: {e}", file=sys.stderr)
-                time.sleep(0.1)
                 continue
+            self._record(RESPONSE, response)
+            # For methods without requestId (backward compatibility)
+            # just return the first response we get
+            if not request_id or response.get("id") == request_id:
+                return response, time.perf_counter() - decode_started
+    
+    async def call_method_async(self, method_name: str, *args, timeout: int = 300, fresh: bool = False) -> Dict[str, Any]:
+        """Call method and await the response without blocking the event loop.
+        
+        fresh=True skips the response cache and ground item index (the state
+        mirror, kept current by pushed events, may still answer), for callers
+        polling for a change.
+        """
+        if self.ground_items is not None and not fresh and method_name in GROUND_ITEM_QUERIES:
+            answered = await self._answer_ground_item_query(method_name, args, timeout)
+            if answered is not None:
+                return answered
+        if self.mirror:
+            mirrored = self.mirror.answer(method_name, args)
+            if mirrored is not None:
+                return mirrored
+        if self.cache:
+            cached = None if fresh else self.cache.lookup(method_name, args)
+            if cached is not None:
+                return cached
+            self.cache.invalidate_for(method_name)
+        
+        request = {
+            "method": method_name,
+            "args": list(args),
+            "id": self._next_request_id()
+        }
+        
+        if not self.transport.is_available():
+            return {
+                "success": False,
+                "error": self.transport.unavailable_error(),
+                "result": None
+            }
+        
+        try:
+            response = await self._send_request_async(request, timeout)
+        except asyncio.TimeoutError:
+            return {
+                "success": False,
+                "error": f"Timeout waiting for response (waited {timeout}s)",
+                "result": None
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Error calling method {method_name}: {e}",
+                "result": None
+            }
+        
+        result = {
+            "success": True,
+            "result": response.get("result"),
+            "error": response.get("error")
+        }
+        if self.cache:
+            # Invalidate again in case a read was cached while this call was in flight
+            self.cache.invalidate_for(method_name)
+            self.cache.store(method_name, args, result)
+        if self.items is not None and method_name in ITEM_REPORTING_METHODS and isinstance(result["result"], list):
+            self.items.observe(result["result"])
+        return result
+    
+    async def _answer_ground_item_query(self, method_name: str, args: tuple, timeout: int) -> Optional[Dict[str, Any]]:
+        """Answer a ground item query from the index, or None to call the shim.
+        
+        The nearby items (and for distances the player tile) are read through
+        the mirror and response cache, so only stale state costs a live call.
+        """
+        reads = [self.call_method_async("getNearbyGroundItems", timeout=timeout)]
+        if method_name == "getDistanceToGroundItem":
+            reads.append(self.call_method_async("getPlayerLocation", timeout=timeout))
+        responses = await asyncio.gather(*reads)
+        failed = any(not response["success"] or response.get("error") is not None for response in responses)
+        if failed or not isinstance(responses[0].get("result"), list):
+            self.ground_items.counters["fallbacks"] += 1
+            return None
+        
+        self.ground_items.update(responses[0]["result"])
+        origin = parse_tile(responses[1].get("result")) if len(responses) > 1 else None
+        if method_name == "getDistanceToGroundItem" and origin is None:
+            self.ground_items.counters["fallbacks"] += 1
+            return None
+        self.ground_items.counters["answered"] += 1
+        return {
+            "success": True,
+            "result": self.ground_items.answer(method_name, args, origin),
+            "error": None
+        }
+    
+    async def call_batch_async(self, calls: List[Dict[str, Any]], timeout: int = 300) -> Dict[str, Any]:
+        """Awaitable call_batch: one request and one combined reply for several calls."""
+        error = _check_batch_calls(calls)
+        if error:
+            return {
+                "success": False,
+                "error": f"Error calling batch: {error}",
+                "result": None
+            }
+        
+        if self._batch_unsupported:
+            results = await asyncio.gather(*[
+                self.call_method_async(call["method"], *call.get("args", []), timeout=timeout) for call in calls
+            ])
+            return self._batch_response({"results": list(results)}, calls)
+        
+        if not self.transport.is_available():
+            return {
+                "success": False,
+                "error": self.transport.unavailable_error(),
+                "result": None
+            }
         
+        try:
+            request = self._build_batch_request(calls)
+            self._invalidate_cache_for_calls(calls)
+            response = await self._send_request_async(request, timeout)
+            self._invalidate_cache_for_calls(calls)
+        except asyncio.TimeoutError:
+            return {
+                "success": False,
+                "error": f"Timeout waiting for response (waited {timeout}s)",
+                "result": None
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Error calling batch: {e}",
+                "result": None
+            }
+        
+        if "results" not in response:
+            # Older shims reply to the envelope with an error; pipeline the calls instead
+            self._batch_unsupported = True
+            return await self.call_batch_async(calls, timeout)
+        return self._batch_response(response, calls)
+    
+    def _build_batch_request(self, calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build the batch envelope: {"id", "batch": [{"method", "args"}, ...]}."""
+        batch = [{"method": call["method"], "args": list(call.get("args", []))} for call in calls]
         return {
-            "success": False,
-            "error": f"Timeout waiting for response (waited {timeout}s)",
-            "result": None
+            "batch": batch,
+            "id": self._next_request_id()
+        }
+    
+    def _invalidate_cache_for_calls(self, calls: List[Dict[str, Any]]) -> None:
+        """Apply cache invalidation rules for every method in a batch."""
+        if self.cache:
+            for call in calls:
+                self.cache.invalidate_for(call["method"])
+    
+    def _batch_response(self, response: Dict[str, Any], calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Convert a batch reply into per-entry {success, result, error} dicts."""
+        results = response.get("results")
+        if not isinstance(results, list) or len(results) != len(calls):
+            return {
+                "success": False,
+                "error": response.get("error") or "Java shim returned a malformed batch response",
+                "result": None
+            }
+        
+        entries = []
+        for entry in results:
+            entry = entry if isinstance(entry, dict) else {"result": entry}
+            entries.append({
+                "success": entry.get("success", True) and entry.get("error") is None,
+                "result": entry.get("result"),
+                "error": entry.get("error")
+            })
+        return {
+            "success": True,
+            "result": entries,
+            "error": None
+        }
+    
+    async def _send_request_async(self, request: Dict[str, Any], timeout: int) -> Dict[str, Any]:
+        """Write a request over the persistent connection and await its raw response."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        await self._ensure_connected_async(deadline)
+        await self._negotiate_codec_async(deadline)
+        label = _metric_label(request)
+        self._count(label, "calls")
+        started = time.perf_counter()
+        try:
+            with traced(self.tracer, "shim_call", method=label, request_id=request["id"]):
+                with traced(self.tracer, "queue"):
+                    await asyncio.wait_for(self._in_flight.acquire(), max(deadline - loop.time(), 0))
+                try:
+                    response = await self._exchange_async(request, deadline)
+                finally:
+                    self._in_flight.release()
+        except asyncio.TimeoutError:
+            self._count(label, "timeouts")
+            raise
+        except asyncio.CancelledError:
+            self._count(label, "cancelled")
+            raise
+        except Exception:
+            self._count(label, "errors")
+            raise
+        if self.metrics:
+            self.metrics.record_phase(label, "total", time.perf_counter() - started)
+        return response
+    
+    async def _exchange_async(self, request: Dict[str, Any], deadline: float) -> Dict[str, Any]:
+        """Send an encoded request on the open connection and await the reply with its id."""
+        loop = asyncio.get_running_loop()
+        request_id = request["id"]
+        # Register before writing so a fast reply cannot be missed
+        response_future = loop.create_future()
+        self._pending[request_id] = response_future
+        try:
+            self._attach_trace_context(request)
+            started = time.perf_counter()
+            with traced(self.tracer, "encode"):
+                payload = self.codec.encode(request)
+            encoded = time.perf_counter()
+            with traced(self.tracer, "transport_write", bytes=len(payload)):
+                await self.transport.send_async(payload, deadline)
+            written = time.perf_counter()
+            self._record(REQUEST, request)
+            with traced(self.tracer, "wait"):
+                response, decode_time = await asyncio.wait_for(response_future, max(deadline - loop.time(), 0))
+            self._record_round_trip(_metric_label(request), response, started, encoded, written, decode_time, total=False)
+            return response
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            # Timed out or cancelled by the MCP client: have the shim abandon the work too
+            self._cancel_on_shim(request_id)
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+    
+    def _attach_trace_context(self, request: Dict[str, Any]) -> None:
+        """Forward the trace and parent span ids so the shim can join its spans to ours (JSON codec only)."""
+        span = self.tracer.current_span() if self.tracer else None
+        if span is not None:
+            request["trace"] = {"trace_id": span.trace_id, "parent_span_id": span.span_id}
+    
+    def _cancel_request(self, request_id: str) -> Dict[str, Any]:
+        """Build the cancel message; it has no id because the shim does not reply to it."""
+        return {
+            "method": "cancel",
+            "args": [request_id]
+        }
+    
+    def _cancel_on_shim(self, request_id: str) -> None:
+        """Send a cancel message in the background; the cancelled caller cannot await it."""
+        loop = asyncio.get_running_loop()
+        task = loop.create_task(self._send_cancel_async(request_id, loop.time() + CANCEL_SEND_TIMEOUT))
+        self._cancel_tasks.add(task)
+        task.add_done_callback(self._cancel_tasks.discard)
+    
+    async def _send_cancel_async(self, request_id: str, deadline: float) -> None:
+        try:
+            cancel = self._cancel_request(request_id)
+            await self.transport.send_async(self.codec.encode(cancel), deadline)
+            self._record(REQUEST, cancel)
+        except Exception as e:
+            print(f"Error cancelling request {request_id}: {e}", file=sys.stderr)
+    
+    async def _negotiate_codec_async(self, deadline: float) -> None:
+        """Run the codec handshake once per connection; concurrent callers share it."""
+        if self._codec_handshake is None:
+            self._codec_handshake = asyncio.get_running_loop().create_task(self._codec_handshake_async(deadline))
+        # Shielded so one caller timing out does not cancel the handshake for the others
+        await asyncio.shield(self._codec_handshake)
+    
+    async def _codec_handshake_async(self, deadline: float) -> None:
+        """Offer the binary codec; the shim answers {"codec", "methods"} or an error if it only speaks JSON."""
+        if self.codec_preference != "binary" or not self.transport.binary_safe:
+            return
+        
+        loop = asyncio.get_running_loop()
+        request = {
+            "method": "negotiateCodec",
+            "args": [[BINARY_CODEC_NAME, JSON_CODEC_NAME], self.session_id],
+            "id": self._next_request_id()
+        }
+        try:
+            response = await self._exchange_async(request, min(deadline, loop.time() + CODEC_HANDSHAKE_TIMEOUT))
+        except asyncio.TimeoutError:
+            print("Codec handshake timed out; using JSON", file=sys.stderr)
+            return
+        except Exception as e:
+            print(f"Codec handshake failed; using JSON: {e}", file=sys.stderr)
+            return
+        
+        self.codec = self._negotiated_codec(response)
+    
+    def _negotiate_codec_sync(self, timeout: float) -> None:
+        """Run the codec handshake once for the blocking connection, which the async handshake does not cover."""
+        if self._sync_codec_negotiated:
+            return
+        self._sync_codec_negotiated = True
+        if self.codec_preference != "binary" or not self.transport.binary_safe:
+            return
+        
+        request = {
+            "method": "negotiateCodec",
+            "args": [[BINARY_CODEC_NAME, JSON_CODEC_NAME], self.session_id],
+            "id": self._next_request_id()
         }
+        try:
+            self.transport.send_sync(self.sync_codec.encode(request))
+            self._record(REQUEST, request)
+            received = self._wait_for_response(request["id"], min(timeout, CODEC_HANDSHAKE_TIMEOUT))
+        except Exception as e:
+            print(f"Codec handshake failed; using JSON: {e}", file=sys.stderr)
+            return
+        if received is None:
+            print("Codec handshake timed out; using JSON", file=sys.stderr)
+            return
+        self.sync_codec = self._negotiated_codec(received[0])
+    
+    def _negotiated_codec(self, response: Dict[str, Any]):
+        """The codec a handshake reply selects: binary if the shim accepted it, JSON otherwise."""
+        result = response.get("result")
+        if isinstance(result, dict) and result.get("codec") == BINARY_CODEC_NAME and isinstance(result.get("methods"), list):
+            return BinaryCodec(result["methods"], self.session_id)
+        return JsonCodec()
+    
+    def _next_request_id(self) -> str:
+        """Return a monotonic, process-unique request id prefixed with the session id."""
+        return f"{self.session_id}-{next(_request_counter)}"
+    
+    def close(self) -> None:
+        """Close the transport and fail any requests still waiting for a reply."""
+        self.transport.close()
+        self._fail_pending(ConnectionError("Java caller closed"))
+        self._reset_codec()
+        self._reset_sync_codec()
+        self._loop = None
+    
+    async def _ensure_connected_async(self, deadline: float) -> None:
+        """Connect the transport for the running event loop if not already connected."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Event loop state cannot be shared across loops (e.g. repeated asyncio.run)
+            self.close()
+            self._loop = loop
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        await self.transport.connect_async(self._on_message, self._on_connection_lost, deadline)
+    
+    def _on_message(self, payload: bytes) -> None:
+        """Resolve the pending future whose id matches a received response with (response, decode seconds)."""
+        decode_started = time.perf_counter()
+        try:
+            response = self.codec.decode(payload)
+        except Exception as e:
+            print(f"Error reading response: {e}", file=sys.stderr)
+            return
+        decode_time = time.perf_counter() - decode_started
+        self._record(RESPONSE, response)
+        future = self._pending.get(response.get("id"))
+        if future and not future.done():
+            future.set_result((response, decode_time))
+        else:
+            print(f"Discarding response for unknown or abandoned request {response.get('id')}", file=sys.stderr)
+    
+    def _record(self, direction: int, message: Dict[str, Any]) -> None:
+        if self.recorder:
+            self.recorder.record(direction, message)
+    
+    def _count(self, label: str, outcome: str) -> None:
+        if self.metrics:
+            self.metrics.count(label, outcome)
+    
+    def _record_round_trip(self, label: str, response: Dict[str, Any], started: float, encoded: float,
+                           written: float, decode_time: float, total: bool = True) -> None:
+        """Record the phases of a completed round-trip; a reply carrying an error counts as one."""
+        if not self.metrics:
+            return
+        finished = time.perf_counter()
+        metrics = self.metrics
+        metrics.record_phase(label, "encode", encoded - started)
+        metrics.record_phase(label, "write", written - encoded)
+        metrics.record_phase(label, "wait", finished - written - decode_time)
+        metrics.record_phase(label, "decode", decode_time)
+        shim_time = response.get("shim_time_ms")
+        if isinstance(shim_time, (int, float)) and not isinstance(shim_time, bool):
+            metrics.record_phase(label, "shim", shim_time / 1000)
+        if total:
+            metrics.record_phase(label, "total", finished - started)
+        if response.get("error") is not None:
+            metrics.count(label, "errors")
+    
+    def _on_connection_lost(self, error: Exception) -> None:
+        """A new connection starts in JSON, so the codec is negotiated again."""
+        self._reset_codec()
+        self._fail_pending(error)
+    
+    def _reset_codec(self) -> None:
+        self.codec = JsonCodec()
+        self._codec_handshake = None
+    
+    def _reset_sync_codec(self) -> None:
+        self.sync_codec = JsonCodec()
+        self._sync_codec_negotiated = False
+    
+    def _fail_pending(self, error: Exception) -> None:
+        """Fail every request still waiting for a reply, e.g. when the connection is lost."""
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
     
     def greet(self, name: str):
         return self.call_method_with_response("greet", name)
@@ -168,12 +755,25 @@ class JavaMethodCaller:
     def insert_upcoming_step(self, index: int, step_description: str):
         return self.call_method_with_response("insertUpcomingStep", index, step_description)
     
+    # Bulk task list methods - each is a single shim call applied atomically
+    def get_upcoming_steps(self):
+        return self.call_method_with_response("getUpcomingSteps")
+    
+    def add_upcoming_steps(self, step_descriptions: List[str]):
+        return self.call_method_with_response("addUpcomingSteps", list(step_descriptions))
+    
+    def replace_upcoming_steps(self, step_descriptions: List[str]):
+        return self.call_method_with_response("replaceUpcomingSteps", list(step_descriptions))
+    
+    def apply_step_edits(self, edits: List[Dict[str, Any]]):
+        return self.call_method_with_response("applyStepEdits", list(edits))
+    
     def handle_npc_dialogue(self, npc_name: str, max_wait_time: int):
         return self.call_method_with_response("handleNPCDialogue", npc_name, max_wait_time)
     
     def use_item_on_item(self, primary_item: str, secondary_item: str, use_item_ids: bool = False):
         return self.call_method_with_response("useItemOnItem", primary_item, secondary_item, use_item_ids)
-
+    
     def perform_item_action(self, action: str, item: str, target: str = None, use_item_ids: bool = False, target_type: str = "object"):
         return self.call_method_with_response("performItemAction", action, item, target, use_item_ids, target_type)
     
@@ -195,3 +795,112 @@ class JavaMethodCaller:
     
     def get_current_tile(self):
         return self.call_method_with_response("getPlayerLocation")
+    
+    # Async API - awaitable counterparts of the wrapper methods above
+    async def greet_async(self, name: str):
+        return await self.call_method_async("greet", name)
+    
+    async def calculate_async(self, a, b, operation):
+        return await self.call_method_async("calculate", a, b, operation)
+    
+    async def walk_to_location_async(self, x: int, y: int, z: int = 0):
+        return await self.call_method_async("walkToLocation", x, y, z)
+    
+    async def click_object_async(self, object_name: str):
+        return await self.call_method_async("clickObject", object_name)
+    
+    async def get_inventory_count_async(self):
+        return await self.call_method_async("getInventoryCount")
+    
+    async def check_inventory_for_item_async(self, item_name: str, use_item_id: bool = False):
+        return await self.call_method_async("checkInventoryForItem", item_name, use_item_id)
+    
+    async def inventory_contains_item_async(self, item_name: str, use_item_id: bool = False):
+        return await self.call_method_async("inventoryContainsItem", item_name, use_item_id)
+    
+    async def check_bank_open_async(self):
+        return await self.call_method_async("bankIsOpen")
+    
+    async def close_bank_async(self):
+        return await self.call_method_async("closeBank")
+    
+    async def withdraw_item_async(self, item_name: str, quantity: int):
+        return await self.call_method_async("withdrawItem", item_name, quantity)
+    
+    async def deposit_item_async(self, item_name: str, quantity: int):
+        return await self.call_method_async("depositItem", item_name, quantity)
+    
+    async def deposit_all_async(self):
+        return await self.call_method_async("depositAllExcept")
+    
+    async def run_dreambot_action_async(self, action: str, *params):
+        return await self.call_method_async("runDreambotAction", action, *params)
+    
+    async def log_message_async(self, level: str, message: str):
+        return await self.call_method_async("logMessage", level, message)
+    
+    # Async Task Management Methods
+    async def clear_upcoming_steps_async(self):
+        return await self.call_method_async("clearUpcomingSteps")
+    
+    async def add_upcoming_step_async(self, step_description: str):
+        return await self.call_method_async("addUpcomingStep", step_description)
+    
+    async def get_upcoming_steps_count_async(self):
+        return await self.call_method_async("getUpcomingStepsCount")
+    
+    async def peek_next_step_async(self):
+        return await self.call_method_async("peekNextStep")
+    
+    async def get_next_step_async(self):
+        return await self.call_method_async("getNextStep")
+    
+    async def set_current_step_async(self, step_description: str):
+        return await self.call_method_async("setCurrentStep", step_description)
+    
+    async def remove_upcoming_step_async(self, index: int):
+        return await self.call_method_async("removeUpcomingStep", index)
+    
+    async def insert_upcoming_step_async(self, index: int, step_description: str):
+        return await self.call_method_async("insertUpcomingStep", index, step_description)
+    
+    # Bulk task list methods - each is a single shim call applied atomically
+    async def get_upcoming_steps_async(self):
+        return await self.call_method_async("getUpcomingSteps")
+    
+    async def add_upcoming_steps_async(self, step_descriptions: List[str]):
+        return await self.call_method_async("addUpcomingSteps", list(step_descriptions))
+    
+    async def replace_upcoming_steps_async(self, step_descriptions: List[str]):
+        return await self.call_method_async("replaceUpcomingSteps", list(step_descriptions))
+    
+    async def apply_step_edits_async(self, edits: List[Dict[str, Any]]):
+        return await self.call_method_async("applyStepEdits", list(edits))
+    
+    async def handle_npc_dialogue_async(self, npc_name: str, max_wait_time: int):
+        return await self.call_method_async("handleNPCDialogue", npc_name, max_wait_time)
+    
+    async def use_item_on_item_async(self, primary_item: str, secondary_item: str, use_item_ids: bool = False):
+        return await self.call_method_async("useItemOnItem", primary_item, secondary_item, use_item_ids)
+    
+    async def perform_item_action_async(self, action: str, item: str, target: str = None, use_item_ids: bool = False, target_type: str = "object"):
+        return await self.call_method_async("performItemAction", action, item, target, use_item_ids, target_type)
+    
+    # Async Ground Item Methods
+    async def pickup_ground_item_async(self, item_name: str):
+        return await self.call_method_async("pickupGroundItem", item_name)
+    
+    async def pickup_ground_item_by_id_async(self, item_id: int):
+        return await self.call_method_async("pickupGroundItemById", item_id)
+    
+    async def get_nearby_ground_items_async(self):
+        return await self.call_method_async("getNearbyGroundItems")
+    
+    async def ground_item_exists_async(self, item_name: str):
+        return await self.call_method_async("groundItemExists", item_name)
+    
+    async def get_distance_to_ground_item_async(self, item_name: str):
+        return await self.call_method_async("getDistanceToGroundItem", item_name)
+    
+    async def get_current_tile_async(self):
+        return await self.call_method_async("getPlayerLocation")
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+
+import asyncio
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+# Hard caps so a runaway script cannot keep the bot busy indefinitely
+MAX_ACTIONS = 1000
+DEFAULT_MAX_ACTIONS = 200
+MAX_LOOP_ITERATIONS = 1000
+MAX_SLEEP = 60.0
+MAX_NESTING = 8
+
+# Actions listed individually at the end of the summary
+SUMMARY_TAIL = 5
+# Longest rendering of one value or result in the summary
+SUMMARY_VALUE_LENGTH = 120
+
+# Summary headline for each way a run can end
+_OUTCOMES = {
+    "completed": "completed",
+    "stopped": "stopped",
+    "failed": "failed",
+    "limit": "hit the action limit",
+    "timeout": "timed out",
+}
+
+STEP_KINDS = ("tool", "if", "repeat", "while", "set", "sleep", "stop")
+
+# Keys each kind of step may carry besides its kind
+_STEP_KEYS = {
+    "tool": {"args", "save", "on_error"},
+    "if": {"then", "else"},
+    "repeat": {"steps"},
+    "while": {"steps", "max_iterations"},
+    "set": set(),
+    "sleep": set(),
+    "stop": set(),
+}
+
+_COMPARISONS = {
+    "==": lambda left, right: left == right,
+    "!=": lambda left, right: left != right,
+    "<": lambda left, right: left < right,
+    "<=": lambda left, right: left <= right,
+    ">": lambda left, right: left > right,
+    ">=": lambda left, right: left >= right,
+    "contains": lambda left, right: right in left,
+}
+_UNARY_CHECKS = {
+    "truthy": bool,
+    "falsy": lambda value: not value,
+}
+
+_VARIABLE_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+# "$name" or "$name.field.0" as a whole string keeps the value's type
+_REFERENCE = re.compile(r"\$([A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z0-9_]+)*)")
+# "${name}" inside a longer string is replaced by the value's text
+_INTERPOLATION = re.compile(r"\$\{([A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z0-9_]+)*)\}")
+
+# (success, raw result, formatted text) for one tool call
+ToolOutcome = Tuple[bool, Any, str]
+ToolRunner = Callable[[str, Dict[str, Any], Optional[float]], Awaitable[ToolOutcome]]
+
+
+def check_macro(steps: Any, check_tool: Callable[[str, Dict[str, Any]], Optional[str]]) -> Optional[str]:
+    """Return a message describing the first malformed step, or None.
+    
+    check_tool(name, args) returns an error for tool steps that name an
+    unusable tool; argument values are only checked when the step runs,
+    after variables are substituted.
+    """
+    return _check_steps(steps, "steps", 1, check_tool)
+
+
+def _check_steps(steps: Any, path: str, depth: int, check_tool: Callable[[str, Dict[str, Any]], Optional[str]]) -> Optional[str]:
+    if not isinstance(steps, list):
+        return f"{path} must be an array of steps"
+    if depth > MAX_NESTING:
+        return f"{path} is nested more than {MAX_NESTING} levels deep"
+    for index, step in enumerate(steps):
+        error = _check_step(step, f"{path}[{index}]", depth, check_tool)
+        if error:
+            return error
+    return None
+
+
+def _check_step(step: Any, path: str, depth: int, check_tool: Callable[[str, Dict[str, Any]], Optional[str]]) -> Optional[str]:
+    if not isinstance(step, dict):
+        return f"{path} must be an object"
+    kinds = [kind for kind in STEP_KINDS if kind in step]
+    if len(kinds) != 1:
+        return f"{path} must have exactly one of {', '.join(STEP_KINDS)}"
+    kind = kinds[0]
+    extra = set(step) - _STEP_KEYS[kind] - {kind}
+    if extra:
+        return f"{path} ({kind}) has unexpected keys: {', '.join(sorted(extra))}"
+    value = step[kind]
+    
+    if kind == "tool":
+        if not isinstance(value, str):
+            return f"{path}.tool must be a tool name"
+        if not isinstance(step.get("args", {}), dict):
+            return f"{path}.args must be an object"
+        if "save" in step and not _is_variable_name(step["save"]):
+            return f"{path}.save must be a variable name"
+        if step.get("on_error", "stop") not in ("stop", "continue"):
+            return f"{path}.on_error must be \"stop\" or \"continue\""
+        error = check_tool(value, step.get("args", {}))
+        return f"{path}: {error}" if error else None
+    if kind == "if":
+        return (
+            _check_condition(value, f"{path}.if")
+            or _check_steps(step.get("then", []), f"{path}.then", depth + 1, check_tool)
+            or _check_steps(step.get("else", []), f"{path}.else", depth + 1, check_tool)
+        )
+    if kind == "repeat":
+        if not _is_count(value, MAX_LOOP_ITERATIONS):
+            return f"{path}.repeat must be an integer from 0 to {MAX_LOOP_ITERATIONS} or a \"$variable\""
+        return _check_steps(step.get("steps"), f"{path}.steps", depth + 1, check_tool)
+    if kind == "while":
+        if not _is_count(step.get("max_iterations"), MAX_LOOP_ITERATIONS):
+            return f"{path}.max_iterations is required and must be an integer from 0 to {MAX_LOOP_ITERATIONS}"
+        return (
+            _check_condition(value, f"{path}.while")
+            or _check_steps(step.get("steps"), f"{path}.steps", depth + 1, check_tool)
+        )
+    if kind == "set":
+        if not isinstance(value, dict) or not all(_is_variable_name(name) for name in value):
+            return f"{path}.set must map variable names to values"
+        return None
+    if kind == "sleep":
+        if not _is_number(value) or not 0 <= value <= MAX_SLEEP:
+            return f"{path}.sleep must be a number of seconds from 0 to {MAX_SLEEP:g}"
+        return None
+    if not isinstance(value, str):
+        return f"{path}.stop must be a message"
+    return None
+
+
+def _check_condition(condition: Any, path: str) -> Optional[str]:
+    if not isinstance(condition, dict):
+        return f"{path} must be a condition object"
+    if "all" in condition or "any" in condition:
+        key = "all" if "all" in condition else "any"
+        if len(condition) != 1 or not isinstance(condition[key], list) or not condition[key]:
+            return f"{path}.{key} must be the only key and a non-empty array of conditions"
+        for index, part in enumerate(condition[key]):
+            error = _check_condition(part, f"{path}.{key}[{index}]")
+            if error:
+                return error
+        return None
+    if "not" in condition:
+        if len(condition) != 1:
+            return f"{path}.not must be the only key"
+        return _check_condition(condition["not"], f"{path}.not")
+    
+    if not isinstance(condition.get("var"), str) or not _REFERENCE.fullmatch("$" + condition["var"]):
+        return f"{path}.var must name a variable"
+    op = condition.get("op", "truthy")
+    if op in _UNARY_CHECKS:
+        extra = set(condition) - {"var", "op"}
+    elif op in _COMPARISONS:
+        if "value" not in condition:
+            return f"{path} needs a value to compare with"
+        extra = set(condition) - {"var", "op", "value"}
+    else:
+        return f"{path}.op must be one of {', '.join(list(_COMPARISONS) + list(_UNARY_CHECKS))}"
+    if extra:
+        return f"{path} has unexpected keys: {', '.join(sorted(extra))}"
+    return None
+
+
+def _is_variable_name(value: Any) -> bool:
+    return isinstance(value, str) and _VARIABLE_NAME.fullmatch(value) is not None
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_count(value: Any, maximum: int) -> bool:
+    if isinstance(value, str):
+        return _REFERENCE.fullmatch(value) is not None
+    return isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= maximum
+
+
+class _Stop(Exception):
+    """Ends the run early; status is "stopped", "failed", "limit" or "timeout"."""
+    
+    def __init__(self, status: str, reason: str):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+
+
+class MacroRun:
+    """Executes a checked macro script with a tool runner and summarises what happened.
+    
+    Tool results are stored in the variable named by a step's save key and
+    always in "last"; loops expose their 0-based counter as "iteration".
+    A failed tool call ends the run unless the step says on_error:
+    "continue". The run also ends at max_actions tool calls, at the
+    deadline (a time.monotonic() value) or at a stop step.
+    """
+    
+    def __init__(self, steps: List[Dict[str, Any]], run_tool: ToolRunner, variables: Optional[Dict[str, Any]] = None,
+                 max_actions: int = DEFAULT_MAX_ACTIONS, deadline: Optional[float] = None):
+        self.steps = steps
+        self.run_tool = run_tool
+        self.variables: Dict[str, Any] = dict(variables or {})
+        self.max_actions = min(max_actions, MAX_ACTIONS)
+        self.deadline = deadline
+        # (action number, tool name, success, formatted text) for every tool call made
+        self.actions: List[Tuple[int, str, bool, str]] = []
+        self.status = "completed"
+        self.reason: Optional[str] = None
+        self.elapsed = 0.0
+    
+    async def run(self) -> "MacroRun":
+        started = time.monotonic()
+        try:
+            await self._run_steps(self.steps)
+        except _Stop as stop:
+            self.status = stop.status
+            self.reason = stop.reason
+        finally:
+            self.elapsed = time.monotonic() - started
+        return self
+    
+    async def _run_steps(self, steps: List[Dict[str, Any]]) -> None:
+        for step in steps:
+            await self._run_step(step)
+    
+    async def _run_step(self, step: Dict[str, Any]) -> None:
+        if "tool" in step:
+            await self._run_tool_step(step)
+        elif "if" in step:
+            branch = step.get("then", []) if self._evaluate(step["if"]) else step.get("else", [])
+            await self._run_steps(branch)
+        elif "repeat" in step:
+            await self._run_loop(step["steps"], self._iterations(step["repeat"]), None)
+        elif "while" in step:
+            await self._run_loop(step["steps"], self._iterations(step["max_iterations"]), step["while"])
+        elif "set" in step:
+            for name, value in step["set"].items():
+                self.variables[name] = self._resolve(value)
+        elif "sleep" in step:
+            await self._sleep(step["sleep"])
+        else:
+            raise _Stop("stopped", str(self._resolve(step["stop"])))
+    
+    async def _run_loop(self, steps: List[Dict[str, Any]], iterations: int, condition: Optional[Dict[str, Any]]) -> None:
+        outer = self.variables.get("iteration")
+        for iteration in range(iterations):
+            self.variables["iteration"] = iteration
+            if condition is not None and not self._evaluate(condition):
+                break
+            await self._run_steps(steps)
+        self.variables["iteration"] = outer
+    
+    def _iterations(self, value: Any) -> int:
+        count = self._resolve(value)
+        if not isinstance(count, int) or isinstance(count, bool) or not 0 <= count <= MAX_LOOP_ITERATIONS:
+            raise _Stop("failed", f"loop count must be an integer from 0 to {MAX_LOOP_ITERATIONS}, got {_short(count)}")
+        return count
+    
+    async def _run_tool_step(self, step: Dict[str, Any]) -> None:
+        if len(self.actions) >= self.max_actions:
+            raise _Stop("limit", f"reached the limit of {self.max_actions} actions")
+        remaining = self._remaining()
+        name = step["tool"]
+        args = self._resolve(step.get("args", {}))
+        success, result, text = await self.run_tool(name, args, remaining)
+        
+        self.actions.append((len(self.actions) + 1, name, success, text))
+        self.variables["last"] = result
+        if "save" in step:
+            self.variables[step["save"]] = result
+        if not success and step.get("on_error", "stop") == "stop":
+            raise _Stop("failed", f"{name} failed: {text}")
+    
+    async def _sleep(self, seconds: float) -> None:
+        remaining = self._remaining()
+        if remaining is not None and seconds >= remaining:
+            await asyncio.sleep(remaining)
+            raise _Stop("timeout", "macro deadline passed")
+        await asyncio.sleep(seconds)
+    
+    def _remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise _Stop("timeout", "macro deadline passed")
+        return remaining
+    
+    def _evaluate(self, condition: Dict[str, Any]) -> bool:
+        if "all" in condition:
+            return all(self._evaluate(part) for part in condition["all"])
+        if "any" in condition:
+            return any(self._evaluate(part) for part in condition["any"])
+        if "not" in condition:
+            return not self._evaluate(condition["not"])
+        
+        left = self._lookup(condition["var"])
+        op = condition.get("op", "truthy")
+        if op in _UNARY_CHECKS:
+            return _UNARY_CHECKS[op](left)
+        right = self._resolve(condition["value"])
+        try:
+            return _COMPARISONS[op](left, right)
+        except TypeError:
+            raise _Stop("failed", f"cannot compare {condition['var']}={_short(left)} {op} {_short(right)}")
+    
+    def _resolve(self, value: Any) -> Any:
+        """Substitute variable references in a value (recursively for arrays and objects)."""
+        if isinstance(value, str):
+            reference = _REFERENCE.fullmatch(value)
+            if reference:
+                return self._lookup(reference.group(1))
+            return _INTERPOLATION.sub(lambda match: str(self._lookup(match.group(1))), value)
+        if isinstance(value, list):
+            return [self._resolve(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self._resolve(item) for key, item in value.items()}
+        return value
+    
+    def _lookup(self, path: str) -> Any:
+        """Return the value of "name" or "name.field.0"; unknown names end the run."""
+        name, *fields = path.split(".")
+        if name not in self.variables:
+            raise _Stop("failed", f"unknown variable ${name}")
+        value = self.variables[name]
+        for field in fields:
+            if isinstance(value, dict) and field in value:
+                value = value[field]
+            elif isinstance(value, list) and field.isdigit() and int(field) < len(value):
+                value = value[int(field)]
+            else:
+                raise _Stop("failed", f"${path} does not exist (${name} is {_short(self.variables[name])})")
+        return value
+    
+    def summary(self) -> str:
+        """Compact report: outcome, per-tool counts, the last few actions and the variables set."""
+        failures = sum(1 for action in self.actions if not action[2])
+        count = len(self.actions)
+        headline = f"Macro {_OUTCOMES[self.status]} after {count} action{'' if count == 1 else 's'} in {self.elapsed:.2f}s"
+        if failures:
+            headline += f" ({failures} failed)"
+        lines = [headline + (f": {self.reason}" if self.reason else "")]
+        
+        counts: Dict[str, List[int]] = {}
+        for _, name, success, _ in self.actions:
+            counts.setdefault(name, [0, 0])[0 if success else 1] += 1
+        if counts:
+            lines.append("Tools: " + ", ".join(
+                f"{name} x{ok + failed}" + (f" ({failed} failed)" if failed else "")
+                for name, (ok, failed) in counts.items()
+            ))
+        
+        if self.actions:
+            lines.append("Last actions:")
+            for number, name, success, text in self.actions[-SUMMARY_TAIL:]:
+                lines.append(f"  #{number} {name} {'ok' if success else 'FAILED'}: {_short(text)}")
+        
+        variables = {name: value for name, value in self.variables.items() if name not in ("last", "iteration")}
+        if variables:
+            lines.append("Variables: " + ", ".join(f"{name}={_short(value)}" for name, value in variables.items()))
+        return "\n".join(lines)
+
+
+def _short(value: Any) -> str:
+    text = value if isinstance(value, str) else repr(value)
+    text = text.replace("\n", " | ")
+    if len(text) > SUMMARY_VALUE_LENGTH:
+        text = text[:SUMMARY_VALUE_LENGTH - 3] + "..."
+    return text
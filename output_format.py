@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+import collections
+import itertools
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+
+# verbose is the original prose; compact is key=value lines; json is one minimal JSON object
+OUTPUT_MODES = ("verbose", "compact", "json")
+DEFAULT_OUTPUT_MODE = "verbose"
+
+# Lists longer than this are cut to one page in compact and json output, with a cursor for the rest
+PAGE_SIZE = 20
+# Text results (and verbose output) longer than this many UTF-8 bytes are cut the same way
+TEXT_PAGE_BYTES = 2048
+# Paged results kept for get_more_results, and for how long
+MAX_PAGED_RESULTS = 64
+PAGE_TTL = 600.0
+
+
+def compact_scalar(value: Any) -> str:
+    """A value as it appears after "key=": bare when unambiguous, JSON otherwise."""
+    if isinstance(value, str) and value and not any(char.isspace() or char in "=\"," for char in value):
+        return value
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def compact_line(value: Any, key: str = "result") -> str:
+    """A dict as space-separated key=value pairs; anything else as key=value."""
+    if isinstance(value, dict) and value:
+        return " ".join(f"{name}={compact_scalar(item)}" for name, item in value.items())
+    return f"{key}={compact_scalar(value)}"
+
+
+def render_json(payload: Dict[str, Any]) -> str:
+    return json.dumps(payload, separators=(",", ":"), default=str)
+
+
+def text_page_end(text: str, start: int, max_bytes: int) -> int:
+    """End of the page of text starting at start: after its last newline within max_bytes, else at max_bytes."""
+    window = text[start:start + max_bytes].encode()[:max_bytes].decode("utf-8", "ignore")
+    if start + len(window) >= len(text):
+        return len(text)
+    newline = window.rfind("\n")
+    return start + (newline + 1 if newline > 0 else max(len(window), 1))
+
+
+def render_result(mode: str, result: Any, error: Optional[str] = None, pager: Optional["ResultPager"] = None) -> str:
+    """Render a successful shim result in compact or json mode, paging long lists and text through pager.
+    
+    For text, total and more= count characters rather than items.
+    """
+    cursor = None
+    total = None
+    if pager is not None and pager.is_long(result):
+        total = len(result)
+        result, cursor = pager.first_page(result)
+    if mode == "json":
+        payload = {"result": result}
+        if total is not None:
+            payload.update(total=total, cursor=cursor)
+        if error is not None:
+            payload["error"] = error
+        return render_json(payload)
+    
+    if isinstance(result, list):
+        lines = [compact_line(item, "item") for item in result] or ["result=[]"]
+    elif result is None:
+        lines = ["ok"]
+    else:
+        lines = [compact_line(result)]
+    if total is not None:
+        lines.append(f"more={total - len(result)} cursor={cursor}")
+    if error is not None:
+        lines.append(f"error={compact_scalar(error)}")
+    return "\n".join(lines)
+
+
+def page_text(text: str, pager: Optional["ResultPager"]) -> str:
+    """Cut verbose output longer than one page to its first page, with a cursor for the rest."""
+    if pager is None or not pager.is_long(text):
+        return text
+    page, cursor = pager.first_page(text)
+    return page.rstrip("\n") + f"\nMore results: cursor {cursor}"
+
+
+def render_error(mode: str, error: str) -> str:
+    if mode == "json":
+        return render_json({"error": error})
+    return f"error={compact_scalar(error)}"
+
+
+class ResultPager:
+    """Keeps the rest of long list and text results so they can be fetched a page at a time by cursor.
+    
+    A list page is page_size items; a text page is at most text_page_bytes
+    UTF-8 bytes, cut after a newline where there is one. A cursor is
+    "<result id>:<offset>", the offset counting items or characters. Results
+    expire after PAGE_TTL seconds and the oldest are dropped beyond
+    MAX_PAGED_RESULTS.
+    """
+    
+    def __init__(self, page_size: int = PAGE_SIZE, max_results: int = MAX_PAGED_RESULTS, ttl: float = PAGE_TTL,
+                 text_page_bytes: int = TEXT_PAGE_BYTES):
+        self.page_size = page_size
+        self.text_page_bytes = text_page_bytes
+        self.max_results = max_results
+        self.ttl = ttl
+        self._results: "collections.OrderedDict[str, Tuple[float, Union[list, str]]]" = collections.OrderedDict()
+        self._ids = itertools.count(1)
+    
+    def is_long(self, result: Any) -> bool:
+        """Whether result is a list or text longer than one page."""
+        if isinstance(result, list):
+            return len(result) > self.page_size
+        return isinstance(result, str) and self._page_end(result, 0) < len(result)
+    
+    def first_page(self, items: Union[list, str]) -> Tuple[Union[list, str], Optional[str]]:
+        """Keep items (a list or text) and return (first page, cursor of the next one)."""
+        self._expire()
+        result_id = f"r{next(self._ids)}"
+        self._results[result_id] = (time.monotonic() + self.ttl, items)
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+        end = self._page_end(items, 0)
+        return items[:end], f"{result_id}:{end}"
+    
+    def page(self, cursor: str) -> Optional[Tuple[Union[list, str], int, int, Optional[str]]]:
+        """Return (page, offset, total, next cursor or None) for a cursor, or None if it is unknown or expired."""
+        self._expire()
+        result_id, _, offset = cursor.partition(":")
+        entry = self._results.get(result_id)
+        if entry is None or not offset.isdigit():
+            return None
+        items = entry[1]
+        start = int(offset)
+        end = self._page_end(items, start)
+        return items[start:end], start, len(items), f"{result_id}:{end}" if end < len(items) else None
+    
+    def _page_end(self, items: Union[list, str], start: int) -> int:
+        if isinstance(items, str):
+            return text_page_end(items, start, self.text_page_bytes)
+        return start + self.page_size
+    
+    def _expire(self) -> None:
+        now = time.monotonic()
+        while self._results and next(iter(self._results.values()))[0] <= now:
+            self._results.popitem(last=False)
+
+
+def render_page(mode: str, page: Union[list, str], offset: int, total: int, cursor: Optional[str]) -> str:
+    """Render one page fetched with get_more_results."""
+    if mode == "json":
+        payload: Dict[str, Any] = {"result": page, "offset": offset, "total": total}
+        if cursor:
+            payload["cursor"] = cursor
+        return render_json(payload)
+    if isinstance(page, str):
+        if mode == "compact":
+            lines = [compact_line(page)]
+            if cursor:
+                lines.append(f"more={total - offset - len(page)} cursor={cursor}")
+        else:
+            lines = [page.rstrip("\n")]
+            if cursor:
+                lines.append(f"More results: cursor {cursor}")
+        return "\n".join(lines)
+    if mode == "compact":
+        lines: List[str] = [compact_line(item, "item") for item in page]
+        if cursor:
+            lines.append(f"more={total - offset - len(page)} cursor={cursor}")
+        return "\n".join(lines)
+    lines = [f"Results {offset + 1}-{offset + len(page)} of {total}:"] + [str(item) for item in page]
+    if cursor:
+        lines.append(f"More results: cursor {cursor}")
+    return "\n".join(lines)
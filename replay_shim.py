@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Replays a recorded shim session (see traffic_log.py) as a deterministic load test.
+
+By default the session's requests are sent again through a JavaMethodCaller
+at their original pace (or --speed times faster) to a ReplayShim answering
+with the recorded responses, and recorded and replayed latencies are
+compared per method. With --serve the ReplayShim just serves the given FIFOs,
+e.g. for a server started with matching pipe paths.
+
+Usage: python replay_shim.py session.log [--speed N] [--output FILE]
+       python replay_shim.py session.log --serve [--speed N] [--pipe PATH] [--response-pipe PATH]
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from bridge_metrics import LatencyHistogram
+from java_caller import JavaMethodCaller
+from stub_shim import StubShim
+from traffic_log import RecordedCall, load_recorded_calls
+from transports import DEFAULT_PIPE_PATH
+
+
+# Protocol messages that are not part of the recorded workload
+CONTROL_METHODS = ("cancel", "negotiateCodec")
+
+
+def _call_key(request: Dict[str, Any]) -> str:
+    """Requests with the same method and arguments (or the same batch) share recorded responses."""
+    if "batch" in request:
+        return json.dumps({"batch": request["batch"]}, sort_keys=True, default=str)
+    return json.dumps({"method": request.get("method"), "args": request.get("args") or []}, sort_keys=True, default=str)
+
+
+def _recorded_shim_time(call: RecordedCall) -> float:
+    """The shim's own execution time when it reported one, otherwise the recorded round trip."""
+    shim_time = call.response.get("shim_time_ms")
+    if isinstance(shim_time, (int, float)) and not isinstance(shim_time, bool):
+        return shim_time / 1000
+    return call.round_trip
+
+
+def replayable_calls(calls: List[RecordedCall]) -> List[RecordedCall]:
+    """Recorded workload calls that got a reply; control messages and unanswered requests are skipped."""
+    return [
+        call for call in calls
+        if call.response is not None and call.request.get("method") not in CONTROL_METHODS
+    ]
+
+
+class ReplayShim(StubShim):
+    """Stand-in shim answering each request with the response recorded for the same call.
+    
+    Identical calls get their recorded responses in the original order; once
+    those run out the last one is repeated. Each reply is delayed by the
+    recorded shim time divided by speed. Calls the log has no response for
+    fall back to the stub's canned results and are counted in unmatched.
+    """
+    
+    def __init__(self, log_path: str, pipe_path: str = DEFAULT_PIPE_PATH,
+                 response_pipe_path: Optional[str] = None, speed: float = 1.0):
+        super().__init__(pipe_path, response_pipe_path)
+        self.speed = speed
+        self.unmatched = 0
+        self._recorded: Dict[str, collections.deque] = {}
+        for call in replayable_calls(load_recorded_calls(log_path)):
+            self._recorded.setdefault(_call_key(call.request), collections.deque()).append(
+                (call.response, _recorded_shim_time(call))
+            )
+        # Recorded delay for each request being answered, by request id
+        self._delays: Dict[Any, float] = {}
+    
+    def handle(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if request.get("method") in CONTROL_METHODS:
+            return super().handle(request)
+        responses = self._recorded.get(_call_key(request))
+        if not responses:
+            self.unmatched += 1
+            return super().handle(request)
+        
+        response, shim_time = responses.popleft() if len(responses) > 1 else responses[0]
+        self._delays[request.get("id")] = shim_time / self.speed
+        return dict(response, id=request.get("id"))
+    
+    def reply_delay(self, request: Dict[str, Any], reply: Dict[str, Any]) -> float:
+        delay = self._delays.pop(request.get("id"), None)
+        return super().reply_delay(request, reply) if delay is None else delay
+
+
+async def replay_session(java_caller: JavaMethodCaller, calls: List[RecordedCall], speed: float = 1.0) -> List[Dict[str, Any]]:
+    """Send each recorded call at its original offset divided by speed; returns one result per call."""
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    first_sent = calls[0].sent_at if calls else 0.0
+    
+    async def replay(call: RecordedCall) -> Dict[str, Any]:
+        await asyncio.sleep(max(started + (call.sent_at - first_sent) / speed - loop.time(), 0))
+        request = call.request
+        sent = time.perf_counter()
+        if "batch" in request:
+            response = await java_caller.call_batch_async(request["batch"])
+        else:
+            response = await java_caller.call_method_async(request["method"], *(request.get("args") or []))
+        return {
+            "method": request.get("method") or "batch",
+            "recorded": call.round_trip,
+            "replayed": time.perf_counter() - sent,
+            "success": response["success"]
+        }
+    
+    return await asyncio.gather(*(replay(call) for call in calls))
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Per-method recorded and replayed latency summaries (seconds) and failure counts."""
+    by_method: Dict[str, Dict[str, Any]] = {}
+    for result in results:
+        entry = by_method.get(result["method"])
+        if entry is None:
+            entry = by_method[result["method"]] = {
+                "recorded": LatencyHistogram(), "replayed": LatencyHistogram(), "failures": 0
+            }
+        entry["recorded"].record(result["recorded"])
+        entry["replayed"].record(result["replayed"])
+        if not result["success"]:
+            entry["failures"] += 1
+    return {
+        method: {
+            "recorded": entry["recorded"].summary(),
+            "replayed": entry["replayed"].summary(),
+            "failures": entry["failures"]
+        }
+        for method, entry in sorted(by_method.items())
+    }
+
+
+async def run_replay(log_path: str, speed: float) -> Dict[str, Any]:
+    """Replay a session against a ReplayShim on temporary FIFOs."""
+    calls = replayable_calls(load_recorded_calls(log_path))
+    directory = tempfile.mkdtemp(prefix="dreambot_replay_")
+    pipe_path = os.path.join(directory, "shim_pipe")
+    response_pipe_path = os.path.join(directory, "shim_response_pipe")
+    shim = ReplayShim(log_path, pipe_path, response_pipe_path, speed=speed)
+    # No response cache: every recorded call reached the shim, so every replayed one should too
+    java_caller = JavaMethodCaller(pipe_path, response_pipe_path)
+    try:
+        shim.start()
+        started = time.perf_counter()
+        results = await replay_session(java_caller, calls, speed)
+        elapsed = time.perf_counter() - started
+    finally:
+        java_caller.close()
+        shim.stop()
+        shutil.rmtree(directory, ignore_errors=True)
+    return {
+        "log": log_path,
+        "speed": speed,
+        "calls": len(results),
+        "unmatched": shim.unmatched,
+        "elapsed": elapsed,
+        "methods": summarize(results)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded shim session.")
+    parser.add_argument("log", help="traffic log written with DREAMBOT_RECORD_FILE")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay this many times faster than recorded")
+    parser.add_argument("--serve", action="store_true", help="only serve the recorded responses on the FIFOs")
+    parser.add_argument("--pipe", default=DEFAULT_PIPE_PATH, help="request FIFO path for --serve")
+    parser.add_argument("--response-pipe", help="response FIFO path for --serve (default: the one paired with --pipe)")
+    parser.add_argument("--output", help="write the replay report to this JSON file")
+    options = parser.parse_args()
+    if options.speed <= 0:
+        parser.error("--speed must be positive")
+    
+    if options.serve:
+        shim = ReplayShim(options.log, options.pipe, options.response_pipe, speed=options.speed).start()
+        print(f"Replaying {options.log} on {shim.pipe_path} -> {shim.response_pipe_path}", file=sys.stderr)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            shim.stop()
+        return
+    
+    report = asyncio.run(run_replay(options.log, options.speed))
+    print(f"Replayed {report['calls']} calls in {report['elapsed']:.2f}s at {options.speed}x"
+          f" ({report['unmatched']} without a recorded response)")
+    print(f"{'method':<28} {'calls':>6} {'recorded p50/p99 ms':>22} {'replayed p50/p99 ms':>22} {'failures':>9}")
+    for method, entry in report["methods"].items():
+        recorded, replayed = entry["recorded"], entry["replayed"]
+        print(f"{method:<28} {recorded['count']:>6}"
+              f" {recorded['p50'] * 1000:>10.3f}/{recorded['p99'] * 1000:<11.3f}"
+              f" {replayed['p50'] * 1000:>10.3f}/{replayed['p99'] * 1000:<11.3f} {entry['failures']:>9}")
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+# Read-only shim methods that may be served from the cache, grouped by the game state they observe
+CACHEABLE_METHODS = {
+    "getInventoryCount": "inventory",
+    "inventoryContainsItem": "inventory",
+    "checkInventoryForItem": "inventory",
+    "bankIsOpen": "bank",
+    "getPlayerLocation": "position",
+    "getNearbyGroundItems": "ground_items",
+}
+
+# Default time-to-live in seconds for each cacheable method
+DEFAULT_TTLS = {
+    "getInventoryCount": 1.0,
+    "inventoryContainsItem": 1.0,
+    "checkInventoryForItem": 1.0,
+    "bankIsOpen": 1.0,
+    "getPlayerLocation": 0.5,
+    "getNearbyGroundItems": 1.0,
+}
+
+ALL_GROUPS = ("inventory", "bank", "position", "ground_items")
+
+# State groups invalidated when a mutating method is sent to the shim
+DEFAULT_INVALIDATIONS = {
+    "withdrawItem": ("inventory",),
+    "depositItem": ("inventory",),
+    "depositAllExcept": ("inventory",),
+    "useItemOnItem": ("inventory",),
+    "performItemAction": ("inventory", "ground_items"),
+    "pickupGroundItem": ("inventory", "ground_items"),
+    "pickupGroundItemById": ("inventory", "ground_items"),
+    "closeBank": ("bank",),
+    "walkToLocation": ("position", "ground_items"),
+    "clickObject": ALL_GROUPS,
+    "handleNPCDialogue": ALL_GROUPS,
+    "runDreambotAction": ALL_GROUPS,
+}
+
+# Methods known not to change game state; anything else unknown invalidates everything
+NON_MUTATING_METHODS = {
+    "greet", "calculate", "logMessage",
+    "clearUpcomingSteps", "addUpcomingStep", "getUpcomingStepsCount", "peekNextStep",
+    "getNextStep", "setCurrentStep", "removeUpcomingStep", "insertUpcomingStep",
+    "getUpcomingSteps", "addUpcomingSteps", "replaceUpcomingSteps", "applyStepEdits",
+    "groundItemExists", "getDistanceToGroundItem",
+}
+
+
+class ResponseCache:
+    """TTL cache for read-only shim queries with invalidation by mutating methods."""
+    
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, invalidations: Optional[Dict[str, Iterable[str]]] = None):
+        self.ttls = dict(DEFAULT_TTLS)
+        self.ttls.update(ttls or {})
+        self.invalidations = dict(DEFAULT_INVALIDATIONS)
+        self.invalidations.update(invalidations or {})
+        self._entries: Dict[Tuple[str, tuple], Tuple[float, Dict[str, Any]]] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+    
+    def lookup(self, method_name: str, args: tuple) -> Optional[Dict[str, Any]]:
+        """Return a fresh cached response for the call, or None on a miss."""
+        if method_name not in CACHEABLE_METHODS or self.ttls.get(method_name, 0) <= 0:
+            return None
+        
+        stats = self._method_stats(method_name)
+        entry = self._entries.get(self._key(method_name, args))
+        if entry and entry[0] > time.monotonic():
+            stats["hits"] += 1
+            return dict(entry[1])
+        stats["misses"] += 1
+        return None
+    
+    def store(self, method_name: str, args: tuple, response: Dict[str, Any]) -> None:
+        """Cache a successful response to a cacheable method."""
+        ttl = self.ttls.get(method_name, 0)
+        if method_name not in CACHEABLE_METHODS or ttl <= 0:
+            return
+        if not response.get("success") or response.get("error") is not None:
+            return
+        key = self._key(method_name, args)
+        if key is not None:
+            self._entries[key] = (time.monotonic() + ttl, dict(response))
+    
+    def invalidate_for(self, method_name: str) -> None:
+        """Drop entries made stale by sending method_name to the shim."""
+        if method_name in CACHEABLE_METHODS or method_name in NON_MUTATING_METHODS:
+            return
+        groups = set(self.invalidations.get(method_name, ALL_GROUPS))
+        stale = [key for key in self._entries if CACHEABLE_METHODS[key[0]] in groups]
+        for key in stale:
+            del self._entries[key]
+            self._method_stats(key[0])["invalidations"] += 1
+    
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        self._entries.clear()
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return hit/miss/invalidation counters and hit rate per method."""
+        report = {}
+        for method_name, stats in sorted(self._stats.items()):
+            lookups = stats["hits"] + stats["misses"]
+            report[method_name] = dict(
+                stats,
+                ttl=self.ttls.get(method_name, 0),
+                hit_rate=round(stats["hits"] / lookups, 3) if lookups else 0.0
+            )
+        return report
+    
+    def _method_stats(self, method_name: str) -> Dict[str, int]:
+        return self._stats.setdefault(method_name, {"hits": 0, "misses": 0, "invalidations": 0})
+    
+    @staticmethod
+    def _key(method_name: str, args: tuple) -> Optional[Tuple[str, tuple]]:
+        key = (method_name, tuple(args))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
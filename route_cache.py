@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import re
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Side of the square areas routes are keyed by; a route recorded from anywhere
+# in a region is reused for trips from anywhere else in it
+REGION_SIZE = 16
+
+# Oldest routes are dropped beyond this many
+MAX_ROUTES = 1000
+
+Tile = Tuple[int, int, int]
+
+# Coordinates inside a tile reported as text
+_TILE_NUMBER = re.compile(r"-?\d+")
+
+
+def parse_tile(result: Any) -> Optional[Tile]:
+    """A position reported by the shim as a tile, or None.
+    
+    Accepts getPlayerLocation's {"x", "y", "z"} result, an [x, y, z] list and
+    text such as "Tile(3222, 3218, 0)"; z defaults to 0 in each.
+    """
+    if isinstance(result, dict):
+        coordinates = [result.get("x"), result.get("y")] + ([result["z"]] if result.get("z") is not None else [])
+    elif isinstance(result, (list, tuple)):
+        coordinates = list(result)
+    elif isinstance(result, str):
+        coordinates = [int(number) for number in _TILE_NUMBER.findall(result)]
+    else:
+        return None
+    if len(coordinates) not in (2, 3) or not all(isinstance(value, int) and not isinstance(value, bool) for value in coordinates):
+        return None
+    return (coordinates[0], coordinates[1], coordinates[2] if len(coordinates) == 3 else 0)
+
+
+def format_tile(tile: Optional[Tile]) -> str:
+    return "an unknown position" if tile is None else f"({tile[0]}, {tile[1]}, {tile[2]})"
+
+
+def region_of(tile: Tile) -> Tile:
+    return (tile[0] // REGION_SIZE, tile[1] // REGION_SIZE, tile[2])
+
+
+def tile_distance(a: Tile, b: Tile) -> int:
+    """Chebyshev distance, the game's tile distance; tiles on different planes are never adjacent."""
+    distance = max(abs(a[0] - b[0]), abs(a[1] - b[1]))
+    return distance if a[2] == b[2] else distance + REGION_SIZE
+
+
+def simplify_trace(trace: List[Tile], max_step: int) -> List[Tile]:
+    """Reduce sampled positions to waypoints at most max_step tiles apart, ending at the last sample.
+    
+    The starting tile is not a waypoint. A sample is kept whenever skipping
+    it would put the next waypoint more than max_step away, or the plane
+    changes (stairs and ladders must be walked through, not around).
+    """
+    waypoints: List[Tile] = []
+    anchor = trace[0]
+    previous = anchor
+    for tile in trace[1:]:
+        if tile == previous:
+            continue
+        if tile[2] != anchor[2] or tile_distance(anchor, tile) > max_step:
+            if previous != anchor:
+                waypoints.append(previous)
+                anchor = previous
+            if tile[2] != anchor[2]:
+                waypoints.append(tile)
+                anchor = tile
+        previous = tile
+    if previous != anchor:
+        waypoints.append(previous)
+    return waypoints
+
+
+class RouteCache:
+    """Waypoint chains of successful walks, keyed by source region and destination tile.
+    
+    With a path, routes are loaded from and saved to a JSON file so they
+    survive restarts; without one they are kept for the process lifetime.
+    """
+    
+    def __init__(self, path: Optional[str] = None, max_routes: int = MAX_ROUTES):
+        self.path = path
+        self.max_routes = max_routes
+        self.routes: Dict[str, Dict[str, Any]] = {}
+        self.counters = {"hits": 0, "misses": 0, "recorded": 0, "dropped": 0}
+        if path and os.path.exists(path):
+            self._load()
+    
+    def lookup(self, source: Tile, destination: Tile) -> Optional[List[Tile]]:
+        """Return the cached waypoints for a trip, or None."""
+        route = self.routes.get(_route_key(source, destination))
+        if route is None:
+            self.counters["misses"] += 1
+            return None
+        self.counters["hits"] += 1
+        route["uses"] += 1
+        route["last_used"] = time.time()
+        return [tuple(waypoint) for waypoint in route["waypoints"]]
+    
+    def record(self, source: Tile, destination: Tile, waypoints: List[Tile], duration: float) -> None:
+        """Store the waypoints of a successful walk (replacing any older route) and persist them."""
+        now = time.time()
+        self.routes[_route_key(source, destination)] = {
+            "waypoints": [list(waypoint) for waypoint in waypoints],
+            "duration": round(duration, 2),
+            "uses": 0,
+            "recorded": now,
+            "last_used": now
+        }
+        self.counters["recorded"] += 1
+        if len(self.routes) > self.max_routes:
+            oldest = min(self.routes, key=lambda key: self.routes[key]["last_used"])
+            del self.routes[oldest]
+        self.save()
+    
+    def drop(self, source: Tile, destination: Tile) -> None:
+        """Forget a route that no longer works (e.g. a door was closed) and persist the change."""
+        if self.routes.pop(_route_key(source, destination), None) is not None:
+            self.counters["dropped"] += 1
+            self.save()
+    
+    def save(self) -> None:
+        """Atomically rewrite the routes file; failures are reported and otherwise ignored."""
+        if not self.path:
+            return
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w") as f:
+                json.dump({"region_size": REGION_SIZE, "routes": self.routes}, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Error saving route cache to {self.path}: {e}", file=sys.stderr)
+    
+    def _load(self) -> None:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error loading route cache from {self.path}: {e}", file=sys.stderr)
+            return
+        if not isinstance(data, dict) or data.get("region_size") != REGION_SIZE:
+            # Keys depend on the region size, so routes from another size cannot be reused
+            print(f"Ignoring route cache {self.path} recorded with a different region size", file=sys.stderr)
+            return
+        self.routes = {key: route for key, route in (data.get("routes") or {}).items() if isinstance(route, dict)}
+
+
+def _route_key(source: Tile, destination: Tile) -> str:
+    region = region_of(source)
+    return f"{region[0]},{region[1]},{region[2]}->{destination[0]},{destination[1]},{destination[2]}"
@@ -2,6 +2,7 @@
 
 import asyncio
 import logging
+import os
 import sys
 from typing import Any, Dict, Optional
 
@@ -14,7 +15,18 @@ from mcp.server import NotificationOptions, Server
 import mcp.server.stdio
 
 # Import our modules
+from bot_pool import BotPool
+from bridge_metrics import BridgeMetrics, write_prometheus_textfile
+from ground_items import GroundItemIndex
+from item_dictionary import ItemDictionary
 from java_caller import JavaMethodCaller
+from output_format import DEFAULT_OUTPUT_MODE, OUTPUT_MODES
+from response_cache import ResponseCache
+from route_cache import RouteCache
+from state_mirror import GameStateMirror
+from tracing import Tracer
+from traffic_log import TrafficRecorder
+from transports import DEFAULT_SOCKET_PATH, create_transport
 from tools import get_tool_definitions
 from handlers import handle_call_tool
 
@@ -29,8 +41,48 @@ logger = logging.getLogger(__name__)
 server = Server("runescape-bot")
 
 # Global Java caller instance
-# Always waits for responses from Java shim
-java_caller = JavaMethodCaller()
+# Always waits for responses from Java shim; keeps both FIFOs open for the server's lifetime
+# Read-only game-state queries are served from a short-lived cache (see response_cache.py), and ground item
+# queries from a spatial index over the cached nearby items (see ground_items.py)
+# DREAMBOT_TRANSPORT selects "fifo" (default, named pipes), "unix" (Unix domain socket)
+# or "shm" (shared-memory rings under /dev/shm)
+transport = create_transport({
+    "transport": os.environ.get("DREAMBOT_TRANSPORT", "fifo"),
+    "socket_path": os.environ.get("DREAMBOT_SOCKET_PATH", DEFAULT_SOCKET_PATH),
+    "ring_path": os.environ.get("DREAMBOT_RING_PATH", "/dev/shm/dreambot_shim_ring"),
+})
+# Opt-in tracing: DREAMBOT_TRACE_FILE names a JSONL span file (convert with `python tracing.py`)
+trace_path = os.environ.get("DREAMBOT_TRACE_FILE")
+tracer = Tracer(trace_path) if trace_path else None
+# Opt-in recording: DREAMBOT_RECORD_FILE logs every shim request and response for replay_shim.py
+record_path = os.environ.get("DREAMBOT_RECORD_FILE")
+recorder = TrafficRecorder(record_path) if record_path else None
+# Routes walked by travel_to_location; DREAMBOT_ROUTE_CACHE names a JSON file keeping them across restarts
+routes = RouteCache(os.environ.get("DREAMBOT_ROUTE_CACHE"))
+# Item names and ids reported by the shim, for checking item arguments; DREAMBOT_ITEM_DICTIONARY names the file keeping them
+items = ItemDictionary(os.environ.get("DREAMBOT_ITEM_DICTIONARY"))
+# DREAMBOT_CODEC=binary offers the compact binary codec (unix and shm transports only); JSON otherwise
+java_caller = JavaMethodCaller(cache=ResponseCache(), transport=transport, codec=os.environ.get("DREAMBOT_CODEC", "json"),
+                               metrics=BridgeMetrics(), tracer=tracer, recorder=recorder, routes=routes,
+                               ground_items=GroundItemIndex(), items=items)
+
+# Long-lived connections to further bots, selected with the bot_id tool argument
+# DREAMBOT_BOT_REGISTRY names the JSON registry file describing them (see bot_pool.py)
+bot_pool = BotPool(java_caller)
+bot_registry_path = os.environ.get("DREAMBOT_BOT_REGISTRY")
+
+# Optional Prometheus textfile (node_exporter textfile collector) rewritten every DREAMBOT_METRICS_INTERVAL seconds
+metrics_textfile = os.environ.get("DREAMBOT_METRICS_TEXTFILE")
+metrics_interval = float(os.environ.get("DREAMBOT_METRICS_INTERVAL", "15"))
+
+# Result format of tools called without an output argument: verbose (default), compact or json
+output_mode = os.environ.get("DREAMBOT_OUTPUT_MODE", DEFAULT_OUTPUT_MODE)
+if output_mode not in OUTPUT_MODES:
+    print(f"Unknown DREAMBOT_OUTPUT_MODE '{output_mode}', using {DEFAULT_OUTPUT_MODE}", file=sys.stderr)
+    output_mode = DEFAULT_OUTPUT_MODE
+
+# Opt-in push-based state subscription: set to the shim's event FIFO path to enable
+event_pipe_path = os.environ.get("DREAMBOT_EVENT_PIPE")
 
 @server.list_tools()
 async def handle_list_tools() -> list[types.Tool]:
@@ -42,23 +94,67 @@ async def handle_call_tool_wrapper(
     name: str, arguments: Optional[Dict[str, Any]]
 ) -> list[types.TextContent]:
     """Handle tool calls."""
-    return await handle_call_tool(java_caller, name, arguments)
+    return await handle_call_tool(java_caller, name, arguments, bot_pool, output_mode)
+
+async def export_metrics():
+    """Periodically dump bridge metrics of every connected bot to the Prometheus textfile."""
+    while True:
+        await asyncio.sleep(metrics_interval)
+        metrics_by_bot = {bot_id: caller.metrics for bot_id, caller in bot_pool.connected_callers().items() if caller.metrics}
+        write_prometheus_textfile(metrics_textfile, metrics_by_bot)
 
 async def main():
+    if bot_registry_path:
+        try:
+            bot_pool.load_registry(bot_registry_path)
+            logger.info(f"Loaded {len(bot_pool.registry)} bots from {bot_registry_path}")
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not load bot registry: {e}")
+    
+    mirror = None
+    if event_pipe_path:
+        mirror = GameStateMirror(java_caller, event_pipe_path)
+        if await mirror.start():
+            logger.info(f"Serving game-state reads from event stream {event_pipe_path}")
+        else:
+            logger.warning("State subscription failed; reads will use live calls")
+    
+    metrics_task = None
+    if metrics_textfile:
+        metrics_task = asyncio.create_task(export_metrics())
+        logger.info(f"Writing bridge metrics to {metrics_textfile} every {metrics_interval}s")
+    
     # Run the server using stdio transport
-    async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="runescape-bot",
-                server_version="1.0.0",
-                capabilities=server.get_capabilities(
-                    notification_options=NotificationOptions(),
-                    experimental_capabilities={},
+    try:
+        async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
+            await server.run(
+                read_stream,
+                write_stream,
+                InitializationOptions(
+                    server_name="runescape-bot",
+                    server_version="1.0.0",
+                    capabilities=server.get_capabilities(
+                        notification_options=NotificationOptions(),
+                        experimental_capabilities={},
+                    ),
                 ),
-            ),
-        )
+            )
+    finally:
+        if metrics_task:
+            metrics_task.cancel()
+            # Final dump so the file reflects the whole run
+            write_prometheus_textfile(metrics_textfile, {
+                bot_id: caller.metrics for bot_id, caller in bot_pool.connected_callers().items() if caller.metrics
+            })
+        if mirror:
+            await mirror.stop_async()
+        bot_pool.close()
+        java_caller.close()
+        if tracer:
+            tracer.close()
+        if recorder:
+            recorder.close()
+        items.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
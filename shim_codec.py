@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+
+import json
+import struct
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# Codec names offered in the negotiateCodec handshake, most preferred first
+BINARY_CODEC_NAME = "binary-v1"
+JSON_CODEC_NAME = "json"
+
+# Binary message layout:
+#   header      magic, kind | flags, interned method id (UNINTERNED_METHOD for none)
+#   request id  varint counter when FLAG_COUNTER_ID is set (id == session prefix + counter), else a string
+#   method      string, only when the method id is UNINTERNED_METHOD
+#   strings     varint count, then the message's string table (strings that repeat in the body)
+#   body        request: args list; batch: varint count of (u16 method id [+ name], args); response: dict without "id"
+MAGIC = 0xB1
+HEADER = struct.Struct(">BBH")
+METHOD_ID = struct.Struct(">H")
+KIND_REQUEST = 0x01
+KIND_BATCH = 0x02
+KIND_RESPONSE = 0x03
+KIND_MASK = 0x0F
+FLAG_COUNTER_ID = 0x80
+UNINTERNED_METHOD = 0xFFFF
+
+# Value tags
+T_NULL = 0
+T_FALSE = 1
+T_TRUE = 2
+T_INT = 3
+T_FLOAT = 4
+T_STR = 5
+T_REF = 6
+T_LIST = 7
+T_DICT = 8
+FLOAT = struct.Struct(">d")
+
+# Strings shorter than this cost no more inline than as a table reference
+MIN_INTERNED_LENGTH = 3
+
+
+class JsonCodec:
+    """The original encoding: one JSON object per message."""
+    
+    name = JSON_CODEC_NAME
+    
+    def encode(self, message: Dict[str, Any]) -> bytes:
+        return json.dumps(message).encode()
+    
+    def decode(self, payload: bytes) -> Dict[str, Any]:
+        return json.loads(payload)
+
+
+class BinaryCodec:
+    """Compact binary encoding negotiated with the shim.
+    
+    methods is the shim's method table from the handshake; a method's index
+    is its id on the wire. Request ids of the form "<session_id>-<n>" are
+    sent as a varint n. Ints are zigzag varints and strings that repeat
+    within a message (dict keys, item names) are sent once in a per-message
+    string table. Binary messages start with MAGIC, which JSON never does,
+    so both sides can still tell JSON messages apart after the handshake;
+    decode() accepts either.
+    """
+    
+    name = BINARY_CODEC_NAME
+    
+    def __init__(self, methods: Sequence[str], session_id: Optional[str] = None):
+        self.methods = list(methods)
+        self.method_ids = {method: index for index, method in enumerate(self.methods)}
+        self.session_prefix = f"{session_id}-" if session_id else None
+        # Header bytes and encoder per interned method, built once per handshake
+        self._request_encoders = {method: _compile_request_encoder(index) for method, index in self.method_ids.items()}
+    
+    def encode(self, message: Dict[str, Any]) -> bytes:
+        counter = self._counter_id(message.get("id"))
+        if "batch" in message:
+            return self._encode_batch(message, counter)
+        if "method" in message:
+            encoder = self._request_encoders.get(message["method"])
+            if encoder and counter is not None:
+                return encoder(counter, message.get("args") or [])
+            return self._encode_request(message, counter)
+        return self._encode_response(message, counter)
+    
+    def decode(self, payload: bytes) -> Dict[str, Any]:
+        if not payload or payload[0] != MAGIC:
+            return json.loads(payload)
+        
+        try:
+            return self._decode_binary(payload)
+        except (IndexError, struct.error):
+            raise ValueError(f"Truncated binary message ({len(payload)} bytes)")
+    
+    def _decode_binary(self, payload: bytes) -> Dict[str, Any]:
+        _, kind_flags, method_id = HEADER.unpack_from(payload)
+        kind = kind_flags & KIND_MASK
+        if kind not in (KIND_REQUEST, KIND_BATCH, KIND_RESPONSE):
+            raise ValueError(f"Unknown binary message kind {kind}")
+        pos = HEADER.size
+        if kind_flags & FLAG_COUNTER_ID:
+            counter, pos = _read_varint(payload, pos)
+            request_id = f"{self.session_prefix}{counter}"
+        else:
+            request_id, pos = _read_string(payload, pos)
+        
+        method = None
+        if kind == KIND_REQUEST:
+            method, pos = self._read_method(payload, pos, method_id)
+        
+        count, pos = _read_varint(payload, pos)
+        table = []
+        for _ in range(count):
+            string, pos = _read_string(payload, pos)
+            table.append(string)
+        
+        if kind == KIND_REQUEST:
+            args, pos = _decode_value(payload, pos, table)
+            message = {"method": method, "args": args}
+        elif kind == KIND_BATCH:
+            count, pos = _read_varint(payload, pos)
+            batch = []
+            for _ in range(count):
+                (entry_id,) = METHOD_ID.unpack_from(payload, pos)
+                entry_method, pos = self._read_method(payload, pos + METHOD_ID.size, entry_id)
+                args, pos = _decode_value(payload, pos, table)
+                batch.append({"method": entry_method, "args": args})
+            message = {"batch": batch}
+        else:
+            message, pos = _decode_value(payload, pos, table)
+        
+        if request_id:
+            message["id"] = request_id
+        return message
+    
+    def _counter_id(self, request_id: Any) -> Optional[int]:
+        """Return the counter of an id made by this session, or None if it must be sent as a string."""
+        if self.session_prefix and isinstance(request_id, str) and request_id.startswith(self.session_prefix):
+            counter = request_id[len(self.session_prefix):]
+            if counter.isdigit():
+                return int(counter)
+        return None
+    
+    def _read_method(self, payload: bytes, pos: int, method_id: int) -> Tuple[str, int]:
+        if method_id == UNINTERNED_METHOD:
+            return _read_string(payload, pos)
+        return self.methods[method_id], pos
+    
+    def _start(self, out: bytearray, kind: int, method_id: int, request_id: Any, counter: Optional[int]) -> None:
+        """Write the header and request id."""
+        if counter is not None:
+            out += HEADER.pack(MAGIC, kind | FLAG_COUNTER_ID, method_id)
+            _write_varint(out, counter)
+        else:
+            out += HEADER.pack(MAGIC, kind, method_id)
+            _write_string(out, "" if request_id is None else str(request_id))
+    
+    def _encode_request(self, message: Dict[str, Any], counter: Optional[int]) -> bytes:
+        method = message["method"]
+        method_id = self.method_ids.get(method, UNINTERNED_METHOD)
+        out = bytearray()
+        self._start(out, KIND_REQUEST, method_id, message.get("id"), counter)
+        if method_id == UNINTERNED_METHOD:
+            _write_string(out, method)
+        _encode_body(out, message.get("args") or [])
+        return bytes(out)
+    
+    def _encode_batch(self, message: Dict[str, Any], counter: Optional[int]) -> bytes:
+        batch = message["batch"]
+        out = bytearray()
+        self._start(out, KIND_BATCH, UNINTERNED_METHOD, message.get("id"), counter)
+        table = _string_table([entry.get("args") or [] for entry in batch])
+        _write_table(out, table)
+        _write_varint(out, len(batch))
+        for entry in batch:
+            method_id = self.method_ids.get(entry["method"], UNINTERNED_METHOD)
+            out += METHOD_ID.pack(method_id)
+            if method_id == UNINTERNED_METHOD:
+                _write_string(out, entry["method"])
+            _encode_value(out, entry.get("args") or [], table)
+        return bytes(out)
+    
+    def _encode_response(self, message: Dict[str, Any], counter: Optional[int]) -> bytes:
+        out = bytearray()
+        self._start(out, KIND_RESPONSE, UNINTERNED_METHOD, message.get("id"), counter)
+        _encode_body(out, {key: value for key, value in message.items() if key != "id"})
+        return bytes(out)
+
+
+def _compile_request_encoder(method_id: int) -> Callable[[int, list], bytes]:
+    """Precompute the header of one interned method; args without strings skip the table pass."""
+    prefix = HEADER.pack(MAGIC, KIND_REQUEST | FLAG_COUNTER_ID, method_id)
+    
+    def encode(counter: int, args: list) -> bytes:
+        out = bytearray(prefix)
+        _write_varint(out, counter)
+        if not args:
+            out += b"\x00\x07\x00"    # empty string table, empty list
+        else:
+            _encode_body(out, args)
+        return bytes(out)
+    
+    return encode
+
+
+def _encode_body(out: bytearray, value: Any) -> None:
+    table = _string_table(value)
+    _write_table(out, table)
+    _encode_value(out, value, table)
+
+
+def _string_table(value: Any) -> Dict[str, int]:
+    """Index every string that occurs more than once in value (dict keys included)."""
+    counts: Dict[str, int] = {}
+    _count_strings(value, counts)
+    table: Dict[str, int] = {}
+    for string, count in counts.items():
+        if count > 1 and len(string) >= MIN_INTERNED_LENGTH:
+            table[string] = len(table)
+    return table
+
+
+def _count_strings(value: Any, counts: Dict[str, int]) -> None:
+    if isinstance(value, str):
+        counts[value] = counts.get(value, 0) + 1
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            key = str(key)
+            counts[key] = counts.get(key, 0) + 1
+            _count_strings(item, counts)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _count_strings(item, counts)
+
+
+def _write_table(out: bytearray, table: Dict[str, int]) -> None:
+    _write_varint(out, len(table))
+    for string in table:    # dicts keep insertion order, which is index order
+        _write_string(out, string)
+
+
+def _encode_value(out: bytearray, value: Any, table: Dict[str, int]) -> None:
+    if value is None:
+        out.append(T_NULL)
+    elif value is True:
+        out.append(T_TRUE)
+    elif value is False:
+        out.append(T_FALSE)
+    elif isinstance(value, int):
+        out.append(T_INT)
+        _write_varint(out, value << 1 if value >= 0 else ((-value) << 1) - 1)
+    elif isinstance(value, float):
+        out.append(T_FLOAT)
+        out += FLOAT.pack(value)
+    elif isinstance(value, str):
+        _encode_string(out, value, table)
+    elif isinstance(value, (list, tuple)):
+        out.append(T_LIST)
+        _write_varint(out, len(value))
+        for item in value:
+            _encode_value(out, item, table)
+    elif isinstance(value, dict):
+        out.append(T_DICT)
+        _write_varint(out, len(value))
+        for key, item in value.items():
+            _encode_string(out, str(key), table)
+            _encode_value(out, item, table)
+    else:
+        raise TypeError(f"Cannot encode {type(value).__name__} value")
+
+
+def _encode_string(out: bytearray, value: str, table: Dict[str, int]) -> None:
+    index = table.get(value)
+    if index is None:
+        out.append(T_STR)
+        _write_string(out, value)
+    else:
+        out.append(T_REF)
+        _write_varint(out, index)
+
+
+def _decode_value(data: bytes, pos: int, table: List[str]) -> Tuple[Any, int]:
+    tag = data[pos]
+    pos += 1
+    if tag == T_STR:
+        return _read_string(data, pos)
+    if tag == T_REF:
+        index, pos = _read_varint(data, pos)
+        return table[index], pos
+    if tag == T_INT:
+        raw, pos = _read_varint(data, pos)
+        return (raw >> 1) ^ -(raw & 1), pos
+    if tag == T_DICT:
+        count, pos = _read_varint(data, pos)
+        result = {}
+        for _ in range(count):
+            key, pos = _decode_value(data, pos, table)
+            result[key], pos = _decode_value(data, pos, table)
+        return result, pos
+    if tag == T_LIST:
+        count, pos = _read_varint(data, pos)
+        items = []
+        for _ in range(count):
+            item, pos = _decode_value(data, pos, table)
+            items.append(item)
+        return items, pos
+    if tag == T_NULL:
+        return None, pos
+    if tag == T_TRUE:
+        return True, pos
+    if tag == T_FALSE:
+        return False, pos
+    if tag == T_FLOAT:
+        return FLOAT.unpack_from(data, pos)[0], pos + FLOAT.size
+    raise ValueError(f"Unknown value tag {tag} at offset {pos - 1}")
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    byte = data[pos]
+    if byte < 0x80:
+        return byte, pos + 1
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _write_string(out: bytearray, value: str) -> None:
+    encoded = value.encode()
+    _write_varint(out, len(encoded))
+    out += encoded
+
+
+def _read_string(data: bytes, pos: int) -> Tuple[str, int]:
+    length, pos = _read_varint(data, pos)
+    end = pos + length
+    return str(data[pos:end], "utf-8"), end
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+
+import asyncio
+import errno
+import mmap
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Optional
+
+from transports import Transport, open_fifo_reader
+
+
+DEFAULT_RING_PATH = "/dev/shm/dreambot_shim_ring"
+DEFAULT_RING_CAPACITY = 1024 * 1024
+
+# File layout: a file header followed by two rings, each a 64-byte header plus its data area.
+# Ring 0 carries requests (client -> shim), ring 1 carries responses (shim -> client).
+FILE_HEADER = struct.Struct("<4sII4x")     # magic, version, ring capacity
+RING_HEADER = struct.Struct("<QQI")        # head (bytes written), tail (bytes read), reader waiting flag
+RING_HEADER_SIZE = 64
+LENGTH_PREFIX = struct.Struct("<I")
+MAGIC = b"DBSR"
+VERSION = 1
+
+# A sleeping reader re-checks its ring at least this often. Python has no
+# fences, so a Python writer's load of the waiting flag may pass its store of
+# the head and skip the doorbell for a reader that has just gone to sleep;
+# this bounds how long such a lost wakeup can delay a message, while an idle
+# reader still wakes only once a second
+LOST_WAKEUP_RECHECK = 1.0
+
+# How often ShmRingPeer's serving thread checks whether it has been stopped
+PEER_STOP_CHECK = 0.05
+
+
+def ring_file_size(capacity: int) -> int:
+    return FILE_HEADER.size + 2 * (RING_HEADER_SIZE + capacity)
+
+
+def doorbell_path(path: str, ring_index: int) -> str:
+    return f"{path}.bell{ring_index}"
+
+
+def create_ring_file(path: str = DEFAULT_RING_PATH, capacity: int = DEFAULT_RING_CAPACITY) -> None:
+    """Create (or reset) the shared-memory file and its doorbell FIFOs; done by the shim side."""
+    with open(path, "wb") as f:
+        f.truncate(ring_file_size(capacity))
+        f.write(FILE_HEADER.pack(MAGIC, VERSION, capacity))
+    for ring_index in (0, 1):
+        bell = doorbell_path(path, ring_index)
+        if not os.path.exists(bell):
+            os.mkfifo(bell)
+
+
+class _Ring:
+    """Single-producer single-consumer byte ring of length-prefixed messages inside the mmap."""
+    
+    def __init__(self, buffer: mmap.mmap, offset: int, capacity: int):
+        self.buffer = buffer
+        self.offset = offset
+        self.data_offset = offset + RING_HEADER_SIZE
+        self.capacity = capacity
+    
+    @property
+    def head(self) -> int:
+        return struct.unpack_from("<Q", self.buffer, self.offset)[0]
+    
+    @property
+    def tail(self) -> int:
+        return struct.unpack_from("<Q", self.buffer, self.offset + 8)[0]
+    
+    @property
+    def reader_waiting(self) -> bool:
+        return struct.unpack_from("<I", self.buffer, self.offset + 16)[0] != 0
+    
+    @reader_waiting.setter
+    def reader_waiting(self, waiting: bool) -> None:
+        struct.pack_into("<I", self.buffer, self.offset + 16, 1 if waiting else 0)
+    
+    def try_write(self, payload: bytes) -> bool:
+        """Append one message; returns False if the ring is currently too full."""
+        head = self.head
+        needed = LENGTH_PREFIX.size + len(payload)
+        if needed > self.capacity - (head - self.tail):
+            return False
+        self._copy_in(head, LENGTH_PREFIX.pack(len(payload)))
+        self._copy_in(head + LENGTH_PREFIX.size, payload)
+        # Publish only after the message bytes are in place
+        struct.pack_into("<Q", self.buffer, self.offset, head + needed)
+        return True
+    
+    def try_read(self) -> Optional[bytes]:
+        """Remove and return the oldest message, or None if the ring is empty."""
+        tail = self.tail
+        if self.head == tail:
+            return None
+        (length,) = LENGTH_PREFIX.unpack(self._copy_out(tail, LENGTH_PREFIX.size))
+        payload = self._copy_out(tail + LENGTH_PREFIX.size, length)
+        struct.pack_into("<Q", self.buffer, self.offset + 8, tail + LENGTH_PREFIX.size + length)
+        return payload
+    
+    def _copy_in(self, position: int, data: bytes) -> None:
+        start = position % self.capacity
+        first = min(len(data), self.capacity - start)
+        self.buffer[self.data_offset + start:self.data_offset + start + first] = data[:first]
+        if first < len(data):
+            self.buffer[self.data_offset:self.data_offset + len(data) - first] = data[first:]
+    
+    def _copy_out(self, position: int, length: int) -> bytes:
+        start = position % self.capacity
+        first = min(length, self.capacity - start)
+        data = self.buffer[self.data_offset + start:self.data_offset + start + first]
+        if first < length:
+            data += self.buffer[self.data_offset:self.data_offset + length - first]
+        return data
+
+
+class RingEndpoint:
+    """One side of the shared-memory channel: writes one ring and reads the other.
+    
+    Wakeups follow the futex pattern: a reader that finds its ring empty sets
+    the ring's waiting flag, re-checks, then sleeps on a doorbell FIFO until
+    it is rung. A writer only touches the doorbell (one 1-byte write) when
+    that flag is set, so a busy channel moves messages without any syscalls.
+    
+    Neither side may let its load (of the head, or of the waiting flag) pass
+    its preceding store (of the waiting flag, or of the head). The reader
+    drains the doorbell, a syscall, between the two, and the shim's writer
+    publishes the head with a full fence. A Python writer (try_send) has no
+    fence to issue, so readers never sleep longer than LOST_WAKEUP_RECHECK
+    before re-checking their ring.
+    """
+    
+    def __init__(self, path: str, role: str):
+        fd = os.open(path, os.O_RDWR)
+        try:
+            self.buffer = mmap.mmap(fd, 0)
+        finally:
+            os.close(fd)
+        magic, version, capacity = FILE_HEADER.unpack_from(self.buffer)
+        if magic != MAGIC or version != VERSION:
+            self.buffer.close()
+            raise ValueError(f"{path} is not a version {VERSION} shim ring file")
+        self.path = path
+        self.capacity = capacity
+        rings = [_Ring(self.buffer, FILE_HEADER.size + index * (RING_HEADER_SIZE + capacity), capacity) for index in (0, 1)]
+        send_index = 0 if role == "client" else 1
+        self.send_ring = rings[send_index]
+        self.receive_ring = rings[1 - send_index]
+        self._send_bell_path = doorbell_path(path, send_index)
+        self._send_bell_fd: Optional[int] = None
+        self._receive_bell_fds = open_fifo_reader(doorbell_path(path, 1 - send_index))
+    
+    @property
+    def bell_fileno(self) -> int:
+        return self._receive_bell_fds[0]
+    
+    def max_message_size(self) -> int:
+        return self.capacity // 2 - LENGTH_PREFIX.size
+    
+    def try_send(self, payload: bytes) -> bool:
+        if len(payload) > self.max_message_size():
+            raise ValueError(f"Message of {len(payload)} bytes is too large for the {self.capacity} byte ring")
+        if not self.send_ring.try_write(payload):
+            return False
+        if self.send_ring.reader_waiting:
+            self._ring_doorbell()
+        return True
+    
+    def try_receive(self) -> Optional[bytes]:
+        return self.receive_ring.try_read()
+    
+    def prepare_to_sleep(self) -> Optional[bytes]:
+        """Flag the reader as waiting and re-check the ring so no wakeup can be missed.
+        
+        Stale doorbell bytes are drained before the re-check, so the sleep
+        that follows ends only when a writer rings for a later message.
+        """
+        self.receive_ring.reader_waiting = True
+        self._drain_doorbell()
+        message = self.receive_ring.try_read()
+        if message is not None:
+            self.receive_ring.reader_waiting = False
+        return message
+    
+    def woke_up(self) -> None:
+        """Clear the waiting flag and consume pending doorbell bytes."""
+        self.receive_ring.reader_waiting = False
+        self._drain_doorbell()
+    
+    def _drain_doorbell(self) -> None:
+        try:
+            while os.read(self.bell_fileno, 4096):
+                pass
+        except BlockingIOError:
+            pass
+    
+    def wait_sync(self, timeout: float, spin_time: float) -> Optional[bytes]:
+        """Block for the next message up to timeout seconds; spins briefly before sleeping."""
+        deadline = time.monotonic() + timeout
+        spin_until = time.monotonic() + spin_time
+        while True:
+            message = self.try_receive()
+            if message is not None:
+                return message
+            now = time.monotonic()
+            if now >= deadline:
+                return None
+            if now < spin_until:
+                continue
+            message = self.prepare_to_sleep()
+            if message is not None:
+                return message
+            select.select([self.bell_fileno], [], [], min(deadline - now, LOST_WAKEUP_RECHECK))
+            self.woke_up()
+    
+    def close(self) -> None:
+        for fd in (self._send_bell_fd, *self._receive_bell_fds):
+            if fd is not None:
+                os.close(fd)
+        self._send_bell_fd = None
+        self._receive_bell_fds = ()
+        self.buffer.close()
+    
+    def _ring_doorbell(self) -> None:
+        try:
+            if self._send_bell_fd is None:
+                self._send_bell_fd = os.open(self._send_bell_path, os.O_WRONLY | os.O_NONBLOCK)
+            os.write(self._send_bell_fd, b"\x01")
+        except BlockingIOError:
+            # Doorbell already full of unread wakeups
+            pass
+        except OSError as e:
+            if e.errno not in (errno.ENXIO, errno.EPIPE):
+                raise
+
+
+class SharedMemoryTransport(Transport):
+    """Transport over an mmap-backed request ring and response ring under /dev/shm.
+    
+    Intended for tight observation loops with small messages, which cross
+    without any pipe or socket syscalls while both sides are busy. The shim
+    creates the ring file (see create_ring_file); messages larger than half
+    the ring are rejected so callers can use another transport for them.
+    """
+    
+    binary_safe = True
+    
+    def __init__(self, path: str = DEFAULT_RING_PATH, spin_time: float = 0.0002):
+        self.path = path
+        self.spin_time = spin_time
+        self._endpoint: Optional[RingEndpoint] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._bell_event: Optional[asyncio.Event] = None
+        self._reader_task: Optional[asyncio.Task] = None
+    
+    def is_available(self) -> bool:
+        return os.path.exists(self.path)
+    
+    def unavailable_error(self) -> str:
+        return f"Shared-memory ring {self.path} not available"
+    
+    async def connect_async(self, on_message: Callable[[bytes], None],
+                            on_connection_lost: Callable[[Exception], None], deadline: float) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self.close()
+            self._loop = loop
+            self._bell_event = asyncio.Event()
+        self._ensure_endpoint()
+        if self._reader_task is None or self._reader_task.done():
+            loop.add_reader(self._endpoint.bell_fileno, self._bell_event.set)
+            self._reader_task = loop.create_task(self._read_messages(on_message, on_connection_lost))
+    
+    async def send_async(self, payload: bytes, deadline: float) -> None:
+        delay = 0.0001
+        while not self._endpoint.try_send(payload):
+            # Ring full: the shim is behind, back off briefly
+            if self._loop.time() + delay > deadline:
+                raise asyncio.TimeoutError()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.01)
+    
+    def send_sync(self, payload: bytes) -> None:
+        self._ensure_endpoint()
+        delay = 0.0001
+        while not self._endpoint.try_send(payload):
+            time.sleep(delay)
+            delay = min(delay * 2, 0.01)
+    
+    def receive_sync(self, timeout: float) -> Optional[bytes]:
+        self._ensure_endpoint()
+        return self._endpoint.wait_sync(timeout, self.spin_time)
+    
+    def close(self) -> None:
+        if self._reader_task and not self._reader_task.done():
+            self._reader_task.cancel()
+        if self._endpoint:
+            if self._loop and not self._loop.is_closed():
+                self._loop.remove_reader(self._endpoint.bell_fileno)
+            self._endpoint.close()
+            self._endpoint = None
+        self._reader_task = None
+        self._loop = None
+    
+    def _ensure_endpoint(self) -> None:
+        if self._endpoint is None:
+            self._endpoint = RingEndpoint(self.path, "client")
+    
+    async def _read_messages(self, on_message: Callable[[bytes], None],
+                             on_connection_lost: Callable[[Exception], None]) -> None:
+        """Background task: drain the response ring, then sleep until the doorbell rings."""
+        endpoint = self._endpoint
+        try:
+            while True:
+                message = endpoint.try_receive()
+                while message is not None:
+                    on_message(message)
+                    message = endpoint.try_receive()
+                message = endpoint.prepare_to_sleep()
+                if message is not None:
+                    on_message(message)
+                    continue
+                try:
+                    await asyncio.wait_for(self._bell_event.wait(), LOST_WAKEUP_RECHECK)
+                except asyncio.TimeoutError:
+                    pass
+                self._bell_event.clear()
+                endpoint.woke_up()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error reading shared-memory ring: {e}", file=sys.stderr)
+            on_connection_lost(e)
+
+
+class ShmRingPeer:
+    """Stand-in for the shim's side of the shared-memory ring, for tests and benchmarks.
+    
+    handler receives each raw request payload and returns the raw response
+    payload (or None for no reply). Requests are served on a background thread.
+    """
+    
+    def __init__(self, handler: Callable[[bytes], Optional[bytes]], path: str = DEFAULT_RING_PATH,
+                 capacity: int = DEFAULT_RING_CAPACITY):
+        self.handler = handler
+        self.path = path
+        create_ring_file(path, capacity)
+        self._endpoint = RingEndpoint(path, "server")
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+    
+    def start(self) -> "ShmRingPeer":
+        self._thread.start()
+        return self
+    
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+        self._endpoint.close()
+    
+    def _serve(self) -> None:
+        while not self._stopped.is_set():
+            request = self._endpoint.wait_sync(PEER_STOP_CHECK, 0.0002)
+            if request is None:
+                continue
+            response = self.handler(request)
+            if response is not None:
+                while not self._endpoint.try_send(response):
+                    time.sleep(0.0001)
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from java_caller import JavaMethodCaller
+from transports import open_fifo_reader
+
+
+# Events queued while waiting for a snapshot; beyond this the mirror just resyncs again
+MAX_QUEUED_EVENTS = 1000
+
+
+class GameStateMirror:
+    """In-memory mirror of game state kept current by events pushed from the shim.
+    
+    The shim streams newline-delimited JSON events over a third FIFO:
+    
+        {"seq": 7, "type": "inventory", "slots": {"3": {"id": 1511, "name": "Logs", "amount": 1}, "4": null}}
+        {"seq": 8, "type": "bank", "open": true}
+        {"seq": 9, "type": "position", "x": 3200, "y": 3200, "z": 0}
+        {"seq": 10, "type": "ground_item_added", "item": {"id": 526, "name": "Bones", "x": 3201, "y": 3200, "z": 0, "amount": 1}}
+        {"seq": 11, "type": "ground_item_removed", "item": {...}}
+        {"seq": 12, "type": "heartbeat"}
+    
+    Sequence numbers are contiguous. A gap triggers a full resync through the
+    getStateSnapshot method, whose result has the same shape as the snapshot
+    returned by subscribeState: {"seq", "inventory": [slots], "bank_open",
+    "position", "ground_items": [items]}. Reads are only answered from the
+    mirror while an event (heartbeats included) arrived within max_staleness
+    seconds; otherwise the caller falls back to a live call. stop_async()
+    calls unsubscribeState with the event pipe path before closing the FIFO,
+    so the shim stops writing to it first.
+    """
+    
+    def __init__(self, java_caller: JavaMethodCaller, event_pipe_path: str = "/tmp/dreambot_shim_event_pipe",
+                 max_staleness: float = 2.0):
+        self.java_caller = java_caller
+        self.event_pipe_path = event_pipe_path
+        self.max_staleness = max_staleness
+        
+        # Mirrored state; seq is None while the mirror is not synchronized
+        self.seq: Optional[int] = None
+        self.inventory: Dict[int, Dict[str, Any]] = {}
+        self.bank_open: Optional[bool] = None
+        self.position: Optional[Dict[str, int]] = None
+        self.ground_items: Dict[tuple, Dict[str, Any]] = {}
+        self.last_event_time = 0.0
+        
+        self.counters = {"served": 0, "fallbacks": 0, "events": 0, "gaps": 0, "resyncs": 0}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._fds: Optional[tuple] = None
+        self._buffer = bytearray()
+        self._queued_events: List[Dict[str, Any]] = []
+        self._resync_task: Optional[asyncio.Task] = None
+        self._subscribed = False
+        # Futures of wait_for_change() callers, resolved whenever mirrored state is updated
+        self._change_waiters: List[asyncio.Future] = []
+    
+    async def start(self) -> bool:
+        """Open the event FIFO, subscribe, load the initial snapshot and attach to the caller."""
+        if not os.path.exists(self.event_pipe_path):
+            print(f"Error: Event pipe {self.event_pipe_path} not available", file=sys.stderr)
+            return False
+        
+        self._loop = asyncio.get_running_loop()
+        # Listen before subscribing so no event between snapshot and stream is lost
+        self._fds = open_fifo_reader(self.event_pipe_path)
+        self._loop.add_reader(self._fds[0], self._on_events_readable)
+        
+        response = await self.java_caller.call_method_async("subscribeState", self.event_pipe_path, timeout=10)
+        if not response["success"] or not isinstance(response.get("result"), dict):
+            print(f"Error subscribing to game state: {response.get('error')}", file=sys.stderr)
+            self.stop()
+            return False
+        
+        self._subscribed = True
+        self._apply_snapshot(response["result"])
+        self.java_caller.mirror = self
+        return True
+    
+    async def stop_async(self) -> None:
+        """Tell the shim to stop streaming events, then stop()."""
+        if self._subscribed:
+            self._subscribed = False
+            response = await self.java_caller.call_method_async("unsubscribeState", self.event_pipe_path, timeout=10)
+            if not response["success"] or response.get("error") is not None:
+                print(f"Error unsubscribing from game state: {response.get('error')}", file=sys.stderr)
+        self.stop()
+    
+    def stop(self) -> None:
+        """Detach from the caller and close the event FIFO, without unsubscribing (see stop_async())."""
+        if self.java_caller.mirror is self:
+            self.java_caller.mirror = None
+        if self._resync_task and not self._resync_task.done():
+            self._resync_task.cancel()
+        # Wake waiters so they fall back to polling
+        self._notify_change()
+        if self._fds:
+            if self._loop and not self._loop.is_closed():
+                self._loop.remove_reader(self._fds[0])
+            for fd in self._fds:
+                os.close(fd)
+            self._fds = None
+        self.seq = None
+    
+    def is_fresh(self) -> bool:
+        """Whether the mirror is synchronized and has heard from the shim recently."""
+        return self.seq is not None and time.monotonic() - self.last_event_time <= self.max_staleness
+    
+    def answer(self, method_name: str, args: tuple) -> Optional[Dict[str, Any]]:
+        """Answer a read-only shim method from the mirror, or None to use a live call."""
+        if method_name not in _MIRRORED_METHODS:
+            return None
+        if not self.is_fresh():
+            self.counters["fallbacks"] += 1
+            return None
+        
+        result = _MIRRORED_METHODS[method_name](self, *args)
+        self.counters["served"] += 1
+        return {
+            "success": True,
+            "result": result,
+            "error": None
+        }
+    
+    async def wait_for_change(self, timeout: float) -> bool:
+        """Wait until an event or snapshot updates the mirror; returns False if timeout passes first."""
+        waiter = asyncio.get_running_loop().create_future()
+        self._change_waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            if waiter in self._change_waiters:
+                self._change_waiters.remove(waiter)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return mirror counters plus synchronization state."""
+        return dict(
+            self.counters,
+            seq=self.seq,
+            fresh=self.is_fresh(),
+            age=round(time.monotonic() - self.last_event_time, 3) if self.last_event_time else None
+        )
+    
+    # Mirrored read methods - results match what the shim would return
+    def _inventory_count(self) -> int:
+        return len(self.inventory)
+    
+    def _inventory_amount(self, item: str, use_item_id: bool = False) -> int:
+        matches = [slot for slot in self.inventory.values() if _item_matches(slot, item, use_item_id)]
+        if not matches:
+            return -1
+        return sum(slot.get("amount", 1) for slot in matches)
+    
+    def _inventory_contains(self, item: str, use_item_id: bool = False) -> bool:
+        return any(_item_matches(slot, item, use_item_id) for slot in self.inventory.values())
+    
+    def _bank_is_open(self) -> Optional[bool]:
+        return self.bank_open
+    
+    def _player_location(self) -> Optional[Dict[str, int]]:
+        return dict(self.position) if self.position else None
+    
+    def _nearby_ground_items(self) -> List[Dict[str, Any]]:
+        return [dict(item) for item in self.ground_items.values()]
+    
+    # Event stream handling
+    def _on_events_readable(self) -> None:
+        """Read available event lines from the FIFO and apply them in order."""
+        try:
+            chunk = os.read(self._fds[0], 65536)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            print(f"Error reading state events: {e}", file=sys.stderr)
+            return
+        
+        self._buffer.extend(chunk)
+        lines = self._buffer.split(b'\n')
+        self._buffer = bytearray(lines.pop())
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Error parsing state event: {e}", file=sys.stderr)
+                continue
+            self.counters["events"] += 1
+            self._handle_event(event)
+    
+    def _handle_event(self, event: Dict[str, Any]) -> None:
+        """Apply one event, detecting sequence gaps."""
+        if self.seq is None:
+            # Waiting for a snapshot; keep events so they can be replayed on top of it
+            if len(self._queued_events) < MAX_QUEUED_EVENTS:
+                self._queued_events.append(event)
+            return
+        
+        seq = event.get("seq")
+        if not isinstance(seq, int) or seq <= self.seq:
+            return
+        if seq != self.seq + 1:
+            self.counters["gaps"] += 1
+            print(f"State event gap: expected {self.seq + 1}, got {seq}; resyncing", file=sys.stderr)
+            self._queued_events.append(event)
+            self._request_resync()
+            return
+        
+        self.seq = seq
+        self.last_event_time = time.monotonic()
+        _apply_event(self, event)
+        if self.java_caller.items is not None:
+            self.java_caller.items.observe(_event_items(event))
+        self._notify_change()
+    
+    def _apply_snapshot(self, snapshot: Dict[str, Any]) -> None:
+        """Replace the mirrored state with a full snapshot and replay newer queued events."""
+        self.inventory = {
+            index: slot for index, slot in enumerate(snapshot.get("inventory") or []) if slot
+        }
+        self.bank_open = snapshot.get("bank_open")
+        self.position = snapshot.get("position")
+        self.ground_items = {_ground_item_key(item): item for item in snapshot.get("ground_items") or []}
+        self.seq = int(snapshot.get("seq", 0))
+        self.last_event_time = time.monotonic()
+        if self.java_caller.items is not None:
+            self.java_caller.items.observe(list(self.inventory.values()) + list(self.ground_items.values()))
+        
+        queued = sorted(self._queued_events, key=lambda event: event.get("seq", 0))
+        self._queued_events = []
+        for event in queued:
+            self._handle_event(event)
+        self._notify_change()
+    
+    def _notify_change(self) -> None:
+        waiters, self._change_waiters = self._change_waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+    
+    def _request_resync(self) -> None:
+        """Mark the mirror unsynchronized and fetch a fresh snapshot in the background."""
+        self.seq = None
+        if self._resync_task is None or self._resync_task.done():
+            self._resync_task = self._loop.create_task(self._resync())
+    
+    async def _resync(self) -> None:
+        """Fetch a full snapshot from the shim, retrying until it succeeds."""
+        delay = 0.1
+        while True:
+            response = await self.java_caller.call_method_async("getStateSnapshot", timeout=10)
+            if response["success"] and isinstance(response.get("result"), dict):
+                self.counters["resyncs"] += 1
+                self._apply_snapshot(response["result"])
+                if self.seq is not None:
+                    return
+                # Queued events still left a gap after the snapshot; fetch a newer one
+            else:
+                print(f"Error resyncing game state: {response.get('error')}", file=sys.stderr)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 5.0)
+
+
+def _item_matches(slot: Dict[str, Any], item: str, use_item_id: bool) -> bool:
+    if use_item_id:
+        return str(slot.get("id")) == str(item)
+    return slot.get("name") == item
+
+
+def _ground_item_key(item: Dict[str, Any]) -> tuple:
+    return (item.get("id"), item.get("name"), item.get("x"), item.get("y"), item.get("z", 0))
+
+
+def _event_items(event: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Items (with ids and names) reported by an event."""
+    if event.get("type") == "inventory":
+        return [slot for slot in (event.get("slots") or {}).values() if slot]
+    if event.get("type") == "ground_item_added":
+        return [event.get("item") or {}]
+    return []
+
+
+def _apply_event(mirror: GameStateMirror, event: Dict[str, Any]) -> None:
+    """Apply a single in-sequence event to the mirror."""
+    event_type = event.get("type")
+    if event_type == "inventory":
+        for index, slot in (event.get("slots") or {}).items():
+            if slot:
+                mirror.inventory[int(index)] = slot
+            else:
+                mirror.inventory.pop(int(index), None)
+    elif event_type == "bank":
+        mirror.bank_open = bool(event.get("open"))
+    elif event_type == "position":
+        mirror.position = {"x": event.get("x"), "y": event.get("y"), "z": event.get("z", 0)}
+    elif event_type == "ground_item_added":
+        item = event.get("item") or {}
+        mirror.ground_items[_ground_item_key(item)] = item
+    elif event_type == "ground_item_removed":
+        mirror.ground_items.pop(_ground_item_key(event.get("item") or {}), None)
+    # heartbeat and unknown event types only refresh the staleness clock
+
+
+# Shim methods the mirror can answer, keyed by Java method name
+_MIRRORED_METHODS = {
+    "getInventoryCount": GameStateMirror._inventory_count,
+    "checkInventoryForItem": GameStateMirror._inventory_amount,
+    "inventoryContainsItem": GameStateMirror._inventory_contains,
+    "bankIsOpen": GameStateMirror._bank_is_open,
+    "getPlayerLocation": GameStateMirror._player_location,
+    "getNearbyGroundItems": GameStateMirror._nearby_ground_items,
+}
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the DreamBot Java shim, serving the FIFO protocol from Python.
+
+Replies with canned results after a configurable latency and jitter, and can
+inject errors, so the server, the tests and the benchmarks run without a
+live DreamBot client.
+
+Usage: python stub_shim.py [--latency S] [--jitter S] [--error-rate P] [--pipe PATH] [--response-pipe PATH]
+"""
+
+import argparse
+import collections
+import errno
+import heapq
+import json
+import os
+import random
+import selectors
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from transports import DEFAULT_PIPE_PATH, open_fifo_reader, response_pipe_path_for
+
+
+# Results the stub returns for each shim method, shaped like the real shim's
+DEFAULT_RESULTS: Dict[str, Any] = {
+    "greet": lambda args: f"Hello, {args[0] if args else 'player'}!",
+    "calculate": lambda args: _calculate(*args),
+    "getInventoryCount": 27,
+    "checkInventoryForItem": 5,
+    "inventoryContainsItem": True,
+    "bankIsOpen": False,
+    "getUpcomingStepsCount": 3,
+    "peekNextStep": "Walk to bank area",
+    "getNextStep": "Walk to bank area",
+    "getUpcomingSteps": ["Walk to bank area", "Open bank booth", "Deposit all items"],
+    "handleNPCDialogue": "Dialogue completed",
+    "groundItemExists": True,
+    "getDistanceToGroundItem": 4.2,
+    "getNearbyGroundItems": [
+        {"id": 526, "name": "Bones", "x": 3222, "y": 3218, "z": 0, "amount": 1},
+        {"id": 995, "name": "Coins", "x": 3224, "y": 3219, "z": 0, "amount": 25},
+    ],
+    "getPlayerLocation": {"x": 3222, "y": 3218, "z": 0},
+    # The stub streams no state events, so there is nothing to stop
+    "unsubscribeState": True,
+}
+
+# Fallback result for methods missing from the results table
+DEFAULT_RESULT = True
+
+INJECTED_ERROR = "Injected error from stub shim"
+
+# Most recent requests kept for inspection
+REQUEST_HISTORY = 10000
+
+
+def _calculate(a: float, b: float, operation: str) -> Any:
+    if operation == "divide":
+        return a / b if b else "Error: division by zero"
+    return {"add": a + b, "subtract": a - b, "multiply": a * b}.get(operation, f"Unknown operation: {operation}")
+
+
+class StubShim:
+    """Serves shim requests on a pair of FIFOs from a background thread.
+    
+    Every reply is delayed by latency plus a uniform random offset of up to
+    +/- jitter seconds; replies are scheduled, not slept on, so concurrent
+    requests overlap the way they do against the real shim. With error_rate
+    > 0 that fraction of calls fails with INJECTED_ERROR. Batch envelopes,
+    cancel messages and the codec handshake (declined; the stub speaks JSON
+    only) are handled like the real shim does.
+    
+    results maps method names to a value or to a callable taking the call's
+    argument list; it is layered over DEFAULT_RESULTS. The most recent
+    requests are kept in self.requests for inspection. Subclasses change
+    what is answered, and when, by overriding handle() and reply_delay().
+    """
+    
+    def __init__(self, pipe_path: str = DEFAULT_PIPE_PATH, response_pipe_path: Optional[str] = None,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 results: Optional[Dict[str, Any]] = None, seed: Optional[int] = None):
+        self.pipe_path = pipe_path
+        self.response_pipe_path = response_pipe_path or response_pipe_path_for(pipe_path)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.results = dict(DEFAULT_RESULTS, **(results or {}))
+        self.requests: collections.deque = collections.deque(maxlen=REQUEST_HISTORY)
+        self._random = random.Random(seed)
+        # Replies waiting for their due time: (due, sequence, request id, payload)
+        self._scheduled: List[tuple] = []
+        self._cancelled: set = set()
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._response_fd: Optional[int] = None
+        self._threads = [
+            threading.Thread(target=self._serve_requests, daemon=True),
+            threading.Thread(target=self._send_replies, daemon=True),
+        ]
+        self._sequence = 0
+    
+    def start(self) -> "StubShim":
+        """Create the FIFOs if needed and start serving."""
+        for path in (self.pipe_path, self.response_pipe_path):
+            if not os.path.exists(path):
+                os.mkfifo(path)
+        for thread in self._threads:
+            thread.start()
+        return self
+    
+    def stop(self) -> None:
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        if self._response_fd is not None:
+            os.close(self._response_fd)
+            self._response_fd = None
+    
+    def __enter__(self) -> "StubShim":
+        return self.start()
+    
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+    
+    def handle(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Build the reply to one request, or None for messages the shim does not answer."""
+        method = request.get("method")
+        if method == "cancel":
+            with self._condition:
+                scheduled = {entry[2] for entry in self._scheduled}
+                self._cancelled.update(request_id for request_id in request.get("args") or [] if request_id in scheduled)
+            return None
+        if method == "negotiateCodec":
+            return {"id": request.get("id"), "result": None, "error": "Unknown method: negotiateCodec"}
+        if "batch" in request:
+            return {"id": request.get("id"), "results": [self._call(entry) for entry in request["batch"]]}
+        return dict(self._call(request), id=request.get("id"))
+    
+    def _call(self, call: Dict[str, Any]) -> Dict[str, Any]:
+        if self.error_rate and self._random.random() < self.error_rate:
+            return {"result": None, "error": INJECTED_ERROR}
+        result = self.results.get(call.get("method"), DEFAULT_RESULT)
+        if callable(result):
+            try:
+                result = result(list(call.get("args") or []))
+            except Exception as e:
+                return {"result": None, "error": f"{type(e).__name__}: {e}"}
+        return {"result": result, "error": None}
+    
+    def reply_delay(self, request: Dict[str, Any], reply: Dict[str, Any]) -> float:
+        """Seconds to wait before sending a reply."""
+        return max(self.latency + self._random.uniform(-self.jitter, self.jitter), 0.0)
+    
+    def _serve_requests(self) -> None:
+        """Read newline-delimited requests and schedule their replies."""
+        read_fd, keepalive_fd = open_fifo_reader(self.pipe_path)
+        selector = selectors.DefaultSelector()
+        selector.register(read_fd, selectors.EVENT_READ)
+        buffer = b""
+        try:
+            while not self._stopped.is_set():
+                if not selector.select(0.1):
+                    continue
+                try:
+                    chunk = os.read(read_fd, 65536)
+                except BlockingIOError:
+                    continue
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    if line.strip():
+                        self._schedule(line)
+        finally:
+            selector.close()
+            os.close(read_fd)
+            os.close(keepalive_fd)
+    
+    def _schedule(self, line: bytes) -> None:
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"Stub shim ignoring malformed request: {e}", file=sys.stderr)
+            return
+        self.requests.append(request)
+        reply = self.handle(request)
+        if reply is None:
+            return
+        
+        delay = self.reply_delay(request, reply)
+        reply["shim_time_ms"] = round(delay * 1000, 3)
+        payload = json.dumps(reply).encode() + b"\n"
+        with self._condition:
+            self._sequence += 1
+            heapq.heappush(self._scheduled, (time.monotonic() + delay, self._sequence, request.get("id"), payload))
+            self._condition.notify()
+    
+    def _send_replies(self) -> None:
+        """Write each scheduled reply once it is due, skipping cancelled requests."""
+        while True:
+            with self._condition:
+                while not self._stopped.is_set():
+                    if self._scheduled:
+                        wait = self._scheduled[0][0] - time.monotonic()
+                        if wait <= 0:
+                            break
+                        self._condition.wait(wait)
+                    else:
+                        self._condition.wait()
+                if self._stopped.is_set():
+                    return
+                _, _, request_id, payload = heapq.heappop(self._scheduled)
+                if request_id in self._cancelled:
+                    self._cancelled.discard(request_id)
+                    continue
+            self._write_reply(payload)
+    
+    def _write_reply(self, payload: bytes) -> None:
+        try:
+            if self._response_fd is None:
+                self._response_fd = self._open_response_pipe()
+                if self._response_fd is None:
+                    return
+            view = memoryview(payload)
+            while view:
+                view = view[os.write(self._response_fd, view):]
+        except BrokenPipeError:
+            # The server went away; reconnect for the next reply
+            os.close(self._response_fd)
+            self._response_fd = None
+    
+    def _open_response_pipe(self) -> Optional[int]:
+        """Open the response FIFO for blocking writes once the server is reading it."""
+        while not self._stopped.is_set():
+            try:
+                fd = os.open(self.response_pipe_path, os.O_WRONLY | os.O_NONBLOCK)
+            except OSError as e:
+                if e.errno != errno.ENXIO:
+                    raise
+                time.sleep(0.01)
+                continue
+            os.set_blocking(fd, True)
+            return fd
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the DreamBot shim FIFO protocol with canned results.")
+    parser.add_argument("--pipe", default=DEFAULT_PIPE_PATH, help="request FIFO path")
+    parser.add_argument("--response-pipe", help="response FIFO path (default: the one paired with --pipe)")
+    parser.add_argument("--latency", type=float, default=0.0, help="reply latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="uniform +/- jitter added to the latency, in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls that fail")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for jitter and errors")
+    options = parser.parse_args()
+    
+    shim = StubShim(options.pipe, options.response_pipe, latency=options.latency, jitter=options.jitter,
+                    error_rate=options.error_rate, seed=options.seed).start()
+    print(f"Stub shim serving {shim.pipe_path} -> {shim.response_pipe_path}", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shim.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that pooled callers on different pipes keep their replies apart.
+"""
+
+import asyncio
+import os
+import tempfile
+
+from bot_pool import BotPool
+from java_caller import JavaMethodCaller
+from stub_shim import StubShim
+from transports import response_pipe_path_for
+
+
+def test_response_pipe_pairing():
+    """Test that every request FIFO is paired with its own response FIFO."""
+    assert response_pipe_path_for("/tmp/dreambot_shim_pipe") == "/tmp/dreambot_shim_response_pipe"
+    assert response_pipe_path_for("/tmp/alt1_pipe") == "/tmp/alt1_response_pipe"
+    assert response_pipe_path_for("/tmp/alt2") == "/tmp/alt2_response"
+    assert JavaMethodCaller("/tmp/alt1_pipe").response_pipe_path == "/tmp/alt1_response_pipe"
+
+
+def test_concurrent_callers():
+    """Test 40 concurrent calls split between the default caller and a caller for another pipe."""
+    print("=== Testing Concurrent Callers On Two Pipes ===")
+
+    directory = tempfile.mkdtemp()
+    default_pipe = os.path.join(directory, "main_pipe")
+    other_pipe = os.path.join(directory, "alt_pipe")
+    default_shim = StubShim(default_pipe, response_pipe_path_for(default_pipe), latency=0.02, jitter=0.01,
+                            results={"greet": lambda args: f"main {args[0]}"}, seed=1)
+    other_shim = StubShim(other_pipe, response_pipe_path_for(other_pipe), latency=0.02, jitter=0.01,
+                          results={"greet": lambda args: f"alt {args[0]}"}, seed=2)
+
+    async def run(pool: BotPool) -> list:
+        callers = [pool.default_caller, pool.for_pipe(other_pipe)]
+        return await asyncio.gather(*[
+            callers[index % 2].call_method_async("greet", index, timeout=5) for index in range(40)
+        ])
+
+    with default_shim, other_shim:
+        pool = BotPool(JavaMethodCaller(default_pipe))
+        try:
+            responses = asyncio.run(run(pool))
+        finally:
+            pool.close()
+            pool.default_caller.close()
+
+    for index, response in enumerate(responses):
+        assert response["success"], (index, response)
+        assert response["result"] == f"{'main' if index % 2 == 0 else 'alt'} {index}", (index, response)
+    print("✓ Every call got its own reply from its own shim")
+
+
+def test_shared_response_pipe_rejected():
+    """Test that a second reader of an already-read response FIFO is refused."""
+    directory = tempfile.mkdtemp()
+    default_pipe = os.path.join(directory, "main_pipe")
+    pool = BotPool(JavaMethodCaller(default_pipe))
+
+    try:
+        pool.for_pipe(os.path.join(directory, "other_pipe"), response_pipe_path_for(default_pipe))
+    except ValueError as e:
+        print(f"✓ Shared response FIFO refused: {e}")
+    else:
+        raise AssertionError("for_pipe accepted the default caller's response FIFO")
+
+    registry_path = os.path.join(directory, "bots.json")
+    with open(registry_path, "w") as f:
+        f.write('{"bots": {"a": {"pipe_path": "/tmp/a_pipe"}, "b": {"pipe_path": "/tmp/b", "response_pipe_path": "/tmp/a_response_pipe"}}}')
+    try:
+        pool.load_registry(registry_path)
+    except ValueError as e:
+        print(f"✓ Registry sharing a response FIFO refused: {e}")
+    else:
+        raise AssertionError("load_registry accepted two bots reading one response FIFO")
+
+
+if __name__ == "__main__":
+    test_response_pipe_pairing()
+    test_concurrent_callers()
+    test_shared_response_pipe_rejected()
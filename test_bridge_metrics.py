@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the latency histograms, the Prometheus textfile format and its atomic write.
+"""
+
+import os
+import re
+import tempfile
+
+from bridge_metrics import (SUB_BUCKETS, BridgeMetrics, LatencyHistogram, _bucket_high, _bucket_index,
+                            format_prometheus, write_prometheus_textfile)
+
+
+def test_bucket_math():
+    """Test that buckets are exact at small values, contiguous, and never more than 1/SUB_BUCKETS too high."""
+    for micros in range(2 * SUB_BUCKETS):
+        assert _bucket_index(micros) == micros and _bucket_high(micros) == micros
+    values = list(range(2 * SUB_BUCKETS, 1 << 16))
+    values += [(1 << bits) + offset for bits in range(16, 40) for offset in (-1, 0, 1)]
+    for micros in values:
+        index = _bucket_index(micros)
+        high = _bucket_high(index)
+        assert _bucket_high(index - 1) < micros <= high, micros
+        assert (high - micros) / micros <= 1 / SUB_BUCKETS, micros
+    # One bucket per SUB_BUCKETS values at the first power of two above the exact range
+    assert _bucket_index(2 * SUB_BUCKETS) + 1 == _bucket_index(2 * SUB_BUCKETS + 2)
+    print("✓ Bucket indices and bounds")
+
+
+def test_histogram_quantiles():
+    """Test quantiles of a known distribution, capped at the largest value recorded."""
+    histogram = LatencyHistogram()
+    assert histogram.summary() == {"count": 0, "mean": 0.0, "p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+    # 1 ms .. 1000 ms, one of each
+    for millis in range(1, 1001):
+        histogram.record(millis / 1000)
+    summary = histogram.summary()
+    assert summary["count"] == 1000 and abs(summary["mean"] - 0.5005) < 1e-9
+    for quantile, expected in ((0.5, 0.5), (0.9, 0.9), (0.99, 0.99)):
+        value = histogram.percentile(quantile)
+        assert expected <= value <= expected * (1 + 1 / SUB_BUCKETS), (quantile, value)
+    assert histogram.percentile(1.0) == summary["max"] == 1.0
+
+    single = LatencyHistogram()
+    single.record(0.0123)
+    # The bucket's upper bound would overstate a lone value; it is capped at the max
+    assert single.percentile(0.5) == single.percentile(0.99) == 0.0123
+    single.record(-1.0)
+    assert single.counts[0] == 1
+    print("✓ Histogram quantiles")
+
+
+def metrics_for_bot(calls: int) -> BridgeMetrics:
+    metrics = BridgeMetrics()
+    for _ in range(calls):
+        metrics.count("getInventoryCount", "calls")
+        metrics.record_phase("getInventoryCount", "wait", 0.002)
+        metrics.record_phase("getInventoryCount", "total", 0.003)
+    metrics.count("getInventoryCount", "timeouts")
+    metrics.count('say "hi"\n', "calls")
+    metrics.record_output("get_inventory_count", "compact", 17)
+    return metrics
+
+
+def test_prometheus_format():
+    """Test that every sample is declared by HELP and TYPE, labels are escaped, and values add up."""
+    text = format_prometheus({"bot2": metrics_for_bot(1), "bot1": metrics_for_bot(3)})
+    assert text.endswith("\n")
+    declared = {}
+    samples = {}
+    sample_pattern = re.compile(r'^([a-z_]+)\{((?:[a-z]+="(?:[^"\\]|\\.)*",?)*)\} (\S+)$')
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert name not in declared, name
+            declared[name] = kind
+            continue
+        match = sample_pattern.match(line)
+        assert match, line
+        name, labels, value = match.groups()
+        # A summary's _sum and _count samples belong to the summary's family
+        base = re.sub(r"_(sum|count)$", "", name)
+        assert name in declared or declared.get(base) == "summary", line
+        float(value)
+        samples[f"{name}{{{labels}}}"] = value
+
+    assert declared["dreambot_bridge_calls_total"] == "counter"
+    assert declared["dreambot_bridge_phase_seconds"] == "summary"
+    assert samples['dreambot_bridge_calls_total{bot="bot1",method="getInventoryCount"}'] == "3"
+    assert samples['dreambot_bridge_failures_total{bot="bot2",method="getInventoryCount",outcome="timeouts"}'] == "1"
+    assert samples['dreambot_bridge_calls_total{bot="bot1",method="say \\"hi\\"\\n"}'] == "1"
+    labels = 'bot="bot1",method="getInventoryCount",phase="wait"'
+    assert samples[f'dreambot_bridge_phase_seconds_count{{{labels}}}'] == "3"
+    assert samples[f'dreambot_bridge_phase_seconds_sum{{{labels}}}'] == "0.006000"
+    assert samples[f'dreambot_bridge_phase_seconds{{{labels},quantile="0.99"}}'] == "0.002000"
+    assert samples['dreambot_tool_output_bytes_total{bot="bot2",tool="get_inventory_count",mode="compact"}'] == "17"
+    # Bots are listed in order, whatever order they were passed in
+    assert text.index('bot="bot1"') < text.index('bot="bot2"')
+    print(f"✓ Prometheus text format ({len(samples)} samples)")
+
+
+def test_textfile_write_is_atomic():
+    """Test that the textfile is replaced whole, and left untouched when the write fails."""
+    path = os.path.join(tempfile.mkdtemp(), "dreambot_bridge.prom")
+    with open(path, "w") as f:
+        f.write("old\n")
+    with open(path) as reader:
+        assert write_prometheus_textfile(path, {"bot1": metrics_for_bot(1)})
+        # A scrape already reading the old file still sees the old file in full
+        assert reader.read() == "old\n"
+    with open(path) as f:
+        assert f.read() == format_prometheus({"bot1": metrics_for_bot(1)})
+    assert os.listdir(os.path.dirname(path)) == ["dreambot_bridge.prom"]
+
+    # The temporary file cannot be created: the old metrics stay in place
+    os.mkdir(f"{path}.{os.getpid()}.tmp")
+    assert not write_prometheus_textfile(path, {"bot1": metrics_for_bot(5)})
+    with open(path) as f:
+        assert 'dreambot_bridge_calls_total{bot="bot1",method="getInventoryCount"} 1' in f.read()
+    assert not write_prometheus_textfile(os.path.join(path + ".missing", "metrics.prom"), {})
+    print("✓ Textfile replaced atomically")
+
+
+if __name__ == "__main__":
+    test_bucket_math()
+    test_histogram_quantiles()
+    test_prometheus_format()
+    test_textfile_write_is_atomic()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test script to verify broadcast reports each bot's outcome in every output mode.
+"""
+
+import asyncio
+import os
+import tempfile
+
+import handlers
+from bot_pool import BotPool
+from handlers import handle_call_tool
+from java_caller import JavaMethodCaller
+from stub_shim import StubShim
+
+
+def test_broadcast_failures_in_every_mode():
+    """Test that a bot whose shim fails is reported as failed in verbose, compact and json output."""
+    print("=== Testing Broadcast Failure Detection ===")
+
+    directory = tempfile.mkdtemp()
+    good_pipe = os.path.join(directory, "good_pipe")
+    bad_pipe = os.path.join(directory, "bad_pipe")
+    good_response_pipe = os.path.join(directory, "good_response_pipe")
+    bad_response_pipe = os.path.join(directory, "bad_response_pipe")
+    good_shim = StubShim(good_pipe, good_response_pipe)
+    bad_shim = StubShim(bad_pipe, bad_response_pipe, error_rate=1.0)
+
+    async def broadcast(pool: BotPool, output_mode: str) -> str:
+        content = await handle_call_tool(pool.default_caller, "broadcast", {"tool": "get_inventory_count"}, pool, output_mode)
+        return content[0].text
+
+    with good_shim, bad_shim:
+        pool = BotPool(
+            JavaMethodCaller(good_pipe, good_response_pipe),
+            {"bad": {"pipe_path": bad_pipe, "response_pipe_path": bad_response_pipe}}
+        )
+        try:
+            for output_mode in ("verbose", "compact", "json"):
+                text = asyncio.run(broadcast(pool, output_mode))
+                print(f"{output_mode}:\n{text}")
+                assert "(1 ok, 1 failed)" in text, text
+                # The bad bot's row, with any continuation lines of its result
+                bad_row = text[text.index("\nbad ") + 1:]
+                assert "failed" in bad_row, bad_row
+                if output_mode == "json":
+                    assert '"error":' in bad_row, bad_row
+                elif output_mode == "compact":
+                    assert "error=" in bad_row, bad_row
+        finally:
+            pool.close()
+            pool.default_caller.close()
+    print("✓ The failing bot was reported as failed in every mode")
+
+
+def test_broadcast_passes_timeout_only_to_tools_that_take_one():
+    """Test that a broadcast deadline reaches tools declaring a timeout argument and no others."""
+    print("=== Testing Broadcast Deadlines ===")
+    directory = tempfile.mkdtemp()
+    pipe_path = os.path.join(directory, "shim_pipe")
+    response_pipe_path = os.path.join(directory, "shim_response_pipe")
+    dispatched = []
+    dispatch_tool = handlers._dispatch_tool
+
+    async def recording_dispatch(java_caller, name, args, bot_pool, output_mode):
+        dispatched.append((name, args))
+        return await dispatch_tool(java_caller, name, args, bot_pool, output_mode)
+
+    async def broadcast(pool: BotPool, arguments: dict) -> str:
+        content = await handle_call_tool(pool.default_caller, "broadcast", arguments, pool)
+        return content[0].text
+
+    def bot_args(tool: str) -> dict:
+        return next(args for name, args in dispatched if name == tool)
+
+    with StubShim(pipe_path, response_pipe_path):
+        pool = BotPool(JavaMethodCaller(pipe_path, response_pipe_path))
+        handlers._dispatch_tool = recording_dispatch
+        try:
+            text = asyncio.run(broadcast(pool, {"tool": "get_inventory_count", "timeout": 7}))
+            assert "(1 ok)" in text, text
+            assert bot_args("get_inventory_count")["timeout"] == 7
+            # lookup_item never calls the shim, so it has no deadline to pass on
+            text = asyncio.run(broadcast(pool, {"tool": "lookup_item", "arguments": {"query": "Logs"}, "timeout": 7}))
+            assert "timeout" not in bot_args("lookup_item"), bot_args("lookup_item")
+            assert bot_args("lookup_item")["query"] == "Logs"
+        finally:
+            handlers._dispatch_tool = dispatch_tool
+            pool.close()
+            pool.default_caller.close()
+    print("✓ Deadline passed only to tools with a timeout argument")
+
+
+if __name__ == "__main__":
+    test_broadcast_failures_in_every_mode()
+    test_broadcast_passes_timeout_only_to_tools_that_take_one()
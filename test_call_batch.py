@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test script to verify batch calls, with and without shim support for the batch envelope.
+"""
+
+import asyncio
+import os
+import tempfile
+
+from java_caller import JavaMethodCaller
+from stub_shim import StubShim
+
+
+CALLS = [{"method": "getInventoryCount"}, {"method": "greet", "args": ["Bob"]}]
+MALFORMED_CALLS = [
+    [{"method": "getInventoryCount"}, {"args": [1]}],
+    [{"method": ""}],
+    ["getInventoryCount"],
+    [{"method": "greet", "args": "Bob"}],
+]
+
+
+def test_batch_calls():
+    """Test that batches succeed and that malformed calls are rejected on every path."""
+    print("=== Testing Batch Calls ===")
+    directory = tempfile.mkdtemp()
+    pipe_path = os.path.join(directory, "shim_pipe")
+    response_pipe_path = os.path.join(directory, "shim_response_pipe")
+
+    with StubShim(pipe_path, response_pipe_path) as shim:
+        java_caller = JavaMethodCaller(pipe_path, response_pipe_path)
+        try:
+            for batch_unsupported in (False, True):
+                # True takes the fallback that sends the calls one by one
+                java_caller._batch_unsupported = batch_unsupported
+                for call_batch in (java_caller.call_batch, lambda calls: asyncio.run(java_caller.call_batch_async(calls))):
+                    response = call_batch(CALLS)
+                    assert response["success"], response
+                    assert [entry["result"] for entry in response["result"]] == [27, "Hello, Bob!"], response
+
+                    sent = len(shim.requests)
+                    for calls in MALFORMED_CALLS:
+                        response = call_batch(calls)
+                        assert not response["success"], (calls, response)
+                        assert response["error"].startswith("Error calling batch: Batch entry"), response
+                    assert len(shim.requests) == sent, "a malformed batch reached the shim"
+        finally:
+            java_caller.close()
+    print("✓ Batches ran and malformed calls were rejected before sending")
+
+
+if __name__ == "__main__":
+    test_batch_calls()
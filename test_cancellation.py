@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that timed-out calls are cancelled on the shim and their late replies are dropped.
+"""
+
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+
+from java_caller import JavaMethodCaller
+from stub_shim import StubShim
+
+
+class FinishesAnywayShim(StubShim):
+    """Replies "slowWork" calls after a delay even when cancelled, as a shim past the point of no return does."""
+
+    def handle(self, request):
+        if request.get("method") == "cancel":
+            return None
+        return super().handle(request)
+
+    def reply_delay(self, request, reply):
+        return 0.4 if request.get("method") == "slowWork" else 0.0
+
+
+def shim_paths() -> tuple:
+    directory = tempfile.mkdtemp()
+    return os.path.join(directory, "shim_pipe"), os.path.join(directory, "shim_response_pipe")
+
+
+def cancels(shim: StubShim) -> list:
+    return [request for request in shim.requests if request.get("method") == "cancel"]
+
+
+def test_async_timeout_cancels_and_drops_late_reply():
+    """Test that an async call past its deadline sends a cancel and its reply, arriving later, is discarded."""
+    print("=== Testing Async Cancellation ===")
+    pipe_path, response_pipe_path = shim_paths()
+    stderr = io.StringIO()
+
+    async def run(java_caller: JavaMethodCaller) -> tuple:
+        timed_out = await java_caller.call_method_async("slowWork", timeout=0.1)
+        # Give the late reply time to arrive while the connection stays open
+        await asyncio.sleep(0.5)
+        after = await java_caller.call_method_async("getInventoryCount", timeout=5)
+        return timed_out, after
+
+    with FinishesAnywayShim(pipe_path, response_pipe_path) as shim:
+        java_caller = JavaMethodCaller(pipe_path, response_pipe_path)
+        try:
+            with contextlib.redirect_stderr(stderr):
+                timed_out, after = asyncio.run(run(java_caller))
+        finally:
+            java_caller.close()
+        slow_request = next(request for request in shim.requests if request.get("method") == "slowWork")
+
+    assert not timed_out["success"] and "Timeout" in timed_out["error"], timed_out
+    assert cancels(shim) == [{"method": "cancel", "args": [slow_request["id"]]}], cancels(shim)
+    assert f"Discarding response for unknown or abandoned request {slow_request['id']}" in stderr.getvalue(), stderr.getvalue()
+    assert after == {"success": True, "result": 27, "error": None}, after
+    assert not java_caller._pending
+    print("✓ Cancel sent and late reply dropped")
+
+
+def test_sync_timeout_cancels_and_skips_late_reply():
+    """Test the blocking API: a timed-out call sends a cancel and the next call skips the stale reply."""
+    print("=== Testing Blocking Cancellation ===")
+    pipe_path, response_pipe_path = shim_paths()
+    with FinishesAnywayShim(pipe_path, response_pipe_path) as shim:
+        java_caller = JavaMethodCaller(pipe_path, response_pipe_path)
+        try:
+            timed_out = java_caller.call_method_with_response("slowWork", timeout=0.1)
+            slow_request = next(request for request in shim.requests if request.get("method") == "slowWork")
+            # The late reply arrives while this call is waiting and must not be taken for its answer
+            after = java_caller.call_method_with_response("greet", "Zezima", timeout=5)
+        finally:
+            java_caller.close()
+
+    assert not timed_out["success"] and "Timeout" in timed_out["error"], timed_out
+    assert cancels(shim) == [{"method": "cancel", "args": [slow_request["id"]]}], cancels(shim)
+    assert after["result"] == "Hello, Zezima!", after
+    print("✓ Cancel sent and stale reply skipped")
+
+
+def test_cancelled_reply_is_never_sent():
+    """Test that the stub shim, like the real one, abandons a request cancelled before its reply is due."""
+    pipe_path, response_pipe_path = shim_paths()
+
+    async def run(java_caller: JavaMethodCaller) -> None:
+        assert not (await java_caller.call_method_async("greet", timeout=0.1))["success"]
+        await asyncio.sleep(0.4)
+
+    with StubShim(pipe_path, response_pipe_path, latency=0.3) as shim:
+        java_caller = JavaMethodCaller(pipe_path, response_pipe_path)
+        stderr = io.StringIO()
+        try:
+            with contextlib.redirect_stderr(stderr):
+                asyncio.run(run(java_caller))
+        finally:
+            java_caller.close()
+        assert len(cancels(shim)) == 1
+    assert "Discarding" not in stderr.getvalue(), stderr.getvalue()
+    print("✓ Cancelled request never answered")
+
+
+if __name__ == "__main__":
+    test_async_timeout_cancels_and_drops_late_reply()
+    test_sync_timeout_cancels_and_skips_late_reply()
+    test_cancelled_reply_is_never_sent()
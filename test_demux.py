@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that concurrent calls on one connection each get their own reply, matched by request id.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import struct
+import tempfile
+import threading
+
+from java_caller import JavaMethodCaller
+from stub_shim import StubShim
+from transports import UnixSocketTransport
+
+
+CALLS = 30
+
+
+def shim_paths() -> tuple:
+    directory = tempfile.mkdtemp()
+    return os.path.join(directory, "shim_pipe"), os.path.join(directory, "shim_response_pipe")
+
+
+def test_out_of_order_replies():
+    """Test that replies arriving in a different order than their requests reach the right callers."""
+    print("=== Testing Out-of-Order Replies ===")
+    pipe_path, response_pipe_path = shim_paths()
+    completed = []
+
+    async def call(java_caller: JavaMethodCaller, index: int) -> dict:
+        response = await java_caller.call_method_async("calculate", index, 1000, "add", timeout=10)
+        completed.append(index)
+        return response
+
+    async def run(java_caller: JavaMethodCaller) -> list:
+        return await asyncio.gather(*(call(java_caller, index) for index in range(CALLS)))
+
+    # Jitter larger than the gap between sends makes the shim answer out of order
+    with StubShim(pipe_path, response_pipe_path, latency=0.2, jitter=0.15, seed=3):
+        java_caller = JavaMethodCaller(pipe_path, response_pipe_path)
+        try:
+            responses = asyncio.run(run(java_caller))
+        finally:
+            java_caller.close()
+
+    assert completed != sorted(completed), "the stub shim answered in order; jitter did not reorder replies"
+    for index, response in enumerate(responses):
+        assert response == {"success": True, "result": index + 1000, "error": None}, (index, response)
+    assert not java_caller._pending
+    print(f"✓ {CALLS} replies matched to their calls, completed in order {completed[:8]}...")
+
+
+class StrayReplyShim(StubShim):
+    """Answers "strayReply" with an id no request has, as a shim with a bug or a restarted shim would."""
+
+    def handle(self, request):
+        reply = super().handle(request)
+        if reply is not None and request.get("method") == "strayReply":
+            reply["id"] = "no-such-request"
+        return reply
+
+
+def test_reply_for_unknown_id():
+    """Test that a reply nobody is waiting for is discarded without disturbing calls in flight."""
+    print("=== Testing Replies for Unknown Ids ===")
+    pipe_path, response_pipe_path = shim_paths()
+
+    async def run(java_caller: JavaMethodCaller) -> tuple:
+        stray = java_caller.call_method_async("strayReply", timeout=0.5)
+        others = [java_caller.call_method_async("calculate", index, 1, "multiply", timeout=5) for index in range(5)]
+        return await asyncio.gather(stray, *others)
+
+    with StrayReplyShim(pipe_path, response_pipe_path, latency=0.05, jitter=0.04, seed=1) as shim:
+        java_caller = JavaMethodCaller(pipe_path, response_pipe_path)
+        try:
+            stray, *others = asyncio.run(run(java_caller))
+            # The connection is still usable afterwards
+            after = java_caller.call_method_with_response("getInventoryCount", timeout=5)
+        finally:
+            java_caller.close()
+        methods = [request["method"] for request in shim.requests]
+
+    assert not stray["success"] and "Timeout" in stray["error"], stray
+    assert [response["result"] for response in others] == list(range(5)), others
+    assert after["result"] == 27, after
+    # The timed-out call was cancelled on the shim
+    assert "cancel" in methods, methods
+    print("✓ Stray reply discarded; other calls unaffected")
+
+
+def test_connection_lost_fails_all_pending():
+    """Test that losing the connection fails every call still waiting, while calls already answered succeed."""
+    print("=== Testing End of Stream With Calls Pending ===")
+    header = struct.Struct(">I")
+    socket_path = os.path.join(tempfile.mkdtemp(), "shim.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen()
+
+    def read_exactly(connection: socket.socket, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = connection.recv(size - len(data))
+            assert chunk
+            data += chunk
+        return data
+
+    def serve() -> None:
+        """Read every request, answer the last two in reverse order, then close."""
+        connection, _ = server.accept()
+        with connection:
+            requests = [json.loads(read_exactly(connection, header.unpack(read_exactly(connection, 4))[0]))
+                        for _ in range(CALLS)]
+            for request in reversed(requests[-2:]):
+                payload = json.dumps({"id": request["id"], "result": request["args"][0], "error": None}).encode()
+                connection.sendall(header.pack(len(payload)) + payload)
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    java_caller = JavaMethodCaller(transport=UnixSocketTransport(socket_path))
+
+    async def run() -> list:
+        return await asyncio.gather(*(java_caller.call_method_async("greet", index, timeout=30) for index in range(CALLS)))
+
+    try:
+        responses = asyncio.run(run())
+    finally:
+        java_caller.close()
+        thread.join(5)
+        server.close()
+
+    answered = [response["result"] for response in responses if response["success"]]
+    failed = [response for response in responses if not response["success"]]
+    assert answered == [CALLS - 2, CALLS - 1], answered
+    assert len(failed) == CALLS - 2 and all("closed the connection" in response["error"] for response in failed), failed
+    assert not java_caller._pending
+    print(f"✓ {len(failed)} pending calls failed when the stream ended")
+
+
+if __name__ == "__main__":
+    test_out_of_order_replies()
+    test_reply_for_unknown_id()
+    test_connection_lost_fails_all_pending()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the ground item spatial index and the caller answering queries from it.
+"""
+
+import asyncio
+import math
+import os
+import random
+import tempfile
+
+from ground_items import GroundItemIndex
+from java_caller import JavaMethodCaller
+from response_cache import ResponseCache
+from stub_shim import StubShim
+from wait_conditions import condition_holds
+
+
+ITEMS = [
+    {"id": 526, "name": "Bones", "x": 3222, "y": 3218, "z": 0, "amount": 1},
+    {"id": 526, "name": "Bones", "x": 3260, "y": 3218, "z": 0, "amount": 1},
+    {"id": 995, "name": "Coins", "x": 3224, "y": 3219, "z": 0, "amount": 25},
+    {"id": 1511, "name": "Oak  logs", "x": 3230, "y": 3230, "z": 0, "amount": 1},
+    {"id": 317, "name": "Raw shrimps", "x": 3223, "y": 3218, "z": 1, "amount": 1},
+    # Without a tile: found by name, never by distance
+    {"id": 314, "name": "Feather"},
+    "not an item",
+]
+
+
+def test_lookups_and_distances():
+    """Test existence, nearest, distance order and radius queries, each on the origin's plane only."""
+    index = GroundItemIndex()
+    index.update(ITEMS)
+    origin = (3220, 3218, 0)
+    assert index.exists("Bones") and index.exists(995, use_item_id=True) and index.exists("Feather")
+    assert not index.exists("Logs")
+
+    distance, item = index.nearest(origin)
+    assert (distance, item["name"]) == (2.0, "Bones")
+    assert index.nearest(origin, "Bones")[1]["x"] == 3222
+    assert index.nearest(origin, "Raw shrimps") is None
+    assert index.nearest((3223, 3218, 1))[1]["name"] == "Raw shrimps"
+
+    assert [item["name"] for _, item in index.by_distance(origin)] == ["Bones", "Coins", "Oak  logs", "Bones"]
+    assert [item["x"] for _, item in index.by_distance(origin, "Bones")] == [3222, 3260]
+    assert [item["name"] for _, item in index.by_distance(origin, radius=5)] == ["Bones", "Coins"]
+    assert index.by_distance(origin, radius=1.5) == []
+
+    assert index.answer("groundItemExists", ("Coins", False), None) is True
+    assert index.answer("getDistanceToGroundItem", ("Coins", False), origin) == round(math.hypot(4, 1), 2)
+    assert index.answer("getDistanceToGroundItem", ("Logs", False), origin) == -1
+    print("✓ Index lookups and distances")
+
+
+def test_names_match_like_wait_until():
+    """Test that the index and wait_until agree on which names match."""
+    index = GroundItemIndex()
+    index.update(ITEMS)
+    for name in ("bones", "BONES", "oak logs", "Oak Logs", "raw  SHRIMPS", "Logs", "Bone"):
+        condition = {"type": "ground_item", "item_name": name}
+        assert index.exists(name) == condition_holds(condition, ITEMS), name
+    assert [item["id"] for _, item in index.by_distance((3220, 3218, 0), "oak LOGS")] == [1511]
+    print("✓ Names matched like wait_until")
+
+
+def test_nearest_matches_brute_force():
+    """Test the ring search against a scan of every item, including items many cells away."""
+    generator = random.Random(7)
+    items = [
+        {"id": index, "name": f"Item {index}", "x": generator.randint(3000, 3400), "y": generator.randint(3000, 3400),
+         "z": generator.choice((0, 0, 0, 1))}
+        for index in range(300)
+    ]
+    index = GroundItemIndex(cell_size=8)
+    index.update(items)
+    for _ in range(200):
+        origin = (generator.randint(2950, 3450), generator.randint(2950, 3450), generator.choice((0, 1, 2)))
+        on_plane = [math.hypot(item["x"] - origin[0], item["y"] - origin[1]) for item in items if item["z"] == origin[2]]
+        nearest = index.nearest(origin)
+        if not on_plane:
+            assert nearest is None
+            continue
+        assert math.isclose(nearest[0], min(on_plane)), (origin, nearest)
+        radius = generator.randint(0, 60)
+        within = index.by_distance(origin, radius=radius)
+        assert [distance for distance, _ in within] == sorted(distance for distance in on_plane if distance <= radius)
+    print("✓ Ring search agrees with a full scan")
+
+
+def test_rebuilds_only_on_new_results():
+    """Test that updating with the result already indexed is free, and a new result replaces the index."""
+    index = GroundItemIndex()
+    index.update(ITEMS)
+    index.update(ITEMS)
+    assert index.counters["rebuilds"] == 1
+    index.update([ITEMS[2]])
+    assert index.counters["rebuilds"] == 2
+    assert not index.exists("Bones") and index.exists("coins")
+    assert index.stats()["items"] == 1
+    print("✓ Index rebuilt only for new results")
+
+
+def test_caller_answers_from_index():
+    """Test queries answered from cached nearby items, re-read once stale, and sent live when the read fails."""
+    print("=== Testing Ground Item Queries Through the Caller ===")
+    directory = tempfile.mkdtemp()
+    pipe_path = os.path.join(directory, "shim_pipe")
+    response_pipe_path = os.path.join(directory, "shim_response_pipe")
+    results = {"getNearbyGroundItems": ITEMS, "getPlayerLocation": {"x": 3220, "y": 3218, "z": 0}}
+
+    async def run(java_caller: JavaMethodCaller, shim: StubShim) -> None:
+        def methods():
+            return [request["method"] for request in shim.requests]
+
+        assert (await java_caller.call_method_async("groundItemExists", "bones", False))["result"] is True
+        distance = await java_caller.call_method_async("getDistanceToGroundItem", "Coins", False)
+        assert distance["result"] == round(math.hypot(4, 1), 2)
+        assert (await java_caller.call_method_async("groundItemExists", "Logs", False))["result"] is False
+        assert methods() == ["getNearbyGroundItems", "getPlayerLocation"], methods()
+
+        # Once the cached items expire they are read again
+        await asyncio.sleep(0.25)
+        assert (await java_caller.call_method_async("groundItemExists", "Coins", False))["result"] is True
+        assert methods()[-1] == "getNearbyGroundItems"
+
+        # A read the index cannot use falls back to the shim's own answer
+        shim.results["getNearbyGroundItems"] = "Bones at Tile(3222, 3218, 0)"
+        await asyncio.sleep(0.25)
+        assert (await java_caller.call_method_async("groundItemExists", "Logs", False))["result"] is True
+        assert methods()[-2:] == ["getNearbyGroundItems", "groundItemExists"], methods()
+        assert java_caller.ground_items.counters == {"answered": 4, "fallbacks": 1, "rebuilds": 2}
+
+    with StubShim(pipe_path, response_pipe_path, results=results) as shim:
+        java_caller = JavaMethodCaller(
+            pipe_path, response_pipe_path,
+            cache=ResponseCache(ttls={"getNearbyGroundItems": 0.2, "getPlayerLocation": 0.2}),
+            ground_items=GroundItemIndex()
+        )
+        try:
+            asyncio.run(run(java_caller, shim))
+        finally:
+            java_caller.close()
+    print("✓ Caller answered from the index and fell back when it could not")
+
+
+if __name__ == "__main__":
+    test_lookups_and_distances()
+    test_names_match_like_wait_until()
+    test_nearest_matches_brute_force()
+    test_rebuilds_only_on_new_results()
+    test_caller_answers_from_index()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the memory-mapped item dictionary.
+"""
+
+import os
+import tempfile
+
+from item_dictionary import HEADER, ItemDictionary, ItemTable, build_table, typo_distance
+
+
+ITEMS = [
+    {"id": 526, "name": "Bones"},
+    {"id": 995, "name": "Coins"},
+    {"id": 1511, "name": "Logs"},
+    {"id": 1521, "name": "Oak logs"},
+    {"id": 317, "name": "Raw shrimps"},
+    {"id": 2142, "name": "Cooked karambwan"},
+]
+
+
+def test_typo_distance():
+    """Test edit distances, adjacent transpositions and the early exit past the limit."""
+    assert typo_distance("logs", "logs", 2) == 0
+    assert typo_distance("logs", "lgos", 2) == 1
+    assert typo_distance("bones", "bone", 2) == 1
+    assert typo_distance("coins", "cions", 1) == 1
+    assert typo_distance("raw shrimps", "raw shirmp", 2) == 2
+    assert typo_distance("bones", "coins", 1) == 2
+    assert typo_distance("karambwan", "logs", 2) == 3
+    print("✓ typo_distance")
+
+
+def test_table_lookups():
+    """Test exact, prefix, id and fuzzy lookups on a serialized table."""
+    table = ItemTable(build_table({item["id"]: item["name"] for item in ITEMS}))
+    assert table.count == len(ITEMS)
+    # Entries are sorted by folded name
+    assert [name for _, name in table.entries()] == sorted((item["name"] for item in ITEMS), key=str.casefold)
+    assert table.find("oak  LOGS") == [(1521, "Oak logs")]
+    assert table.find("Oak") == []
+    assert table.with_prefix("co", 5) == [(995, "Coins"), (2142, "Cooked karambwan")]
+    assert table.name_for_id(317) == "Raw shrimps"
+    assert table.name_for_id(318) is None
+    assert table.similar("Raw shirmps", 5) == [(317, "Raw shrimps")]
+    assert table.similar("Bonse", 5) == [(526, "Bones")]
+    assert table.similar("Feathers", 5) == []
+    print("✓ Table lookups")
+
+
+def test_resolve():
+    """Test that names are sent, normalized or rejected with suggestions."""
+    dictionary = ItemDictionary()
+    dictionary.observe(ITEMS + [{"id": "x", "name": "Bad id"}, {"id": 7, "name": "  "}, "not an item"])
+    assert dictionary.table.count == len(ITEMS)
+    assert dictionary.resolve("Bones") == ("Bones", [])
+    assert dictionary.resolve("raw  SHRIMPS") == ("Raw shrimps", [])
+    assert dictionary.resolve("Feather") == ("Feather", [])
+    assert dictionary.resolve("Cions") == (None, ["Coins"])
+    assert dictionary.counters == {"exact": 1, "normalized": 1, "rejected": 1, "unknown": 1}
+
+    lookup = dictionary.lookup("1511")
+    assert lookup["id"] == [(1511, "Logs")]
+    assert dictionary.lookup("logs") == {"name": [(1511, "Logs")]}
+    print("✓ resolve and lookup")
+
+
+def test_build_and_reopen():
+    """Test that observed items are written to the file and memory-mapped again on reopening."""
+    path = os.path.join(tempfile.mkdtemp(), "items.dict")
+    dictionary = ItemDictionary(path)
+    dictionary.observe(ITEMS[:3])
+    dictionary.close()
+    assert os.path.exists(path)
+
+    reopened = ItemDictionary(path)
+    assert reopened.table.count == 3
+    assert reopened.resolve("coins") == ("Coins", [])
+    # A rename of a known id replaces it; new items extend the file on the next save
+    reopened.observe([{"id": 995, "name": "Coins (stack)"}] + ITEMS[3:])
+    reopened.close()
+
+    again = ItemDictionary(path)
+    assert again.table.count == len(ITEMS)
+    assert again.table.name_for_id(995) == "Coins (stack)"
+    assert again.table.find("Coins") == []
+    again.close()
+    print("✓ Dictionary file built and reopened")
+
+
+def test_corrupt_and_truncated_files():
+    """Test that unreadable files leave an empty dictionary that is rewritten on the next save."""
+    directory = tempfile.mkdtemp()
+    valid = build_table({item["id"]: item["name"] for item in ITEMS})
+    corrupt_files = {
+        "empty.dict": b"",
+        "short_header.dict": valid[:HEADER.size - 1],
+        "wrong_magic.dict": b"XXXX" + valid[4:],
+        "truncated.dict": valid[:-5],
+    }
+    for file_name, contents in corrupt_files.items():
+        path = os.path.join(directory, file_name)
+        with open(path, "wb") as f:
+            f.write(contents)
+        dictionary = ItemDictionary(path)
+        assert dictionary.table.count == 0, file_name
+        assert dictionary.resolve("Bones") == ("Bones", []), file_name
+        dictionary.observe(ITEMS[:1])
+        dictionary.close()
+        assert ItemDictionary(path).table.find("bones") == [(526, "Bones")], file_name
+    print("✓ Corrupt and truncated files recovered")
+
+
+if __name__ == "__main__":
+    test_typo_distance()
+    test_table_lookups()
+    test_resolve()
+    test_build_and_reopen()
+    test_corrupt_and_truncated_files()
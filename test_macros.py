@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the macro engine behind run_macro, with a scripted tool runner.
+"""
+
+import asyncio
+import time
+
+from macros import MAX_NESTING, MacroRun, check_macro
+
+
+class ScriptedTools:
+    """Tool runner returning canned results; a callable result is called with the tool's arguments."""
+
+    def __init__(self, results):
+        self.results = results
+        self.calls = []
+
+    async def __call__(self, name, args, remaining):
+        self.calls.append((name, args))
+        result = self.results.get(name)
+        if callable(result):
+            result = result(args)
+        if isinstance(result, Exception):
+            return False, None, f"{name} failed: {result}"
+        return True, result, f"{name}: {result}"
+
+
+def known_tools(name, args):
+    return None if name in ("count", "walk", "deposit", "fail") else f"Unknown tool: {name}"
+
+
+def run(steps, tools, **options):
+    return asyncio.run(MacroRun(steps, tools, **options).run())
+
+
+def test_check_macro():
+    """Test that malformed scripts are rejected with the path of the offending step."""
+    assert check_macro([{"tool": "count"}, {"set": {"a": 1}}, {"sleep": 0}], known_tools) is None
+    cases = {
+        "steps must be an array of steps": {"tool": "count"},
+        "steps[0] must have exactly one of": [{"tool": "count", "sleep": 1}],
+        "steps[0]: Unknown tool: fly": [{"tool": "fly"}],
+        "steps[0] (tool) has unexpected keys: retry": [{"tool": "count", "retry": 3}],
+        "steps[0].save must be a variable name": [{"tool": "count", "save": "1bad"}],
+        "steps[0].if.var must name a variable": [{"if": {"op": "truthy"}, "then": []}],
+        "steps[0].if needs a value to compare with": [{"if": {"var": "a", "op": ">"}}],
+        "steps[0].max_iterations is required": [{"while": {"var": "a"}, "steps": []}],
+        "steps[0].repeat must be an integer": [{"repeat": -1, "steps": []}],
+        "steps[0].sleep must be a number of seconds": [{"sleep": 1000}],
+    }
+    for expected, steps in cases.items():
+        error = check_macro(steps, known_tools)
+        assert error is not None and error.startswith(expected), (steps, error)
+
+    nested = [{"tool": "count"}]
+    for _ in range(MAX_NESTING):
+        nested = [{"repeat": 1, "steps": nested}]
+    assert "nested more than" in check_macro(nested, known_tools)
+    print("✓ Malformed macros rejected")
+
+
+def test_variables_conditions_and_loops():
+    """Test save, substitution, if/else, repeat and while with the iteration counter."""
+    tools = ScriptedTools({"count": lambda args: 28 - len(tools.calls), "walk": True, "deposit": True})
+    steps = [
+        {"set": {"target": {"x": 3200, "y": 3210}, "label": "bank"}},
+        {"tool": "walk", "args": {"x": "$target.x", "y": "$target.y", "note": "to ${label}"}},
+        {"tool": "count", "save": "free"},
+        {"if": {"var": "free", "op": ">=", "value": 20}, "then": [{"tool": "deposit"}], "else": [{"stop": "too full"}]},
+        {"repeat": 2, "steps": [{"tool": "walk", "args": {"x": "$iteration"}}]},
+        {"while": {"var": "last", "op": "!=", "value": 20}, "max_iterations": 10, "steps": [{"tool": "count"}]},
+    ]
+    macro = run(steps, tools)
+    assert macro.status == "completed", macro.summary()
+    assert tools.calls[0] == ("walk", {"x": 3200, "y": 3210, "note": "to bank"})
+    assert ("deposit", {}) in tools.calls
+    assert [args for name, args in tools.calls if name == "walk"][1:] == [{"x": 0}, {"x": 1}]
+    assert macro.variables["last"] == 20
+    assert macro.variables["free"] == 26
+    print(macro.summary())
+
+    tools = ScriptedTools({"count": 3})
+    macro = run(steps, tools)
+    assert (macro.status, macro.reason) == ("stopped", "too full")
+    print("✓ Variables, conditions and loops")
+
+
+def test_failures_and_limits():
+    """Test on_error, unknown variables, the action limit and the deadline."""
+    tools = ScriptedTools({"fail": RuntimeError("no bank nearby"), "count": 1})
+    macro = run([{"tool": "fail", "on_error": "continue"}, {"tool": "count"}, {"tool": "fail"}, {"tool": "count"}], tools)
+    assert macro.status == "failed" and macro.reason.startswith("fail failed"), macro.reason
+    assert len(macro.actions) == 3
+    assert "(2 failed)" in macro.summary()
+
+    macro = run([{"tool": "walk", "args": {"x": "$nowhere"}}], ScriptedTools({}))
+    assert (macro.status, macro.reason) == ("failed", "unknown variable $nowhere")
+
+    macro = run([{"repeat": 100, "steps": [{"tool": "count"}]}], ScriptedTools({"count": 1}), max_actions=5)
+    assert macro.status == "limit" and len(macro.actions) == 5
+
+    started = time.monotonic()
+    macro = run([{"sleep": 5}], ScriptedTools({}), deadline=time.monotonic() + 0.1)
+    assert macro.status == "timeout"
+    assert time.monotonic() - started < 1.0
+
+    macro = run([{"set": {"a": "x"}}, {"if": {"var": "a", "op": ">", "value": 1}, "then": []}], ScriptedTools({}))
+    assert macro.status == "failed" and macro.reason.startswith("cannot compare"), macro.reason
+    print("✓ Failures, limits and deadlines end the run")
+
+
+if __name__ == "__main__":
+    test_check_macro()
+    test_variables_conditions_and_loops()
+    test_failures_and_limits()
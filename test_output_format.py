@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script to verify paging of long results in every output mode.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+
+from handlers import handle_call_tool
+from java_caller import JavaMethodCaller
+from output_format import TEXT_PAGE_BYTES, ResultPager, render_page, render_result, text_page_end
+from stub_shim import StubShim
+
+
+# The raw ground item dump an old shim returns: one line per item, far more than a page
+GROUND_ITEMS_TEXT = "\n".join(f"Bones x{index} at Tile({3200 + index}, 3200, 0) - 'Ünnamed'" for index in range(200))
+
+
+def test_text_page_end():
+    """Test that text pages end after a newline within the byte budget, or at the budget without splitting a character."""
+    assert text_page_end("short", 0, 100) == 5
+    assert text_page_end("aaaa\nbbbb\ncccc", 0, 12) == 10
+    assert text_page_end("aaaa\nbbbb\ncccc", 10, 12) == 14
+    assert text_page_end("x" * 30, 0, 10) == 10
+    # Two-byte characters are never cut in half
+    assert text_page_end("é" * 10, 0, 5) == 2
+    assert text_page_end("é", 0, 1) == 1
+    print("✓ text_page_end")
+
+
+def test_pager_text():
+    """Test that a long text result is split into pages within the byte budget that join back to the text."""
+    pager = ResultPager(text_page_bytes=256)
+    assert not pager.is_long("short")
+    assert pager.is_long(GROUND_ITEMS_TEXT)
+    page, cursor = pager.first_page(GROUND_ITEMS_TEXT)
+    pages = [page]
+    while cursor:
+        page, offset, total, cursor = pager.page(cursor)
+        assert offset == sum(len(page) for page in pages) and total == len(GROUND_ITEMS_TEXT)
+        pages.append(page)
+    assert "".join(pages) == GROUND_ITEMS_TEXT
+    assert all(len(page.encode()) <= 256 and page.endswith("\n") for page in pages[:-1])
+
+    rendered = render_result("compact", GROUND_ITEMS_TEXT, pager=ResultPager(text_page_bytes=256))
+    first, more = rendered.split("\n")
+    assert first.startswith('result="Bones x0 at') and more.startswith("more="), rendered
+    assert render_page("compact", "rest", 10, 14, None) == 'result=rest'
+    assert render_page("verbose", "rest\n", 10, 15, "r1:15") == "rest\nMore results: cursor r1:15"
+    print(f"✓ Text split into {len(pages)} pages")
+
+
+def test_get_more_results_pages_text():
+    """Test that a long text result from the shim is paged through get_more_results in every output mode."""
+    print("=== Testing Text Result Paging ===")
+    directory = tempfile.mkdtemp()
+    pipe_path = os.path.join(directory, "shim_pipe")
+    response_pipe_path = os.path.join(directory, "shim_response_pipe")
+
+    async def call(java_caller, name, args):
+        return (await handle_call_tool(java_caller, name, args))[0].text
+
+    async def fetch_all(java_caller, output_mode):
+        text = await call(java_caller, "get_nearby_ground_items", {"output": output_mode})
+        # The page budget applies to the text; JSON escaping and the cursor line add a little
+        assert len(text.encode()) <= TEXT_PAGE_BYTES * 1.25, len(text.encode())
+        pages = [text]
+        while "cursor" in pages[-1]:
+            if output_mode == "json":
+                cursor = json.loads(pages[-1])["cursor"]
+            else:
+                cursor = pages[-1].rsplit("cursor", 1)[1].strip(" =:")
+            pages.append(await call(java_caller, "get_more_results", {"cursor": cursor, "output": output_mode}))
+        return pages
+
+    with StubShim(pipe_path, response_pipe_path, results={"getNearbyGroundItems": GROUND_ITEMS_TEXT}):
+        java_caller = JavaMethodCaller(pipe_path, response_pipe_path)
+        try:
+            pages = asyncio.run(fetch_all(java_caller, "json"))
+            assert "".join(json.loads(page)["result"] for page in pages) == GROUND_ITEMS_TEXT
+            assert json.loads(pages[0])["total"] == len(GROUND_ITEMS_TEXT)
+
+            for output_mode in ("compact", "verbose"):
+                pages = asyncio.run(fetch_all(java_caller, output_mode))
+                assert len(pages) > 1, output_mode
+                assert "Bones x199" in pages[-1] and "cursor" not in pages[-1], pages[-1]
+        finally:
+            java_caller.close()
+    print(f"✓ Paged a {len(GROUND_ITEMS_TEXT.encode())} byte result in every mode")
+
+
+if __name__ == "__main__":
+    test_text_page_end()
+    test_pager_text()
+    test_get_more_results_pages_text()
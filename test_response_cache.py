@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the response cache's TTLs and invalidation groups.
+"""
+
+import os
+import tempfile
+import time
+
+from java_caller import JavaMethodCaller
+from response_cache import ResponseCache
+from stub_shim import StubShim
+
+
+def ok(result):
+    return {"success": True, "result": result, "error": None}
+
+
+def test_ttl_expiry():
+    """Test that entries are served until their method's TTL passes."""
+    cache = ResponseCache(ttls={"getInventoryCount": 0.1, "getPlayerLocation": 0})
+    cache.store("getInventoryCount", (), ok(27))
+    cache.store("getPlayerLocation", (), ok({"x": 1, "y": 2}))
+    assert cache.lookup("getInventoryCount", ()) == ok(27)
+    # A TTL of 0 disables caching for the method
+    assert cache.lookup("getPlayerLocation", ()) is None
+    time.sleep(0.15)
+    assert cache.lookup("getInventoryCount", ()) is None
+    assert cache.stats()["getInventoryCount"]["hits"] == 1
+    assert cache.stats()["getInventoryCount"]["misses"] == 1
+    print("✓ Entries expire after their TTL")
+
+
+def test_only_successful_reads_are_stored():
+    """Test that errors, mutating methods and unhashable arguments are never cached."""
+    cache = ResponseCache()
+    cache.store("getInventoryCount", (), {"success": True, "result": None, "error": "Not logged in"})
+    cache.store("getInventoryCount", (), {"success": False, "result": None, "error": "Timeout"})
+    cache.store("withdrawItem", ("Logs", 5), ok(True))
+    cache.store("checkInventoryForItem", (["Logs"],), ok(5))
+    assert cache.lookup("getInventoryCount", ()) is None
+    assert cache.lookup("withdrawItem", ("Logs", 5)) is None
+    assert cache.lookup("checkInventoryForItem", (["Logs"],)) is None
+
+    # Arguments are part of the key
+    cache.store("checkInventoryForItem", ("Logs", False), ok(5))
+    assert cache.lookup("checkInventoryForItem", ("Logs", False)) == ok(5)
+    assert cache.lookup("checkInventoryForItem", ("Bones", False)) is None
+    print("✓ Only successful reads are cached")
+
+
+def test_invalidation_groups():
+    """Test that mutating methods drop only the state groups they change."""
+    cache = ResponseCache()
+
+    def fill():
+        cache.clear()
+        cache.store("getInventoryCount", (), ok(27))
+        cache.store("bankIsOpen", (), ok(False))
+        cache.store("getPlayerLocation", (), ok({"x": 1, "y": 2}))
+        cache.store("getNearbyGroundItems", (), ok([]))
+
+    def cached():
+        return {method for method in ("getInventoryCount", "bankIsOpen", "getPlayerLocation", "getNearbyGroundItems")
+                if cache._entries.get((method, ()))}
+
+    expected = {
+        "withdrawItem": {"bankIsOpen", "getPlayerLocation", "getNearbyGroundItems"},
+        "closeBank": {"getInventoryCount", "getPlayerLocation", "getNearbyGroundItems"},
+        "walkToLocation": {"getInventoryCount", "bankIsOpen"},
+        "pickupGroundItem": {"bankIsOpen", "getPlayerLocation"},
+        "clickObject": set(),
+        # Unknown methods may change anything
+        "someNewShimMethod": set(),
+        # Known non-mutating methods and cacheable reads change nothing
+        "addUpcomingStep": {"getInventoryCount", "bankIsOpen", "getPlayerLocation", "getNearbyGroundItems"},
+        "getPlayerLocation": {"getInventoryCount", "bankIsOpen", "getPlayerLocation", "getNearbyGroundItems"},
+    }
+    for method, remaining in expected.items():
+        fill()
+        cache.invalidate_for(method)
+        assert cached() == remaining, (method, cached())
+    assert cache.stats()["getInventoryCount"]["invalidations"] == 4
+
+    custom = ResponseCache(invalidations={"closeBank": ("bank", "inventory")})
+    custom.store("getInventoryCount", (), ok(27))
+    custom.invalidate_for("closeBank")
+    assert custom.lookup("getInventoryCount", ()) is None
+    print("✓ Invalidation groups")
+
+
+def test_caller_uses_cache():
+    """Test that a caller answers repeated reads from the cache and re-reads after a mutating call."""
+    directory = tempfile.mkdtemp()
+    pipe_path = os.path.join(directory, "shim_pipe")
+    response_pipe_path = os.path.join(directory, "shim_response_pipe")
+
+    with StubShim(pipe_path, response_pipe_path) as shim:
+        java_caller = JavaMethodCaller(pipe_path, response_pipe_path, cache=ResponseCache())
+        try:
+            for _ in range(3):
+                assert java_caller.call_method_with_response("getInventoryCount", timeout=5) == ok(27)
+            java_caller.call_method_with_response("depositItem", "Logs", 1, timeout=5)
+            assert java_caller.call_method_with_response("getInventoryCount", timeout=5) == ok(27)
+        finally:
+            java_caller.close()
+        methods = [request["method"] for request in shim.requests]
+    assert methods == ["getInventoryCount", "depositItem", "getInventoryCount"], methods
+    print("✓ Caller served repeated reads from the cache")
+
+
+if __name__ == "__main__":
+    test_ttl_expiry()
+    test_only_successful_reads_are_stored()
+    test_invalidation_groups()
+    test_caller_uses_cache()
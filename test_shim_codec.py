@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the binary shim codec round-trips messages and is negotiated on the blocking API.
+"""
+
+import os
+import socket
+import tempfile
+import threading
+
+from java_caller import JavaMethodCaller
+from shim_codec import BINARY_CODEC_NAME, MAGIC, BinaryCodec, JsonCodec, _read_varint, _write_varint
+from transports import FRAME_HEADER, UnixSocketTransport
+
+
+SESSION_ID = "4242-1a2b3c4d"
+METHODS = ["getInventoryCount", "walkToLocation", "getNearbyGroundItems"]
+
+
+def test_varints():
+    """Test varints across byte boundaries."""
+    for value in (0, 1, 127, 128, 300, 16383, 16384, 2 ** 32, 2 ** 63):
+        out = bytearray()
+        _write_varint(out, value)
+        assert _read_varint(bytes(out), 0) == (value, len(out)), value
+    print("✓ Varints round-trip")
+
+
+def test_round_trip():
+    """Test requests, batches and responses, including negative ints, floats and nested values."""
+    codec = BinaryCodec(METHODS, SESSION_ID)
+    ground_items = [{"id": 526, "name": "Bones", "x": 3222, "y": 3218, "z": 0, "amount": 1} for _ in range(5)]
+    messages = [
+        {"method": "getInventoryCount", "args": [], "id": f"{SESSION_ID}-1"},
+        {"method": "walkToLocation", "args": [3222, -3218, 0.5, True, None], "id": f"{SESSION_ID}-300"},
+        {"method": "notInTheTable", "args": ["Bones", "Bones", ["nested", {"key": [1, 2]}]], "id": "other-session-7"},
+        {"batch": [{"method": "getInventoryCount", "args": []}, {"method": "greet", "args": ["Bones"]}], "id": f"{SESSION_ID}-2"},
+        {"id": f"{SESSION_ID}-3", "result": ground_items, "error": None},
+        {"id": f"{SESSION_ID}-4", "result": None, "error": "Unknown method: greet", "shim_time_ms": 1.25},
+    ]
+    for message in messages:
+        payload = codec.encode(message)
+        assert payload[0] == MAGIC, message
+        assert codec.decode(payload) == message, message
+
+    # Repeated strings are sent once, so the ground item list beats its JSON encoding
+    response = messages[4]
+    assert len(codec.encode(response)) < len(JsonCodec().encode(response))
+    print("✓ Binary messages round-trip")
+
+
+def test_json_and_bad_payloads():
+    """Test that JSON is still accepted and that unknown magic, unknown message kinds and truncation are rejected."""
+    codec = BinaryCodec(METHODS, SESSION_ID)
+    assert codec.decode(b'{"id": "x", "result": 1}') == {"id": "x", "result": 1}
+
+    payload = bytearray(codec.encode({"id": f"{SESSION_ID}-5", "result": 1, "error": None}))
+    corrupt_payloads = (
+        bytes([MAGIC + 1]) + bytes(payload[1:]),
+        bytes(payload[:1]) + b"\x0e" + bytes(payload[2:]),
+        bytes(payload[:-3]),
+    )
+    for corrupt in corrupt_payloads:
+        try:
+            codec.decode(corrupt)
+        except ValueError as e:
+            print(f"✓ Rejected: {e}")
+        else:
+            raise AssertionError(f"Decoded a corrupt payload {corrupt!r}")
+
+
+class BinaryPeer:
+    """A shim that accepts the binary codec on every connection and then only speaks binary on it."""
+
+    def __init__(self, socket_path: str):
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(socket_path)
+        self.server.listen()
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self) -> None:
+        connection, _ = self.server.accept()
+        codec = JsonCodec()
+        with connection:
+            while True:
+                header = self._read(connection, FRAME_HEADER.size)
+                if header is None:
+                    return
+                request = codec.decode(self._read(connection, FRAME_HEADER.unpack(header)[0]))
+                if request.get("method") == "negotiateCodec":
+                    reply = JsonCodec().encode({"id": request["id"], "result": {"codec": BINARY_CODEC_NAME, "methods": METHODS}})
+                    codec = BinaryCodec(METHODS, request["args"][1])
+                else:
+                    reply = codec.encode({"id": request["id"], "result": f"{request['method']} {request['args']}", "error": None})
+                connection.sendall(FRAME_HEADER.pack(len(reply)) + reply)
+
+    def _read(self, connection: socket.socket, size: int):
+        data = b""
+        while len(data) < size:
+            chunk = connection.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    def close(self) -> None:
+        self.server.close()
+
+
+def test_blocking_api_negotiates_binary():
+    """Test that the blocking API runs the handshake on its own connection before sending binary."""
+    socket_path = os.path.join(tempfile.mkdtemp(), "shim.sock")
+    peer = BinaryPeer(socket_path)
+    java_caller = JavaMethodCaller(transport=UnixSocketTransport(socket_path), codec="binary")
+    try:
+        response = java_caller.call_method_with_response("walkToLocation", 3222, 3218, timeout=5)
+        assert response == {"success": True, "result": "walkToLocation [3222, 3218]", "error": None}, response
+        assert isinstance(java_caller.sync_codec, BinaryCodec)
+    finally:
+        java_caller.close()
+        peer.close()
+    print("✓ Blocking call negotiated the binary codec")
+
+
+if __name__ == "__main__":
+    test_varints()
+    test_round_trip()
+    test_json_and_bad_payloads()
+    test_blocking_api_negotiates_binary()
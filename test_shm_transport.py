@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the shared-memory ring transport against ShmRingPeer.
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+import shm_transport
+from shm_transport import LENGTH_PREFIX, RingEndpoint, SharedMemoryTransport, ShmRingPeer, create_ring_file
+
+
+# Small enough that the test messages wrap around the ring many times
+CAPACITY = 256
+
+
+def echo(payload: bytes) -> bytes:
+    return b"echo " + payload
+
+
+def test_wrap_around_and_close():
+    """Test messages crossing the end of both rings, a wakeup after idling, and closing both ends."""
+    print("=== Testing Shared-Memory Ring Wrap-Around ===")
+    path = os.path.join(tempfile.mkdtemp(), "shim_ring")
+    peer = ShmRingPeer(echo, path, capacity=CAPACITY).start()
+    transport = SharedMemoryTransport(path)
+    # Payload sizes chosen so message boundaries fall at many different offsets, including across the end
+    payloads = [bytes([65 + index % 26]) * (20 + index * 7 % 90) for index in range(60)]
+    assert sum(LENGTH_PREFIX.size + len(payload) for payload in payloads) > 10 * CAPACITY
+
+    async def run() -> tuple:
+        loop = asyncio.get_running_loop()
+        received: asyncio.Queue = asyncio.Queue()
+        lost = []
+        await transport.connect_async(received.put_nowait, lost.append, loop.time() + 5)
+        replies = []
+        for payload in payloads:
+            await transport.send_async(payload, loop.time() + 5)
+            replies.append(await asyncio.wait_for(received.get(), 5))
+
+        # Let the reader go to sleep on the doorbell, then check that a new reply still wakes it
+        await asyncio.sleep(0.3)
+        started = time.monotonic()
+        await transport.send_async(b"after idle", loop.time() + 5)
+        replies.append(await asyncio.wait_for(received.get(), 5))
+        return replies, time.monotonic() - started, lost
+
+    try:
+        replies, wakeup_time, lost = asyncio.run(run())
+    finally:
+        transport.close()
+        peer.stop()
+
+    assert replies == [echo(payload) for payload in payloads + [b"after idle"]]
+    assert not lost, lost
+    assert wakeup_time < 1.0, wakeup_time
+    print(f"✓ {len(replies)} messages echoed in order; idle reader woke in {wakeup_time * 1000:.1f}ms")
+
+
+def test_blocking_receive_after_wrap():
+    """Test the blocking API across the end of the ring."""
+    path = os.path.join(tempfile.mkdtemp(), "shim_ring")
+    peer = ShmRingPeer(echo, path, capacity=CAPACITY).start()
+    transport = SharedMemoryTransport(path)
+    try:
+        for index in range(30):
+            payload = str(index).encode() * 10
+            transport.send_sync(payload)
+            assert transport.receive_sync(5) == echo(payload), index
+        assert transport.receive_sync(0.05) is None
+    finally:
+        transport.close()
+        peer.stop()
+    print("✓ Blocking round-trips wrapped the ring")
+
+
+def test_lost_wakeup_is_bounded():
+    """Test that a message published without ringing the doorbell still reaches a sleeping reader."""
+    path = os.path.join(tempfile.mkdtemp(), "shim_ring")
+    create_ring_file(path, CAPACITY)
+    shim_side = RingEndpoint(path, "server")
+    transport = SharedMemoryTransport(path)
+    recheck = shm_transport.LOST_WAKEUP_RECHECK
+    shm_transport.LOST_WAKEUP_RECHECK = 0.2
+
+    async def run() -> float:
+        loop = asyncio.get_running_loop()
+        received: asyncio.Queue = asyncio.Queue()
+        await transport.connect_async(received.put_nowait, lambda error: None, loop.time() + 5)
+        await asyncio.sleep(0.05)
+        assert shim_side.send_ring.reader_waiting
+        started = time.monotonic()
+        # What a writer whose flag load passed its head store does: publish, see no waiter, skip the doorbell
+        assert shim_side.send_ring.try_write(b"unannounced")
+        assert await asyncio.wait_for(received.get(), 5) == b"unannounced"
+        return time.monotonic() - started
+
+    try:
+        delay = asyncio.run(run())
+        transport.close()
+        # The blocking wait is bounded the same way
+        timer = threading.Timer(0.05, shim_side.send_ring.try_write, (b"unannounced too",))
+        started = time.monotonic()
+        timer.start()
+        assert transport.receive_sync(5) == b"unannounced too"
+        assert time.monotonic() - started < 1.0
+    finally:
+        shm_transport.LOST_WAKEUP_RECHECK = recheck
+        transport.close()
+        shim_side.close()
+    assert delay < 1.0, delay
+    print(f"✓ Unannounced message picked up after {delay * 1000:.0f}ms")
+
+
+def test_oversized_message_rejected():
+    """Test that a message larger than half the ring is refused instead of deadlocking the ring."""
+    path = os.path.join(tempfile.mkdtemp(), "shim_ring")
+    peer = ShmRingPeer(echo, path, capacity=CAPACITY)
+    endpoint = RingEndpoint(path, "client")
+    try:
+        endpoint.try_send(b"x" * CAPACITY)
+    except ValueError as e:
+        print(f"✓ Oversized message refused: {e}")
+    else:
+        raise AssertionError("An oversized message was accepted")
+    finally:
+        endpoint.close()
+        peer.start()
+        peer.stop()
+
+
+if __name__ == "__main__":
+    test_wrap_around_and_close()
+    test_blocking_receive_after_wrap()
+    test_lost_wakeup_is_bounded()
+    test_oversized_message_rejected()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the push-based game-state mirror, including resyncs after sequence gaps.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+
+from java_caller import JavaMethodCaller
+from state_mirror import GameStateMirror
+from stub_shim import StubShim
+
+
+def snapshot(seq: int, x: int) -> dict:
+    return {
+        "seq": seq,
+        "inventory": [{"id": 1511, "name": "Logs", "amount": 1}, None, {"id": 995, "name": "Coins", "amount": 25}],
+        "bank_open": False,
+        "position": {"x": x, "y": 3200, "z": 0},
+        "ground_items": [{"id": 526, "name": "Bones", "x": 3201, "y": 3200, "z": 0, "amount": 1}],
+    }
+
+
+class ScriptedShimCaller:
+    """Caller stand-in answering the mirror's shim calls from canned results and recording them."""
+
+    def __init__(self, results):
+        self.results = results
+        self.calls = []
+        self.mirror = None
+        self.items = None
+
+    async def call_method_async(self, method_name, *args, timeout=None):
+        self.calls.append(method_name)
+        result = self.results[method_name]
+        return {"success": True, "result": result() if callable(result) else result, "error": None}
+
+
+async def wait_for(mirror: GameStateMirror, predicate, timeout: float = 5.0) -> None:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, mirror.stats()
+        await asyncio.sleep(0.01)
+
+
+def test_events_gaps_and_resync():
+    """Test applying events, answering reads, and resyncing after a gap with queued events replayed."""
+    print("=== Testing Game-State Mirror ===")
+    event_pipe_path = os.path.join(tempfile.mkdtemp(), "shim_event_pipe")
+    os.mkfifo(event_pipe_path)
+    # The snapshot fetched after the gap is at seq 8, so queued event 9 must be replayed on top of it
+    caller = ScriptedShimCaller({
+        "subscribeState": snapshot(5, 3200),
+        "getStateSnapshot": snapshot(8, 3250),
+        # The shim must be told to stop while the FIFO still has a reader
+        "unsubscribeState": lambda: mirror._fds is not None and unsubscribed.append(True),
+    })
+    unsubscribed = []
+
+    def read(method_name, *args):
+        return mirror.answer(method_name, args)["result"]
+
+    async def run() -> None:
+        assert await mirror.start()
+        events = os.open(event_pipe_path, os.O_WRONLY | os.O_NONBLOCK)
+
+        def push(*sent):
+            os.write(events, b"".join(json.dumps(event).encode() + b"\n" for event in sent))
+
+        try:
+            assert caller.mirror is mirror and mirror.seq == 5
+            assert read("getInventoryCount") == 2
+            assert read("checkInventoryForItem", "Coins", False) == 25
+
+            push(
+                {"seq": 6, "type": "position", "x": 3210, "y": 3201},
+                {"seq": 7, "type": "inventory", "slots": {"0": None, "5": {"id": 317, "name": "Raw shrimps"}}},
+                # Already applied: ignored
+                {"seq": 6, "type": "bank", "open": True},
+            )
+            await wait_for(mirror, lambda: mirror.seq == 7)
+            assert read("getPlayerLocation") == {"x": 3210, "y": 3201, "z": 0}
+            assert read("inventoryContainsItem", "Logs", False) is False
+            assert read("bankIsOpen") is False
+
+            # seq 8 is lost: the mirror stops answering and resyncs
+            push({"seq": 9, "type": "bank", "open": True})
+            await wait_for(mirror, lambda: mirror.counters["gaps"] == 1)
+            await wait_for(mirror, lambda: mirror.seq == 9)
+            assert mirror.counters["resyncs"] == 1
+            assert mirror.position == {"x": 3250, "y": 3200, "z": 0}
+            assert mirror.bank_open is True
+            assert read("getNearbyGroundItems")[0]["name"] == "Bones"
+        finally:
+            await mirror.stop_async()
+            os.close(events)
+
+    mirror = GameStateMirror(caller, event_pipe_path, max_staleness=5.0)
+    asyncio.run(run())
+    assert caller.mirror is None
+    assert caller.calls == ["subscribeState", "getStateSnapshot", "unsubscribeState"], caller.calls
+    assert unsubscribed == [True]
+    print("✓ Events applied, gap detected and resynced")
+
+
+def test_caller_reads_from_mirror():
+    """Test that an attached mirror answers the caller's reads without touching the pipes."""
+    java_caller = JavaMethodCaller("/nonexistent/shim_pipe", "/nonexistent/shim_response_pipe")
+    mirror = GameStateMirror(java_caller, max_staleness=5.0)
+    mirror._apply_snapshot(snapshot(1, 3200))
+    java_caller.mirror = mirror
+    try:
+        response = asyncio.run(java_caller.call_method_async("getPlayerLocation"))
+        assert response == {"success": True, "result": {"x": 3200, "y": 3200, "z": 0}, "error": None}
+        assert java_caller.call_method_with_response("getInventoryCount")["result"] == 2
+        assert mirror.counters["served"] == 2
+    finally:
+        java_caller.close()
+    print("✓ Caller reads answered from the mirror")
+
+
+def test_unsubscribe_from_stub_shim():
+    """Test that stopping the mirror unsubscribes from the stub shim once, and a failed start does not."""
+    directory = tempfile.mkdtemp()
+    pipe_path = os.path.join(directory, "shim_pipe")
+    response_pipe_path = os.path.join(directory, "shim_response_pipe")
+    event_pipe_path = os.path.join(directory, "shim_event_pipe")
+    os.mkfifo(event_pipe_path)
+
+    async def run(java_caller: JavaMethodCaller, subscribes: bool) -> None:
+        mirror = GameStateMirror(java_caller, event_pipe_path)
+        assert await mirror.start() is subscribes
+        await mirror.stop_async()
+        await mirror.stop_async()
+
+    with StubShim(pipe_path, response_pipe_path, results={"subscribeState": snapshot(1, 3200)}) as shim:
+        java_caller = JavaMethodCaller(pipe_path, response_pipe_path)
+        try:
+            asyncio.run(run(java_caller, True))
+            shim.results["subscribeState"] = "not a snapshot"
+            asyncio.run(run(java_caller, False))
+        finally:
+            java_caller.close()
+        methods = [request["method"] for request in shim.requests]
+    assert methods == ["subscribeState", "unsubscribeState", "subscribeState"], methods
+    assert shim.requests[1]["args"] == [event_pipe_path]
+    print("✓ Mirror unsubscribed before closing its FIFO")
+
+
+def test_stale_mirror_falls_back():
+    """Test that reads fall back to live calls once no event has arrived within max_staleness."""
+    mirror = GameStateMirror(JavaMethodCaller("/nonexistent/shim_pipe"), max_staleness=0.0)
+    mirror._apply_snapshot(snapshot(1, 3200))
+    mirror.last_event_time -= 1.0
+    assert not mirror.is_fresh()
+    assert mirror.answer("getInventoryCount", ()) is None
+    assert mirror.answer("walkToLocation", (1, 2)) is None
+    assert mirror.counters["fallbacks"] == 1
+    print("✓ Stale mirror falls back to live calls")
+
+
+if __name__ == "__main__":
+    test_events_gaps_and_resync()
+    test_caller_reads_from_mirror()
+    test_unsubscribe_from_stub_shim()
+    test_stale_mirror_falls_back()
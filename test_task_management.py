@@ -4,9 +4,14 @@ Test script to demonstrate the task management functionality in the MCP server.
 This script shows how the new task management tools work with the DreamBot shim.
 """
 
+import asyncio
 import json
+import os
+import tempfile
 import time
+from handlers import handle_call_tool
 from java_caller import JavaMethodCaller
+from stub_shim import StubShim
 
 
 def test_task_management():
@@ -148,6 +153,119 @@ def demo_mining_scenario():
     print("\n✓ Mining scenario demonstration complete!")
 
 
+class StepQueue:
+    """The shim's upcoming-steps list, for the stub shim to serve the bulk step methods from."""
+    
+    def __init__(self):
+        self.steps = []
+    
+    def results(self) -> dict:
+        return {
+            "getUpcomingSteps": lambda args: list(self.steps),
+            "addUpcomingSteps": self.add,
+            "replaceUpcomingSteps": self.replace,
+            "applyStepEdits": self.apply_edits,
+        }
+    
+    def add(self, args):
+        self.steps.extend(args[0])
+        return f"Added {len(args[0])} steps"
+    
+    def replace(self, args):
+        self.steps = list(args[0])
+        return f"Replaced with {len(args[0])} steps"
+    
+    def apply_edits(self, args):
+        # All or nothing: an edit that does not fit leaves the list as it was
+        steps = list(self.steps)
+        for edit in args[0]:
+            if edit["op"] == "insert":
+                if not 0 <= edit["index"] <= len(steps):
+                    raise IndexError(f"insert index {edit['index']} out of range")
+                steps.insert(edit["index"], edit["step_description"])
+            elif edit["op"] == "remove":
+                steps.pop(edit["index"])
+            else:
+                steps.insert(edit["to_index"], steps.pop(edit["from_index"]))
+        self.steps = steps
+        return f"Applied {len(args[0])} edits"
+
+
+def test_bulk_step_operations():
+    """Test adding, replacing and reordering steps in one shim call each, against the stub shim."""
+    print("=== Bulk Step Operations Test ===")
+    directory = tempfile.mkdtemp()
+    pipe_path = os.path.join(directory, "shim_pipe")
+    response_pipe_path = os.path.join(directory, "shim_response_pipe")
+    queue = StepQueue()
+    
+    async def call(java_caller, name, args):
+        return (await handle_call_tool(java_caller, name, args))[0].text
+    
+    async def run(java_caller, shim):
+        def sent():
+            return [(request["method"], request["args"]) for request in shim.requests]
+        
+        text = await call(java_caller, "add_upcoming_steps", {"step_descriptions": ["Walk to bank area", "Open bank booth"]})
+        assert text == "Steps added: Added 2 steps", text
+        await call(java_caller, "add_upcoming_steps", {"step_descriptions": ["Deposit all items"]})
+        # The whole list travels as one argument in one request
+        assert sent() == [
+            ("addUpcomingSteps", [["Walk to bank area", "Open bank booth"]]),
+            ("addUpcomingSteps", [["Deposit all items"]]),
+        ], sent()
+        assert queue.steps == ["Walk to bank area", "Open bank booth", "Deposit all items"]
+        
+        text = await call(java_caller, "apply_step_edits", {"edits": [
+            {"op": "move", "from_index": 2, "to_index": 0},
+            {"op": "insert", "index": 1, "step_description": "Check inventory space"},
+            {"op": "remove", "index": 3},
+        ]})
+        assert text == "Step edits result: Applied 3 edits", text
+        assert queue.steps == ["Deposit all items", "Check inventory space", "Walk to bank area"], queue.steps
+        
+        text = await call(java_caller, "get_upcoming_steps", {})
+        assert text == "Upcoming steps (3):\n0. Deposit all items\n1. Check inventory space\n2. Walk to bank area", text
+        
+        # A failing edit rejects the whole batch on the shim
+        text = await call(java_caller, "apply_step_edits", {"output": "compact", "edits": [
+            {"op": "remove", "index": 0},
+            {"op": "insert", "index": 9, "step_description": "Too far"},
+        ]})
+        assert text == 'ok\nerror="IndexError: insert index 9 out of range"', text
+        assert len(queue.steps) == 3
+        
+        text = await call(java_caller, "replace_upcoming_steps", {"step_descriptions": ["Walk to furnace"]})
+        assert text == "Replace steps result: Replaced with 1 steps", text
+        await call(java_caller, "replace_upcoming_steps", {"step_descriptions": []})
+        assert queue.steps == []
+        assert await call(java_caller, "get_upcoming_steps", {}) == "No upcoming steps"
+        
+        # Malformed edits are rejected before anything reaches the shim
+        requests = len(shim.requests)
+        for args, error in (
+            ({"edits": []}, "edits must not be empty"),
+            ({"edits": [{"op": "swap", "index": 0}]}, "edits[0].op must be one of insert, remove, move"),
+            ({"edits": [{"op": "move", "from_index": 1}]}, "edits[0] (move) requires to_index"),
+            ({"edits": [{"op": "insert", "index": 0}]}, "edits[0] (insert) requires step_description"),
+            ({"edits": [{"op": "remove", "index": "0"}]}, "edits[0].index must be an integer"),
+        ):
+            text = await call(java_caller, "apply_step_edits", args)
+            assert text == f"Error: {error}", text
+        text = await call(java_caller, "add_upcoming_steps", {"step_descriptions": ["Walk", ""]})
+        assert text == "Error: step_descriptions[1] must not be empty", text
+        assert len(shim.requests) == requests
+    
+    with StubShim(pipe_path, response_pipe_path, results=queue.results()) as shim:
+        java_caller = JavaMethodCaller(pipe_path, response_pipe_path)
+        try:
+            asyncio.run(run(java_caller, shim))
+        finally:
+            java_caller.close()
+    print("✓ Bulk add, edit and replace each took one shim call")
+
+
 if __name__ == "__main__":
     test_task_management()
-    demo_mining_scenario()
\ No newline at end of file
+    demo_mining_scenario()
+    test_bulk_step_operations()
\ No newline at end of file
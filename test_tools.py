@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the compiled argument validators and the declarative tool specs.
+"""
+
+import asyncio
+
+from handlers import handle_call_tool
+from java_caller import JavaMethodCaller
+from tools import (ACTION_TIMEOUT, TOOL_DEFINITIONS, TOOL_SPECS, TOOL_SPECS_BY_NAME, WALK_TIMEOUT, ToolSpec,
+                   compile_validator)
+
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "count": {"type": "integer", "minimum": 1},
+        "ratio": {"type": "number", "exclusiveMinimum": 0},
+        "mode": {"type": "string", "enum": ["fast", "safe"]},
+        "flag": {"type": "boolean"},
+        "steps": {"type": "array", "minItems": 1, "items": {"type": "string", "minLength": 1}},
+        "target": {"oneOf": [{"type": "string"}, {"type": "integer"}]},
+        "tile": {
+            "type": "object",
+            "properties": {"x": {"type": "integer"}, "y": {"type": "integer"}},
+            "required": ["x", "y"]
+        }
+    },
+    "required": ["name", "count"]
+}
+
+
+def test_required():
+    """Test that required properties must be present, non-null and, for strings, non-empty."""
+    validate = compile_validator(SCHEMA)
+    assert validate({"name": "Bob", "count": 1}) is None
+    assert validate({"count": 1}) == "name is required"
+    assert validate({"name": None, "count": 1}) == "name is required"
+    assert validate({"name": "", "count": 1}) == "name is required"
+    assert validate({"name": "Bob"}) == "count is required"
+    # Optional properties may be missing or null
+    assert validate({"name": "Bob", "count": 1, "mode": None}) is None
+    assert validate({"name": "Bob", "count": 1, "tile": {"x": 1}}) == "tile.y is required"
+    print("✓ Required properties")
+
+
+def test_types():
+    """Test each JSON schema type, including booleans not counting as numbers."""
+    validate = compile_validator(SCHEMA)
+    base = {"name": "Bob", "count": 1}
+    cases = [
+        ({"name": 5}, "name must be a string"),
+        ({"count": "3"}, "count must be an integer"),
+        ({"count": 2.5}, "count must be an integer"),
+        ({"count": True}, "count must be an integer"),
+        ({"ratio": False}, "ratio must be a number"),
+        ({"flag": 1}, "flag must be a boolean"),
+        ({"steps": "walk"}, "steps must be an array"),
+        ({"steps": ["walk", 3]}, "steps[1] must be a string"),
+        ({"tile": [1, 2]}, "tile must be an object"),
+        ({"tile": {"x": 1, "y": "2"}}, "tile.y must be an integer"),
+        ({"target": 2.5}, "target must be a string or an integer"),
+    ]
+    for args, error in cases:
+        assert validate(dict(base, **args)) == error, (args, validate(dict(base, **args)))
+    for args in ({"ratio": 2}, {"ratio": 0.5}, {"target": "Bob"}, {"target": 7}, {"flag": False}):
+        assert validate(dict(base, **args)) is None, args
+    assert compile_validator(SCHEMA)("not an object") == " must be an object"
+    print("✓ Types")
+
+
+def test_enum_and_ranges():
+    """Test enum membership, inclusive and exclusive minimums and minimum lengths."""
+    validate = compile_validator(SCHEMA)
+    base = {"name": "Bob", "count": 1}
+    assert validate(dict(base, mode="safe")) is None
+    assert validate(dict(base, mode="reckless")) == "mode must be one of fast, safe"
+    assert validate(dict(base, count=0)) == "count must be at least 1"
+    assert validate(dict(base, ratio=0)) == "ratio must be greater than 0"
+    assert validate(dict(base, ratio=-1.5)) == "ratio must be greater than 0"
+    assert validate(dict(base, steps=[])) == "steps must not be empty"
+    assert validate(dict(base, steps=["walk", ""])) == "steps[1] must not be empty"
+    print("✓ Enums and ranges")
+
+
+def test_tool_spec():
+    """Test the properties every spec gains, its defaults, deadlines and shim argument mapping."""
+    spec = ToolSpec(
+        name="test_tool",
+        method="testMethod",
+        args=["name", "*extra", "count"],
+        success="Result: {result}",
+        default="Ran {name} x{count}",
+        description="Test tool",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "extra": {"type": "array", "items": {"type": "integer"}},
+                "count": {"type": "integer", "minimum": 1, "default": 2}
+            },
+            "required": ["name"]
+        },
+        check=lambda args: "name must not be Bob" if args.get("name") == "Bob" else None,
+        item_args=["name"]
+    )
+    properties = spec.input_schema["properties"]
+    assert {"bot_id", "timeout", "output", "exact_item_names"} <= set(properties)
+    assert spec.defaults == {"count": 2}
+
+    assert spec.validate({"name": "Alice"}) is None
+    assert spec.validate({"name": "Alice", "timeout": 0}) == "timeout must be greater than 0"
+    assert spec.validate({"name": "Alice", "output": "xml"}).startswith("output must be one of")
+    # The custom check runs only once the schema is satisfied
+    assert spec.validate({"name": "Bob"}) == "name must not be Bob"
+    assert spec.validate({"name": "Bob", "count": 0}) == "count must be at least 1"
+
+    assert spec.shim_args({"name": "Alice", "extra": [7, 8]}) == ["Alice", 7, 8, 2]
+    assert spec.shim_args({"name": "Alice", "count": 5}) == ["Alice", 5]
+    assert spec.format_result({"name": "Alice"}, None) == "Result: Ran Alice x2"
+    assert spec.format_result({"name": "Alice"}, 3) == "Result: 3"
+
+    assert spec.deadline({}) == ACTION_TIMEOUT and spec.deadline({"timeout": 4}) == 4
+    assert spec.item_name_args({"name": "Logs"}) == ["name"]
+    assert spec.item_name_args({"name": "Logs", "exact_item_names": True}) == []
+
+    local = ToolSpec(name="local_tool", description="Local", input_schema={"type": "object", "properties": {}}, timeout=None)
+    assert set(local.input_schema["properties"]) == {"bot_id"} and local.deadline({}) is None
+    dynamic = ToolSpec(name="dynamic", description="Dynamic", input_schema={"type": "object", "properties": {}},
+                       timeout=lambda args: args.get("wait", 1) + 10)
+    assert dynamic.deadline({"wait": 5}) == 15
+    print("✓ ToolSpec")
+
+
+def test_registered_tools():
+    """Test the registry itself and that a real tool's arguments are rejected before reaching the shim."""
+    assert len(TOOL_SPECS_BY_NAME) == len(TOOL_SPECS) == len(TOOL_DEFINITIONS)
+    for spec in TOOL_SPECS:
+        if spec.method is None:
+            continue
+        assert spec.success or spec.formatter, spec.name
+        assert all(arg.lstrip("*") in spec.input_schema["properties"] for arg in spec.args), spec.name
+
+    walk = TOOL_SPECS_BY_NAME["walk_to_location"]
+    assert walk.validate({"x": 3222}) == "y is required"
+    assert walk.validate({"x": 3222, "y": "3218"}) == "y must be an integer"
+    assert walk.shim_args({"x": 3222, "y": 3218}) == [3222, 3218, 0]
+    assert walk.deadline({"x": 3222, "y": 3218}) == WALK_TIMEOUT
+
+    # No shim is listening at this path: a validation error must come back without trying to reach it
+    java_caller = JavaMethodCaller("/nonexistent/shim_pipe")
+    try:
+        content = asyncio.run(handle_call_tool(java_caller, "walk_to_location", {"x": 3222, "y": True}))
+    finally:
+        java_caller.close()
+    assert content[0].text == "Error: y must be an integer", content[0].text
+    print(f"✓ {len(TOOL_SPECS)} registered tools")
+
+
+if __name__ == "__main__":
+    test_required()
+    test_types()
+    test_enum_and_ranges()
+    test_tool_spec()
+    test_registered_tools()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that tool calls are traced as nested spans and convert to Chrome trace events.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+
+from handlers import handle_call_tool
+from java_caller import JavaMethodCaller
+from stub_shim import StubShim
+from tracing import Tracer, convert_to_chrome
+
+
+# Spans of one shim tool call, parent first
+EXPECTED_TREE = {
+    "tool": None,
+    "validate": "tool",
+    "shim_call": "tool",
+    "queue": "shim_call",
+    "encode": "shim_call",
+    "transport_write": "shim_call",
+    "wait": "shim_call",
+    "format": "tool",
+}
+
+# Start times come from the wall clock and durations from a monotonic one, so allow a little slack
+CLOCK_SLACK_US = 2000
+
+
+def test_tool_calls_traced_and_converted():
+    """Test two concurrent tool calls: separate traces, each a tree rooted at its tool span, on separate rows."""
+    print("=== Testing Request Tracing ===")
+    directory = tempfile.mkdtemp()
+    pipe_path = os.path.join(directory, "shim_pipe")
+    response_pipe_path = os.path.join(directory, "shim_response_pipe")
+    trace_path = os.path.join(directory, "trace.jsonl")
+    chrome_path = os.path.join(directory, "trace.json")
+
+    async def run(java_caller: JavaMethodCaller) -> list:
+        return await asyncio.gather(
+            handle_call_tool(java_caller, "get_inventory_count", {}),
+            handle_call_tool(java_caller, "greet_user", {"name": "Zezima"}),
+        )
+
+    tracer = Tracer(trace_path)
+    with StubShim(pipe_path, response_pipe_path, latency=0.05) as shim:
+        java_caller = JavaMethodCaller(pipe_path, response_pipe_path, tracer=tracer)
+        try:
+            results = asyncio.run(run(java_caller))
+        finally:
+            java_caller.close()
+            tracer.close()
+        shim_requests = {request["method"]: request for request in shim.requests}
+    assert "Inventory count: 27" in results[0][0].text and "Zezima" in results[1][0].text, results
+
+    with open(trace_path) as f:
+        spans = [json.loads(line) for line in f]
+    roots = [span for span in spans if span["parent_id"] is None]
+    assert sorted(root["attrs"]["tool"] for root in roots) == ["get_inventory_count", "greet_user"], roots
+    assert len({root["trace_id"] for root in roots}) == 2
+
+    for root in roots:
+        trace = {span["span_id"]: span for span in spans if span["trace_id"] == root["trace_id"]}
+        by_name = {span["name"]: span for span in trace.values()}
+        assert sorted(by_name) == sorted(EXPECTED_TREE) and len(trace) == len(EXPECTED_TREE), sorted(by_name)
+        for name, parent_name in EXPECTED_TREE.items():
+            span = by_name[name]
+            if parent_name is None:
+                continue
+            parent = by_name[parent_name]
+            assert span["parent_id"] == parent["span_id"], (name, span, parent)
+            # Children run within their parent
+            assert span["start_us"] >= parent["start_us"] - CLOCK_SLACK_US, name
+            assert span["start_us"] + span["dur_us"] <= parent["start_us"] + parent["dur_us"] + CLOCK_SLACK_US, name
+        # The shim gets the trace and the shim_call span to hang its own spans under
+        shim_call = by_name["shim_call"]
+        request = shim_requests[shim_call["attrs"]["method"]]
+        assert request["trace"] == {"trace_id": root["trace_id"], "parent_span_id": shim_call["span_id"]}
+        assert shim_call["attrs"]["request_id"] == request["id"]
+        assert by_name["wait"]["dur_us"] >= 40000, by_name["wait"]
+
+    assert convert_to_chrome(trace_path, chrome_path) == len(spans)
+    with open(chrome_path) as f:
+        chrome = json.load(f)
+    events = chrome["traceEvents"]
+    assert all(event["ph"] == "X" and event["cat"] == "dreambot" for event in events)
+    assert sorted((event["args"]["span_id"], event["ts"], event["dur"]) for event in events) == \
+        sorted((span["span_id"], span["start_us"], span["dur_us"]) for span in spans)
+    rows = {event["args"]["trace_id"]: event["tid"] for event in events}
+    # The calls overlapped, so each gets its own row, and every span of a trace is on that row
+    assert sorted(rows.values()) == [0, 1], rows
+    assert all(event["tid"] == rows[event["args"]["trace_id"]] for event in events)
+    print(f"✓ {len(spans)} spans in 2 traces, converted to {len(events)} trace events")
+
+
+def test_conversion_skips_bad_lines_and_reuses_rows():
+    """Test that a truncated line is skipped and traces that do not overlap share a row."""
+    directory = tempfile.mkdtemp()
+    trace_path = os.path.join(directory, "trace.jsonl")
+    chrome_path = os.path.join(directory, "trace.json")
+    spans = [
+        {"name": "tool", "trace_id": "a", "span_id": 1, "parent_id": None, "start_us": 0, "dur_us": 100, "attrs": {}},
+        {"name": "tool", "trace_id": "b", "span_id": 2, "parent_id": None, "start_us": 50, "dur_us": 100, "attrs": {}},
+        {"name": "tool", "trace_id": "c", "span_id": 3, "parent_id": None, "start_us": 200, "dur_us": 10, "attrs": {}},
+    ]
+    with open(trace_path, "w") as f:
+        f.write("".join(json.dumps(span) + "\n" for span in spans) + '{"name": "to\n\n')
+    assert convert_to_chrome(trace_path, chrome_path) == 3
+    with open(chrome_path) as f:
+        rows = {event["args"]["trace_id"]: event["tid"] for event in json.load(f)["traceEvents"]}
+    assert rows == {"a": 0, "b": 1, "c": 0}, rows
+    print("✓ Bad lines skipped and free rows reused")
+
+
+if __name__ == "__main__":
+    test_tool_calls_traced_and_converted()
+    test_conversion_skips_bad_lines_and_reuses_rows()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test script to verify recording shim traffic and replaying it with the replay shim.
+"""
+
+import asyncio
+import gzip
+import itertools
+import os
+import tempfile
+
+from java_caller import JavaMethodCaller
+from replay_shim import ReplayShim, replay_session, replayable_calls, run_replay
+from stub_shim import StubShim
+from traffic_log import REQUEST, RESPONSE, TrafficRecorder, load_recorded_calls, read_traffic_log
+
+
+def record_session(directory: str) -> str:
+    """Record a short session against the stub shim; inventory counts go down by one per call."""
+    log_path = os.path.join(directory, "session.log")
+    pipe_path = os.path.join(directory, "shim_pipe")
+    response_pipe_path = os.path.join(directory, "shim_response_pipe")
+    counts = itertools.count(27, -1)
+    results = {"getInventoryCount": lambda args: next(counts)}
+
+    with StubShim(pipe_path, response_pipe_path, results=results):
+        recorder = TrafficRecorder(log_path)
+        java_caller = JavaMethodCaller(pipe_path, response_pipe_path, recorder=recorder)
+        try:
+            for _ in range(3):
+                assert java_caller.call_method_with_response("getInventoryCount", timeout=5)["success"]
+            assert java_caller.call_method_with_response("checkInventoryForItem", "Logs", False, timeout=5)["result"] == 5
+            batch = [{"method": "bankIsOpen"}, {"method": "getPlayerLocation"}]
+            assert java_caller.call_batch(batch, timeout=5)["success"]
+        finally:
+            java_caller.close()
+            recorder.close()
+    return log_path
+
+
+def test_record_and_load():
+    """Test that every request and response is logged in order and paired up by id."""
+    print("=== Testing Traffic Recording ===")
+    log_path = record_session(tempfile.mkdtemp())
+    records = list(read_traffic_log(log_path))
+    offsets = [offset for _, offset, _ in records]
+    assert offsets == sorted(offsets)
+    assert [direction for direction, _, _ in records].count(REQUEST) == [direction for direction, _, _ in records].count(RESPONSE)
+
+    calls = replayable_calls(load_recorded_calls(log_path))
+    assert [call.request.get("method") for call in calls] == [
+        "getInventoryCount", "getInventoryCount", "getInventoryCount", "checkInventoryForItem", None
+    ]
+    assert [call.response["result"] for call in calls[:3]] == [27, 26, 25]
+    assert "batch" in calls[4].request
+    assert all(call.round_trip >= 0 for call in calls)
+    print(f"✓ {len(calls)} calls recorded and paired")
+
+
+def test_malformed_logs():
+    """Test that a foreign file is rejected and a truncated log keeps the records before the cut."""
+    directory = tempfile.mkdtemp()
+    log_path = record_session(directory)
+    with gzip.open(log_path, "rb") as f:
+        contents = f.read()
+
+    truncated_path = os.path.join(directory, "truncated.log")
+    with gzip.open(truncated_path, "wb") as f:
+        f.write(contents[:-3])
+    assert len(list(read_traffic_log(truncated_path))) == len(list(read_traffic_log(log_path))) - 1
+
+    foreign_path = os.path.join(directory, "foreign.log")
+    with gzip.open(foreign_path, "wb") as f:
+        f.write(b"XXXX" + contents[4:])
+    try:
+        list(read_traffic_log(foreign_path))
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    print("✓ Malformed logs rejected or cut at the last whole record")
+
+
+def test_replay_shim():
+    """Test that the replay shim answers identical calls in recorded order and repeats the last answer."""
+    print("=== Testing Replay Shim ===")
+    directory = tempfile.mkdtemp()
+    log_path = record_session(directory)
+    pipe_path = os.path.join(directory, "replay_pipe")
+    response_pipe_path = os.path.join(directory, "replay_response_pipe")
+
+    with ReplayShim(log_path, pipe_path, response_pipe_path, speed=100.0) as shim:
+        java_caller = JavaMethodCaller(pipe_path, response_pipe_path)
+        try:
+            counts = [java_caller.call_method_with_response("getInventoryCount", timeout=5)["result"] for _ in range(4)]
+            assert counts == [27, 26, 25, 25], counts
+            assert shim.unmatched == 0
+            # Never recorded: answered by the stub's canned results
+            assert java_caller.call_method_with_response("bankIsOpen", timeout=5)["result"] is False
+            assert shim.unmatched == 1
+
+            results = asyncio.run(replay_session(java_caller, replayable_calls(load_recorded_calls(log_path)), speed=100.0))
+            assert all(result["success"] for result in results)
+            assert [result["method"] for result in results][-1] == "batch"
+        finally:
+            java_caller.close()
+    print("✓ Recorded responses served back")
+
+
+def test_run_replay_report():
+    """Test the end-to-end replay report."""
+    log_path = record_session(tempfile.mkdtemp())
+    report = asyncio.run(run_replay(log_path, speed=50.0))
+    assert (report["calls"], report["unmatched"]) == (5, 0), report
+    assert report["methods"]["getInventoryCount"]["recorded"]["count"] == 3
+    assert report["methods"]["getInventoryCount"]["failures"] == 0
+    assert set(report["methods"]) == {"batch", "checkInventoryForItem", "getInventoryCount"}
+    print(f"✓ Replayed {report['calls']} calls in {report['elapsed']:.3f}s")
+
+
+if __name__ == "__main__":
+    test_record_and_load()
+    test_malformed_logs()
+    test_replay_shim()
+    test_run_replay_report()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the FIFO and Unix socket transports' framing and timeouts, and create_transport.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+
+from java_caller import JavaMethodCaller
+from stub_shim import StubShim
+from transports import FRAME_HEADER, MAX_FRAME_SIZE, FifoTransport, UnixSocketTransport, create_transport
+
+
+def frame(payload: bytes) -> bytes:
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def read_frame(connection: socket.socket) -> bytes:
+    def read(size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = connection.recv(size - len(data))
+            assert chunk, "peer closed mid-frame"
+            data += chunk
+        return data
+    return read(FRAME_HEADER.unpack(read(FRAME_HEADER.size))[0])
+
+
+class ScriptedPeer:
+    """A shim socket that accepts one connection and runs script(connection) on it in a thread."""
+
+    def __init__(self, script):
+        self.socket_path = os.path.join(tempfile.mkdtemp(), "shim.sock")
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.socket_path)
+        self.server.listen()
+        self.script = script
+        self.error = None
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self) -> None:
+        connection, _ = self.server.accept()
+        try:
+            with connection:
+                self.script(connection)
+        except Exception as e:
+            self.error = e
+
+    def close(self) -> None:
+        self.thread.join(5)
+        self.server.close()
+        assert self.error is None, self.error
+
+
+# Empty, binary with newlines, and larger than one recv
+PAYLOADS = [b"", b"\x00\n\xff binary\n", b"x" * 200000]
+
+
+def send_replies(connection: socket.socket) -> None:
+    """Echo PAYLOADS back: the first a byte at a time, the rest coalesced into one write."""
+    for payload in PAYLOADS:
+        assert read_frame(connection) == payload
+    for byte in frame(PAYLOADS[0]) + frame(PAYLOADS[1])[:3]:
+        connection.sendall(bytes([byte]))
+        time.sleep(0.001)
+    connection.sendall(frame(PAYLOADS[1])[3:] + frame(PAYLOADS[2]))
+
+
+def test_async_framing():
+    """Test frames split across many reads and frames sharing one read, on the async API."""
+    peer = ScriptedPeer(send_replies)
+    transport = UnixSocketTransport(peer.socket_path)
+
+    async def run() -> list:
+        loop = asyncio.get_running_loop()
+        received: asyncio.Queue = asyncio.Queue()
+        lost = []
+        await transport.connect_async(received.put_nowait, lost.append, loop.time() + 5)
+        # Connecting again is a no-op on the open connection
+        await transport.connect_async(received.put_nowait, lost.append, loop.time() + 5)
+        for payload in PAYLOADS:
+            await transport.send_async(payload, loop.time() + 5)
+        messages = [await asyncio.wait_for(received.get(), 5) for _ in PAYLOADS]
+        await asyncio.sleep(0.05)
+        return messages, lost
+
+    try:
+        messages, lost = asyncio.run(run())
+    finally:
+        transport.close()
+        peer.close()
+    assert messages == PAYLOADS
+    # The peer closing after its script counts as a lost connection, not as a message
+    assert len(lost) == 1 and isinstance(lost[0], ConnectionError), lost
+    print("✓ Async frames reassembled")
+
+
+def test_sync_framing_and_timeout():
+    """Test the blocking API, including a receive timing out mid-frame and resuming."""
+    def script(connection: socket.socket) -> None:
+        send_replies(connection)
+        assert read_frame(connection) == b"split"
+        reply = frame(b"split reply")
+        connection.sendall(reply[:6])
+        time.sleep(0.3)
+        connection.sendall(reply[6:])
+
+    peer = ScriptedPeer(script)
+    transport = UnixSocketTransport(peer.socket_path)
+    try:
+        for payload in PAYLOADS:
+            transport.send_sync(payload)
+        assert [transport.receive_sync(5) for _ in PAYLOADS] == PAYLOADS
+        transport.send_sync(b"split")
+        # Times out holding half a frame, then completes it on the next call
+        assert transport.receive_sync(0.1) is None
+        assert transport.receive_sync(5) == b"split reply"
+        try:
+            transport.receive_sync(5)
+        except ConnectionError as e:
+            print(f"✓ Peer close reported: {e}")
+        else:
+            raise AssertionError("A closed connection was not reported")
+    finally:
+        transport.close()
+        peer.close()
+    print("✓ Sync frames reassembled across timeouts")
+
+
+def test_oversized_frame():
+    """Test that a frame header over MAX_FRAME_SIZE drops the connection on both APIs."""
+    def script(connection: socket.socket) -> None:
+        read_frame(connection)
+        connection.sendall(FRAME_HEADER.pack(MAX_FRAME_SIZE + 1) + b"junk")
+        time.sleep(0.2)
+
+    peer = ScriptedPeer(script)
+    transport = UnixSocketTransport(peer.socket_path)
+
+    async def run() -> list:
+        loop = asyncio.get_running_loop()
+        lost = []
+        await transport.connect_async(lambda payload: None, lost.append, loop.time() + 5)
+        await transport.send_async(b"hello", loop.time() + 5)
+        while not lost:
+            await asyncio.sleep(0.01)
+        return lost
+
+    try:
+        lost = asyncio.run(run())
+        assert "exceeds" in str(lost[0]), lost
+        assert not transport.connected
+    finally:
+        transport.close()
+        peer.close()
+
+    peer = ScriptedPeer(script)
+    transport = UnixSocketTransport(peer.socket_path)
+    try:
+        transport.send_sync(b"hello")
+        try:
+            transport.receive_sync(5)
+        except ConnectionError as e:
+            assert "exceeds" in str(e)
+        else:
+            raise AssertionError("An oversized frame was accepted")
+    finally:
+        transport.close()
+        peer.close()
+    print("✓ Oversized frames rejected")
+
+
+def test_peer_close_fails_pending_calls():
+    """Test that calls in flight fail as soon as the shim closes the connection, not at their timeout."""
+    def script(connection: socket.socket) -> None:
+        # Take both requests, answer neither
+        read_frame(connection)
+        read_frame(connection)
+
+    peer = ScriptedPeer(script)
+    java_caller = JavaMethodCaller(transport=UnixSocketTransport(peer.socket_path))
+
+    async def run() -> list:
+        return await asyncio.gather(
+            java_caller.call_method_async("getInventoryCount", timeout=30),
+            java_caller.call_method_async("bankIsOpen", timeout=30),
+        )
+
+    started = time.monotonic()
+    try:
+        responses = asyncio.run(run())
+    finally:
+        java_caller.close()
+        peer.close()
+    assert time.monotonic() - started < 5
+    for response in responses:
+        assert not response["success"] and "closed the connection" in response["error"], response
+    print("✓ Pending calls failed on peer close")
+
+
+def test_connect_failures_and_create_transport():
+    """Test connecting with nothing listening, and building each transport from configuration."""
+    missing = UnixSocketTransport(os.path.join(tempfile.mkdtemp(), "missing.sock"))
+    assert not missing.is_available()
+
+    async def connect() -> None:
+        await missing.connect_async(lambda payload: None, lambda error: None, asyncio.get_running_loop().time() + 1)
+
+    try:
+        asyncio.run(connect())
+    except ConnectionError as e:
+        assert "not listening" in str(e)
+    else:
+        raise AssertionError("Connected with nothing listening")
+    finally:
+        missing.close()
+
+    fifo = create_transport({"pipe_path": "/tmp/bot2_pipe"})
+    assert isinstance(fifo, FifoTransport) and fifo.response_pipe_path == "/tmp/bot2_response_pipe"
+    unix = create_transport({"transport": "unix", "socket_path": "/tmp/bot2.sock"})
+    assert isinstance(unix, UnixSocketTransport) and unix.socket_path == "/tmp/bot2.sock" and unix.binary_safe
+    try:
+        create_transport({"transport": "carrier pigeon"})
+    except ValueError as e:
+        assert "carrier pigeon" in str(e)
+    else:
+        raise AssertionError("Unknown transport accepted")
+    print("✓ Connect failures and create_transport")
+
+
+class SplitReplyShim(StubShim):
+    """Writes each reply in two pieces with a pause between them, as a shim flushing mid-message can."""
+
+    def _write_reply(self, payload: bytes) -> None:
+        middle = len(payload) // 2
+        super()._write_reply(payload[:middle])
+        time.sleep(0.05)
+        super()._write_reply(payload[middle:])
+
+
+def fifo_paths() -> tuple:
+    directory = tempfile.mkdtemp()
+    return os.path.join(directory, "shim_pipe"), os.path.join(directory, "shim_response_pipe")
+
+
+def request(request_id: str) -> bytes:
+    return json.dumps({"method": "greet", "args": [request_id], "id": request_id}).encode()
+
+
+def test_fifo_receive_timeout():
+    """Test that receive_sync returns None once its timeout passes and the late reply is returned by the next call."""
+    pipe_path, response_pipe_path = fifo_paths()
+    with StubShim(pipe_path, response_pipe_path, latency=0.3):
+        transport = FifoTransport(pipe_path, response_pipe_path)
+        try:
+            transport.send_sync(request("a"))
+            started = time.monotonic()
+            assert transport.receive_sync(0.1) is None
+            # Woken by the timeout, not by polling, and not long after it
+            assert 0.1 <= time.monotonic() - started < 0.25
+            reply = transport.receive_sync(5)
+            assert reply is not None and json.loads(reply)["id"] == "a"
+            # The reply is returned once it is written, not at the next poll
+            assert time.monotonic() - started < 0.45
+            assert transport.receive_sync(0) is None
+        finally:
+            transport.close()
+    print("✓ FIFO receive timeout")
+
+
+def test_fifo_partial_reads():
+    """Test that a reply arriving in pieces over several selector wakeups is returned whole, exactly once."""
+    pipe_path, response_pipe_path = fifo_paths()
+    with SplitReplyShim(pipe_path, response_pipe_path, results={"greet": lambda args: "é\n" * 5000 + args[0]}):
+        transport = FifoTransport(pipe_path, response_pipe_path)
+        try:
+            # Opens the response FIFO and its selector, then count the selector's wakeups
+            assert transport.receive_sync(0) is None
+            select = transport._selector.select
+            wakeups = []
+            transport._selector.select = lambda timeout=None: wakeups.append(timeout) or select(timeout)
+            for request_id in ("a", "b"):
+                transport.send_sync(request(request_id))
+            replies = [json.loads(transport.receive_sync(5)) for _ in range(2)]
+            assert transport.receive_sync(0.1) is None
+        finally:
+            transport.close()
+    assert [reply["id"] for reply in replies] == ["a", "b"]
+    assert [reply["result"][-1] for reply in replies] == ["a", "b"] and len(replies[0]["result"]) == 10001
+    # At least one wakeup found only half a reply
+    assert len(wakeups) > 2, wakeups
+    print(f"✓ FIFO replies reassembled across {len(wakeups)} wakeups")
+
+
+if __name__ == "__main__":
+    test_async_framing()
+    test_sync_framing_and_timeout()
+    test_oversized_frame()
+    test_peer_close_fails_pending_calls()
+    test_connect_failures_and_create_transport()
+    test_fifo_receive_timeout()
+    test_fifo_partial_reads()
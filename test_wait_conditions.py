@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script to verify wait_until condition evaluation.
+"""
+
+import asyncio
+import os
+import tempfile
+
+from java_caller import JavaMethodCaller
+from stub_shim import StubShim
+from wait_conditions import ConditionWaiter, check_condition, condition_holds, condition_read, describe_observation
+
+
+def test_at_tile():
+    """Test at_tile against every position format the shim reports."""
+    condition = {"type": "at_tile", "x": 3222, "y": 3218, "radius": 1}
+    for position in ({"x": 3223, "y": 3217, "z": 0}, [3223, 3217], [3222, 3218, 0], "Tile(3221, 3219, 0)", "(3222, 3218)"):
+        assert condition_holds(condition, position), position
+    for position in ({"x": 3224, "y": 3218}, [3222, 3218, 1], "Tile(3222, 3216, 0)", "somewhere", None, [3222]):
+        assert not condition_holds(condition, position), position
+    assert describe_observation(condition, "Tile(3221, 3219, 0)") == "player at (3221, 3219, 0)"
+    assert describe_observation(condition, "somewhere") == "position unknown"
+    print("✓ at_tile reads dicts, lists and tile strings")
+
+
+def test_inventory_and_bank():
+    """Test inventory counts (with -1 for a missing item) and the bank state."""
+    at_least_five = {"type": "inventory_count", "count": 5}
+    assert condition_holds(at_least_five, 5) and not condition_holds(at_least_five, 4)
+    assert not condition_holds(at_least_five, True)
+    none_left = {"type": "inventory_count", "item_name": "Logs", "count": 0, "op": "=="}
+    assert condition_holds(none_left, -1)
+    assert condition_read(none_left) == ("checkInventoryForItem", ("Logs", False))
+    assert condition_read(at_least_five) == ("getInventoryCount", ())
+
+    assert condition_holds({"type": "bank_open"}, True)
+    assert condition_holds({"type": "bank_open", "open": False}, False)
+    assert not condition_holds({"type": "bank_open", "open": False}, None)
+    print("✓ inventory_count and bank_open evaluated")
+
+
+def test_ground_item():
+    """Test that ground item names match ignoring case and extra whitespace."""
+    items = [{"id": 526, "name": "Bones", "x": 1, "y": 1}, {"id": 1511, "name": "Raw  shrimps"}, {"id": 1, "name": None}]
+    assert condition_holds({"type": "ground_item", "item_name": "bones"}, items)
+    assert condition_holds({"type": "ground_item", "item_name": "RAW SHRIMPS"}, items)
+    assert not condition_holds({"type": "ground_item", "item_name": "Coins"}, items)
+    assert condition_holds({"type": "ground_item", "item_name": "coins", "present": False}, items)
+    assert not condition_holds({"type": "ground_item", "item_name": "Bones"}, "not a list")
+    print("✓ ground_item names matched like the item dictionary does")
+
+
+def test_check_condition():
+    """Test that conditions missing the fields their type needs are rejected."""
+    assert check_condition({"type": "at_tile", "x": 1}) == "at_tile requires y"
+    assert check_condition({"type": "ground_item"}) == "ground_item requires item_name"
+    assert check_condition({"type": "bank_open"}) is None
+
+
+def test_waiter_against_stub_shim():
+    """Test a waiter that is met after the position changes, and one that times out with a report."""
+    print("=== Testing ConditionWaiter Against the Stub Shim ===")
+    directory = tempfile.mkdtemp()
+    pipe_path = os.path.join(directory, "shim_pipe")
+    response_pipe_path = os.path.join(directory, "shim_response_pipe")
+    positions = iter(["Tile(3200, 3200, 0)", "Tile(3210, 3210, 0)"])
+    results = {"getPlayerLocation": lambda args: next(positions, "Tile(3222, 3218, 0)")}
+
+    with StubShim(pipe_path, response_pipe_path, results=results):
+        java_caller = JavaMethodCaller(pipe_path, response_pipe_path)
+        try:
+            waiter = ConditionWaiter(java_caller, [
+                {"type": "at_tile", "x": 3222, "y": 3218},
+                {"type": "ground_item", "item_name": "coins"},
+            ], timeout=5)
+            asyncio.run(waiter.wait())
+            assert waiter.met, waiter.summary()
+            assert waiter.evaluations == 3, waiter.evaluations
+            print(waiter.summary())
+
+            waiter = ConditionWaiter(java_caller, [{"type": "bank_open"}], timeout=0.3)
+            asyncio.run(waiter.wait())
+            assert not waiter.met
+            assert "bank open: not met (bank closed)" in waiter.summary(), waiter.summary()
+            print(waiter.summary())
+        finally:
+            java_caller.close()
+    print("✓ Waiters met and timed out as expected")
+
+
+if __name__ == "__main__":
+    test_at_tile()
+    test_inventory_and_bank()
+    test_ground_item()
+    test_check_condition()
+    test_waiter_against_stub_shim()
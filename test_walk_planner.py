@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the walk planner against scripted positions, and the route cache it keeps.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+
+import walk_planner
+from route_cache import RouteCache, simplify_trace
+from walk_planner import WalkPlanner
+
+
+START = (3200, 3200, 0)
+DESTINATION = (3230, 3200, 0)
+
+
+def walk_east(start: tuple, end_x: int, step: int = 2) -> list:
+    return [(x, start[1], start[2]) for x in range(start[0] + step, end_x + 1, step)]
+
+
+class ScriptedWorld:
+    """Caller stand-in where each walkToLocation target has a scripted list of positions.
+
+    Every getPlayerLocation read advances one position along the path of the
+    current walk, and the walk returns once its path is used up. A path
+    ending in STUCK stops there and its walk never returns.
+    """
+
+    STUCK = None
+
+    def __init__(self, paths: dict, position: tuple = START):
+        self.paths = paths
+        self.position = position
+        self.path = []
+        self.walks = []
+        self.cancelled = []
+        self.tracer = None
+
+    async def call_method_async(self, method_name, *args, timeout=None, fresh=False):
+        if method_name == "getPlayerLocation":
+            if self.path and self.path[0] is not self.STUCK:
+                self.position = self.path.pop(0)
+            return {"success": True, "result": dict(zip("xyz", self.position)), "error": None}
+
+        target = tuple(args)
+        self.walks.append(target)
+        self.path = list(self.paths.get(target, []))
+        try:
+            await asyncio.wait_for(self._walk(), timeout)
+        except asyncio.CancelledError:
+            self.cancelled.append(target)
+            raise
+        except asyncio.TimeoutError:
+            return {"success": False, "result": None, "error": f"Timeout waiting for response (waited {timeout}s)"}
+        return {"success": True, "result": None, "error": None}
+
+    async def _walk(self) -> None:
+        while self.path:
+            await asyncio.sleep(0.002)
+
+
+def run_walk(world: ScriptedWorld, routes: RouteCache = None, timeout: float = 30.0) -> WalkPlanner:
+    return asyncio.run(WalkPlanner(world, DESTINATION, timeout=timeout, routes=routes).walk())
+
+
+def fast_timings(function):
+    """Run a test with short sampling and stuck intervals so it takes well under a second."""
+    def wrapper():
+        saved = walk_planner.SAMPLE_INTERVAL, walk_planner.STUCK_TIMEOUT
+        walk_planner.SAMPLE_INTERVAL, walk_planner.STUCK_TIMEOUT = 0.005, 0.2
+        try:
+            function()
+        finally:
+            walk_planner.SAMPLE_INTERVAL, walk_planner.STUCK_TIMEOUT = saved
+    wrapper.__name__ = function.__name__
+    wrapper.__doc__ = function.__doc__
+    return wrapper
+
+
+def test_simplify_trace():
+    """Test that samples reduce to waypoints at most max_step apart, keeping plane changes and the last sample."""
+    straight = [START] + walk_east(START, 3230, step=1)
+    assert simplify_trace(straight, 12) == [(3212, 3200, 0), (3224, 3200, 0), (3230, 3200, 0)]
+    # Standing still and duplicate samples add nothing
+    assert simplify_trace([START, START, (3205, 3200, 0), (3205, 3200, 0)], 12) == [(3205, 3200, 0)]
+    assert simplify_trace([START, START], 12) == []
+    # Climbing stairs keeps the tiles on both sides of the plane change
+    stairs = [START, (3204, 3200, 0), (3205, 3200, 0), (3205, 3201, 1), (3208, 3201, 1)]
+    assert simplify_trace(stairs, 12) == [(3205, 3200, 0), (3205, 3201, 1), (3208, 3201, 1)]
+    # Every waypoint is within max_step of the one before it
+    zigzag = [START] + [(3200 + index * 3, 3200 + (index % 2) * 5, 0) for index in range(1, 30)]
+    waypoints = simplify_trace(zigzag, 7)
+    assert waypoints[-1] == zigzag[-1]
+    for previous, waypoint in zip([START] + waypoints, waypoints):
+        assert max(abs(previous[0] - waypoint[0]), abs(previous[1] - waypoint[1])) <= 7, (previous, waypoint)
+    print("✓ simplify_trace")
+
+
+@fast_timings
+def test_direct_walk_records_route():
+    """Test a direct walk arriving, caching its simplified trace, and the next trip following that route."""
+    print("=== Testing Walk Planner ===")
+    path = os.path.join(tempfile.mkdtemp(), "routes.json")
+    routes = RouteCache(path)
+    world = ScriptedWorld({DESTINATION: walk_east(START, 3230)})
+    planner = run_walk(world, routes)
+    assert planner.outcome == "arrived" and world.walks == [DESTINATION], (planner.outcome, world.walks)
+    expected_route = simplify_trace([START] + walk_east(START, 3230), walk_planner.SEGMENT_LENGTH)
+    assert planner.recorded_waypoints == len(expected_route)
+    assert "by direct walk" in planner.summary() and "cached a" in planner.summary()
+
+    # A restart loads the route, and a trip from elsewhere in the same region follows it
+    reloaded = RouteCache(path)
+    assert reloaded.lookup(START, DESTINATION) == expected_route
+    paths = {}
+    position = (3202, 3201, 0)
+    for waypoint in expected_route:
+        paths[waypoint] = walk_east(position, waypoint[0]) or [waypoint]
+        position = waypoint
+    world = ScriptedWorld(paths, position=(3202, 3201, 0))
+    planner = run_walk(world, reloaded)
+    assert planner.outcome == "arrived", planner.summary()
+    assert world.walks == expected_route and planner.cached_segments == len(expected_route)
+    assert "via cached route" in planner.summary()
+    print(f"✓ Direct walk cached a {len(expected_route)}-waypoint route, followed on the next trip")
+
+
+@fast_timings
+def test_stuck_walk_is_abandoned():
+    """Test that a walk whose position stops changing ends after STUCK_TIMEOUT and is cancelled, caching nothing."""
+    routes = RouteCache()
+    world = ScriptedWorld({DESTINATION: walk_east(START, 3210) + [ScriptedWorld.STUCK]})
+    planner = run_walk(world, routes)
+    assert planner.outcome == "stuck" and world.cancelled == [DESTINATION], (planner.outcome, world.cancelled)
+    assert planner.position == (3210, 3200, 0)
+    # Abandoned soon after the last movement, long before the 30 s deadline
+    assert walk_planner.STUCK_TIMEOUT <= planner.elapsed < 2, planner.elapsed
+    assert "no movement for 0.2s" in planner.summary()
+    assert routes.counters["recorded"] == 0
+    print(f"✓ Stuck walk abandoned after {planner.elapsed:.2f}s")
+
+
+@fast_timings
+def test_stuck_route_is_dropped():
+    """Test that a cached route that gets stuck is dropped and the rest of the trip is walked directly."""
+    routes = RouteCache()
+    # A door has closed on the cached route since it was recorded
+    blocked = (3212, 3210, 0)
+    routes.record(START, DESTINATION, [blocked, DESTINATION], 10.0)
+    world = ScriptedWorld({
+        blocked: [(3202, 3202, 0), (3204, 3204, 0), ScriptedWorld.STUCK],
+        DESTINATION: walk_east((3204, 3204, 0), 3228) + [DESTINATION],
+    })
+    planner = run_walk(world, routes)
+    assert planner.outcome == "arrived", planner.summary()
+    assert world.walks == [blocked, DESTINATION] and world.cancelled == [blocked], world.walks
+    assert planner.route_dropped and routes.counters["dropped"] == 1
+    assert "after leaving a cached route that got stuck (dropped)" in planner.summary()
+    # The direct walk that worked replaces the dropped route
+    assert routes.lookup(START, DESTINATION)[-1] == DESTINATION
+    print("✓ Stuck route dropped and replaced")
+
+
+@fast_timings
+def test_deadline_and_unreadable_position():
+    """Test the overall deadline ending a walk that keeps moving, and a walk that cannot read the position."""
+    world = ScriptedWorld({DESTINATION: walk_east(START, 3230, step=1) * 50})
+    planner = run_walk(world, timeout=0.3)
+    assert planner.outcome == "timeout" and "timed out" in planner.summary(), planner.summary()
+
+    class NoPosition(ScriptedWorld):
+        async def call_method_async(self, method_name, *args, timeout=None, fresh=False):
+            return {"success": True, "result": "somewhere", "error": None}
+
+    planner = run_walk(NoPosition({}))
+    assert planner.outcome == "failed" and "Could not read the player position" in planner.summary()
+    print("✓ Deadline and unreadable position")
+
+
+def test_route_cache_writes_atomically():
+    """Test that saving replaces the routes file whole and keeps the old one when the write fails."""
+    path = os.path.join(tempfile.mkdtemp(), "routes.json")
+    routes = RouteCache(path)
+    routes.record(START, DESTINATION, [(3212, 3200, 0), DESTINATION], 8.0)
+    with open(path) as reader:
+        routes.record((3300, 3300, 0), DESTINATION, [DESTINATION], 20.0)
+        # A reader of the previous file keeps seeing it whole
+        assert len(json.load(reader)["routes"]) == 1
+    assert os.listdir(os.path.dirname(path)) == ["routes.json"]
+    assert len(RouteCache(path).routes) == 2
+
+    os.mkdir(f"{path}.{os.getpid()}.tmp")
+    routes.drop(START, DESTINATION)
+    # The failed save left the previous file in place
+    assert len(RouteCache(path).routes) == 2
+
+    with open(path, "w") as f:
+        json.dump({"region_size": 8, "routes": {"0,0,0->1,1,0": {"waypoints": [[1, 1, 0]]}}}, f)
+    assert RouteCache(path).routes == {}
+
+    bounded = RouteCache(max_routes=2)
+    for index in range(3):
+        bounded.record((3200 + index * 16, 3200, 0), DESTINATION, [DESTINATION], 1.0)
+    assert bounded.lookup(START, DESTINATION) is None and len(bounded.routes) == 2
+    print("✓ Route cache saved atomically")
+
+
+if __name__ == "__main__":
+    test_simplify_trace()
+    test_direct_walk_records_route()
+    test_stuck_walk_is_abandoned()
+    test_stuck_route_is_dropped()
+    test_deadline_and_unreadable_position()
+    test_route_cache_writes_atomically()
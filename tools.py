@@ -1,501 +1,1504 @@
 #!/usr/bin/env python3
 
+from typing import Any, Callable, Dict, List, Optional, Union
+
 import mcp.types as types
 
+from macros import DEFAULT_MAX_ACTIONS, MAX_ACTIONS, MAX_LOOP_ITERATIONS, MAX_SLEEP, check_macro
+from output_format import OUTPUT_MODES
+from wait_conditions import COMPARISON_OPERATORS, CONDITION_TYPES, check_condition
 
-def get_tool_definitions() -> list[types.Tool]:
-    """Get all tool definitions for the MCP server."""
-    return [
-        types.Tool(
-            name="call_java_method",
-            description="Call a Java method via named pipe with arguments",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "method_name": {
-                        "type": "string",
-                        "description": "Name of the Java method to call"
-                    },
-                    "args": {
-                        "type": "array",
-                        "description": "Arguments to pass to the method",
-                        "items": {
-                            "oneOf": [
-                                {"type": "string"},
-                                {"type": "number"},
-                                {"type": "boolean"}
-                            ]
-                        }
-                    },
-                    "pipe_path": {
-                        "type": "string",
-                        "description": "Custom named pipe path (optional)",
-                        "default": "/tmp/dreambot_shim_pipe"
-                    }
+
+# Python type checks for the JSON schema types used by the tool definitions
+_TYPE_CHECKS = {
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "array": lambda value: isinstance(value, list),
+    "object": lambda value: isinstance(value, dict),
+}
+
+_TYPE_NAMES = {
+    "string": "a string",
+    "integer": "an integer",
+    "number": "a number",
+    "boolean": "a boolean",
+    "array": "an array",
+    "object": "an object",
+}
+
+
+def compile_validator(schema: Dict[str, Any]) -> Callable[[Any, str], Optional[str]]:
+    """Compile the JSON schema subset used by the tools into a validation function.
+    
+    The returned function takes (value, path) and returns an error message, or
+    None when the value is valid. Required string properties must also be
+    non-empty, matching what the handlers have always enforced.
+    """
+    checks = []
+    
+    schema_type = schema.get("type")
+    if schema_type in _TYPE_CHECKS:
+        type_check = _TYPE_CHECKS[schema_type]
+        type_name = _TYPE_NAMES[schema_type]
+        checks.append(lambda value, path: None if type_check(value) else f"{path} must be {type_name}")
+    
+    if "oneOf" in schema:
+        options = [compile_validator(option) for option in schema["oneOf"]]
+        allowed = " or ".join(_TYPE_NAMES.get(option.get("type"), "valid") for option in schema["oneOf"])
+        checks.append(lambda value, path: None if any(option(value, path) is None for option in options) else f"{path} must be {allowed}")
+    
+    if "enum" in schema:
+        choices = list(schema["enum"])
+        checks.append(lambda value, path: None if value in choices else f"{path} must be one of {', '.join(map(str, choices))}")
+    
+    if "minimum" in schema:
+        minimum = schema["minimum"]
+        checks.append(lambda value, path: None if value >= minimum else f"{path} must be at least {minimum}")
+    
+    if "exclusiveMinimum" in schema:
+        exclusive_minimum = schema["exclusiveMinimum"]
+        checks.append(lambda value, path: None if value > exclusive_minimum else f"{path} must be greater than {exclusive_minimum}")
+    
+    for length_key in ("minLength", "minItems"):
+        if length_key in schema:
+            min_length = schema[length_key]
+            checks.append(lambda value, path: None if len(value) >= min_length else f"{path} must not be empty")
+    
+    if "items" in schema:
+        item_check = compile_validator(schema["items"])
+        
+        def check_items(value, path):
+            for index, item in enumerate(value):
+                error = item_check(item, f"{path}[{index}]")
+                if error:
+                    return error
+            return None
+        checks.append(check_items)
+    
+    if "properties" in schema or "required" in schema:
+        properties = schema.get("properties", {})
+        property_checks = {name: compile_validator(prop) for name, prop in properties.items()}
+        required = list(schema.get("required", []))
+        required_strings = {name for name in required if properties.get(name, {}).get("type") == "string"}
+        
+        def check_properties(value, path):
+            prefix = f"{path}." if path else ""
+            for name in required:
+                if value.get(name) is None or (name in required_strings and value.get(name) == ""):
+                    return f"{prefix}{name} is required"
+            for name, check in property_checks.items():
+                if value.get(name) is not None:
+                    error = check(value[name], f"{prefix}{name}")
+                    if error:
+                        return error
+            return None
+        checks.append(check_properties)
+    
+    def validate(value, path=""):
+        # Later checks assume the type check (always first) passed
+        for check in checks:
+            error = check(value, path)
+            if error:
+                return error
+        return None
+    return validate
+
+
+# Added to every tool's schema; routes the call to a pooled bot connection (see bot_pool.py)
+BOT_ID_PROPERTY = {
+    "type": "string",
+    "description": "Bot to run this on, as named in the bot registry (optional, defaults to the server's own bot)"
+}
+
+# Added to the schema of every tool that calls the shim; overrides the tool's default deadline
+TIMEOUT_PROPERTY = {
+    "type": "number",
+    "exclusiveMinimum": 0,
+    "description": "Seconds to wait for the shim before giving up (optional, defaults to the tool's own deadline)"
+}
+
+# Added to the schema of every tool backed by one shim method, and get_more_results; selects the result format
+OUTPUT_PROPERTY = {
+    "type": "string",
+    "enum": list(OUTPUT_MODES),
+    "description": (
+        "Result format (optional, defaults to the server's): verbose prose, compact key=value lines or minimal json. "
+        "Long text is cut to a page in every format, and compact and json also cut long lists; "
+        "the rest is fetched with get_more_results and the returned cursor"
+    )
+}
+
+# Added to the schema of every tool with item name arguments; skips checking them against the item dictionary
+EXACT_ITEM_NAMES_PROPERTY = {
+    "type": "boolean",
+    "description": (
+        "Send item names exactly as given (optional). By default names are matched against the items the bot has seen: "
+        "case and spacing are corrected, and likely misspellings are rejected with suggestions"
+    )
+}
+
+# Default deadlines in seconds, so a hung shim fails fast for quick reads
+# QUICK_TIMEOUT covers reads and task-list bookkeeping that never touch the game world
+QUICK_TIMEOUT = 2.0
+ACTION_TIMEOUT = 30.0
+WALK_TIMEOUT = 300.0
+# Arbitrary shim methods keep the caller's historical default
+RAW_CALL_TIMEOUT = 300.0
+# Extra time on top of handle_npc_dialogue's own max_wait_time
+DIALOGUE_MARGIN = 10.0
+
+
+class ToolSpec:
+    """Declarative description of one MCP tool.
+    
+    Tools backed by a single shim method declare the Java method name, the
+    order in which tool arguments map onto its positional arguments (a
+    "*name" entry spreads a list argument) and how to format the result.
+    Tools with method=None are implemented directly in handlers.py.
+    
+    timeout is the default deadline in seconds (or a function of the tool
+    arguments returning one); a timeout argument overrides it per call.
+    Tools that never call the shim use timeout=None.
+    
+    item_args names the arguments holding item names (or is a function of
+    the tool arguments returning them), which are checked against the item
+    dictionary unless item_id_flag names an argument set to treat them as
+    ids.
+    """
+    
+    def __init__(self, name: str, description: str, input_schema: Dict[str, Any],
+                 method: Optional[str] = None, args: Optional[List[str]] = None,
+                 success: Optional[str] = None, default: Optional[str] = None, failure: Optional[str] = None,
+                 formatter: Optional[Callable[[Dict[str, Any], Any], str]] = None,
+                 check: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None,
+                 timeout: Union[float, Callable[[Dict[str, Any]], float], None] = ACTION_TIMEOUT,
+                 item_args: Union[List[str], Callable[[Dict[str, Any]], List[str]], None] = None,
+                 item_id_flag: Optional[str] = None):
+        properties = dict(input_schema.get("properties", {}), bot_id=BOT_ID_PROPERTY)
+        if timeout is not None:
+            properties.setdefault("timeout", TIMEOUT_PROPERTY)
+        if item_args:
+            properties.setdefault("exact_item_names", EXACT_ITEM_NAMES_PROPERTY)
+        if method is not None:
+            properties.setdefault("output", OUTPUT_PROPERTY)
+        input_schema = dict(input_schema, properties=properties)
+        self.name = name
+        self.description = description
+        self.input_schema = input_schema
+        self.method = method
+        self.args = args or []
+        self.success = success
+        self.default = default
+        self.failure = failure or f"Failed to run {name}"
+        self.formatter = formatter
+        self.check = check
+        self.timeout = timeout
+        self.item_args = item_args or []
+        self.item_id_flag = item_id_flag
+        # Precomputed once so each call only does dictionary lookups
+        self.defaults = {
+            arg: prop["default"] for arg, prop in input_schema.get("properties", {}).items() if "default" in prop
+        }
+        self.tool = types.Tool(name=name, description=description, inputSchema=input_schema)
+        self._validate = compile_validator(input_schema)
+    
+    def validate(self, args: Dict[str, Any]) -> Optional[str]:
+        """Return an error message if args do not satisfy the tool's schema."""
+        error = self._validate(args)
+        if error is None and self.check:
+            error = self.check(args)
+        return error
+    
+    def deadline(self, args: Dict[str, Any]) -> Optional[float]:
+        """Return the seconds this call may wait for the shim: the timeout argument or the tool's default."""
+        if args.get("timeout") is not None:
+            return args["timeout"]
+        if callable(self.timeout):
+            return self.timeout(args)
+        return self.timeout
+    
+    def item_name_args(self, args: Dict[str, Any]) -> List[str]:
+        """Return the arguments of this call holding item names to check against the item dictionary."""
+        if args.get("exact_item_names") or (self.item_id_flag and args.get(self.item_id_flag)):
+            return []
+        names = self.item_args(args) if callable(self.item_args) else self.item_args
+        return [name for name in names if args.get(name) is not None]
+    
+    def shim_args(self, args: Dict[str, Any]) -> list:
+        """Map tool arguments onto the shim method's positional arguments."""
+        values = []
+        for arg in self.args:
+            if arg.startswith("*"):
+                values.extend(args.get(arg[1:]) or [])
+            else:
+                value = args.get(arg)
+                values.append(self.defaults.get(arg) if value is None else value)
+        return values
+    
+    def format_result(self, args: Dict[str, Any], result: Any) -> str:
+        """Format a successful shim result for the agent."""
+        if self.formatter:
+            return self.formatter(args, result)
+        if result is None and self.default is not None:
+            result = self.default.format(**dict(self.defaults, **args))
+        return self.success.format(result=result)
+
+
+# Result formatters for tools whose output depends on the result value
+def _item_type(args: Dict[str, Any]) -> str:
+    return "ID" if args.get("use_item_id") else "name"
+
+
+def _format_inventory_count(args: Dict[str, Any], result: Any) -> str:
+    if result == "count_unknown":
+        return "Inventory count request sent successfully (actual count unknown - enable response waiting for real count)"
+    return f"Inventory count: {'Unknown' if result is None else result}"
+
+
+def _format_inventory_item_count(args: Dict[str, Any], result: Any) -> str:
+    if result is None or result == -1:
+        return f"Item {_item_type(args)} '{args['item_name']}' not found in inventory"
+    return f"Inventory contains {result} of item {_item_type(args)} '{args['item_name']}'"
+
+
+def _format_inventory_contains(args: Dict[str, Any], result: Any) -> str:
+    status = "contains" if result else "does not contain"
+    return f"Inventory {status} item {_item_type(args)} '{args['item_name']}'"
+
+
+def _format_bank_status(args: Dict[str, Any], result: Any) -> str:
+    if result == "status_unknown":
+        return "Bank status check sent successfully (actual status unknown - enable response waiting for real status)"
+    elif isinstance(result, bool):
+        return f"Bank is {'open' if result else 'closed'}"
+    elif isinstance(result, str) and result.lower() in ["true", "open", "yes"]:
+        return "Bank is open"
+    elif isinstance(result, str) and result.lower() in ["false", "closed", "no"]:
+        return "Bank is closed"
+    return f"Bank status: {result}"
+
+
+def _format_upcoming_steps(args: Dict[str, Any], result: Any) -> str:
+    if not result:
+        return "No upcoming steps"
+    if not isinstance(result, list):
+        return f"Upcoming steps: {result}"
+    lines = [f"{index}. {step}" for index, step in enumerate(result)]
+    return f"Upcoming steps ({len(result)}):\n" + "\n".join(lines)
+
+
+def _format_npc_dialogue(args: Dict[str, Any], result: Any) -> str:
+    if result is None:
+        result = f"Successfully handled dialogue with {args.get('npc_name') or 'NPC'}"
+    return f"NPC dialogue result: {result}"
+
+
+def _format_ground_item_exists(args: Dict[str, Any], result: Any) -> str:
+    exists_text = "exists" if result else "does not exist"
+    return f"Ground item '{args['item_name']}' {exists_text}"
+
+
+def _format_ground_item_distance(args: Dict[str, Any], result: Any) -> str:
+    if result is None or result == -1:
+        return f"Ground item '{args['item_name']}' not found"
+    return f"Distance to '{args['item_name']}': {result:.1f}"
+
+
+def _perform_item_action_items(args: Dict[str, Any]) -> List[str]:
+    """The target is an item name only for inventory actions."""
+    return ["item", "target"] if args.get("target_type") == "item" else ["item"]
+
+
+def _check_step_edits(args: Dict[str, Any]) -> Optional[str]:
+    """Reject malformed edits locally so a bad plan never half-applies on the shim."""
+    required_fields = {
+        "insert": ("index", "step_description"),
+        "remove": ("index",),
+        "move": ("from_index", "to_index"),
+    }
+    for position, edit in enumerate(args["edits"]):
+        missing = [field for field in required_fields[edit["op"]] if edit.get(field) is None]
+        if missing:
+            return f"edits[{position}] ({edit['op']}) requires {', '.join(missing)}"
+    return None
+
+
+def _npc_dialogue_deadline(args: Dict[str, Any]) -> float:
+    return args.get("max_wait_time", 120) + DIALOGUE_MARGIN
+
+
+def _check_broadcast(args: Dict[str, Any]) -> Optional[str]:
+    """Reject broadcasts that would be invalid on every bot before any bot is contacted."""
+    if args["tool"] == "broadcast":
+        return "broadcast cannot run itself"
+    spec = TOOL_SPECS_BY_NAME.get(args["tool"])
+    if spec is None:
+        return f"Unknown tool: {args['tool']}"
+    error = spec.validate(args.get("arguments") or {})
+    return f"arguments: {error}" if error else None
+
+
+def _check_wait_until(args: Dict[str, Any]) -> Optional[str]:
+    """Reject conditions missing the fields their type needs."""
+    for index, condition in enumerate(args["conditions"]):
+        error = check_condition(condition)
+        if error:
+            return f"conditions[{index}]: {error}"
+    return None
+
+
+def _check_macro_tool(name: str, args: Dict[str, Any]) -> Optional[str]:
+    """Macro steps may use any tool backed by a single shim method."""
+    spec = TOOL_SPECS_BY_NAME.get(name)
+    if spec is None:
+        return f"Unknown tool: {name}"
+    if spec.method is None:
+        return f"{name} cannot be used in a macro (only tools that call one shim method can)"
+    if "bot_id" in args:
+        return "set bot_id on run_macro itself, not on its steps"
+    return None
+
+
+def _check_run_macro(args: Dict[str, Any]) -> Optional[str]:
+    """Reject malformed scripts before the first step runs."""
+    return check_macro(args["steps"], _check_macro_tool)
+
+
+TOOL_SPECS = [
+    ToolSpec(
+        name="call_java_method",
+        timeout=RAW_CALL_TIMEOUT,
+        description="Call a Java method via named pipe with arguments",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "method_name": {
+                    "type": "string",
+                    "description": "Name of the Java method to call"
                 },
-                "required": ["method_name"]
-            }
-        ),
-        types.Tool(
-            name="greet_user",
-            description="Greet a user via the Java shim",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "name": {
-                        "type": "string",
-                        "description": "Name of the person to greet"
+                "args": {
+                    "type": "array",
+                    "description": "Arguments to pass to the method",
+                    "items": {
+                        "oneOf": [
+                            {"type": "string"},
+                            {"type": "number"},
+                            {"type": "boolean"}
+                        ]
                     }
                 },
-                "required": ["name"]
-            }
-        ),
-        types.Tool(
-            name="calculate",
-            description="Perform a calculation via the Java shim",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "a": {
-                        "type": "number",
-                        "description": "First number"
-                    },
-                    "b": {
-                        "type": "number",
-                        "description": "Second number"
-                    },
-                    "operation": {
-                        "type": "string",
-                        "description": "Operation to perform",
-                        "enum": ["add", "subtract", "multiply", "divide"]
-                    }
+                "pipe_path": {
+                    "type": "string",
+                    "description": "Custom named pipe path (optional)",
+                    "default": "/tmp/dreambot_shim_pipe"
                 },
-                "required": ["a", "b", "operation"]
-            }
-        ),
-        types.Tool(
-            name="walk_to_location",
-            description="Command the bot to walk to specific coordinates (x, y, z)",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "x": {
-                        "type": "integer",
-                        "description": "X coordinate"
-                    },
-                    "y": {
-                        "type": "integer",
-                        "description": "Y coordinate"
-                    },
-                    "z": {
-                        "type": "integer",
-                        "description": "Z coordinate (plane/level), optional, defaults to 0"
+                "response_pipe_path": {
+                    "type": "string",
+                    "description": "Response pipe for a custom pipe_path (optional; defaults to the pipe named after it, e.g. /tmp/alt_pipe -> /tmp/alt_response_pipe)"
+                }
+            },
+            "required": ["method_name"]
+        }
+    ),
+    ToolSpec(
+        name="call_batch",
+        timeout=RAW_CALL_TIMEOUT,
+        description="Call several Java methods in a single round-trip to the shim. Returns each call's result or error in order",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "calls": {
+                    "type": "array",
+                    "minItems": 1,
+                    "description": "Method calls to run, e.g. [{\"method\": \"getInventoryCount\"}, {\"method\": \"bankIsOpen\"}]",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "method": {
+                                "type": "string",
+                                "description": "Name of the Java method to call"
+                            },
+                            "args": {
+                                "type": "array",
+                                "description": "Arguments to pass to the method",
+                                "items": {
+                                    "oneOf": [
+                                        {"type": "string"},
+                                        {"type": "number"},
+                                        {"type": "boolean"}
+                                    ]
+                                }
+                            }
+                        },
+                        "required": ["method"]
                     }
+                }
+            },
+            "required": ["calls"]
+        }
+    ),
+    ToolSpec(
+        name="broadcast",
+        timeout=None,
+        check=_check_broadcast,
+        description="Run one tool on many bots concurrently and return a table of each bot's result. Total time is that of the slowest bot",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "tool": {
+                    "type": "string",
+                    "description": "Name of the tool to run on every selected bot, e.g. deposit_all"
                 },
-                "required": ["x", "y"]
-            }
-        ),
-        types.Tool(
-            name="click_object",
-            description="Command the bot to click on an object",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "object_name": {
-                        "type": "string",
-                        "description": "Name of the object to click"
-                    }
+                "arguments": {
+                    "type": "object",
+                    "description": "Arguments for the tool (without bot_id)"
                 },
-                "required": ["object_name"]
-            }
-        ),
-        types.Tool(
-            name="get_inventory_count",
-            description="Get the current inventory count from the bot and return the actual count",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        ),
-        types.Tool(
-            name="check_inventory_for_item",
-            description="Check if inventory contains a specific item and return count. Returns -1 if item not found, 0+ for actual count",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "item_name": {
-                        "type": "string",
-                        "description": "Name or ID of the item to check for"
-                    },
-                    "use_item_id": {
-                        "type": "boolean",
-                        "description": "Whether to treat item_name as an ID (true) or name (false). Default is false (names)."
-                    }
+                "bots": {
+                    "oneOf": [
+                        {"type": "string"},
+                        {"type": "array", "items": {"type": "string"}}
+                    ],
+                    "description": "Bot ids to run on, as a list or a glob such as \"alt*\" (default: all bots)",
+                    "default": "*"
                 },
-                "required": ["item_name"]
-            }
-        ),
-        types.Tool(
-            name="inventory_contains_item",
-            description="Check if inventory contains a specific item (boolean result). Simple true/false check without count",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "item_name": {
-                        "type": "string",
-                        "description": "Name or ID of the item to check for"
-                    },
-                    "use_item_id": {
-                        "type": "boolean",
-                        "description": "Whether to treat item_name as an ID (true) or name (false). Default is false (names)."
-                    }
+                "max_concurrency": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "description": "Maximum number of bots running the tool at once",
+                    "default": 16
                 },
-                "required": ["item_name"]
-            }
+                "timeout": {
+                    "type": "number",
+                    "exclusiveMinimum": 0,
+                    "description": "Deadline in seconds for each bot (default: the tool's own deadline)"
+                }
+            },
+            "required": ["tool"]
+        }
+    ),
+    ToolSpec(
+        name="run_macro",
+        timeout=None,
+        check=_check_run_macro,
+        description=(
+            "Run a sequence of tool calls on the server in one turn and return a compact summary. "
+            "Each step is one of: "
+            "{\"tool\": name, \"args\": {...}, \"save\": var, \"on_error\": \"stop\"|\"continue\"}; "
+            "{\"if\": condition, \"then\": [steps], \"else\": [steps]}; "
+            f"{{\"repeat\": n, \"steps\": [steps]}} (n <= {MAX_LOOP_ITERATIONS}); "
+            "{\"while\": condition, \"max_iterations\": n, \"steps\": [steps]}; "
+            f"{{\"set\": {{var: value}}}}; {{\"sleep\": seconds}} (<= {MAX_SLEEP:g}); {{\"stop\": message}}. "
+            "A condition is {\"var\": name, \"op\": \"==\"|\"!=\"|\"<\"|\"<=\"|\">\"|\">=\"|\"contains\"|\"truthy\"|\"falsy\", "
+            "\"value\": x} or {\"all\"|\"any\": [conditions]} or {\"not\": condition}. "
+            "Tool results are saved to the \"save\" variable and to \"last\"; loops set \"iteration\". "
+            "\"$var\" (or \"$var.field\") as a whole value is replaced by the variable, \"${var}\" inside text by its text. "
+            "A failed tool call (the shim reported an error) ends the macro unless on_error is \"continue\""
         ),
-        types.Tool(
-            name="check_bank_open",
-            description="Check if the bank is currently open and return true/false status",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        ),
-        types.Tool(
-            name="close_bank",
-            description="Close the bank if it is currently open",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        ),
-        types.Tool(
-            name="withdraw_item",
-            description="Withdraw a specific item from the bank with quantity",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "item_name": {
-                        "type": "string",
-                        "description": "Name of the item to withdraw"
-                    },
-                    "quantity": {
-                        "type": "integer",
-                        "description": "Quantity to withdraw (use -1 for all)"
-                    }
+        input_schema={
+            "type": "object",
+            "properties": {
+                "steps": {
+                    "type": "array",
+                    "minItems": 1,
+                    "description": "Steps to run in order, e.g. [{\"repeat\": 10, \"steps\": [{\"tool\": \"withdraw_item\", "
+                                   "\"args\": {\"item_name\": \"$item\", \"quantity\": 14}}, {\"tool\": \"deposit_all\"}]}]",
+                    "items": {"type": "object"}
                 },
-                "required": ["item_name", "quantity"]
-            }
-        ),
-        types.Tool(
-            name="deposit_item",
-            description="Deposit a specific item to the bank with quantity",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "item_name": {
-                        "type": "string",
-                        "description": "Name of the item to deposit"
-                    },
-                    "quantity": {
-                        "type": "integer",
-                        "description": "Quantity to deposit (use -1 for all)"
-                    }
+                "variables": {
+                    "type": "object",
+                    "description": "Initial variable values, e.g. {\"item\": \"Logs\"}"
                 },
-                "required": ["item_name", "quantity"]
-            }
-        ),
-        types.Tool(
-            name="deposit_all",
-            description="Deposit all items from inventory to the bank",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        ),
-        types.Tool(
-            name="run_dreambot_action",
-            description="Run a DreamBot action with parameters",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "action": {
-                        "type": "string",
-                        "description": "The action to perform"
-                    },
-                    "params": {
-                        "type": "array",
-                        "description": "Parameters for the action",
-                        "items": {"type": "string"}
-                    }
+                "max_actions": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "description": f"Stop after this many tool calls (at most {MAX_ACTIONS})",
+                    "default": DEFAULT_MAX_ACTIONS
                 },
-                "required": ["action"]
-            }
+                "timeout": {
+                    "type": "number",
+                    "exclusiveMinimum": 0,
+                    "description": "Deadline in seconds for the whole macro (optional, no deadline by default)"
+                }
+            },
+            "required": ["steps"]
+        }
+    ),
+    ToolSpec(
+        name="wait_until",
+        timeout=ACTION_TIMEOUT,
+        check=_check_wait_until,
+        description=(
+            "Wait on the server until game-state conditions hold, instead of polling with repeated tool calls. "
+            "Returns as soon as they hold (or at the deadline) with the elapsed time and number of evaluations. "
+            "Condition types: at_tile (x, y, z, radius), inventory_count (count, op, optional item_name), "
+            "bank_open (open), ground_item (item_name, present)"
         ),
-        types.Tool(
-            name="log_message",
-            description="Log a message with specified level",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "level": {
-                        "type": "string",
-                        "description": "Log level",
-                        "enum": ["INFO", "DEBUG", "ERROR", "WARN"]
-                    },
-                    "message": {
-                        "type": "string",
-                        "description": "Message to log"
+        input_schema={
+            "type": "object",
+            "properties": {
+                "conditions": {
+                    "type": "array",
+                    "minItems": 1,
+                    "description": "Conditions to wait for, e.g. [{\"type\": \"at_tile\", \"x\": 3222, \"y\": 3218, \"radius\": 2}]",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "type": {
+                                "type": "string",
+                                "enum": list(CONDITION_TYPES),
+                                "description": "Kind of condition"
+                            },
+                            "x": {"type": "integer", "description": "Tile x coordinate (at_tile)"},
+                            "y": {"type": "integer", "description": "Tile y coordinate (at_tile)"},
+                            "z": {"type": "integer", "description": "Plane (at_tile, default 0)"},
+                            "radius": {
+                                "type": "integer",
+                                "minimum": 0,
+                                "description": "Tiles the player may be away from (x, y) (at_tile, default 0)"
+                            },
+                            "item_name": {
+                                "type": "string",
+                                "description": "Item name, or id with use_item_id (inventory_count: omit to count all items; ground_item)"
+                            },
+                            "use_item_id": {
+                                "type": "boolean",
+                                "description": "Treat item_name as an item id (inventory_count, default false)"
+                            },
+                            "count": {
+                                "type": "integer",
+                                "minimum": 0,
+                                "description": "Amount to compare with (inventory_count)"
+                            },
+                            "op": {
+                                "type": "string",
+                                "enum": list(COMPARISON_OPERATORS),
+                                "description": "Comparison of the amount with count (inventory_count, default >=)"
+                            },
+                            "open": {"type": "boolean", "description": "Wait for the bank to be open or closed (bank_open, default true)"},
+                            "present": {"type": "boolean", "description": "Wait for the item to appear or disappear (ground_item, default true)"}
+                        },
+                        "required": ["type"]
                     }
                 },
-                "required": ["level", "message"]
-            }
-        ),
-        # Task Management Tools
-        types.Tool(
-            name="clear_upcoming_steps",
-            description="Clear all upcoming steps from the task list",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        ),
-        types.Tool(
-            name="add_upcoming_step",
-            description="Add a new step to the upcoming task list",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "step_description": {
-                        "type": "string",
-                        "description": "Description of the step to add"
-                    }
+                "match": {
+                    "type": "string",
+                    "enum": ["all", "any"],
+                    "description": "Whether all conditions or any one of them must hold",
+                    "default": "all"
                 },
-                "required": ["step_description"]
-            }
-        ),
-        types.Tool(
-            name="get_upcoming_steps_count",
-            description="Get the actual number of upcoming steps in the task list",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        ),
-        types.Tool(
-            name="peek_next_step",
-            description="Preview the next step without removing it from the list and return step details",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        ),
-        types.Tool(
-            name="get_next_step",
-            description="Get and remove the next step from the task list, returning the step description",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        ),
-        types.Tool(
-            name="set_current_step",
-            description="Set the current step being executed",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "step_description": {
-                        "type": "string",
-                        "description": "Description of the current step"
-                    }
+                "timeout": {
+                    "type": "number",
+                    "exclusiveMinimum": 0,
+                    "description": f"Seconds to wait before giving up (default {ACTION_TIMEOUT:g})"
+                }
+            },
+            "required": ["conditions"]
+        }
+    ),
+    ToolSpec(
+        name="greet_user",
+        method="greet",
+        args=["name"],
+        timeout=QUICK_TIMEOUT,
+        success="Greeting result: {result}",
+        default="Greeting completed",
+        failure="Failed to greet user",
+        description="Greet a user via the Java shim",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "name": {
+                    "type": "string",
+                    "description": "Name of the person to greet"
+                }
+            },
+            "required": ["name"]
+        }
+    ),
+    ToolSpec(
+        name="calculate",
+        method="calculate",
+        args=["a", "b", "operation"],
+        timeout=QUICK_TIMEOUT,
+        success="Calculation result: {result}",
+        default="{a} {operation} {b}",
+        failure="Failed to calculate",
+        description="Perform a calculation via the Java shim",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "a": {
+                    "type": "number",
+                    "description": "First number"
                 },
-                "required": ["step_description"]
-            }
-        ),
-        types.Tool(
-            name="remove_upcoming_step",
-            description="Remove a specific step from the upcoming task list by index",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "index": {
-                        "type": "integer",
-                        "description": "Index of the step to remove (0-based)"
-                    }
+                "b": {
+                    "type": "number",
+                    "description": "Second number"
                 },
-                "required": ["index"]
-            }
-        ),
-        types.Tool(
-            name="insert_upcoming_step",
-            description="Insert a step at a specific position in the upcoming task list",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "index": {
-                        "type": "integer",
-                        "description": "Index where to insert the step (0-based)"
-                    },
-                    "step_description": {
-                        "type": "string",
-                        "description": "Description of the step to insert"
-                    }
+                "operation": {
+                    "type": "string",
+                    "description": "Operation to perform",
+                    "enum": ["add", "subtract", "multiply", "divide"]
+                }
+            },
+            "required": ["a", "b", "operation"]
+        }
+    ),
+    ToolSpec(
+        name="walk_to_location",
+        method="walkToLocation",
+        args=["x", "y", "z"],
+        timeout=WALK_TIMEOUT,
+        success="Walk result: {result}",
+        default="Walking to ({x}, {y}, {z})",
+        failure="Failed to walk",
+        description="Command the bot to walk to specific coordinates (x, y, z)",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "x": {
+                    "type": "integer",
+                    "description": "X coordinate"
                 },
-                "required": ["index", "step_description"]
-            }
-        ),
-        types.Tool(
-            name="handle_npc_dialogue",
-            description="Handle NPC dialogue interactions, waiting for all dialogue to complete. Uses the Tutorial Island dialogue handling pattern.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "npc_name": {
-                        "type": "string",
-                        "description": "Name of the NPC to interact with (optional, can be empty for any dialogue)"
-                    },
-                    "max_wait_time": {
-                        "type": "integer",
-                        "description": "Maximum time to wait for dialogue completion in seconds (default: 30)"
-                    }
+                "y": {
+                    "type": "integer",
+                    "description": "Y coordinate"
                 },
-                "required": []
-            }
+                "z": {
+                    "type": "integer",
+                    "description": "Z coordinate (plane/level), optional, defaults to 0",
+                    "default": 0
+                }
+            },
+            "required": ["x", "y"]
+        }
+    ),
+    ToolSpec(
+        name="travel_to_location",
+        timeout=WALK_TIMEOUT,
+        description=(
+            "Walk to specific coordinates (x, y, z) like walk_to_location, but planned on the server: "
+            "trips made before from the same area follow their cached route in short segments with their own deadlines, "
+            "and the walk stops as soon as the bot stops moving for a few seconds instead of waiting out the timeout. "
+            "Successful walks are cached for repeat trips"
         ),
-        types.Tool(
-            name="use_item_on_item",
-            description="Use one item on another item in the inventory (combine items)",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "primary_item": {
-                        "type": "string", 
-                        "description": "Name or ID of the primary item to use"
-                    },
-                    "secondary_item": {
-                        "type": "string",
-                        "description": "Name or ID of the secondary item to use the primary item on"
-                    },
-                    "use_item_ids": {
-                        "type": "boolean",
-                        "description": "Whether to treat the item parameters as IDs (true) or names (false). Default is false (names)."
-                    }
+        input_schema={
+            "type": "object",
+            "properties": {
+                "x": {
+                    "type": "integer",
+                    "description": "X coordinate"
                 },
-                "required": ["primary_item", "secondary_item"]
-            }
-        ),
-        types.Tool(
-            name="perform_item_action",
-            description="Perform a custom action on an item, or use an item on a game object. Examples: 'Eat' on 'Lobster', use 'Bread' on 'Oven', 'Drop' an item, etc.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "action": {
-                        "type": "string",
-                        "description": "The action to perform (e.g., 'Eat', 'Use', 'Drop', 'Drink', 'Wield', etc.)"
-                    },
-                    "item": {
-                        "type": "string",
-                        "description": "Name or ID of the item to perform the action on"
-                    },
-                    "target": {
-                        "type": "string",
-                        "description": "Optional target for the action. Can be another item name (for inventory actions) or game object name (for world interactions)"
-                    },
-                    "use_item_ids": {
-                        "type": "boolean",
-                        "description": "Whether to treat the item parameter as an ID (true) or name (false). Default is false (names)."
-                    },
-                    "target_type": {
-                        "type": "string",
-                        "description": "Type of target: 'item' for inventory items, 'object' for game objects. Default is 'object' if target is provided.",
-                        "enum": ["item", "object"]
-                    }
+                "y": {
+                    "type": "integer",
+                    "description": "Y coordinate"
                 },
-                "required": ["action", "item"]
-            }
-        ),
-        # Ground Item Tools
-        types.Tool(
-            name="pickup_ground_item",
-            description="Pick up a ground item by name",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "item_name": {
-                        "type": "string",
-                        "description": "Name of the ground item to pick up"
-                    }
+                "z": {
+                    "type": "integer",
+                    "description": "Z coordinate (plane/level), optional, defaults to 0",
+                    "default": 0
                 },
-                "required": ["item_name"]
-            }
-        ),
-        types.Tool(
-            name="pickup_ground_item_by_id",
-            description="Pick up a ground item by ID",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "item_id": {
-                        "type": "integer",
-                        "description": "ID of the ground item to pick up"
-                    }
+                "timeout": {
+                    "type": "number",
+                    "exclusiveMinimum": 0,
+                    "description": f"Seconds the whole walk may take (default {WALK_TIMEOUT:g})"
+                }
+            },
+            "required": ["x", "y"]
+        }
+    ),
+    ToolSpec(
+        name="click_object",
+        method="clickObject",
+        args=["object_name"],
+        success="Click result: {result}",
+        default="Clicked {object_name}",
+        failure="Failed to click object",
+        description="Command the bot to click on an object",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "object_name": {
+                    "type": "string",
+                    "description": "Name of the object to click"
+                }
+            },
+            "required": ["object_name"]
+        }
+    ),
+    ToolSpec(
+        name="get_inventory_count",
+        method="getInventoryCount",
+        args=[],
+        timeout=QUICK_TIMEOUT,
+        formatter=_format_inventory_count,
+        failure="Failed to get inventory count",
+        description="Get the current inventory count from the bot and return the actual count",
+        input_schema={
+            "type": "object",
+            "properties": {},
+            "required": []
+        }
+    ),
+    ToolSpec(
+        name="check_inventory_for_item",
+        method="checkInventoryForItem",
+        args=["item_name", "use_item_id"],
+        item_args=["item_name"],
+        item_id_flag="use_item_id",
+        timeout=QUICK_TIMEOUT,
+        formatter=_format_inventory_item_count,
+        failure="Failed to check inventory for item",
+        description="Check if inventory contains a specific item and return count. Returns -1 if item not found, 0+ for actual count",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "item_name": {
+                    "type": "string",
+                    "description": "Name or ID of the item to check for"
                 },
-                "required": ["item_id"]
-            }
-        ),
-        types.Tool(
-            name="get_nearby_ground_items",
-            description="Get information about nearby ground items",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
+                "use_item_id": {
+                    "type": "boolean",
+                    "description": "Whether to treat item_name as an ID (true) or name (false). Default is false (names).",
+                    "default": False
+                }
+            },
+            "required": ["item_name"]
+        }
+    ),
+    ToolSpec(
+        name="inventory_contains_item",
+        method="inventoryContainsItem",
+        args=["item_name", "use_item_id"],
+        item_args=["item_name"],
+        item_id_flag="use_item_id",
+        timeout=QUICK_TIMEOUT,
+        formatter=_format_inventory_contains,
+        failure="Failed to check if inventory contains item",
+        description="Check if inventory contains a specific item (boolean result). Simple true/false check without count",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "item_name": {
+                    "type": "string",
+                    "description": "Name or ID of the item to check for"
+                },
+                "use_item_id": {
+                    "type": "boolean",
+                    "description": "Whether to treat item_name as an ID (true) or name (false). Default is false (names).",
+                    "default": False
+                }
+            },
+            "required": ["item_name"]
+        }
+    ),
+    ToolSpec(
+        name="lookup_item",
+        timeout=None,
+        description=(
+            "Look an item up in the server's dictionary of items the bot has seen, by id, name, name prefix "
+            "or misspelled name, without calling the shim. Useful for finding the exact name or id to pass to item tools"
         ),
-        types.Tool(
-            name="ground_item_exists",
-            description="Check if a specific ground item exists nearby",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "item_name": {
-                        "type": "string",
-                        "description": "Name of the ground item to check for"
+        input_schema={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Item id, name or start of a name"
+                },
+                "limit": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "description": "Most matches to list per kind of match",
+                    "default": 5
+                }
+            },
+            "required": ["query"]
+        }
+    ),
+    ToolSpec(
+        name="check_bank_open",
+        method="bankIsOpen",
+        args=[],
+        timeout=QUICK_TIMEOUT,
+        formatter=_format_bank_status,
+        failure="Failed to check bank status",
+        description="Check if the bank is currently open and return true/false status",
+        input_schema={
+            "type": "object",
+            "properties": {},
+            "required": []
+        }
+    ),
+    ToolSpec(
+        name="close_bank",
+        method="closeBank",
+        args=[],
+        success="Close bank result: {result}",
+        default="Bank close attempted",
+        failure="Failed to close bank",
+        description="Close the bank if it is currently open",
+        input_schema={
+            "type": "object",
+            "properties": {},
+            "required": []
+        }
+    ),
+    ToolSpec(
+        name="withdraw_item",
+        method="withdrawItem",
+        args=["item_name", "quantity"],
+        item_args=["item_name"],
+        success="Withdraw item result: {result}",
+        default="Withdraw {quantity} {item_name} attempted",
+        failure="Failed to withdraw item",
+        description="Withdraw a specific item from the bank with quantity",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "item_name": {
+                    "type": "string",
+                    "description": "Name of the item to withdraw"
+                },
+                "quantity": {
+                    "type": "integer",
+                    "description": "Quantity to withdraw (use -1 for all)"
+                }
+            },
+            "required": ["item_name", "quantity"]
+        }
+    ),
+    ToolSpec(
+        name="deposit_item",
+        method="depositItem",
+        args=["item_name", "quantity"],
+        item_args=["item_name"],
+        success="Deposit item result: {result}",
+        default="Deposit {quantity} {item_name} attempted",
+        failure="Failed to deposit item",
+        description="Deposit a specific item to the bank with quantity",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "item_name": {
+                    "type": "string",
+                    "description": "Name of the item to deposit"
+                },
+                "quantity": {
+                    "type": "integer",
+                    "description": "Quantity to deposit (use -1 for all)"
+                }
+            },
+            "required": ["item_name", "quantity"]
+        }
+    ),
+    ToolSpec(
+        name="deposit_all",
+        method="depositAllExcept",
+        args=[],
+        success="Deposit all result: {result}",
+        default="Deposit all attempted",
+        failure="Failed to deposit all",
+        description="Deposit all items from inventory to the bank",
+        input_schema={
+            "type": "object",
+            "properties": {},
+            "required": []
+        }
+    ),
+    ToolSpec(
+        name="run_dreambot_action",
+        method="runDreambotAction",
+        args=["action", "*params"],
+        success="DreamBot action result: {result}",
+        default="Action '{action}' executed",
+        failure="Failed to execute DreamBot action",
+        description="Run a DreamBot action with parameters",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "action": {
+                    "type": "string",
+                    "description": "The action to perform"
+                },
+                "params": {
+                    "type": "array",
+                    "description": "Parameters for the action",
+                    "items": {"type": "string"}
+                }
+            },
+            "required": ["action"]
+        }
+    ),
+    ToolSpec(
+        name="log_message",
+        method="logMessage",
+        args=["level", "message"],
+        timeout=QUICK_TIMEOUT,
+        success="Log message result: {result}",
+        default="[{level}] {message}",
+        failure="Failed to log message",
+        description="Log a message with specified level",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "level": {
+                    "type": "string",
+                    "description": "Log level",
+                    "enum": ["INFO", "DEBUG", "ERROR", "WARN"]
+                },
+                "message": {
+                    "type": "string",
+                    "description": "Message to log"
+                }
+            },
+            "required": ["level", "message"]
+        }
+    ),
+    # Task Management Tools
+    ToolSpec(
+        name="clear_upcoming_steps",
+        method="clearUpcomingSteps",
+        args=[],
+        timeout=QUICK_TIMEOUT,
+        success="Cleared upcoming steps: {result}",
+        default="Steps cleared",
+        failure="Failed to clear upcoming steps",
+        description="Clear all upcoming steps from the task list",
+        input_schema={
+            "type": "object",
+            "properties": {},
+            "required": []
+        }
+    ),
+    ToolSpec(
+        name="add_upcoming_step",
+        method="addUpcomingStep",
+        args=["step_description"],
+        timeout=QUICK_TIMEOUT,
+        success="Step added: {result}",
+        default="Added: {step_description}",
+        failure="Failed to add step",
+        description="Add a new step to the upcoming task list",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "step_description": {
+                    "type": "string",
+                    "description": "Description of the step to add"
+                }
+            },
+            "required": ["step_description"]
+        }
+    ),
+    ToolSpec(
+        name="get_upcoming_steps_count",
+        method="getUpcomingStepsCount",
+        args=[],
+        timeout=QUICK_TIMEOUT,
+        success="Upcoming steps count: {result}",
+        default="0",
+        failure="Failed to get steps count",
+        description="Get the actual number of upcoming steps in the task list",
+        input_schema={
+            "type": "object",
+            "properties": {},
+            "required": []
+        }
+    ),
+    ToolSpec(
+        name="peek_next_step",
+        method="peekNextStep",
+        args=[],
+        timeout=QUICK_TIMEOUT,
+        success="Next step: {result}",
+        default="No upcoming steps",
+        failure="Failed to peek next step",
+        description="Preview the next step without removing it from the list and return step details",
+        input_schema={
+            "type": "object",
+            "properties": {},
+            "required": []
+        }
+    ),
+    ToolSpec(
+        name="get_next_step",
+        method="getNextStep",
+        args=[],
+        timeout=QUICK_TIMEOUT,
+        success="Retrieved next step: {result}",
+        default="No steps available",
+        failure="Failed to get next step",
+        description="Get and remove the next step from the task list, returning the step description",
+        input_schema={
+            "type": "object",
+            "properties": {},
+            "required": []
+        }
+    ),
+    ToolSpec(
+        name="set_current_step",
+        method="setCurrentStep",
+        args=["step_description"],
+        timeout=QUICK_TIMEOUT,
+        success="Set current step: {result}",
+        default="Current step: {step_description}",
+        failure="Failed to set current step",
+        description="Set the current step being executed",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "step_description": {
+                    "type": "string",
+                    "description": "Description of the current step"
+                }
+            },
+            "required": ["step_description"]
+        }
+    ),
+    ToolSpec(
+        name="remove_upcoming_step",
+        method="removeUpcomingStep",
+        args=["index"],
+        timeout=QUICK_TIMEOUT,
+        success="Remove step result: {result}",
+        default="Removed step at index {index}",
+        failure="Failed to remove step",
+        description="Remove a specific step from the upcoming task list by index",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "index": {
+                    "type": "integer",
+                    "description": "Index of the step to remove (0-based)"
+                }
+            },
+            "required": ["index"]
+        }
+    ),
+    ToolSpec(
+        name="insert_upcoming_step",
+        method="insertUpcomingStep",
+        args=["index", "step_description"],
+        timeout=QUICK_TIMEOUT,
+        success="Insert step result: {result}",
+        default="Inserted '{step_description}' at index {index}",
+        failure="Failed to insert step",
+        description="Insert a step at a specific position in the upcoming task list",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "index": {
+                    "type": "integer",
+                    "description": "Index where to insert the step (0-based)"
+                },
+                "step_description": {
+                    "type": "string",
+                    "description": "Description of the step to insert"
+                }
+            },
+            "required": ["index", "step_description"]
+        }
+    ),
+    ToolSpec(
+        name="get_upcoming_steps",
+        method="getUpcomingSteps",
+        args=[],
+        timeout=QUICK_TIMEOUT,
+        formatter=_format_upcoming_steps,
+        failure="Failed to get upcoming steps",
+        description="Get the full list of upcoming steps in order",
+        input_schema={
+            "type": "object",
+            "properties": {},
+            "required": []
+        }
+    ),
+    ToolSpec(
+        name="add_upcoming_steps",
+        method="addUpcomingSteps",
+        args=["step_descriptions"],
+        timeout=QUICK_TIMEOUT,
+        success="Steps added: {result}",
+        default="Steps appended",
+        failure="Failed to add steps",
+        description="Append several steps to the end of the upcoming task list in one call",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "step_descriptions": {
+                    "type": "array",
+                    "description": "Step descriptions in execution order",
+                    "items": {"type": "string", "minLength": 1}
+                }
+            },
+            "required": ["step_descriptions"]
+        }
+    ),
+    ToolSpec(
+        name="replace_upcoming_steps",
+        method="replaceUpcomingSteps",
+        args=["step_descriptions"],
+        timeout=QUICK_TIMEOUT,
+        success="Replace steps result: {result}",
+        default="Upcoming steps replaced",
+        failure="Failed to replace steps",
+        description="Replace the whole upcoming task list with the given steps in one call",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "step_descriptions": {
+                    "type": "array",
+                    "description": "Step descriptions in execution order",
+                    "items": {"type": "string", "minLength": 1}
+                }
+            },
+            "required": ["step_descriptions"]
+        }
+    ),
+    ToolSpec(
+        name="apply_step_edits",
+        check=_check_step_edits,
+        method="applyStepEdits",
+        args=["edits"],
+        timeout=QUICK_TIMEOUT,
+        success="Step edits result: {result}",
+        default="Edits applied",
+        failure="Failed to apply step edits",
+        description="Apply a list of insert/remove/move edits to the upcoming task list atomically. Edits are applied in order, each against the result of the previous one",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "edits": {
+                    "type": "array",
+                    "minItems": 1,
+                    "description": "Edits, e.g. {\"op\": \"insert\", \"index\": 0, \"step_description\": \"...\"}, {\"op\": \"remove\", \"index\": 2}, {\"op\": \"move\", \"from_index\": 3, \"to_index\": 0}",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "op": {
+                                "type": "string",
+                                "enum": ["insert", "remove", "move"]
+                            },
+                            "index": {
+                                "type": "integer",
+                                "description": "Target index for insert/remove (0-based)"
+                            },
+                            "step_description": {
+                                "type": "string",
+                                "description": "Step to insert (insert only)"
+                            },
+                            "from_index": {
+                                "type": "integer",
+                                "description": "Current index of the step to move (move only)"
+                            },
+                            "to_index": {
+                                "type": "integer",
+                                "description": "New index of the moved step (move only)"
+                            }
+                        },
+                        "required": ["op"]
                     }
+                }
+            },
+            "required": ["edits"]
+        }
+    ),
+    ToolSpec(
+        name="handle_npc_dialogue",
+        method="handleNPCDialogue",
+        args=["npc_name", "max_wait_time"],
+        timeout=_npc_dialogue_deadline,
+        formatter=_format_npc_dialogue,
+        failure="Failed to handle NPC dialogue",
+        description="Handle NPC dialogue interactions, waiting for all dialogue to complete. Uses the Tutorial Island dialogue handling pattern.",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "npc_name": {
+                    "type": "string",
+                    "description": "Name of the NPC to interact with (optional, can be empty for any dialogue)",
+                    "default": ""
+                },
+                "max_wait_time": {
+                    "type": "integer",
+                    "description": "Maximum time to wait for dialogue completion in seconds (default: 120)",
+                    "default": 120
+                }
+            },
+            "required": []
+        }
+    ),
+    ToolSpec(
+        name="use_item_on_item",
+        method="useItemOnItem",
+        args=["primary_item", "secondary_item", "use_item_ids"],
+        item_args=["primary_item", "secondary_item"],
+        item_id_flag="use_item_ids",
+        success="Use item on item result: {result}",
+        default="Used {primary_item} on {secondary_item}",
+        failure="Failed to use item on item",
+        description="Use one item on another item in the inventory (combine items)",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "primary_item": {
+                    "type": "string", 
+                    "description": "Name or ID of the primary item to use"
+                },
+                "secondary_item": {
+                    "type": "string",
+                    "description": "Name or ID of the secondary item to use the primary item on"
                 },
-                "required": ["item_name"]
-            }
+                "use_item_ids": {
+                    "type": "boolean",
+                    "description": "Whether to treat the item parameters as IDs (true) or names (false). Default is false (names).",
+                    "default": False
+                }
+            },
+            "required": ["primary_item", "secondary_item"]
+        }
+    ),
+    ToolSpec(
+        name="perform_item_action",
+        method="performItemAction",
+        args=["action", "item", "target", "use_item_ids", "target_type"],
+        item_args=_perform_item_action_items,
+        item_id_flag="use_item_ids",
+        success="Item action result: {result}",
+        default="Performed {action} on {item}",
+        failure="Failed to perform item action",
+        description="Perform a custom action on an item, or use an item on a game object. Examples: 'Eat' on 'Lobster', use 'Bread' on 'Oven', 'Drop' an item, etc.",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "action": {
+                    "type": "string",
+                    "description": "The action to perform (e.g., 'Eat', 'Use', 'Drop', 'Drink', 'Wield', etc.)"
+                },
+                "item": {
+                    "type": "string",
+                    "description": "Name or ID of the item to perform the action on"
+                },
+                "target": {
+                    "type": "string",
+                    "description": "Optional target for the action. Can be another item name (for inventory actions) or game object name (for world interactions)"
+                },
+                "use_item_ids": {
+                    "type": "boolean",
+                    "description": "Whether to treat the item parameter as an ID (true) or name (false). Default is false (names).",
+                    "default": False
+                },
+                "target_type": {
+                    "type": "string",
+                    "description": "Type of target: 'item' for inventory items, 'object' for game objects. Default is 'object' if target is provided.",
+                    "enum": ["item", "object"],
+                    "default": "object"
+                }
+            },
+            "required": ["action", "item"]
+        }
+    ),
+    # Ground Item Tools
+    ToolSpec(
+        name="pickup_ground_item",
+        method="pickupGroundItem",
+        args=["item_name"],
+        success="Pickup ground item result: {result}",
+        default="Attempted to pick up ground item: {item_name}",
+        failure="Failed to pick up ground item",
+        description="Pick up a ground item by name",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "item_name": {
+                    "type": "string",
+                    "description": "Name of the ground item to pick up"
+                }
+            },
+            "required": ["item_name"]
+        }
+    ),
+    ToolSpec(
+        name="pickup_ground_item_by_id",
+        method="pickupGroundItemById",
+        args=["item_id"],
+        success="Pickup ground item by ID result: {result}",
+        default="Attempted to pick up ground item ID: {item_id}",
+        failure="Failed to pick up ground item by ID",
+        description="Pick up a ground item by ID",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "item_id": {
+                    "type": "integer",
+                    "description": "ID of the ground item to pick up"
+                }
+            },
+            "required": ["item_id"]
+        }
+    ),
+    ToolSpec(
+        name="get_nearby_ground_items",
+        method="getNearbyGroundItems",
+        args=[],
+        timeout=QUICK_TIMEOUT,
+        success="Nearby ground items: {result}",
+        default="No ground items information available",
+        failure="Failed to get nearby ground items",
+        description="Get information about nearby ground items",
+        input_schema={
+            "type": "object",
+            "properties": {},
+            "required": []
+        }
+    ),
+    ToolSpec(
+        name="ground_item_exists",
+        method="groundItemExists",
+        args=["item_name"],
+        timeout=QUICK_TIMEOUT,
+        formatter=_format_ground_item_exists,
+        failure="Failed to check if ground item exists",
+        description="Check if a specific ground item exists nearby",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "item_name": {
+                    "type": "string",
+                    "description": "Name of the ground item to check for"
+                }
+            },
+            "required": ["item_name"]
+        }
+    ),
+    ToolSpec(
+        name="get_distance_to_ground_item",
+        method="getDistanceToGroundItem",
+        args=["item_name"],
+        timeout=QUICK_TIMEOUT,
+        formatter=_format_ground_item_distance,
+        failure="Failed to get distance to ground item",
+        description="Get the distance to the closest ground item by name",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "item_name": {
+                    "type": "string",
+                    "description": "Name of the ground item to get distance to"
+                }
+            },
+            "required": ["item_name"]
+        }
+    ),
+    ToolSpec(
+        name="find_ground_items",
+        timeout=QUICK_TIMEOUT,
+        failure="Failed to find ground items",
+        description=(
+            "List nearby ground items nearest first, optionally only one kind and only within a radius, "
+            "with their tiles and distances. Answered on the server from the cached nearby items and player tile"
         ),
-        types.Tool(
-            name="get_distance_to_ground_item",
-            description="Get the distance to the closest ground item by name",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "item_name": {
-                        "type": "string",
-                        "description": "Name of the ground item to get distance to"
-                    }
+        input_schema={
+            "type": "object",
+            "properties": {
+                "item_name": {
+                    "type": "string",
+                    "description": "Only list items with this name (or id with use_item_id); omit to list every item"
+                },
+                "use_item_id": {
+                    "type": "boolean",
+                    "description": "Treat item_name as an item id",
+                    "default": False
+                },
+                "radius": {
+                    "type": "number",
+                    "minimum": 0,
+                    "description": "Only list items at most this many tiles away"
                 },
-                "required": ["item_name"]
-            }
+                "limit": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "description": "Most items to list",
+                    "default": 10
+                }
+            },
+            "required": []
+        }
+    ),
+    ToolSpec(
+        name="get_current_tile",
+        method="getPlayerLocation",
+        args=[],
+        timeout=QUICK_TIMEOUT,
+        success="Current tile: {result}",
+        default="Current tile unknown",
+        failure="Failed to get current tile",
+        description="Get the player's current tile coordinates (x, y, z)",
+        input_schema={
+            "type": "object",
+            "properties": {},
+            "required": []
+        }
+    ),
+    ToolSpec(
+        name="get_bridge_metrics",
+        timeout=None,
+        description=(
+            "Get per-method call, error and timeout counts and p50/p90/p99/max latency of each round-trip phase "
+            "(encode, write, wait, decode, shim, total), and the bytes each tool returned per output mode"
         ),
-        types.Tool(
-            name="get_current_tile",
-            description="Get the player's current tile coordinates (x, y, z)",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        )
-    ]
+        input_schema={
+            "type": "object",
+            "properties": {
+                "method": {
+                    "type": "string",
+                    "description": "Only show this shim method (optional)"
+                },
+                "all_bots": {
+                    "type": "boolean",
+                    "description": "Show every connected bot instead of just the selected one",
+                    "default": False
+                }
+            },
+            "required": []
+        }
+    ),
+    ToolSpec(
+        name="get_more_results",
+        timeout=None,
+        description="Get the next page of a long list or text result, using the cursor returned with the previous page",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "cursor": {
+                    "type": "string",
+                    "description": "Cursor from the previous page"
+                },
+                "output": OUTPUT_PROPERTY
+            },
+            "required": ["cursor"]
+        }
+    ),
+    ToolSpec(
+        name="get_cache_stats",
+        timeout=None,
+        description="Get hit/miss/invalidation counters and TTLs of the read-only game-state cache, per shim method",
+        input_schema={
+            "type": "object",
+            "properties": {},
+            "required": []
+        }
+    )
+]
+
+# Built once at import: O(1) dispatch by name and a tool list reused for every list_tools request
+TOOL_SPECS_BY_NAME = {spec.name: spec for spec in TOOL_SPECS}
+TOOL_DEFINITIONS = [spec.tool for spec in TOOL_SPECS]
+
+
+def get_tool_definitions() -> list[types.Tool]:
+    """Get all tool definitions for the MCP server."""
+    return TOOL_DEFINITIONS
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Opt-in request tracing: spans written to a JSONL file, convertible to Chrome trace-event format.
+
+Usage: python tracing.py trace.jsonl trace.json   (then open trace.json in chrome://tracing or Perfetto)
+"""
+
+import contextlib
+import contextvars
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
+
+
+# Buffered spans are written once a root span ends or this many are waiting
+FLUSH_THRESHOLD = 256
+
+# Span currently open in this task/thread; children started inside it nest under it
+_current_span: contextvars.ContextVar = contextvars.ContextVar("dreambot_current_span", default=None)
+
+
+class Span:
+    """One timed operation. Attributes added with set() end up in the span record."""
+    
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_us", "_started", "attrs")
+    
+    def __init__(self, name: str, trace_id: str, span_id: int, parent_id: Optional[int], attrs: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        # Wall-clock start so spans can be joined with the shim's; duration from the monotonic clock
+        self.start_us = time.time_ns() // 1000
+        self._started = time.perf_counter_ns()
+        self.attrs = attrs
+    
+    def set(self, key: str, value: Any) -> None:
+        self.attrs[key] = value
+    
+    def record(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_us": self.start_us,
+            "dur_us": (time.perf_counter_ns() - self._started) // 1000,
+            "attrs": self.attrs
+        }
+
+
+class Tracer:
+    """Writes spans as JSON lines to a local file.
+    
+    Each handle_call_tool invocation is a root span with its own trace id;
+    spans opened while it runs (validation, encode, transport write, wait,
+    format) become its children through a context variable, so concurrent
+    tool calls never mix. Spans are buffered and written in one go when
+    their root ends.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.pid = os.getpid()
+        self._file = open(path, "a", buffering=1024 * 1024)
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        self._span_ids = itertools.count(1)
+    
+    @contextlib.contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[Span]:
+        """Open a span as a child of the current one (or as a new root)."""
+        parent = _current_span.get()
+        if parent is None:
+            span = Span(name, uuid.uuid4().hex[:16], next(self._span_ids), None, attrs)
+        else:
+            span = Span(name, parent.trace_id, next(self._span_ids), parent.span_id, attrs)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set("error", type(e).__name__)
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(span)
+    
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+    
+    def flush(self) -> None:
+        with self._lock:
+            if self._buffer:
+                self._file.write("".join(self._buffer))
+                self._file.flush()
+                self._buffer = []
+    
+    def close(self) -> None:
+        self.flush()
+        self._file.close()
+    
+    def _finish(self, span: Span) -> None:
+        record = span.record()
+        record["pid"] = self.pid
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            self._buffer.append(line)
+            pending = len(self._buffer)
+        if span.parent_id is None or pending >= FLUSH_THRESHOLD:
+            self.flush()
+
+
+def traced(tracer: Optional[Tracer], name: str, **attrs: Any):
+    """tracer.span(...) when tracing is enabled, otherwise a no-op context yielding None."""
+    if tracer is None:
+        return contextlib.nullcontext()
+    return tracer.span(name, **attrs)
+
+
+def convert_to_chrome(jsonl_path: str, output_path: str) -> int:
+    """Convert a span file to Chrome trace-event JSON; returns the number of spans converted.
+    
+    Overlapping traces are placed on separate rows (tids) so concurrent tool
+    calls show up side by side in the flame chart.
+    """
+    spans = []
+    with open(jsonl_path) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                spans.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                print(f"Skipping line {line_number}: {e}", file=sys.stderr)
+    
+    # Give each trace the first row that is free for its whole duration
+    traces: Dict[str, List[int]] = {}
+    for span in spans:
+        start, end = span["start_us"], span["start_us"] + span["dur_us"]
+        bounds = traces.setdefault(span["trace_id"], [start, end])
+        bounds[0] = min(bounds[0], start)
+        bounds[1] = max(bounds[1], end)
+    row_ends: List[int] = []
+    rows: Dict[str, int] = {}
+    for trace_id, (start, end) in sorted(traces.items(), key=lambda item: item[1][0]):
+        for row, row_end in enumerate(row_ends):
+            if row_end <= start:
+                break
+        else:
+            row = len(row_ends)
+            row_ends.append(0)
+        row_ends[row] = end
+        rows[trace_id] = row
+    
+    events = [
+        {
+            "name": span["name"],
+            "cat": "dreambot",
+            "ph": "X",
+            "ts": span["start_us"],
+            "dur": span["dur_us"],
+            "pid": span.get("pid", 0),
+            "tid": rows[span["trace_id"]],
+            "args": dict(span.get("attrs") or {}, trace_id=span["trace_id"], span_id=span["span_id"])
+        }
+        for span in spans
+    ]
+    with open(output_path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return len(events)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(__doc__.strip(), file=sys.stderr)
+        sys.exit(2)
+    count = convert_to_chrome(sys.argv[1], sys.argv[2])
+    print(f"Wrote {count} spans to {sys.argv[2]}")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Recording of the messages exchanged with the shim, for replay with replay_shim.py.
+
+A log is a gzip stream: a file header, then one record per message holding
+the direction, the microseconds since recording started and the message as
+compact JSON. Messages are recorded decoded, so logs do not depend on the
+codec in use.
+
+Usage: python traffic_log.py session.log   (prints the records as JSON lines)
+"""
+
+import gzip
+import json
+import struct
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+LOG_MAGIC = b"DBTL"
+LOG_VERSION = 1
+
+# magic, version, wall-clock start time
+FILE_HEADER = struct.Struct(">4sBd")
+# direction, microseconds since start, payload length
+RECORD_HEADER = struct.Struct(">BQI")
+
+REQUEST = 0
+RESPONSE = 1
+
+DIRECTION_NAMES = {REQUEST: "request", RESPONSE: "response"}
+
+
+class TrafficRecorder:
+    """Appends every request sent to and response received from the shim to a log file."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self._file = gzip.open(path, "wb")
+        self._file.write(FILE_HEADER.pack(LOG_MAGIC, LOG_VERSION, self.started_at))
+        self._lock = threading.Lock()
+    
+    def record(self, direction: int, message: Dict[str, Any]) -> None:
+        payload = json.dumps(message, separators=(",", ":"), default=str).encode()
+        offset = int((time.perf_counter() - self._started) * 1_000_000)
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(RECORD_HEADER.pack(direction, offset, len(payload)))
+            self._file.write(payload)
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_traffic_log(path: str) -> Iterator[Tuple[int, float, Dict[str, Any]]]:
+    """Yield (direction, seconds since recording started, message) for each record; raises ValueError if malformed."""
+    with gzip.open(path, "rb") as f:
+        header = f.read(FILE_HEADER.size)
+        if len(header) < FILE_HEADER.size:
+            raise ValueError(f"{path} is not a traffic log")
+        magic, version, _ = FILE_HEADER.unpack(header)
+        if magic != LOG_MAGIC or version != LOG_VERSION:
+            raise ValueError(f"{path} is not a version {LOG_VERSION} traffic log")
+        
+        while True:
+            try:
+                record_header = f.read(RECORD_HEADER.size)
+                if not record_header:
+                    return
+                direction, offset, length = RECORD_HEADER.unpack(record_header)
+                payload = f.read(length)
+                if len(payload) < length:
+                    raise struct.error("truncated payload")
+                message = json.loads(payload)
+            except (EOFError, struct.error, json.JSONDecodeError) as e:
+                # The recording process died mid-write; keep everything before it
+                print(f"Traffic log {path} ends with a truncated record: {e}", file=sys.stderr)
+                return
+            yield direction, offset / 1_000_000, message
+
+
+class RecordedCall:
+    """A recorded request, when it was sent and the reply it got (None if it never got one)."""
+    
+    __slots__ = ("request", "sent_at", "response", "received_at")
+    
+    def __init__(self, request: Dict[str, Any], sent_at: float):
+        self.request = request
+        self.sent_at = sent_at
+        self.response: Optional[Dict[str, Any]] = None
+        self.received_at: Optional[float] = None
+    
+    @property
+    def round_trip(self) -> Optional[float]:
+        return None if self.received_at is None else self.received_at - self.sent_at
+
+
+def load_recorded_calls(path: str) -> List[RecordedCall]:
+    """Pair each recorded request with its response by id, in the order the requests were sent."""
+    calls: List[RecordedCall] = []
+    by_id: Dict[str, RecordedCall] = {}
+    for direction, offset, message in read_traffic_log(path):
+        if direction == REQUEST:
+            call = RecordedCall(message, offset)
+            calls.append(call)
+            if message.get("id") is not None:
+                by_id[message["id"]] = call
+        else:
+            call = by_id.pop(message.get("id"), None)
+            if call is not None:
+                call.response = message
+                call.received_at = offset
+    return calls
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__.strip(), file=sys.stderr)
+        sys.exit(2)
+    for direction, offset, message in read_traffic_log(sys.argv[1]):
+        print(json.dumps({"t": round(offset, 6), "direction": DIRECTION_NAMES.get(direction, direction), "message": message}))
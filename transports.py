@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+
+import asyncio
+import collections
+import errno
+import os
+import selectors
+import socket
+import struct
+import sys
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+DEFAULT_PIPE_PATH = "/tmp/dreambot_shim_pipe"
+# Shim protocol: a shim writes the replies to requests read from a FIFO to the
+# response FIFO paired with it by response_pipe_path_for(), unless the bridge
+# is configured with an explicit response_pipe_path. For the default pipe
+# that is this path. Shims serving any other request FIFO used to reply on
+# this one too; they must now reply on their own pair ("<name>_pipe" ->
+# "<name>_response_pipe", any other path -> "<path>_response").
+DEFAULT_RESPONSE_PIPE_PATH = "/tmp/dreambot_shim_response_pipe"
+DEFAULT_SOCKET_PATH = "/tmp/dreambot_shim.sock"
+
+# Length prefix used by framed transports: 4-byte big-endian payload size
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+
+def response_pipe_path_for(pipe_path: str) -> str:
+    """Return the response FIFO paired with a request FIFO.
+    
+    Each request FIFO gets its own response FIFO so callers talking to
+    different shims never read each other's replies: "<name>_pipe" pairs
+    with "<name>_response_pipe" (as the default paths do) and any other
+    path with "<path>_response".
+    """
+    if pipe_path.endswith("_pipe"):
+        return pipe_path[:-len("_pipe")] + "_response_pipe"
+    return pipe_path + "_response"
+
+
+def open_fifo_reader(path: str) -> tuple:
+    """Open a FIFO for non-blocking reads; returns (read_fd, keepalive_fd).
+    
+    Holding a write end keeps the read end from reporting EOF while the shim
+    has the pipe closed between writes.
+    """
+    read_fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+    try:
+        keepalive_fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+    except OSError:
+        os.close(read_fd)
+        raise
+    return read_fd, keepalive_fd
+
+
+class Transport:
+    """Moves encoded messages between JavaMethodCaller and the shim.
+    
+    Payloads handed to a transport are complete messages; each transport
+    frames them its own way. Received messages are delivered to the
+    on_message callback given to connect_async, and failures of the
+    connection to on_connection_lost. The synchronous send_sync/receive_sync
+    pair serves the blocking API and must not be mixed with the async API
+    on the same transport at the same time.
+    
+    binary_safe is True for transports whose framing can carry arbitrary
+    bytes, i.e. that can use the binary codec from shim_codec.py.
+    """
+    
+    binary_safe = False
+    
+    def is_available(self) -> bool:
+        """Cheap check that the shim endpoint exists."""
+        raise NotImplementedError
+    
+    def unavailable_error(self) -> str:
+        """Error message used when is_available() is False."""
+        raise NotImplementedError
+    
+    async def connect_async(self, on_message: Callable[[bytes], None],
+                            on_connection_lost: Callable[[Exception], None], deadline: float) -> None:
+        """Connect if not already connected; a no-op on an open connection."""
+        raise NotImplementedError
+    
+    async def send_async(self, payload: bytes, deadline: float) -> None:
+        """Send one message without blocking the event loop."""
+        raise NotImplementedError
+    
+    def send_sync(self, payload: bytes) -> None:
+        """Send one message, blocking until it is written."""
+        raise NotImplementedError
+    
+    def receive_sync(self, timeout: float) -> Optional[bytes]:
+        """Block for the next message; returns None on timeout."""
+        raise NotImplementedError
+    
+    def close(self) -> None:
+        """Release every descriptor and stop background readers."""
+        raise NotImplementedError
+
+
+class FifoTransport(Transport):
+    """Legacy transport over a request FIFO and a response FIFO carrying newline-delimited messages."""
+    
+    def __init__(self, pipe_path: str = DEFAULT_PIPE_PATH, response_pipe_path: Optional[str] = None):
+        self.pipe_path = pipe_path
+        self.response_pipe_path = response_pipe_path or response_pipe_path_for(pipe_path)
+        # Persistent async state, opened lazily and kept until close()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._request_fd: Optional[int] = None
+        self._response_fd: Optional[int] = None
+        self._response_keepalive_fd: Optional[int] = None
+        self._response_ready: Optional[asyncio.Event] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._on_message: Optional[Callable[[bytes], None]] = None
+        self._on_connection_lost: Optional[Callable[[Exception], None]] = None
+        self._read_buffer = bytearray(65536)
+        self._read_length = 0
+        # Blocking API state: a blocking request descriptor, a selector on the
+        # response descriptor and messages read but not yet returned
+        self._sync_request_fd: Optional[int] = None
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._sync_messages: collections.deque = collections.deque()
+    
+    def is_available(self) -> bool:
+        return os.path.exists(self.pipe_path)
+    
+    def unavailable_error(self) -> str:
+        return f"Named pipe {self.pipe_path} not available"
+    
+    async def connect_async(self, on_message: Callable[[bytes], None],
+                            on_connection_lost: Callable[[Exception], None], deadline: float) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Event loop state cannot be shared across loops (e.g. repeated asyncio.run)
+            self.close()
+            self._loop = loop
+            self._response_ready = asyncio.Event()
+            self._write_lock = asyncio.Lock()
+        self._on_message = on_message
+        self._on_connection_lost = on_connection_lost
+        
+        if self._response_fd is None:
+            self._open_response_pipe()
+            loop.add_reader(self._response_fd, self._response_ready.set)
+        
+        if self._reader_task is None or self._reader_task.done():
+            self._reader_task = loop.create_task(self._read_responses())
+        
+        if self._request_fd is None:
+            async with self._write_lock:
+                if self._request_fd is None:
+                    self._request_fd = await self._open_request_pipe_async(deadline)
+    
+    async def send_async(self, payload: bytes, deadline: float) -> None:
+        """Write a message to the persistent FIFO using writability notifications."""
+        data = payload + b'\n'
+        async with self._write_lock:
+            if self._request_fd is None:
+                self._request_fd = await self._open_request_pipe_async(deadline)
+            try:
+                await self._write_all_async(self._request_fd, data, deadline)
+            except BrokenPipeError:
+                # The shim closed its read end (e.g. restarted); reconnect once
+                os.close(self._request_fd)
+                self._request_fd = None
+                self._request_fd = await self._open_request_pipe_async(deadline)
+                await self._write_all_async(self._request_fd, data, deadline)
+    
+    def send_sync(self, payload: bytes) -> None:
+        """Write a message to the persistent request FIFO, blocking until the shim is listening."""
+        data = payload + b'\n'
+        if self._sync_request_fd is None:
+            self._sync_request_fd = os.open(self.pipe_path, os.O_WRONLY)
+        try:
+            self._write_all_sync(self._sync_request_fd, data)
+        except BrokenPipeError:
+            # The shim closed its read end (e.g. restarted); reconnect once
+            os.close(self._sync_request_fd)
+            self._sync_request_fd = None
+            self._sync_request_fd = os.open(self.pipe_path, os.O_WRONLY)
+            self._write_all_sync(self._sync_request_fd, data)
+    
+    def receive_sync(self, timeout: float) -> Optional[bytes]:
+        """Sleep in the kernel until the open response FIFO is readable; no polling while idle."""
+        if self._sync_messages:
+            return self._sync_messages.popleft()
+        
+        if self._response_fd is None:
+            self._open_response_pipe()
+        if self._selector is None:
+            self._selector = selectors.DefaultSelector()
+            self._selector.register(self._response_fd, selectors.EVENT_READ)
+        
+        deadline = time.monotonic() + timeout
+        while not self._sync_messages:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            if self._selector.select(remaining):
+                self._drain_response_pipe(self._sync_messages.append)
+        return self._sync_messages.popleft()
+    
+    def close(self) -> None:
+        if self._reader_task and not self._reader_task.done():
+            self._reader_task.cancel()
+        if self._loop and not self._loop.is_closed() and self._response_fd is not None:
+            self._loop.remove_reader(self._response_fd)
+        if self._selector:
+            self._selector.close()
+            self._selector = None
+        for fd in (self._request_fd, self._sync_request_fd, self._response_fd, self._response_keepalive_fd):
+            if fd is not None:
+                os.close(fd)
+        self._request_fd = self._sync_request_fd = self._response_fd = self._response_keepalive_fd = None
+        self._reader_task = None
+        self._loop = None
+        self._read_length = 0
+        self._sync_messages.clear()
+    
+    def _open_response_pipe(self) -> None:
+        """Open the response FIFO once; shared by the async reader and the blocking API."""
+        self._response_fd, self._response_keepalive_fd = open_fifo_reader(self.response_pipe_path)
+        self._read_length = 0
+    
+    async def _open_request_pipe_async(self, deadline: float) -> int:
+        """Open the request FIFO for non-blocking writes, waiting for the shim to listen."""
+        loop = asyncio.get_running_loop()
+        
+        # A non-blocking open fails with ENXIO until the shim opens its read end
+        delay = 0.01
+        while True:
+            try:
+                return os.open(self.pipe_path, os.O_WRONLY | os.O_NONBLOCK)
+            except OSError as e:
+                if e.errno != errno.ENXIO:
+                    raise
+                if loop.time() + delay > deadline:
+                    raise asyncio.TimeoutError()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.5)
+    
+    async def _write_all_async(self, fd: int, data: bytes, deadline: float) -> None:
+        """Write data fully to a non-blocking descriptor."""
+        loop = asyncio.get_running_loop()
+        view = memoryview(data)
+        while view:
+            try:
+                written = os.write(fd, view)
+                view = view[written:]
+            except BlockingIOError:
+                writable = loop.create_future()
+                loop.add_writer(fd, writable.set_result, None)
+                try:
+                    await asyncio.wait_for(writable, max(deadline - loop.time(), 0))
+                finally:
+                    loop.remove_writer(fd)
+    
+    def _write_all_sync(self, fd: int, data: bytes) -> None:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    
+    async def _read_responses(self) -> None:
+        """Background task that reads the response FIFO and delivers each message."""
+        while True:
+            await self._response_ready.wait()
+            self._response_ready.clear()
+            try:
+                self._drain_response_pipe(self._on_message)
+            except OSError as e:
+                print(f"Error reading response: {e}", file=sys.stderr)
+                self._on_connection_lost(e)
+    
+    def _drain_response_pipe(self, deliver: Callable[[bytes], None]) -> None:
+        """Read everything currently available into the reusable buffer and pass each message to deliver."""
+        while True:
+            if self._read_length == len(self._read_buffer):
+                # A single response larger than the buffer; grow it
+                self._read_buffer.extend(bytes(len(self._read_buffer)))
+            free = memoryview(self._read_buffer)[self._read_length:]
+            try:
+                count = os.readv(self._response_fd, [free])
+            except BlockingIOError:
+                return
+            finally:
+                free.release()
+            if count == 0:
+                return
+            self._read_length += count
+            self._dispatch_buffered_lines(deliver)
+    
+    def _dispatch_buffered_lines(self, deliver: Callable[[bytes], None]) -> None:
+        """Deliver every complete newline-framed message in the buffer."""
+        buffer = self._read_buffer
+        start = 0
+        while True:
+            newline = buffer.find(b'\n', start, self._read_length)
+            if newline < 0:
+                break
+            line = bytes(buffer[start:newline]).strip()
+            start = newline + 1
+            if line:
+                deliver(line)
+        
+        if start:
+            # Move any partial frame to the front of the buffer
+            remaining = self._read_length - start
+            buffer[:remaining] = buffer[start:self._read_length]
+            self._read_length = remaining
+
+
+class UnixSocketTransport(Transport):
+    """Full-duplex transport over a Unix domain socket with length-prefixed frames.
+    
+    Each frame is a 4-byte big-endian length followed by the payload. The
+    connection doubles as a liveness signal: connecting fails immediately if
+    the shim is not listening, and a closed connection fails every pending
+    request instead of letting it run into its timeout.
+    """
+    
+    binary_safe = True
+    
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH):
+        self.socket_path = socket_path
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+        # Blocking connection used by the synchronous API
+        self._sock: Optional[socket.socket] = None
+        self._sync_buffer = bytearray()
+    
+    def is_available(self) -> bool:
+        return os.path.exists(self.socket_path)
+    
+    def unavailable_error(self) -> str:
+        return f"Shim socket {self.socket_path} not available"
+    
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+    
+    async def connect_async(self, on_message: Callable[[bytes], None],
+                            on_connection_lost: Callable[[Exception], None], deadline: float) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self.close()
+            self._loop = loop
+            self._connect_lock = asyncio.Lock()
+        
+        async with self._connect_lock:
+            if self.connected:
+                return
+            try:
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_unix_connection(self.socket_path), max(deadline - loop.time(), 0)
+                )
+            except (ConnectionRefusedError, FileNotFoundError) as e:
+                raise ConnectionError(f"Java shim is not listening on {self.socket_path}: {e}") from e
+            self._reader_task = loop.create_task(self._read_frames(self._reader, on_message, on_connection_lost))
+    
+    async def send_async(self, payload: bytes, deadline: float) -> None:
+        if not self.connected:
+            raise ConnectionError(f"Not connected to {self.socket_path}")
+        # One write call per frame keeps concurrent senders from interleaving
+        self._writer.write(FRAME_HEADER.pack(len(payload)) + payload)
+        await asyncio.wait_for(self._writer.drain(), max(deadline - self._loop.time(), 0))
+    
+    def send_sync(self, payload: bytes) -> None:
+        if self._sock is None:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                self._sock.connect(self.socket_path)
+            except OSError:
+                self._sock.close()
+                self._sock = None
+                raise
+            self._sync_buffer.clear()
+        try:
+            self._sock.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+        except OSError:
+            self._close_sync_socket()
+            raise
+    
+    def receive_sync(self, timeout: float) -> Optional[bytes]:
+        if self._sock is None:
+            raise ConnectionError(f"Not connected to {self.socket_path}")
+        deadline = time.monotonic() + timeout
+        while True:
+            frame = self._pop_sync_frame()
+            if frame is not None:
+                return frame
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            self._sock.settimeout(remaining)
+            try:
+                chunk = self._sock.recv(65536)
+            except socket.timeout:
+                # Any partial frame stays buffered for the next call
+                return None
+            if not chunk:
+                self._close_sync_socket()
+                raise ConnectionError(f"Java shim closed the connection on {self.socket_path}")
+            self._sync_buffer.extend(chunk)
+    
+    def close(self) -> None:
+        if self._reader_task and not self._reader_task.done():
+            self._reader_task.cancel()
+        if self._writer is not None and self._loop and not self._loop.is_closed():
+            self._writer.close()
+        self._reader = self._writer = None
+        self._reader_task = None
+        self._loop = None
+        self._close_sync_socket()
+    
+    def _close_sync_socket(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        self._sync_buffer.clear()
+    
+    def _pop_sync_frame(self) -> Optional[bytes]:
+        """Remove and return one complete frame from the sync buffer, if present."""
+        if len(self._sync_buffer) < FRAME_HEADER.size:
+            return None
+        (length,) = FRAME_HEADER.unpack_from(self._sync_buffer)
+        if length > MAX_FRAME_SIZE:
+            self._close_sync_socket()
+            raise ConnectionError(f"Frame of {length} bytes exceeds the {MAX_FRAME_SIZE} byte limit")
+        end = FRAME_HEADER.size + length
+        if len(self._sync_buffer) < end:
+            return None
+        frame = bytes(self._sync_buffer[FRAME_HEADER.size:end])
+        del self._sync_buffer[:end]
+        return frame
+    
+    async def _read_frames(self, reader: asyncio.StreamReader, on_message: Callable[[bytes], None],
+                           on_connection_lost: Callable[[Exception], None]) -> None:
+        """Background task that reads length-prefixed frames until the connection closes."""
+        try:
+            while True:
+                header = await reader.readexactly(FRAME_HEADER.size)
+                (length,) = FRAME_HEADER.unpack(header)
+                if length > MAX_FRAME_SIZE:
+                    raise ConnectionError(f"Frame of {length} bytes exceeds the {MAX_FRAME_SIZE} byte limit")
+                on_message(await reader.readexactly(length))
+        except asyncio.CancelledError:
+            raise
+        except (asyncio.IncompleteReadError, ConnectionError, OSError) as e:
+            if self._reader is reader:
+                self._writer.close()
+                self._reader = self._writer = None
+            on_connection_lost(ConnectionError(f"Java shim closed the connection on {self.socket_path}: {e}"))
+
+
+def create_transport(config: Dict[str, Any]) -> Transport:
+    """Build a transport from configuration.
+    
+    config["transport"] selects "fifo" (default), "unix" or "shm"; the remaining
+    keys are the paths for that transport (pipe_path/response_pipe_path,
+    socket_path or ring_path). A FIFO config without response_pipe_path
+    uses the one paired with its pipe_path (see response_pipe_path_for).
+    """
+    kind = config.get("transport", "fifo")
+    if kind == "fifo":
+        return FifoTransport(config.get("pipe_path", DEFAULT_PIPE_PATH), config.get("response_pipe_path"))
+    elif kind == "unix":
+        return UnixSocketTransport(config.get("socket_path", DEFAULT_SOCKET_PATH))
+    elif kind == "shm":
+        # Imported here because shm_transport builds on this module
+        from shm_transport import DEFAULT_RING_PATH, SharedMemoryTransport
+        return SharedMemoryTransport(config.get("ring_path", DEFAULT_RING_PATH))
+    raise ValueError(f"Unknown transport: {kind}")
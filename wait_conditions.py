@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from item_dictionary import fold
+from java_caller import JavaMethodCaller
+from route_cache import format_tile, parse_tile
+
+
+# Polling backoff used when no fresh state mirror can push changes
+INITIAL_POLL_INTERVAL = 0.05
+MAX_POLL_INTERVAL = 0.5
+POLL_BACKOFF = 1.5
+
+CONDITION_TYPES = ("at_tile", "inventory_count", "bank_open", "ground_item")
+
+# Fields each condition type requires besides "type"
+REQUIRED_FIELDS = {
+    "at_tile": ("x", "y"),
+    "inventory_count": ("count",),
+    "bank_open": (),
+    "ground_item": ("item_name",),
+}
+
+_COMPARISONS = {
+    ">=": lambda value, target: value >= target,
+    ">": lambda value, target: value > target,
+    "<=": lambda value, target: value <= target,
+    "<": lambda value, target: value < target,
+    "==": lambda value, target: value == target,
+    "!=": lambda value, target: value != target,
+}
+COMPARISON_OPERATORS = tuple(_COMPARISONS)
+
+
+def check_condition(condition: Dict[str, Any]) -> Optional[str]:
+    """Return an error if a (schema-valid) condition lacks the fields its type needs."""
+    missing = [field for field in REQUIRED_FIELDS[condition["type"]] if condition.get(field) is None]
+    if missing:
+        return f"{condition['type']} requires {', '.join(missing)}"
+    return None
+
+
+def condition_read(condition: Dict[str, Any]) -> Tuple[str, tuple]:
+    """The read-only shim method and arguments whose result decides a condition."""
+    kind = condition["type"]
+    if kind == "at_tile":
+        return "getPlayerLocation", ()
+    if kind == "inventory_count":
+        if condition.get("item_name") is None:
+            return "getInventoryCount", ()
+        return "checkInventoryForItem", (condition["item_name"], condition.get("use_item_id", False))
+    if kind == "bank_open":
+        return "bankIsOpen", ()
+    # Answered by the state mirror when one is running, unlike groundItemExists
+    return "getNearbyGroundItems", ()
+
+
+def condition_holds(condition: Dict[str, Any], result: Any) -> bool:
+    kind = condition["type"]
+    if kind == "at_tile":
+        tile = parse_tile(result)
+        if tile is None:
+            return False
+        # Tile distance in the game is Chebyshev distance on the same plane
+        x, y, z = tile
+        return z == condition.get("z", 0) and max(abs(x - condition["x"]), abs(y - condition["y"])) <= condition.get("radius", 0)
+    if kind == "inventory_count":
+        if isinstance(result, bool) or not isinstance(result, (int, float)):
+            return False
+        # checkInventoryForItem answers -1 for an item that is not there
+        amount = max(result, 0)
+        return _COMPARISONS[condition.get("op", ">=")](amount, condition["count"])
+    if kind == "bank_open":
+        return result is not None and bool(result) == condition.get("open", True)
+    # Item names match the way the item dictionary matches them: ignoring case and extra whitespace
+    wanted = fold(condition["item_name"])
+    present = isinstance(result, list) and any(
+        isinstance(item, dict) and isinstance(item.get("name"), str) and fold(item["name"]) == wanted for item in result
+    )
+    return present == condition.get("present", True)
+
+
+def describe_condition(condition: Dict[str, Any]) -> str:
+    kind = condition["type"]
+    if kind == "at_tile":
+        tile = f"({condition['x']}, {condition['y']}, {condition.get('z', 0)})"
+        radius = condition.get("radius", 0)
+        return f"player at {tile}" if not radius else f"player within {radius} tiles of {tile}"
+    if kind == "inventory_count":
+        subject = f"'{condition['item_name']}' in inventory" if condition.get("item_name") is not None else "inventory items"
+        return f"{subject} {condition.get('op', '>=')} {condition['count']}"
+    if kind == "bank_open":
+        return "bank open" if condition.get("open", True) else "bank closed"
+    return f"ground item '{condition['item_name']}' {'present' if condition.get('present', True) else 'absent'}"
+
+
+def describe_observation(condition: Dict[str, Any], result: Any) -> str:
+    kind = condition["type"]
+    if kind == "at_tile":
+        tile = parse_tile(result)
+        return "position unknown" if tile is None else f"player at {format_tile(tile)}"
+    if kind == "inventory_count":
+        return f"count {max(result, 0) if isinstance(result, (int, float)) and not isinstance(result, bool) else result}"
+    if kind == "bank_open":
+        return "bank state unknown" if result is None else f"bank {'open' if result else 'closed'}"
+    return "item present" if condition_holds(dict(condition, present=True), result) else "item absent"
+
+
+class ConditionWaiter:
+    """Evaluates conditions until they hold (all of them, or any with match="any") or the deadline passes.
+    
+    Each evaluation issues one read per distinct shim method and arguments,
+    concurrently. While the caller has a fresh state mirror the reads are
+    answered from it and re-evaluation waits for the next pushed event;
+    otherwise reads bypass the response cache and re-evaluation backs off
+    from INITIAL_POLL_INTERVAL to MAX_POLL_INTERVAL. Failed reads count as
+    "not yet" and the last error is reported if the deadline passes.
+    """
+    
+    def __init__(self, java_caller: JavaMethodCaller, conditions: List[Dict[str, Any]], match: str = "all",
+                 timeout: float = 30.0, read_timeout: float = 2.0):
+        self.java_caller = java_caller
+        self.conditions = conditions
+        self.match = match
+        self.timeout = timeout
+        self.read_timeout = read_timeout
+        self.met = False
+        self.evaluations = 0
+        self.push_waits = 0
+        self.elapsed = 0.0
+        self.last_error: Optional[str] = None
+        # Latest result for each condition, by index
+        self.results: List[Any] = [None] * len(conditions)
+        self.holds: List[bool] = [False] * len(conditions)
+    
+    async def wait(self) -> "ConditionWaiter":
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + self.timeout
+        interval = INITIAL_POLL_INTERVAL
+        try:
+            while True:
+                self.met = await self._evaluate(max(min(self.read_timeout, deadline - loop.time()), 0.001))
+                if self.met:
+                    return self
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return self
+                mirror = self.java_caller.mirror
+                if mirror is not None and mirror.is_fresh():
+                    self.push_waits += 1
+                    await mirror.wait_for_change(min(remaining, MAX_POLL_INTERVAL))
+                else:
+                    await asyncio.sleep(min(interval, remaining))
+                    interval = min(interval * POLL_BACKOFF, MAX_POLL_INTERVAL)
+        finally:
+            self.elapsed = loop.time() - started
+    
+    async def _evaluate(self, read_timeout: float) -> bool:
+        reads: Dict[Tuple[str, tuple], List[int]] = {}
+        for index, condition in enumerate(self.conditions):
+            reads.setdefault(condition_read(condition), []).append(index)
+        responses = await asyncio.gather(*(
+            self.java_caller.call_method_async(method, *args, timeout=read_timeout, fresh=True)
+            for method, args in reads
+        ))
+        self.evaluations += 1
+        
+        for ((method, _), indexes), response in zip(reads.items(), responses):
+            if not response["success"] or response.get("error") is not None:
+                self.last_error = f"{method}: {response.get('error') or 'Unknown error'}"
+                for index in indexes:
+                    self.holds[index] = False
+                continue
+            for index in indexes:
+                self.results[index] = response.get("result")
+                self.holds[index] = condition_holds(self.conditions[index], response.get("result"))
+        return all(self.holds) if self.match == "all" else any(self.holds)
+    
+    def summary(self) -> str:
+        mode = "push events" if self.push_waits else "polling"
+        evaluations = f"{self.evaluations} evaluation{'' if self.evaluations == 1 else 's'}, {mode}"
+        joiner = " and " if self.match == "all" else " or "
+        wanted = joiner.join(describe_condition(condition) for condition in self.conditions)
+        if self.met:
+            return f"Condition met after {self.elapsed:.2f}s ({evaluations}): {wanted}"
+        
+        lines = [f"Timed out after {self.elapsed:.2f}s ({evaluations}) waiting for {wanted}"]
+        for condition, result, holds in zip(self.conditions, self.results, self.holds):
+            state = "met" if holds else "not met"
+            lines.append(f"  {describe_condition(condition)}: {state} ({describe_observation(condition, result)})")
+        if self.last_error:
+            lines.append(f"Last read error: {self.last_error}")
+        return "\n".join(lines)
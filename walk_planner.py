@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+import asyncio
+from typing import List, Optional
+
+from java_caller import JavaMethodCaller
+from route_cache import RouteCache, Tile, format_tile, parse_tile, simplify_trace, tile_distance
+from tracing import traced
+
+
+# Position is sampled about once per game tick while walking
+SAMPLE_INTERVAL = 0.6
+# A walk is abandoned when the position has not changed for this long
+STUCK_TIMEOUT = 6.0
+# Longest distance between consecutive waypoints of a recorded route
+SEGMENT_LENGTH = 12
+# Deadline of one route segment: a fixed allowance plus walking time per tile
+SEGMENT_BASE_TIMEOUT = 5.0
+SECONDS_PER_TILE = 0.6
+# How close counts as arriving at the destination, and at an intermediate waypoint
+ARRIVAL_RADIUS = 1
+WAYPOINT_RADIUS = 3
+# Deadline of each position read
+LOCATE_TIMEOUT = 2
+
+
+class WalkPlanner:
+    """Walks to a tile in segments, following a cached route when there is one.
+    
+    With a cached route each waypoint is one walkToLocation call with its own
+    deadline; without one the destination is walked to directly. Either way
+    the position is sampled while walking and the walk is abandoned (and the
+    shim told to cancel it) as soon as the bot stops moving for
+    STUCK_TIMEOUT, rather than when the whole deadline runs out. Samples of
+    a successful walk become the cached route for later trips from the same
+    region; a cached route that gets stuck is dropped, and the rest of the
+    trip is walked directly.
+    """
+    
+    def __init__(self, java_caller: JavaMethodCaller, destination: Tile, timeout: float = 300.0,
+                 routes: Optional[RouteCache] = None):
+        self.java_caller = java_caller
+        self.destination = destination
+        self.timeout = timeout
+        self.routes = routes
+        # "arrived", "stuck", "timeout" or "failed"
+        self.outcome = "failed"
+        self.error: Optional[str] = None
+        self.start: Optional[Tile] = None
+        self.position: Optional[Tile] = None
+        # Distinct positions seen since the start, in order
+        self.trace: List[Tile] = []
+        self.cached_segments = 0
+        self.segments_walked = 0
+        self.route_dropped = False
+        self.recorded_waypoints = 0
+        self.stuck_target: Optional[Tile] = None
+        self.elapsed = 0.0
+    
+    async def walk(self) -> "WalkPlanner":
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + self.timeout
+        try:
+            await self._locate()
+            if self.position is None:
+                self.error = f"Could not read the player position: {self.error}"
+                return self
+            self.start = self.position
+            if tile_distance(self.start, self.destination) <= ARRIVAL_RADIUS:
+                self.outcome = "arrived"
+                return self
+            
+            waypoints = self.routes.lookup(self.start, self.destination) if self.routes else None
+            if waypoints:
+                self.cached_segments = len(waypoints)
+                if await self._follow(waypoints, deadline):
+                    self.outcome = "arrived"
+                    return self
+                if self.outcome != "stuck":
+                    return self
+                self.routes.drop(self.start, self.destination)
+                self.route_dropped = True
+            
+            self.outcome = await self._walk_segment(self.destination, ARRIVAL_RADIUS, deadline, deadline)
+            if self.outcome == "arrived" and self.routes:
+                route = simplify_trace(self.trace, SEGMENT_LENGTH)
+                if route:
+                    self.routes.record(self.start, self.destination, route, loop.time() - started)
+                    self.recorded_waypoints = len(route)
+            return self
+        finally:
+            self.elapsed = loop.time() - started
+    
+    async def _follow(self, waypoints: List[Tile], deadline: float) -> bool:
+        """Walk a cached route from its waypoint nearest the current position; False (with outcome set) on failure."""
+        loop = asyncio.get_running_loop()
+        nearest = min(range(len(waypoints)), key=lambda index: tile_distance(self.position, waypoints[index]))
+        for index in range(nearest, len(waypoints)):
+            waypoint = waypoints[index]
+            last = index == len(waypoints) - 1
+            segment_deadline = min(deadline, loop.time() + SEGMENT_BASE_TIMEOUT + SECONDS_PER_TILE * tile_distance(self.position, waypoint))
+            self.outcome = await self._walk_segment(
+                self.destination if last else waypoint, ARRIVAL_RADIUS if last else WAYPOINT_RADIUS, segment_deadline, deadline
+            )
+            if self.outcome != "arrived":
+                return False
+        return True
+    
+    async def _walk_segment(self, target: Tile, radius: int, segment_deadline: float, deadline: float) -> str:
+        """Walk to target, sampling the position; returns "arrived", "stuck", "timeout" or "failed"."""
+        loop = asyncio.get_running_loop()
+        last_moved = loop.time()
+        self.segments_walked += 1
+        with traced(self.java_caller.tracer, "walk_segment", target=list(target)):
+            while True:
+                walk = asyncio.ensure_future(self.java_caller.call_method_async(
+                    "walkToLocation", *target, timeout=max(segment_deadline - loop.time(), 0.001)
+                ))
+                try:
+                    while not walk.done():
+                        await asyncio.wait({walk}, timeout=SAMPLE_INTERVAL)
+                        if await self._locate():
+                            last_moved = loop.time()
+                        if not walk.done() and loop.time() - last_moved >= STUCK_TIMEOUT:
+                            return self._stuck(target, f"no movement for {STUCK_TIMEOUT:g}s")
+                finally:
+                    # Abandoning the call also has the shim cancel the walk
+                    walk.cancel()
+                
+                response = walk.result()
+                if self.position is not None and tile_distance(self.position, target) <= radius:
+                    return "arrived"
+                if loop.time() >= segment_deadline:
+                    if segment_deadline >= deadline:
+                        self.error = "deadline passed"
+                        return "timeout"
+                    return self._stuck(target, "segment deadline passed")
+                if not response["success"] or response.get("error") is not None:
+                    self.error = response.get("error") or "Unknown error"
+                    return "failed"
+                if loop.time() - last_moved >= STUCK_TIMEOUT:
+                    return self._stuck(target, f"no movement for {STUCK_TIMEOUT:g}s")
+                # The walk ended short of the target (e.g. the shim walks a step at a time): walk again
+                await asyncio.sleep(min(SAMPLE_INTERVAL, max(segment_deadline - loop.time(), 0)))
+    
+    def _stuck(self, target: Tile, reason: str) -> str:
+        self.stuck_target = target
+        self.error = reason
+        return "stuck"
+    
+    async def _locate(self) -> bool:
+        """Read the position into self.position and the trace; True if it changed."""
+        response = await self.java_caller.call_method_async("getPlayerLocation", timeout=LOCATE_TIMEOUT, fresh=True)
+        position = parse_tile(response.get("result")) if response["success"] else None
+        if position is None:
+            self.error = response.get("error") or "no position in reply"
+            return False
+        if position == self.position:
+            return False
+        self.position = position
+        self.trace.append(position)
+        return True
+    
+    def summary(self) -> str:
+        destination = format_tile(self.destination)
+        route = ""
+        if self.cached_segments:
+            route = f" via cached route ({self.cached_segments} segments)"
+        if self.route_dropped:
+            route = " after leaving a cached route that got stuck (dropped)"
+        
+        if self.outcome == "arrived":
+            if self.segments_walked == 0:
+                return f"Already at {destination}"
+            text = f"Arrived at {format_tile(self.position)} in {self.elapsed:.1f}s{route or ' by direct walk'}"
+            if self.recorded_waypoints:
+                text += f"; cached a {self.recorded_waypoints}-waypoint route for repeat trips"
+            return text
+        if self.outcome == "failed":
+            return f"Failed to walk to {destination}: {self.error}"
+        if self.outcome == "timeout":
+            return f"Walk to {destination} timed out after {self.elapsed:.1f}s at {format_tile(self.position)}{route}"
+        text = f"Stuck at {format_tile(self.position)} after {self.elapsed:.1f}s walking to {destination}{route}: {self.error}"
+        if self.stuck_target != self.destination:
+            text += f" on the segment to {format_tile(self.stuck_target)}"
+        return text